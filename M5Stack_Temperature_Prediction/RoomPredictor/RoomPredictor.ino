@@ -4,7 +4,14 @@
 #include <HTTPClient.h>
 #include <ArduinoJson.h>
 #include "neural_weights.h"
+#if __has_include("history_files.h")
+#include "history_files.h"  // Historique sur SPIFFS / carte SD (export_csv_to_arduino_v2.py --target files)
+#else
 #include "csv_data.h"  // Données CSV réelles
+#endif
+#if __has_include("calendar_tables.h")
+#include "calendar_tables.h"  // Encodages saison / heure précalculés (calendar_tables.py)
+#endif
 
 // ============================================================================
 // FORWARD DECLARATIONS (Déclarations anticipées pour éviter erreurs compilation)
@@ -834,10 +841,16 @@ int day_of_year(int day, int month) {
 // Encodage cyclique de la date (sin/cos pour continuité)
 void encode_date_cyclical(int day, int month, float* sin_day, float* cos_day) {
   int doy = day_of_year(day, month);  // 1-365
+#ifdef CALENDAR_TABLES_H
+  // Mêmes valeurs que l'entraînement, sans sin/cos
+  *sin_day = SEASON_SIN[doy - 1] / CALENDAR_SCALE;
+  *cos_day = SEASON_COS[doy - 1] / CALENDAR_SCALE;
+#else
   float angle = (2.0 * PI * doy) / 365.0;  // Radians
   
   *sin_day = sin(angle);
   *cos_day = cos(angle);
+#endif
   
   Serial.printf("[DATE] Jour de l'année: %d/365 → sin=%.3f, cos=%.3f\n", doy, *sin_day, *cos_day);
 }
@@ -846,6 +859,40 @@ float relu(float x) {
   return x > 0 ? x : 0.0f;
 }
 
+#ifdef NUM_SHARDS
+// Entraînement shardé (neural_weights.h exporté avec --shards): un réseau par
+// groupe de rooms; couches cachées du shard s
+void shard_hidden(const float* inputs, int s, float* hidden2) {
+  float hidden1[32];
+  for (int i = 0; i < 32; i++) {
+    hidden1[i] = BIAS0[s][i];
+    for (int j = 0; j < 5; j++) {
+      hidden1[i] += inputs[j] * W0[s][j][i];
+    }
+    hidden1[i] = relu(hidden1[i]);
+  }
+  for (int i = 0; i < 32; i++) {
+    hidden2[i] = BIAS1[s][i];
+    for (int j = 0; j < 32; j++) {
+      hidden2[i] += hidden1[j] * W1[s][j][i];
+    }
+    hidden2[i] = relu(hidden2[i]);
+  }
+}
+#endif
+
+#ifdef OUTPUT_RANK
+// Tête factorisée (neural_weights.h exporté avec --output-rank):
+// prédiction d'une seule room en O(OUTPUT_RANK) à partir du bottleneck partagé
+float predict_room_output(const float* bottleneck, int room) {
+  float value = ROOM_BIAS[room];
+  for (int k = 0; k < OUTPUT_RANK; k++) {
+    value += bottleneck[k] * ROOM_W[room][k];
+  }
+  return value;
+}
+#endif
+
 void predict_rooms(float temp_ext, float humidity, int day, int month, float* output) {
   unsigned long start_time = micros(); // Mesure précise en microsecondes
   
@@ -855,7 +902,11 @@ void predict_rooms(float temp_ext, float humidity, int day, int month, float* ou
   
   // Encoder l'heure du jour (pour simplification, utiliser une valeur fixe ou heure actuelle)
   // Pour l'instant, utiliser midi (12h) comme valeur par défaut
+#ifdef CALENDAR_TABLES_H
+  float time_sin = TIME_SIN[12 * CALENDAR_STEPS_PER_HOUR] / CALENDAR_SCALE;
+#else
   float time_sin = sin(2.0 * PI * 12.0 / 24.0);
+#endif
   
   // INPUT: 5 features (temp_ext, humidity, season_sin, season_cos, time_sin)
   float inputs[5] = {temp_ext, humidity, season_sin, season_cos, time_sin};
@@ -863,6 +914,21 @@ void predict_rooms(float temp_ext, float humidity, int day, int month, float* ou
   Serial.printf("[NN] Inputs: temp=%.1f°C, hum=%.1f%%, season_sin=%.3f, season_cos=%.3f, time_sin=%.3f\n", 
                 temp_ext, humidity, season_sin, season_cos, time_sin);
   
+#ifdef NUM_SHARDS
+  // Un réseau par shard, sorties rangées par l'index ROOM_SHARD / ROOM_SLOT
+  float hidden2[32];
+  for (int s = 0; s < NUM_SHARDS; s++) {
+    shard_hidden(inputs, s, hidden2);
+    for (int i = 0; i < NUM_ROOMS; i++) {
+      if (ROOM_SHARD[i] != s) continue;
+      int slot = ROOM_SLOT[i];
+      output[i] = BIAS2[s][slot];
+      for (int j = 0; j < 32; j++) {
+        output[i] += hidden2[j] * W2[s][j][slot];
+      }
+    }
+  }
+#else
   // Layer 0: Input(5) -> Dense(32) + ReLU
   float hidden1[32];
   for (int i = 0; i < 32; i++) {
@@ -883,6 +949,21 @@ void predict_rooms(float temp_ext, float humidity, int day, int month, float* ou
     hidden2[i] = relu(hidden2[i]);
   }
   
+#ifdef OUTPUT_RANK
+  // Layer 2: Dense(32) -> Bottleneck(OUTPUT_RANK), linéaire
+  float bottleneck[OUTPUT_RANK];
+  for (int i = 0; i < OUTPUT_RANK; i++) {
+    bottleneck[i] = BIAS2[i];
+    for (int j = 0; j < 32; j++) {
+      bottleneck[i] += hidden2[j] * W2[j][i];
+    }
+  }
+  
+  // Layer 3: Bottleneck -> Output(NUM_ROOMS), OUTPUT_RANK MACs par room
+  for (int i = 0; i < NUM_ROOMS; i++) {
+    output[i] = predict_room_output(bottleneck, i);
+  }
+#else
   // Layer 2: Dense(32) -> Output(NUM_ROOMS)
   for (int i = 0; i < NUM_ROOMS; i++) {
     output[i] = BIAS2[i];
@@ -890,6 +971,8 @@ void predict_rooms(float temp_ext, float humidity, int day, int month, float* ou
       output[i] += hidden2[j] * W2[j][i];
     }
   }
+#endif
+#endif  // NUM_SHARDS
   
   // Enregistrer temps d'inférence
   perf.last_inference_time = micros() - start_time;
@@ -1734,6 +1817,23 @@ void display_graph_manual() {
 // ============================================================================
 // AFFICHAGE DES DONNÉES HISTORIQUES CSV
 // ============================================================================
+#ifdef HISTORY_FILES_H
+float history_slice[HISTORY_MAX_POINTS];  // Tranche room / période lue depuis le système de fichiers
+#endif
+
+// Températures d'une room pour une période: csv_data.h (flash) ou fichiers history/ (SPIFFS / SD)
+// Le pointeur reste valide jusqu'à l'appel suivant
+const float* csv_room_temps(int period, int room_idx, int* size) {
+#ifdef HISTORY_FILES_H
+  *size = history_read_slice(period, room_idx, history_slice, NULL, HISTORY_MAX_POINTS);
+  if (*size < 0) *size = 0;
+  return history_slice;
+#else
+  *size = pgm_read_word(&csv_sizes_arrays[period][room_idx]);
+  return csv_temps_arrays[period] + pgm_read_word(&csv_offsets_arrays[period][room_idx]);
+#endif
+}
+
 void display_historical_data() {
   M5.Display.startWrite();
   
@@ -1804,7 +1904,7 @@ void display_historical_data() {
   M5.Display.setCursor(room_dd_x + (room_dd_w - room_text_w)/2, room_dd_y + 15);
   M5.Display.print(room_label);
   
-  // Le nombre de points sera déterminé dynamiquement depuis sizes_array
+  // Le nombre de points sera déterminé dynamiquement par csv_room_temps
   
   // Zone graphique (décalée pour laisser place aux graduations)
   int graph_x = 180;
@@ -1819,20 +1919,15 @@ void display_historical_data() {
   float min_temp = 100.0f;
   float max_temp = -100.0f;
   
-  // Accès via la nouvelle structure linéaire
-  const float* temps_array = csv_temps_arrays[csv_period];
-  const int* offsets_array = csv_offsets_arrays[csv_period];
-  const int* sizes_array = csv_sizes_arrays[csv_period];
-  
   // Calculer min/max en fonction des rooms visibles
   for (int room_idx = 0; room_idx < CSV_NUM_ROOMS; room_idx++) {
     // Si "Toutes" OU si c'est la room sélectionnée
     if (selected_room_view == 0 || selected_room_view == room_idx + 1) {
-      int offset = pgm_read_word(&offsets_array[room_idx]);
-      int size = pgm_read_word(&sizes_array[room_idx]);
+      int size;
+      const float* temps = csv_room_temps(csv_period, room_idx, &size);
       
       for (int i = 0; i < size; i++) {
-        float temp = pgm_read_float(&temps_array[offset + i]);
+        float temp = pgm_read_float(&temps[i]);
         if (temp < min_temp) min_temp = temp;
         if (temp > max_temp) max_temp = temp;
       }
@@ -1894,14 +1989,14 @@ void display_historical_data() {
   for (int room_idx = 0; room_idx < CSV_NUM_ROOMS; room_idx++) {
     // Si "Toutes" OU si c'est la room sélectionnée
     if (selected_room_view == 0 || selected_room_view == room_idx + 1) {
-      int offset = pgm_read_word(&offsets_array[room_idx]);
-      int size = pgm_read_word(&sizes_array[room_idx]);
+      int size;
+      const float* temps = csv_room_temps(csv_period, room_idx, &size);
       uint16_t color = room_colors[room_idx % 10];
       
       // Dessiner la courbe point par point
       for (int i = 1; i < size; i++) {
-        float temp_prev = pgm_read_float(&temps_array[offset + i - 1]);
-        float temp_curr = pgm_read_float(&temps_array[offset + i]);
+        float temp_prev = pgm_read_float(&temps[i - 1]);
+        float temp_curr = pgm_read_float(&temps[i]);
         
         int x1 = graph_x + (i - 1) * graph_w / (size - 1);
         int x2 = graph_x + i * graph_w / (size - 1);
@@ -1953,7 +2048,8 @@ void display_historical_data() {
   } else {
     String room_label = getRoomViewLabel(selected_room_view);
     int room_idx = selected_room_view - 1;
-    int num_points = pgm_read_word(&sizes_array[room_idx]);
+    int num_points;
+    csv_room_temps(csv_period, room_idx, &num_points);
     M5.Display.printf("%s | %d points | Min: %.1fC | Max: %.1fC", 
                       room_label.c_str(), num_points, min_temp, max_temp);
   }
@@ -2772,6 +2868,13 @@ void setup() {
   Serial.println("=== ROOM TEMPERATURE PREDICTION v2.0 ===");
   Serial.println("[SECURITY] Démarrage avec fonctions de sécurité activées");
   
+#ifdef HISTORY_FILES_H
+  // Historique CSV lu sur le système de fichiers (history/index.bin + shards)
+  if (!history_begin()) {
+    Serial.println("[HISTORY] Système de fichiers non monté (SPIFFS / SD): historique CSV indisponible");
+  }
+#endif
+  
   // Afficher écran de démarrage
   M5.Display.fillScreen(BLACK);
   M5.Display.setTextSize(4);
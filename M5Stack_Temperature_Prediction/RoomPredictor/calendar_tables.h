@@ -0,0 +1,28 @@
+// Auto-generated calendar feature tables (calendar_tables.py)
+// Mêmes encodages que l'entraînement: saison = 2*pi*doy/365, heure = 2*pi*(h + m/60)/24
+
+#ifndef CALENDAR_TABLES_H
+#define CALENDAR_TABLES_H
+
+#include <stdint.h>
+
+#define CALENDAR_DAYS 366
+#define CALENDAR_STEPS_PER_HOUR 12
+#define CALENDAR_SCALE 1.0f
+typedef float calendar_t;
+
+// Index: jour de l'année - 1
+const calendar_t SEASON_SIN[CALENDAR_DAYS] = {
+  0.017213356f, 0.03442161f, 0.051619668f, 0.068802424f, 0.0859648f, 0.1031017f, 0.12020805f, 0.13727877f, 0.15430883f, 0.17129314f, 0.18822671f, 0.2051045f, 0.22192152f, 0.23867276f, 0.2553533f, 0.27195817f, 0.28848243f, 0.3049212f, 0.32126966f, 0.3375229f, 0.3536761f, 0.36972454f, 0.38566342f, 0.40148798f, 0.4171936f, 0.4327756f, 0.44822934f, 0.46355027f, 0.47873384f, 0.49377555f, 0.5086709f, 0.5234156f, 0.5380052f, 0.55243534f, 0.56670177f, 0.5808003f, 0.5947267f, 0.6084769f, 0.62204677f, 0.6354323f, 0.64862955f, 0.6616346f, 0.6744436f, 0.6870528f, 0.6994583f, 0.71165663f, 0.723644f, 0.735417f, 0.7469721f, 0.7583058f, 0.76941484f, 0.78029585f, 0.79094565f, 0.8013611f, 0.81153905f, 0.8214766f, 0.8311706f, 0.84061843f, 0.8498171f, 0.85876393f, 0.8674564f, 0.8758917f, 0.88406754f, 0.89198136f, 0.89963084f, 0.90701383f, 0.914128f, 0.9209713f, 0.9275417f, 0.93383723f, 0.93985605f, 0.9455964f, 0.95105654f, 0.9562348f, 0.9611298f, 0.96573997f, 0.9700639f, 0.9741005f, 0.97784835f, 0.9813065f, 0.9844738f, 0.98734945f, 0.9899325f, 0.9922222f, 0.99421793f, 0.995919f, 0.99732494f, 0.99843544f, 0.99925f, 0.9997685f, 0.99999076f, 0.9999167f, 0.9995463f, 0.99887973f, 0.9979172f, 0.9966589f, 0.9951053f, 0.99325687f, 0.9911141f, 0.98867756f, 0.98594815f, 0.98292655f, 0.9796137f, 0.97601056f, 0.9721182f, 0.96793777f, 0.9634706f, 0.9587178f, 0.953681f, 0.9483616f, 0.9427611f, 0.93688136f, 0.9307239f, 0.9242907f, 0.91758364f, 0.91060466f, 0.9033558f, 0.8958393f, 0.88805735f, 0.8800122f, 0.8717063f, 0.86314213f, 0.8543222f, 0.84524906f, 0.83592546f, 0.8263542f, 0.81653804f, 0.80647993f, 0.7961829f, 0.78564984f, 0.77488405f, 0.7638886f, 0.75266683f, 0.741222f, 0.7295576f, 0.71767694f, 0.70558363f, 0.69328123f, 0.68077344f, 0.6680639f, 0.6551564f, 0.64205474f, 0.62876284f, 0.6152846f, 0.6016241f, 0.58778524f, 0.57377225f, 0.55958927f, 0.54524046f, 0.53073007f, 0.5160624f, 0.5012418f, 0.4862727f, 0.47115952f, 0.4559067f, 0.4405188f, 0.42500034f, 0.40935597f, 0.39359027f, 0.37770796f, 0.36171374f, 0.34561232f, 0.3294085f, 0.31310704f, 0.29671282f, 0.28023067f, 0.2636655f, 0.24702218f, 0.23030567f, 0.21352091f, 0.19667289f, 0.17976658f, 0.16280702f, 0.14579919f, 0.12874818f, 0.111659005f, 0.09453675f, 0.077386476f, 0.06021328f, 0.043022234f, 0.025818441f, 0.008606997f, -0.008606997f, -0.025818441f, -0.043022234f, -0.06021328f, -0.077386476f, -0.09453675f, -0.111659005f, -0.12874818f, -0.14579919f, -0.16280702f, -0.17976658f, -0.19667289f, -0.21352091f, -0.23030567f, -0.24702218f, -0.2636655f, -0.28023067f, -0.29671282f, -0.31310704f, -0.3294085f, -0.34561232f, -0.36171374f, -0.37770796f, -0.39359027f, -0.40935597f, -0.42500034f, -0.4405188f, -0.4559067f, -0.47115952f, -0.4862727f, -0.5012418f, -0.5160624f, -0.53073007f, -0.54524046f, -0.55958927f, -0.57377225f, -0.58778524f, -0.6016241f, -0.6152846f, -0.62876284f, -0.64205474f, -0.6551564f, -0.6680639f, -0.68077344f, -0.69328123f, -0.70558363f, -0.71767694f, -0.7295576f, -0.741222f, -0.75266683f, -0.7638886f, -0.77488405f, -0.78564984f, -0.7961829f, -0.80647993f, -0.81653804f, -0.8263542f, -0.83592546f, -0.84524906f, -0.8543222f, -0.86314213f, -0.8717063f, -0.8800122f, -0.88805735f, -0.8958393f, -0.9033558f, -0.91060466f, -0.91758364f, -0.9242907f, -0.9307239f, -0.93688136f, -0.9427611f, -0.9483616f, -0.953681f, -0.9587178f, -0.9634706f, -0.96793777f, -0.9721182f, -0.97601056f, -0.9796137f, -0.98292655f, -0.98594815f, -0.98867756f, -0.9911141f, -0.99325687f, -0.9951053f, -0.9966589f, -0.9979172f, -0.99887973f, -0.9995463f, -0.9999167f, -0.99999076f, -0.9997685f, -0.99925f, -0.99843544f, -0.99732494f, -0.995919f, -0.99421793f, -0.9922222f, -0.9899325f, -0.98734945f, -0.9844738f, -0.9813065f, -0.97784835f, -0.9741005f, -0.9700639f, -0.96573997f, -0.9611298f, -0.9562348f, -0.95105654f, -0.9455964f, -0.93985605f, -0.93383723f, -0.9275417f, -0.9209713f, -0.914128f, -0.90701383f, -0.89963084f, -0.89198136f, -0.88406754f, -0.8758917f, -0.8674564f, -0.85876393f, -0.8498171f, -0.84061843f, -0.8311706f, -0.8214766f, -0.81153905f, -0.8013611f, -0.79094565f, -0.78029585f, -0.76941484f, -0.7583058f, -0.7469721f, -0.735417f, -0.723644f, -0.71165663f, -0.6994583f, -0.6870528f, -0.6744436f, -0.6616346f, -0.64862955f, -0.6354323f, -0.62204677f, -0.6084769f, -0.5947267f, -0.5808003f, -0.56670177f, -0.55243534f, -0.5380052f, -0.5234156f, -0.5086709f, -0.49377555f, -0.47873384f, -0.46355027f, -0.44822934f, -0.4327756f, -0.4171936f, -0.40148798f, -0.38566342f, -0.36972454f, -0.3536761f, -0.3375229f, -0.32126966f, -0.3049212f, -0.28848243f, -0.27195817f, -0.2553533f, -0.23867276f, -0.22192152f, -0.2051045f, -0.18822671f, -0.17129314f, -0.15430883f, -0.13727877f, -0.12020805f, -0.1031017f, -0.0859648f, -0.068802424f, -0.051619668f, -0.03442161f, -0.017213356f, 0.00000000000000064324905f, 0.017213356f
+};
+
+const calendar_t SEASON_COS[CALENDAR_DAYS] = {
+  0.9998518f, 0.9994074f, 0.9986668f, 0.9976303f, 0.9962982f, 0.9946708f, 0.99274874f, 0.99053246f, 0.9880227f, 0.98522013f, 0.9821256f, 0.9787401f, 0.9750645f, 0.97110003f, 0.96684784f, 0.96230906f, 0.9574852f, 0.95237756f, 0.94698775f, 0.9413173f, 0.93536794f, 0.9291414f, 0.92263955f, 0.9158643f, 0.90881765f, 0.90150166f, 0.8939186f, 0.8860706f, 0.8779601f, 0.8695894f, 0.860961f, 0.85207754f, 0.8429415f, 0.83355576f, 0.823923f, 0.8140461f, 0.80392796f, 0.7935716f, 0.7829801f, 0.7721566f, 0.7611043f, 0.7498264f, 0.7383264f, 0.7266075f, 0.7146734f, 0.70252746f, 0.6901734f, 0.6776148f, 0.6648554f, 0.651899f, 0.6387494f, 0.62541056f, 0.6118864f, 0.5981809f, 0.5842982f, 0.5702423f, 0.55601746f, 0.5416278f, 0.52707773f, 0.5123714f, 0.4975133f, 0.48250774f, 0.46735922f, 0.4520722f, 0.43665123f, 0.42110088f, 0.40542573f, 0.38963044f, 0.37371972f, 0.35769823f, 0.34157076f, 0.3253421f, 0.309017f, 0.29260033f, 0.27609697f, 0.2595118f, 0.24284972f, 0.22611569f, 0.20931464f, 0.19245158f, 0.17553149f, 0.15855938f, 0.14154029f, 0.124479264f, 0.107381344f, 0.09025161f, 0.07309513f, 0.05591699f, 0.03872228f, 0.021516098f, 0.0043035382f, -0.012910296f, -0.030120306f, -0.047321387f, -0.06450845f, -0.081676394f, -0.09882014f, -0.1159346f, -0.13301471f, -0.1500554f, -0.16705163f, -0.18399835f, -0.20089056f, -0.21772324f, -0.2344914f, -0.25119007f, -0.2678143f, -0.2843592f, -0.3008198f, -0.3171913f, -0.33346877f, -0.34964746f, -0.36572254f, -0.38168922f, -0.3975428f, -0.4132786f, -0.42889193f, -0.44437817f, -0.45973274f, -0.47495106f, -0.49002868f, -0.5049611f, -0.5197438f, -0.53437257f, -0.54884297f, -0.5631507f, -0.5772916f, -0.59126145f, -0.60505605f, -0.6186714f, -0.6321034f, -0.64534813f, -0.6584016f, -0.67125994f, -0.6839194f, -0.6963762f, -0.7086267f, -0.7206671f, -0.73249406f, -0.74410397f, -0.75549334f, -0.76665884f, -0.7775971f, -0.78830504f, -0.79877937f, -0.809017f, -0.8190149f, -0.8287701f, -0.8382797f, -0.8475409f, -0.856551f, -0.8653073f, -0.87380713f, -0.882048f, -0.8900276f, -0.8977434f, -0.9051932f, -0.91237473f, -0.91928595f, -0.9259248f, -0.93228924f, -0.9383774f, -0.9441875f, -0.9497178f, -0.9549668f, -0.9599327f, -0.96461415f, -0.9690098f, -0.97311836f, -0.9769385f, -0.98046917f, -0.9837093f, -0.9866579f, -0.9893142f, -0.99167734f, -0.9937466f, -0.99552137f, -0.9970012f, -0.9981855f, -0.9990741f, -0.99966663f, -0.999963f, -0.999963f, -0.99966663f, -0.9990741f, -0.9981855f, -0.9970012f, -0.99552137f, -0.9937466f, -0.99167734f, -0.9893142f, -0.9866579f, -0.9837093f, -0.98046917f, -0.9769385f, -0.97311836f, -0.9690098f, -0.96461415f, -0.9599327f, -0.9549668f, -0.9497178f, -0.9441875f, -0.9383774f, -0.93228924f, -0.9259248f, -0.91928595f, -0.91237473f, -0.9051932f, -0.8977434f, -0.8900276f, -0.882048f, -0.87380713f, -0.8653073f, -0.856551f, -0.8475409f, -0.8382797f, -0.8287701f, -0.8190149f, -0.809017f, -0.79877937f, -0.78830504f, -0.7775971f, -0.76665884f, -0.75549334f, -0.74410397f, -0.73249406f, -0.7206671f, -0.7086267f, -0.6963762f, -0.6839194f, -0.67125994f, -0.6584016f, -0.64534813f, -0.6321034f, -0.6186714f, -0.60505605f, -0.59126145f, -0.5772916f, -0.5631507f, -0.54884297f, -0.53437257f, -0.5197438f, -0.5049611f, -0.49002868f, -0.47495106f, -0.45973274f, -0.44437817f, -0.42889193f, -0.4132786f, -0.3975428f, -0.38168922f, -0.36572254f, -0.34964746f, -0.33346877f, -0.3171913f, -0.3008198f, -0.2843592f, -0.2678143f, -0.25119007f, -0.2344914f, -0.21772324f, -0.20089056f, -0.18399835f, -0.16705163f, -0.1500554f, -0.13301471f, -0.1159346f, -0.09882014f, -0.081676394f, -0.06450845f, -0.047321387f, -0.030120306f, -0.012910296f, 0.0043035382f, 0.021516098f, 0.03872228f, 0.05591699f, 0.07309513f, 0.09025161f, 0.107381344f, 0.124479264f, 0.14154029f, 0.15855938f, 0.17553149f, 0.19245158f, 0.20931464f, 0.22611569f, 0.24284972f, 0.2595118f, 0.27609697f, 0.29260033f, 0.309017f, 0.3253421f, 0.34157076f, 0.35769823f, 0.37371972f, 0.38963044f, 0.40542573f, 0.42110088f, 0.43665123f, 0.4520722f, 0.46735922f, 0.48250774f, 0.4975133f, 0.5123714f, 0.52707773f, 0.5416278f, 0.55601746f, 0.5702423f, 0.5842982f, 0.5981809f, 0.6118864f, 0.62541056f, 0.6387494f, 0.651899f, 0.6648554f, 0.6776148f, 0.6901734f, 0.70252746f, 0.7146734f, 0.7266075f, 0.7383264f, 0.7498264f, 0.7611043f, 0.7721566f, 0.7829801f, 0.7935716f, 0.80392796f, 0.8140461f, 0.823923f, 0.83355576f, 0.8429415f, 0.85207754f, 0.860961f, 0.8695894f, 0.8779601f, 0.8860706f, 0.8939186f, 0.90150166f, 0.90881765f, 0.9158643f, 0.92263955f, 0.9291414f, 0.93536794f, 0.9413173f, 0.94698775f, 0.95237756f, 0.9574852f, 0.96230906f, 0.96684784f, 0.97110003f, 0.9750645f, 0.9787401f, 0.9821256f, 0.98522013f, 0.9880227f, 0.99053246f, 0.99274874f, 0.9946708f, 0.9962982f, 0.9976303f, 0.9986668f, 0.9994074f, 0.9998518f, 1.0f, 0.9998518f
+};
+
+// Index: heure * CALENDAR_STEPS_PER_HOUR + minute / 5
+const calendar_t TIME_SIN[24 * CALENDAR_STEPS_PER_HOUR] = {
+  0.0f, 0.021814885f, 0.043619387f, 0.065403126f, 0.087155744f, 0.10886688f, 0.13052619f, 0.15212339f, 0.17364818f, 0.19509032f, 0.21643962f, 0.23768589f, 0.25881904f, 0.27982903f, 0.3007058f, 0.32143947f, 0.34202015f, 0.36243805f, 0.38268343f, 0.40274668f, 0.42261827f, 0.4422887f, 0.4617486f, 0.48098877f, 0.5f, 0.51877326f, 0.53729963f, 0.55557024f, 0.57357645f, 0.59130967f, 0.6087614f, 0.62592345f, 0.64278764f, 0.6593458f, 0.6755902f, 0.69151306f, 0.70710677f, 0.72236395f, 0.7372773f, 0.7518398f, 0.76604444f, 0.77988446f, 0.7933533f, 0.8064446f, 0.81915206f, 0.8314696f, 0.8433914f, 0.85491186f, 0.8660254f, 0.87672675f, 0.8870108f, 0.89687276f, 0.9063078f, 0.91531146f, 0.9238795f, 0.93200785f, 0.9396926f, 0.9469301f, 0.95371693f, 0.96004987f, 0.9659258f, 0.9713421f, 0.976296f, 0.98078525f, 0.9848077f, 0.98836154f, 0.9914449f, 0.99405634f, 0.9961947f, 0.99785894f, 0.99904823f, 0.999762f, 1.0f, 0.999762f, 0.99904823f, 0.99785894f, 0.9961947f, 0.99405634f, 0.9914449f, 0.98836154f, 0.9848077f, 0.98078525f, 0.976296f, 0.9713421f, 0.9659258f, 0.96004987f, 0.95371693f, 0.9469301f, 0.9396926f, 0.93200785f, 0.9238795f, 0.91531146f, 0.9063078f, 0.89687276f, 0.8870108f, 0.87672675f, 0.8660254f, 0.85491186f, 0.8433914f, 0.8314696f, 0.81915206f, 0.8064446f, 0.7933533f, 0.77988446f, 0.76604444f, 0.7518398f, 0.7372773f, 0.72236395f, 0.70710677f, 0.69151306f, 0.6755902f, 0.6593458f, 0.64278764f, 0.62592345f, 0.6087614f, 0.59130967f, 0.57357645f, 0.55557024f, 0.53729963f, 0.51877326f, 0.5f, 0.48098877f, 0.4617486f, 0.4422887f, 0.42261827f, 0.40274668f, 0.38268343f, 0.36243805f, 0.34202015f, 0.32143947f, 0.3007058f, 0.27982903f, 0.25881904f, 0.23768589f, 0.21643962f, 0.19509032f, 0.17364818f, 0.15212339f, 0.13052619f, 0.10886688f, 0.087155744f, 0.065403126f, 0.043619387f, 0.021814885f, 0.00000000000000012246469f, -0.021814885f, -0.043619387f, -0.065403126f, -0.087155744f, -0.10886688f, -0.13052619f, -0.15212339f, -0.17364818f, -0.19509032f, -0.21643962f, -0.23768589f, -0.25881904f, -0.27982903f, -0.3007058f, -0.32143947f, -0.34202015f, -0.36243805f, -0.38268343f, -0.40274668f, -0.42261827f, -0.4422887f, -0.4617486f, -0.48098877f, -0.5f, -0.51877326f, -0.53729963f, -0.55557024f, -0.57357645f, -0.59130967f, -0.6087614f, -0.62592345f, -0.64278764f, -0.6593458f, -0.6755902f, -0.69151306f, -0.70710677f, -0.72236395f, -0.7372773f, -0.7518398f, -0.76604444f, -0.77988446f, -0.7933533f, -0.8064446f, -0.81915206f, -0.8314696f, -0.8433914f, -0.85491186f, -0.8660254f, -0.87672675f, -0.8870108f, -0.89687276f, -0.9063078f, -0.91531146f, -0.9238795f, -0.93200785f, -0.9396926f, -0.9469301f, -0.95371693f, -0.96004987f, -0.9659258f, -0.9713421f, -0.976296f, -0.98078525f, -0.9848077f, -0.98836154f, -0.9914449f, -0.99405634f, -0.9961947f, -0.99785894f, -0.99904823f, -0.999762f, -1.0f, -0.999762f, -0.99904823f, -0.99785894f, -0.9961947f, -0.99405634f, -0.9914449f, -0.98836154f, -0.9848077f, -0.98078525f, -0.976296f, -0.9713421f, -0.9659258f, -0.96004987f, -0.95371693f, -0.9469301f, -0.9396926f, -0.93200785f, -0.9238795f, -0.91531146f, -0.9063078f, -0.89687276f, -0.8870108f, -0.87672675f, -0.8660254f, -0.85491186f, -0.8433914f, -0.8314696f, -0.81915206f, -0.8064446f, -0.7933533f, -0.77988446f, -0.76604444f, -0.7518398f, -0.7372773f, -0.72236395f, -0.70710677f, -0.69151306f, -0.6755902f, -0.6593458f, -0.64278764f, -0.62592345f, -0.6087614f, -0.59130967f, -0.57357645f, -0.55557024f, -0.53729963f, -0.51877326f, -0.5f, -0.48098877f, -0.4617486f, -0.4422887f, -0.42261827f, -0.40274668f, -0.38268343f, -0.36243805f, -0.34202015f, -0.32143947f, -0.3007058f, -0.27982903f, -0.25881904f, -0.23768589f, -0.21643962f, -0.19509032f, -0.17364818f, -0.15212339f, -0.13052619f, -0.10886688f, -0.087155744f, -0.065403126f, -0.043619387f, -0.021814885f
+};
+
+#endif // CALENDAR_TABLES_H
@@ -0,0 +1,507 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark reproductible du pipeline à l'échelle d'un parc de rooms
+Pour chaque taille de parc, un corpus synthétique (profils ISOLATION_PROFILES)
+est généré dans un dossier temporaire, puis chaque étape est chronométrée dans
+un processus dédié (mémoire isolée):
+
+    load            load_room_data
+    features        prepare_features_with_date
+    train           train_model (nombre d'époques fixe)
+    train_sharded   train_model avec --shards groupes de rooms en processus parallèles
+    export_weights  export_weights_for_esp32
+    export_csv      export_csv_to_arduino
+    generate        generate_synthetic_data (GUI, une série par room)
+    codecs          lecture du corpus pour chaque compression disponible
+                    (CSV brut, gzip, zstd, xz): octets lus et débit
+    output_head     tête de sortie dense vs factorisée (--output-rank) entraînées
+                    sur les mêmes features: MAE test, paramètres, MACs, flash
+
+Temps mural et pic de mémoire (RSS échantillonné pendant l'étape) sont écrits
+dans un fichier JSON, qui peut servir de référence pour détecter les régressions.
+
+Usage:
+    python benchmark_pipeline.py                          # 3, 30, 300, 1000 rooms
+    python benchmark_pipeline.py --rooms 3 30 --days 90
+    python benchmark_pipeline.py --save-baseline benchmark_baseline.json
+    python benchmark_pipeline.py --check benchmark_baseline.json --threshold 0.25
+    python benchmark_pipeline.py --rooms 100 1000 --stages load features output_head
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+from pipeline_profiler import PeakRssSampler
+
+DEFAULT_SCALES = [3, 30, 300, 1000]
+DEFAULT_DAYS = 365
+DEFAULT_INTERVAL = 30          # minutes, comme les CSV générés par la GUI
+DEFAULT_EPOCHS = 2             # Époques fixes: on mesure le coût, pas la précision
+DEFAULT_SEED = 42
+DEFAULT_OUTPUT = 'benchmark_results.json'
+DEFAULT_OUTPUT_RANK = 8
+DEFAULT_SHARDS = 4
+DEFAULT_THRESHOLD = 0.25       # +25% de temps = régression
+MIN_REGRESSION_SECONDS = 0.05  # Écarts plus petits ignorés (bruit de mesure)
+
+STAGES = ['load', 'features', 'train', 'train_sharded', 'export_weights', 'export_csv', 'generate', 'codecs', 'output_head']
+
+# Étapes qui importent train_model_with_date (TensorFlow)
+PIPELINE_STAGES = ('load', 'features', 'train', 'train_sharded', 'export_weights', 'output_head')
+
+# Étapes dont dépend chaque étape (ignorée si une dépendance a échoué)
+STAGE_DEPENDENCIES = {
+    'features': ['load'],
+    'export_weights': ['train'],
+    'output_head': ['features']
+}
+
+ARDUINO_DIR = os.path.join('M5Stack_Temperature_Prediction', 'RoomPredictor')
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ============================================================================
+# CORPUS SYNTHÉTIQUE
+# ============================================================================
+
+def generate_corpus(num_rooms, data_dir, days=DEFAULT_DAYS, interval_minutes=DEFAULT_INTERVAL,
+                    seed=DEFAULT_SEED, start_date='2024-01-01'):
+    """
+    Écrit num_rooms fichiers RoomN_data.csv au format de la GUI
+
+    Les profils d'isolation sont attribués à tour de rôle; toutes les rooms
+    partagent la même grille temporelle et la même température extérieure.
+
+    Returns:
+        Nombre total de lignes écrites
+    """
+    import pandas as pd
+    from data_generator_gui import ISOLATION_PROFILES
+    from generate_test_data import generate_fleet_temperatures
+
+    profile_keys = list(ISOLATION_PROFILES.keys())
+    profiles = [ISOLATION_PROFILES[profile_keys[i % len(profile_keys)]] for i in range(num_rooms)]
+    num_samples = int(days * 24 * 60 / interval_minutes)
+
+    timestamps, ext_temps, temperatures = generate_fleet_temperatures(
+        profiles, start_date, num_samples, interval_minutes, seed)
+
+    os.makedirs(data_dir, exist_ok=True)
+    formatted_timestamps = timestamps.strftime('%Y-%m-%d %H:%M:%S')
+    for i in range(num_rooms):
+        df = pd.DataFrame({
+            'Timestamp': formatted_timestamps,
+            'Temperature_Celsius(°C)': temperatures[i],
+            'External_Temp(°C)': ext_temps
+        })
+        df.to_csv(os.path.join(data_dir, f'Room{i + 1}_data.csv'), index=False, float_format='%.2f')
+
+    return num_rooms * num_samples
+
+def _compress_file(source, output, compression):
+    """Compresse un fichier en flux, octet pour octet (pas de re-sérialisation CSV)"""
+    if compression == 'gzip':
+        import gzip
+        opener = gzip.open
+    elif compression == 'xz':
+        import lzma
+        opener = lzma.open
+    else:
+        import zstandard
+        opener = zstandard.open
+    with open(source, 'rb') as src, opener(output, 'wb') as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+def measure_codecs(data_dir):
+    """
+    Relit le corpus dans chaque format: CSV brut puis chaque codec disponible
+
+    Returns:
+        dict codec -> octets sur disque, taux de compression, temps d'écriture
+        et de lecture, débit (octets lus et équivalent CSV) et lignes/s
+    """
+    from room_data import (CSV_COMPRESSIONS, available_compressions, detect_room_columns, get_csv_files,
+                           read_room_columns)
+
+    plain_files = get_csv_files(data_dir)
+    plain_bytes = sum(os.path.getsize(path) for path in plain_files.values())
+    codecs = {}
+    for compression in [None] + available_compressions():
+        codec_dir = data_dir if compression is None else f"{data_dir}_{compression}"
+        start = time.perf_counter()
+        if compression is not None:
+            os.makedirs(codec_dir, exist_ok=True)
+            for path in plain_files.values():
+                output = os.path.join(codec_dir, os.path.basename(path) + CSV_COMPRESSIONS[compression])
+                _compress_file(path, output, compression)
+        write_seconds = time.perf_counter() - start
+
+        files = get_csv_files(codec_dir)
+        size = sum(os.path.getsize(path) for path in files.values())
+        rows = 0
+        start = time.perf_counter()
+        for path in files.values():
+            _, detected = detect_room_columns(path)
+            timestamps, _ = read_room_columns(path, detected)
+            rows += len(timestamps)
+        read_seconds = time.perf_counter() - start
+
+        codecs[compression or 'csv'] = {
+            'bytes': size,
+            'ratio': plain_bytes / size if size else None,
+            'write_seconds': write_seconds,
+            'read_seconds': read_seconds,
+            'read_mb_per_s': size / (1024 * 1024) / read_seconds,
+            'csv_mb_per_s': plain_bytes / (1024 * 1024) / read_seconds,
+            'rows_per_s': rows / read_seconds
+        }
+        if compression is not None:
+            shutil.rmtree(codec_dir, ignore_errors=True)
+    return codecs
+
+# ============================================================================
+# TÊTE DE SORTIE DENSE vs FACTORISÉE
+# ============================================================================
+
+def head_macs(num_rooms, output_rank=None, num_inputs=5, hidden=32):
+    """
+    Multiplications-accumulations d'une inférence sur l'appareil
+
+    Returns:
+        (MACs pour toutes les rooms, MACs par room en plus du tronc partagé:
+         32 pour la tête dense, k pour la tête factorisée)
+    """
+    shared = num_inputs * hidden + hidden * hidden + (hidden * output_rank if output_rank else 0)
+    per_room = output_rank or hidden
+    return shared + per_room * num_rooms, per_room
+
+def compare_output_heads(pipeline, features, epochs, output_rank, seed=DEFAULT_SEED):
+    """
+    Entraîne la tête dense et la tête factorisée sur le même split
+
+    Returns:
+        dict 'dense' / 'factorized': MAE test, paramètres, MACs, flash des poids
+    """
+    from device_footprint import weights_arrays
+    X, y, num_rooms = features
+    X_train, X_test, y_train, y_test = pipeline.train_test_split(X, y, test_size=0.2, random_state=42)
+    heads = {}
+    for name, rank in (('dense', None), ('factorized', output_rank)):
+        np.random.seed(seed)
+        model = pipeline.create_model_with_date(num_outputs=num_rooms, verbose=False, output_rank=rank)
+        start = time.perf_counter()
+        model.fit(X_train, y_train, epochs=epochs, batch_size=16, verbose=0)
+        fit_seconds = time.perf_counter() - start
+        y_pred = model.predict(X_test, batch_size=4096, verbose=0)
+        all_rooms, per_room = head_macs(num_rooms, rank)
+        heads[name] = {
+            'output_rank': rank,
+            'test_mae': float(np.mean(np.abs(y_pred - y_test))),
+            'fit_seconds': fit_seconds,
+            'params': int(model.count_params()),
+            'macs_all_rooms': all_rooms,
+            'macs_per_room': per_room,
+            'weights_flash_bytes': sum(a.flash_bytes for a in weights_arrays(num_rooms, output_rank=rank))
+        }
+    return heads
+
+# ============================================================================
+# EXÉCUTION D'UNE TAILLE DE PARC (processus dédié)
+# ============================================================================
+
+def run_stages(num_rooms, days, interval_minutes, epochs, seed, stages, verbose=False,
+               output_rank=DEFAULT_OUTPUT_RANK, shards=DEFAULT_SHARDS):
+    """
+    Génère le corpus et chronomètre les étapes dans le répertoire courant
+
+    Returns:
+        dict des résultats pour cette taille de parc
+    """
+    result = {'rooms': num_rooms, 'stages': {}}
+
+    start = time.perf_counter()
+    result['rows'] = generate_corpus(num_rooms, 'data', days, interval_minutes, seed)
+    result['corpus_seconds'] = time.perf_counter() - start
+    os.makedirs(ARDUINO_DIR, exist_ok=True)
+
+    # Imports hors chronométrage (TensorFlow seul coûte plusieurs secondes)
+    state = {}
+    start = time.perf_counter()
+    try:
+        import train_model_with_date as pipeline
+        state['pipeline'] = pipeline
+    except ImportError as e:
+        result['import_error'] = f"{type(e).__name__}: {e}"
+    result['import_seconds'] = time.perf_counter() - start
+
+    def stage_load():
+        state['frame'] = state['pipeline'].load_room_data()
+
+    def stage_features():
+        state['features'] = state['pipeline'].prepare_features_with_date(state['frame'])
+
+    def stage_train():
+        np.random.seed(seed)
+        state['model'], _ = state['pipeline'].train_model(epochs=epochs)
+        if state['model'] is None:
+            raise RuntimeError("train_model n'a produit aucun modèle")
+
+    def stage_train_sharded():
+        np.random.seed(seed)
+        sharding = dict(state['pipeline'].SHARDING, shards=shards)
+        model, _ = state['pipeline'].train_model(epochs=epochs, sharding=sharding)
+        if model is None:
+            raise RuntimeError("train_model n'a produit aucun modèle")
+
+    def stage_export_weights():
+        state['pipeline'].export_weights_for_esp32(state['model'],
+                                                   num_rooms=state['model'].output_shape[-1])
+
+    def stage_export_csv():
+        from export_csv_to_arduino_v2 import export_csv_to_arduino
+        # Mesurer le coût de l'export complet, même au-delà de la capacité de l'appareil
+        export_csv_to_arduino(on_overflow='warn')
+
+    def stage_generate():
+        from data_generator_gui import ISOLATION_PROFILES, DataGeneratorGUI
+        profile_keys = list(ISOLATION_PROFILES.keys())
+        start_date = datetime(2024, 1, 1)
+        # Même appel que la GUI, une série par room (le GUI n'utilise pas self ici)
+        for i in range(num_rooms):
+            DataGeneratorGUI.generate_synthetic_data(
+                None, profile_keys[i % len(profile_keys)], start_date, days, interval_minutes)
+
+    def stage_codecs():
+        result['codecs'] = measure_codecs('data')
+
+    def stage_output_head():
+        result['output_heads'] = compare_output_heads(state['pipeline'], state['features'], epochs,
+                                                      output_rank, seed)
+
+    functions = {
+        'load': stage_load,
+        'features': stage_features,
+        'train': stage_train,
+        'train_sharded': stage_train_sharded,
+        'export_weights': stage_export_weights,
+        'export_csv': stage_export_csv,
+        'generate': stage_generate,
+        'codecs': stage_codecs,
+        'output_head': stage_output_head
+    }
+
+    devnull = open(os.devnull, 'w')
+    for stage in stages:
+        if 'pipeline' not in state and stage in PIPELINE_STAGES:
+            result['stages'][stage] = {'status': 'skipped', 'error': result['import_error']}
+            continue
+        failed = [dep for dep in STAGE_DEPENDENCIES.get(stage, [])
+                  if result['stages'].get(dep, {}).get('status') != 'ok']
+        if failed:
+            result['stages'][stage] = {'status': 'skipped', 'error': f"dépend de {', '.join(failed)}"}
+            continue
+
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)
+        entry = {'status': 'ok'}
+        with PeakRssSampler() as sampler:
+            start = time.perf_counter()
+            try:
+                with output:
+                    functions[stage]()
+            except Exception as e:
+                entry = {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+            entry['seconds'] = time.perf_counter() - start
+        entry['peak_rss_mb'] = sampler.peak_mb
+        if sampler.peak_mb is not None and sampler.start_mb is not None:
+            entry['rss_delta_mb'] = sampler.peak_mb - sampler.start_mb
+        result['stages'][stage] = entry
+    devnull.close()
+
+    return result
+
+def run_scale(num_rooms, args):
+    """Lance une taille de parc dans un sous-processus, dans un dossier temporaire"""
+    workdir = tempfile.mkdtemp(prefix=f'bench_{num_rooms}rooms_')
+    result_file = os.path.join(workdir, 'result.json')
+    command = [sys.executable, os.path.abspath(__file__), '--worker', str(num_rooms),
+               '--result-file', result_file,
+               '--days', str(args.days), '--interval', str(args.interval),
+               '--epochs', str(args.epochs), '--seed', str(args.seed),
+               '--output-rank', str(args.output_rank), '--shards', str(args.shards), '--stages', *args.stages]
+    if args.verbose:
+        command.append('--verbose')
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_DIR, env.get('PYTHONPATH')]))
+    try:
+        completed = subprocess.run(command, cwd=workdir, env=env)
+        if completed.returncode != 0 or not os.path.exists(result_file):
+            return {'rooms': num_rooms, 'error': f"processus terminé avec le code {completed.returncode}",
+                    'stages': {}}
+        with open(result_file, encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"[FILES] Dossier conservé: {workdir}")
+
+# ============================================================================
+# RÉSULTATS ET RÉGRESSIONS
+# ============================================================================
+
+def print_results(results):
+    """Affiche un tableau temps / pic RSS par taille de parc et par étape"""
+    print("\n" + "="*80)
+    print("RÉSULTATS")
+    print("="*80)
+    header = f"{'Étape':<16}" + "".join(f"{str(n) + ' rooms':>22}" for n in results['scales'])
+    print(header)
+    print("-" * len(header))
+    for stage in ['corpus'] + STAGES:
+        cells = []
+        for scale in results['scales'].values():
+            if stage == 'corpus':
+                seconds = scale.get('corpus_seconds')
+                cells.append(f"{seconds:.2f}s" if seconds is not None else '-')
+                continue
+            entry = scale.get('stages', {}).get(stage)
+            if entry is None:
+                cells.append('-')
+            elif entry['status'] != 'ok':
+                cells.append(entry['status'])
+            else:
+                peak = entry.get('peak_rss_mb')
+                cells.append(f"{entry['seconds']:.2f}s" + (f" / {peak:.0f} MB" if peak is not None else ''))
+        print(f"{stage:<16}" + "".join(f"{cell:>22}" for cell in cells))
+
+    for scale in results['scales'].values():
+        if scale.get('codecs'):
+            print(f"\nCodecs ({scale['rooms']} rooms):")
+            print(f"  {'Format':<8}{'Taille':>12}{'Ratio':>8}{'Écriture':>11}{'Lecture':>10}"
+                  f"{'Lu MB/s':>10}{'CSV MB/s':>10}{'Lignes/s':>14}")
+            for codec, entry in scale['codecs'].items():
+                print(f"  {codec:<8}{entry['bytes'] / (1024 * 1024):>9.1f} MB{entry['ratio']:>7.1f}x"
+                      f"{entry['write_seconds']:>10.2f}s{entry['read_seconds']:>9.2f}s"
+                      f"{entry['read_mb_per_s']:>10.1f}{entry['csv_mb_per_s']:>10.1f}{entry['rows_per_s']:>14,.0f}")
+
+    heads = [scale for scale in results['scales'].values() if scale.get('output_heads')]
+    if heads:
+        print("\nTête de sortie (dense vs factorisée):")
+        print(f"  {'Rooms':>6}  {'Tête':<18}{'MAE test':>10}{'Params':>10}{'MACs/toutes':>13}"
+              f"{'MACs/room':>11}{'Flash poids':>13}")
+        for scale in heads:
+            for name, entry in scale['output_heads'].items():
+                label = f"{name} (k={entry['output_rank']})" if entry['output_rank'] else name
+                print(f"  {scale['rooms']:>6}  {label:<18}{entry['test_mae']:>8.3f}°C{entry['params']:>10,}"
+                      f"{entry['macs_all_rooms']:>13,}{entry['macs_per_room']:>11,}"
+                      f"{entry['weights_flash_bytes'] / 1024:>10.1f} KB")
+
+    for scale in results['scales'].values():
+        for stage, entry in scale.get('stages', {}).items():
+            if entry['status'] != 'ok':
+                print(f"[WARN] {scale['rooms']} rooms / {stage}: {entry.get('error')}")
+        if 'error' in scale:
+            print(f"[ERROR] {scale['rooms']} rooms: {scale['error']}")
+
+def check_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare les temps aux valeurs de référence
+
+    Returns:
+        Liste des régressions (scale, étape, référence, mesure, ratio)
+    """
+    if baseline.get('config') != results.get('config'):
+        print(f"[WARN] Configuration différente de la référence: {baseline.get('config')}")
+
+    regressions = []
+    for scale_key, scale in results['scales'].items():
+        base_scale = baseline.get('scales', {}).get(scale_key)
+        if base_scale is None:
+            continue
+        for stage, entry in scale.get('stages', {}).items():
+            base_entry = base_scale.get('stages', {}).get(stage)
+            if base_entry is None or base_entry['status'] != 'ok' or entry['status'] != 'ok':
+                continue
+            base_seconds, seconds = base_entry['seconds'], entry['seconds']
+            if seconds > base_seconds * (1 + threshold) and seconds - base_seconds > MIN_REGRESSION_SECONDS:
+                regressions.append((scale_key, stage, base_seconds, seconds, seconds / base_seconds))
+    return regressions
+
+def save_json(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline à l'échelle d'un parc de rooms")
+    parser.add_argument('--rooms', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help="Tailles de parc (défaut: 3 30 300 1000)")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS)
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help="Pas en minutes")
+    parser.add_argument('--epochs', type=int, default=DEFAULT_EPOCHS)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--output-rank', type=int, default=DEFAULT_OUTPUT_RANK,
+                        help="Rang k de la tête factorisée (étape output_head)")
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS,
+                        help="Groupes de rooms de l'étape train_sharded")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Fichier JSON des résultats")
+    parser.add_argument('--save-baseline', metavar='FICHIER', help="Enregistrer aussi comme référence")
+    parser.add_argument('--check', metavar='FICHIER', help="Comparer à une référence (code 1 si régression)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Ralentissement toléré (0.25 = +25%%)")
+    parser.add_argument('--keep', action='store_true', help="Conserver les dossiers temporaires")
+    parser.add_argument('--verbose', action='store_true', help="Afficher la sortie des étapes")
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        result = run_stages(args.worker, args.days, args.interval, args.epochs, args.seed,
+                            args.stages, args.verbose, args.output_rank, args.shards)
+        save_json(result, args.result_file)
+        return
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {'days': args.days, 'interval_minutes': args.interval,
+                   'epochs': args.epochs, 'seed': args.seed},
+        'scales': {}
+    }
+
+    for num_rooms in args.rooms:
+        print(f"[INFO] Benchmark {num_rooms} rooms ({args.days} jours, pas {args.interval} min)...")
+        results['scales'][str(num_rooms)] = run_scale(num_rooms, args)
+
+    print_results(results)
+    save_json(results, args.output)
+    print(f"\n[OK] Résultats: {args.output}")
+    if args.save_baseline:
+        save_json(results, args.save_baseline)
+        print(f"[OK] Référence enregistrée: {args.save_baseline}")
+
+    if args.check:
+        with open(args.check, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = check_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n[X] {len(regressions)} régression(s) (seuil +{args.threshold:.0%}):")
+            for scale_key, stage, base_seconds, seconds, ratio in regressions:
+                print(f"    {scale_key} rooms / {stage}: {base_seconds:.2f}s -> {seconds:.2f}s (x{ratio:.2f})")
+            sys.exit(1)
+        print(f"\n[OK] Aucune régression (seuil +{args.threshold:.0%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Encodages calendaires du modèle et tables précalculées pour le M5Stack
+Les features saison (sin/cos du jour de l'année) et heure (sin de l'heure)
+sont définies ici une seule fois: prepare_features_with_date, forecast.py et
+les tables exportées appellent les mêmes fonctions, l'entraînement et
+l'appareil ne peuvent donc pas diverger.
+
+Sur l'appareil, predict_rooms lit calendar_tables.h au lieu d'appeler sin/cos:
+    SEASON_SIN[366], SEASON_COS[366]   index jour de l'année - 1
+    TIME_SIN[24 * k]                   index heure * k + minute / (60 / k)
+en float, ou en virgule fixe Q15 (int16, valeur / CALENDAR_SCALE).
+
+verify_calendar_tables() relit les tables pour chaque pas d'une année
+bissextile (et les timestamps des CSV) et les compare aux features
+d'entraînement: égalité exacte en float32, erreur de quantification en Q15.
+verify_calendar_header() relit ensuite les littéraux du header écrit: chacun
+doit être un littéral C valide et redonner exactement la valeur de la table.
+
+Usage:
+    python calendar_tables.py                          # calendar_tables.h + vérification
+    python calendar_tables.py --fixed-point --steps-per-hour 4
+"""
+
+import os
+import re
+import argparse
+import numpy as np
+import pandas as pd
+
+CALENDAR_HEADER = 'calendar_tables.h'
+CALENDAR_DAYS = 366
+TIME_STEPS_PER_HOUR = 12    # pas de 5 min: couvre les grilles de 5, 10, 15, 20, 30 et 60 min
+Q15_SCALE = 32767
+VERIFY_YEAR = 2024          # année bissextile: les 366 jours sont vérifiés
+
+# Littéraux émis dans calendar_tables.h: float avec point décimal ('1.0f', pas '1f') ou entier Q15
+FLOAT_LITERAL = re.compile(r'^-?\d+\.\d*f$')
+INT_LITERAL = re.compile(r'^-?\d+$')
+
+# ============================================================================
+# ENCODAGES (partagés par l'entraînement, les prévisions et les tables)
+# ============================================================================
+
+def season_encoding(doy):
+    """sin / cos du jour de l'année (1-366), cycle de 365 jours"""
+    angle = (2 * np.pi * np.asarray(doy)) / 365.0
+    return np.sin(angle), np.cos(angle)
+
+def time_of_day_encoding(hours, minutes=0):
+    """sin de l'heure de la journée (0-24h)"""
+    hour = np.asarray(hours) + np.asarray(minutes) / 60.0
+    return np.sin((2 * np.pi * hour) / 24.0)
+
+# ============================================================================
+# TABLES
+# ============================================================================
+
+def build_calendar_tables(steps_per_hour=TIME_STEPS_PER_HOUR, fixed_point=False):
+    """
+    Tables des encodages calendaires
+
+    Args:
+        steps_per_hour: résolution de TIME_SIN (diviseur de 60)
+        fixed_point: valeurs Q15 int16 au lieu de float32
+
+    Returns:
+        dict 'season_sin', 'season_cos', 'time_sin', 'steps_per_hour', 'fixed_point'
+    """
+    if steps_per_hour < 1 or 60 % steps_per_hour:
+        raise ValueError(f"steps_per_hour doit diviser 60 (reçu: {steps_per_hour})")
+    season_sin, season_cos = season_encoding(np.arange(1, CALENDAR_DAYS + 1))
+    steps = np.arange(24 * steps_per_hour)
+    time_sin = time_of_day_encoding(steps // steps_per_hour, (steps % steps_per_hour) * (60 // steps_per_hour))
+
+    def encode(values):
+        if fixed_point:
+            return np.round(values * Q15_SCALE).astype(np.int16)
+        return values.astype(np.float32)
+
+    return {'season_sin': encode(season_sin), 'season_cos': encode(season_cos), 'time_sin': encode(time_sin),
+            'steps_per_hour': steps_per_hour, 'fixed_point': fixed_point}
+
+def lookup_calendar_features(tables, doy, hours, minutes):
+    """
+    Features saison_sin, saison_cos, heure_sin lues dans les tables (comme l'appareil)
+
+    Returns:
+        matrice float32 (n x 3)
+    """
+    k = tables['steps_per_hour']
+    time_index = np.asarray(hours) * k + np.asarray(minutes) // (60 // k)
+    scale = np.float32(Q15_SCALE if tables['fixed_point'] else 1.0)
+    columns = [tables['season_sin'][np.asarray(doy) - 1], tables['season_cos'][np.asarray(doy) - 1],
+               tables['time_sin'][time_index]]
+    return np.column_stack([column.astype(np.float32) / scale for column in columns])
+
+def calendar_table_bytes(tables):
+    return sum(tables[name].nbytes for name in ('season_sin', 'season_cos', 'time_sin'))
+
+# ============================================================================
+# VÉRIFICATION
+# ============================================================================
+
+def _training_calendar_features(dates):
+    """Mêmes calculs que prepare_features_with_date, en float32 comme à l'entrée du réseau"""
+    season_sin, season_cos = season_encoding(dates.dayofyear.values)
+    time_sin = time_of_day_encoding(dates.hour.values, dates.minute.values)
+    return np.column_stack([season_sin, season_cos, time_sin]).astype(np.float32)
+
+def verify_calendar_tables(tables, timestamps=None):
+    """
+    Compare les tables aux features d'entraînement
+
+    Args:
+        timestamps: timestamps supplémentaires à vérifier (int64 ns, ex. ceux des CSV);
+            par défaut chaque pas de la table sur une année bissextile
+
+    Returns:
+        dict: 'checked', 'off_grid' (minutes hors de la résolution de TIME_SIN),
+        'max_error' par feature, 'exact'
+    """
+    step_minutes = 60 // tables['steps_per_hour']
+    dates = pd.date_range(f"{VERIFY_YEAR}-01-01", f"{VERIFY_YEAR}-12-31 23:59", freq=f"{step_minutes}min")
+    if timestamps is not None:
+        dates = dates.append(pd.DatetimeIndex(np.asarray(timestamps).view('datetime64[ns]')))
+
+    on_grid = dates.minute.values % step_minutes == 0
+    dates = dates[on_grid]
+    expected = _training_calendar_features(dates)
+    actual = lookup_calendar_features(tables, dates.dayofyear.values, dates.hour.values, dates.minute.values)
+    errors = np.abs(actual - expected).max(axis=0) if len(dates) else np.zeros(3)
+    return {
+        'checked': int(len(dates)),
+        'off_grid': int((~on_grid).sum()),
+        'max_error': dict(zip(('season_sin', 'season_cos', 'time_sin'), errors.tolist())),
+        'exact': bool(np.array_equal(actual, expected))
+    }
+
+def print_verification(result, tables):
+    errors = ', '.join(f"{name}={error:.2e}" for name, error in result['max_error'].items())
+    if tables['fixed_point']:
+        tag = '[OK]' if max(result['max_error'].values()) <= 0.5 / Q15_SCALE + 1e-7 else '[ERREUR]'
+        print(f"{tag} Tables calendrier Q15: {result['checked']} pas vérifiés, écart max {errors}")
+    else:
+        tag = '[OK]' if result['exact'] else '[ERREUR]'
+        print(f"{tag} Tables calendrier: {result['checked']} pas vérifiés, "
+              f"{'identiques aux features' if result['exact'] else 'écart ' + errors}")
+    if result['off_grid']:
+        print(f"[WARN] {result['off_grid']} timestamps hors de la grille de {60 // tables['steps_per_hour']} min "
+              f"(augmenter --steps-per-hour)")
+
+# ============================================================================
+# HEADER
+# ============================================================================
+
+def c_float_literal(value):
+    """Littéral float C le plus court qui redonne exactement la valeur float32 (toujours avec un point)"""
+    return np.format_float_positional(np.float32(value), unique=True, trim='0') + 'f'
+
+def write_calendar_header(tables, output_file=CALENDAR_HEADER):
+    """Écrit calendar_tables.h (SEASON_SIN, SEASON_COS, TIME_SIN)"""
+    k = tables['steps_per_hour']
+    fixed_point = tables['fixed_point']
+
+    def values(array):
+        if fixed_point:
+            return ", ".join(str(int(v)) for v in array)
+        return ", ".join(c_float_literal(v) for v in array)
+
+    with open(output_file, 'w') as f:
+        f.write("// Auto-generated calendar feature tables (calendar_tables.py)\n")
+        f.write("// Mêmes encodages que l'entraînement: saison = 2*pi*doy/365, heure = 2*pi*(h + m/60)/24\n\n")
+        f.write("#ifndef CALENDAR_TABLES_H\n")
+        f.write("#define CALENDAR_TABLES_H\n\n")
+        f.write("#include <stdint.h>\n\n")
+        f.write(f"#define CALENDAR_DAYS {CALENDAR_DAYS}\n")
+        f.write(f"#define CALENDAR_STEPS_PER_HOUR {k}\n")
+        if fixed_point:
+            f.write(f"#define CALENDAR_SCALE {Q15_SCALE}.0f  // Q15\n")
+            f.write("typedef int16_t calendar_t;\n\n")
+        else:
+            f.write("#define CALENDAR_SCALE 1.0f\n")
+            f.write("typedef float calendar_t;\n\n")
+
+        f.write("// Index: jour de l'année - 1\n")
+        f.write(f"const calendar_t SEASON_SIN[CALENDAR_DAYS] = {{\n  {values(tables['season_sin'])}\n}};\n\n")
+        f.write(f"const calendar_t SEASON_COS[CALENDAR_DAYS] = {{\n  {values(tables['season_cos'])}\n}};\n\n")
+        f.write(f"// Index: heure * CALENDAR_STEPS_PER_HOUR + minute / {60 // k}\n")
+        f.write(f"const calendar_t TIME_SIN[24 * CALENDAR_STEPS_PER_HOUR] = {{\n  {values(tables['time_sin'])}\n}};\n\n")
+        f.write("#endif // CALENDAR_TABLES_H\n")
+    return output_file
+
+def verify_calendar_header(tables, header_file):
+    """
+    Relit les tableaux de calendar_tables.h et les compare aux tables
+
+    Raises:
+        ValueError: littéral C invalide, tableau absent ou valeur différente
+    """
+    with open(header_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    pattern = FLOAT_LITERAL if not tables['fixed_point'] else INT_LITERAL
+    for name, key in (('SEASON_SIN', 'season_sin'), ('SEASON_COS', 'season_cos'), ('TIME_SIN', 'time_sin')):
+        match = re.search(rf'const calendar_t {name}\[[^\]]*\] = \{{([^}}]*)\}};', text)
+        if match is None:
+            raise ValueError(f"{header_file}: tableau {name} introuvable")
+        literals = [literal.strip() for literal in match.group(1).split(',')]
+        invalid = [literal for literal in literals if not pattern.match(literal)]
+        if invalid:
+            raise ValueError(f"{header_file}: littéraux invalides dans {name}: {', '.join(invalid[:5])}")
+        values = np.array([float(literal.rstrip('f')) for literal in literals], dtype=tables[key].dtype)
+        if not np.array_equal(values, tables[key]):
+            raise ValueError(f"{header_file}: {name} relu ne correspond pas aux tables")
+
+def export_calendar_tables(output_dir='', steps_per_hour=TIME_STEPS_PER_HOUR, fixed_point=False, timestamps=None):
+    """
+    Génère, vérifie et écrit calendar_tables.h
+
+    Returns:
+        chemin du header
+
+    Raises:
+        ValueError: les tables (ou le header relu) ne reproduisent pas les features d'entraînement
+    """
+    tables = build_calendar_tables(steps_per_hour, fixed_point)
+    result = verify_calendar_tables(tables, timestamps)
+    print_verification(result, tables)
+    if not fixed_point and not result['exact']:
+        raise ValueError("Les tables calendrier ne reproduisent pas les features d'entraînement")
+    output_file = write_calendar_header(tables, os.path.join(output_dir, CALENDAR_HEADER))
+    verify_calendar_header(tables, output_file)
+    print(f"[OK] Fichier généré: {output_file} ({calendar_table_bytes(tables) / 1024:.1f} KB)")
+    return output_file
+
+def data_timestamps(data_dir):
+    """Timestamps de tous les CSV du dossier (int64 ns)"""
+    from room_data import detect_room_columns, get_csv_files, read_room_columns
+    timestamps = []
+    for csv_file in get_csv_files(data_dir).values():
+        _, detected = detect_room_columns(csv_file)
+        if detected['timestamp'] is not None and detected['temperature'] is not None:
+            timestamps.append(read_room_columns(csv_file, detected)[0])
+    return np.concatenate(timestamps) if timestamps else None
+
+def main():
+    from room_data import DATA_DIR
+    parser = argparse.ArgumentParser(description="Tables calendrier (saison / heure) pour le M5Stack")
+    parser.add_argument('--steps-per-hour', type=int, default=TIME_STEPS_PER_HOUR,
+                        help="Résolution de TIME_SIN (diviseur de 60, défaut: 12 = 5 min)")
+    parser.add_argument('--fixed-point', action='store_true', help="Valeurs Q15 int16 au lieu de float")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Vérifier aussi les timestamps de ces CSV")
+    parser.add_argument('--output-dir', default='')
+    args = parser.parse_args()
+
+    try:
+        export_calendar_tables(args.output_dir, args.steps_per_hour, args.fixed_point,
+                               data_timestamps(args.data_dir))
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Import des CSV réels dans data/ sans re-parsing
+Seul l'en-tête du fichier source est lu (colonnes timestamp et température
+requises), puis le fichier est copié tel quel: clone copy-on-write (reflink)
+quand le système de fichiers le permet, sinon copie noyau (shutil.copyfile).
+
+Chaque import est enregistré dans data/imports.json avec l'empreinte de la
+source et de la copie: une source inchangée dont la copie est intacte n'est
+plus recopiée (ni le store memmap réimporté, la copie gardant son empreinte).
+
+Pas de lien physique (hardlink): la copie dans data/ peut être réécrite sur
+place (export du store, génération), ce qui modifierait le fichier de l'utilisateur.
+"""
+
+import os
+import json
+import shutil
+
+from room_data import DATA_DIR, detect_room_columns
+from room_store import file_fingerprint
+
+IMPORT_MANIFEST = os.path.join(DATA_DIR, 'imports.json')
+
+# ioctl Linux de clonage de fichier (btrfs, XFS, bcachefs...)
+FICLONE = 0x40049409
+
+def load_import_manifest(path=IMPORT_MANIFEST):
+    """Charge le registre des imports (dict copie -> source et empreintes)"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Registre d'import illisible ({path}): {e}")
+        return {}
+
+def save_import_manifest(manifest, path=IMPORT_MANIFEST):
+    """Écrit le registre des imports (remplacement atomique)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def check_header(source):
+    """
+    Vérifie l'en-tête d'un CSV de room sans lire les données
+
+    Raises:
+        ValueError: colonnes timestamp/température introuvables
+    """
+    _, detected = detect_room_columns(source)
+    missing = [column_type for column_type in ('timestamp', 'temperature') if detected[column_type] is None]
+    if missing:
+        raise ValueError(f"{source}: colonne(s) introuvable(s): {', '.join(missing)}")
+    return detected
+
+def is_import_current(source, output, manifest):
+    """True si `output` est une copie intacte de `source` dans son état actuel"""
+    entry = manifest.get(os.path.normpath(output))
+    if entry is None or not os.path.exists(source) or not os.path.exists(output):
+        return False
+    return (entry.get('source') == os.path.abspath(source)
+            and entry.get('source_fingerprint') == file_fingerprint(source)
+            and entry.get('output_fingerprint') == file_fingerprint(output))
+
+def _reflink(source, output):
+    """Clone copy-on-write (Linux); False si non supporté"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(source, 'rb') as src, open(output, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return True
+    except OSError:
+        if os.path.exists(output):
+            os.remove(output)
+        return False
+
+def copy_file(source, output):
+    """
+    Copie un fichier sans passer par Python ligne à ligne
+
+    Returns:
+        'reflink' ou 'copie'
+    """
+    tmp_path = output + '.tmp'
+    if _reflink(source, tmp_path):
+        method = 'reflink'
+    else:
+        shutil.copyfile(source, tmp_path)
+        method = 'copie'
+    os.replace(tmp_path, output)
+    return method
+
+def import_room_csv(source, output, manifest):
+    """
+    Importe un CSV réel vers data/RoomN_data.csv
+
+    Args:
+        source: CSV de l'utilisateur
+        output: destination dans data/
+        manifest: registre des imports (mis à jour; à sauvegarder par l'appelant)
+
+    Returns:
+        'inchangé', 'reflink' ou 'copie'
+
+    Raises:
+        OSError, ValueError: source introuvable ou en-tête invalide
+    """
+    if is_import_current(source, output, manifest):
+        return 'inchangé'
+
+    check_header(source)
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    source_fingerprint = file_fingerprint(source)
+    method = copy_file(source, output)
+    manifest[os.path.normpath(output)] = {
+        'source': os.path.abspath(source),
+        'source_fingerprint': source_fingerprint,
+        'output_fingerprint': file_fingerprint(output)
+    }
+    return method
@@ -3,7 +3,7 @@
 """
 Interface Graphique pour la Gestion des Données de Température
 Permet de générer des données fictives OU d'importer des données réelles
-Support de N chambres (1 à 20+)
+Support de N chambres (1 à plusieurs centaines)
 """
 
 import tkinter as tk
@@ -18,6 +18,12 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
+from room_data import (CSV_COMPRESSIONS, available_compressions, csv_compression, get_csv_files,
+                       room_csv_path, room_csv_variants)
+from room_store import open_current_store
+from data_quality import format_quality_summary, scan_csv_files
+from csv_import import import_room_csv, is_import_current, load_import_manifest, save_import_manifest
+
 # Profils d'isolation
 ISOLATION_PROFILES = {
     'excellent': {
@@ -72,6 +78,12 @@ ISOLATION_PROFILES = {
     }
 }
 
+# Tableau des chambres
+MAX_ROOMS = 500
+ROOM_COLUMNS = ('room_id', 'name', 'source', 'detail')
+SOURCE_LABELS = {False: "🎲 Données générées", True: "📁 Données réelles (CSV)"}
+NO_COMPRESSION = 'aucune'
+
 class RoomConfig:
     """Configuration pour une chambre"""
     def __init__(self, room_id, name="", profile='good', use_real_data=False, csv_path=""):
@@ -114,7 +126,7 @@ class DataGeneratorGUI:
         # Couleurs
         style.configure('Title.TLabel', font=('Arial', 14, 'bold'), foreground='#2C3E50')
         style.configure('Header.TLabel', font=('Arial', 11, 'bold'), foreground='#34495E')
-        style.configure('Room.TFrame', relief='solid', borderwidth=1)
+        style.configure('Treeview', rowheight=24)
         
     def create_widgets(self):
         """Crée l'interface utilisateur"""
@@ -169,7 +181,7 @@ class DataGeneratorGUI:
         ttk.Label(rooms_frame, text="Nombre de chambres:", style='Header.TLabel').pack(side='left', padx=5)
         
         self.num_rooms_var = tk.IntVar(value=3)
-        num_rooms_spinbox = ttk.Spinbox(rooms_frame, from_=1, to=30, textvariable=self.num_rooms_var, 
+        num_rooms_spinbox = ttk.Spinbox(rooms_frame, from_=1, to=MAX_ROOMS, textvariable=self.num_rooms_var, 
                                        width=10, command=self.update_rooms_display)
         num_rooms_spinbox.pack(side='left', padx=5)
         
@@ -189,6 +201,11 @@ class DataGeneratorGUI:
                                      values=[5, 10, 15, 30, 60])
         interval_combo.pack(side='left', padx=5)
         
+        ttk.Label(params_frame, text="Compression:", style='Header.TLabel').pack(side='left', padx=15)
+        self.compression_var = tk.StringVar(value=NO_COMPRESSION)
+        ttk.Combobox(params_frame, textvariable=self.compression_var, width=8, state='readonly',
+                    values=[NO_COMPRESSION] + available_compressions()).pack(side='left', padx=5)
+        
         # Date de début
         date_frame = ttk.Frame(global_frame)
         date_frame.pack(fill='x', pady=5)
@@ -207,8 +224,9 @@ class DataGeneratorGUI:
         ttk.Spinbox(date_frame, from_=1, to=31, textvariable=self.start_day_var, width=5).pack(side='left', padx=2)
         
         # === LISTE DES CHAMBRES ===
-        self.rooms_container = ttk.Frame(self.scrollable_frame)
-        self.rooms_container.pack(fill='both', expand=True, padx=5, pady=5)
+        rooms_list_frame = ttk.LabelFrame(self.scrollable_frame, text="🏠 Chambres", padding="5")
+        rooms_list_frame.pack(fill='both', expand=True, padx=5, pady=5)
+        self.create_rooms_table(rooms_list_frame)
         
         # === ZONE DE LOG ===
         log_frame = ttk.LabelFrame(self.scrollable_frame, text="📋 Journal", padding="5")
@@ -248,12 +266,92 @@ class DataGeneratorGUI:
         # Initialiser l'affichage
         self.update_rooms_display()
         
-    def update_rooms_display(self):
-        """Met à jour l'affichage des chambres selon le nombre choisi"""
-        # Supprimer anciens widgets
-        for widget in self.rooms_container.winfo_children():
-            widget.destroy()
-        
+    def create_rooms_table(self, parent):
+        """
+        Crée le tableau des chambres (ttk.Treeview)
+        
+        Le Treeview ne dessine que les lignes visibles: quel que soit le nombre
+        de chambres, l'édition ne crée qu'un seul widget, placé sur la cellule
+        double-cliquée, et seule la ligne modifiée est mise à jour.
+        """
+        # Actions groupées sur la sélection
+        toolbar = ttk.Frame(parent)
+        toolbar.pack(fill='x', pady=(0, 5))
+        
+        ttk.Label(toolbar, text="Sélection:", style='Header.TLabel').pack(side='left', padx=5)
+        ttk.Button(toolbar, text="Tout sélectionner",
+                  command=lambda: self.rooms_tree.selection_set(self.rooms_tree.get_children())).pack(side='left', padx=2)
+        
+        self.bulk_profile_var = tk.StringVar(value='good')
+        ttk.Combobox(toolbar, textvariable=self.bulk_profile_var, width=12, state='readonly',
+                    values=list(ISOLATION_PROFILES.keys())).pack(side='left', padx=(15, 2))
+        ttk.Button(toolbar, text="🏷️ Appliquer le profil",
+                  command=self.set_selected_profile).pack(side='left', padx=2)
+        
+        ttk.Button(toolbar, text=SOURCE_LABELS[False],
+                  command=lambda: self.set_selected_source(False)).pack(side='left', padx=(15, 2))
+        ttk.Button(toolbar, text="📂 Importer CSV...",
+                  command=self.browse_selected_csv).pack(side='left', padx=2)
+        
+        ttk.Label(toolbar, text="Double-clic pour modifier une cellule",
+                 foreground='gray').pack(side='right', padx=5)
+        
+        # Tableau
+        table_frame = ttk.Frame(parent)
+        table_frame.pack(fill='both', expand=True)
+        
+        self.rooms_tree = ttk.Treeview(table_frame, columns=ROOM_COLUMNS, show='headings',
+                                       height=12, selectmode='extended')
+        headings = {'room_id': ("#", 50), 'name': ("Nom", 200), 'source': ("Source", 200),
+                    'detail': ("Profil d'isolation / Fichier CSV", 450)}
+        for column in ROOM_COLUMNS:
+            text, width = headings[column]
+            self.rooms_tree.heading(column, text=text)
+            self.rooms_tree.column(column, width=width, stretch=(column == 'detail'),
+                                   anchor='center' if column == 'room_id' else 'w')
+        
+        for key, profile in ISOLATION_PROFILES.items():
+            self.rooms_tree.tag_configure(key, foreground=profile['color'])
+        self.rooms_tree.tag_configure('real', foreground='#34495E')
+        
+        tree_scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.rooms_tree.yview)
+        
+        def on_tree_scroll(first, last):
+            # L'éditeur est placé en coordonnées de la ligne: il ne suit pas le défilement
+            self.close_cell_editor()
+            tree_scrollbar.set(first, last)
+        
+        self.rooms_tree.configure(yscrollcommand=on_tree_scroll)
+        self.rooms_tree.pack(side='left', fill='both', expand=True)
+        tree_scrollbar.pack(side='right', fill='y')
+        
+        self.rooms_tree.bind('<Double-1>', self.edit_room_cell)
+        self.rooms_tree.bind('<ButtonPress-1>', lambda e: self.close_cell_editor(), add='+')
+        self._cell_editor = None
+    
+    def room_row(self, room):
+        """Valeurs et tag d'affichage d'une chambre dans le tableau"""
+        if room.use_real_data:
+            detail = room.csv_path or "Aucun fichier sélectionné"
+            tag = 'real'
+        else:
+            detail = f"{room.profile} ({ISOLATION_PROFILES[room.profile]['name']})"
+            tag = room.profile
+        return (room.room_id, room.name, SOURCE_LABELS[room.use_real_data], detail), (tag,)
+    
+    def refresh_room_row(self, index):
+        """Met à jour la seule ligne d'une chambre"""
+        values, tags = self.room_row(self.rooms[index])
+        self.rooms_tree.item(str(index), values=values, tags=tags)
+    
+    def update_rooms_display(self, rebuild=False):
+        """
+        Ajuste le tableau au nombre de chambres choisi
+        
+        Seules les lignes ajoutées ou retirées sont modifiées; rebuild=True
+        reconstruit tout le tableau (après chargement d'une configuration).
+        """
+        self.close_cell_editor(save=False)
         num_rooms = self.num_rooms_var.get()
         
         # Ajuster la liste de configs
@@ -262,101 +360,163 @@ class DataGeneratorGUI:
         while len(self.rooms) > num_rooms:
             self.rooms.pop()
         
-        # Créer les widgets pour chaque chambre
-        for i, room in enumerate(self.rooms):
-            self.create_room_widget(i, room)
+        if rebuild:
+            self.rooms_tree.delete(*self.rooms_tree.get_children())
+        displayed = len(self.rooms_tree.get_children())
+        if displayed > num_rooms:
+            self.rooms_tree.delete(*[str(i) for i in range(num_rooms, displayed)])
+        for i in range(displayed, num_rooms):
+            values, tags = self.room_row(self.rooms[i])
+            self.rooms_tree.insert('', 'end', iid=str(i), values=values, tags=tags)
     
-    def create_room_widget(self, index, room):
-        """Crée le widget pour une chambre"""
-        frame = ttk.LabelFrame(self.rooms_container, text=f"🏠 Chambre {room.room_id}", 
-                              padding="10", style='Room.TFrame')
-        frame.pack(fill='x', pady=5)
-        
-        # Ligne 1: Nom
-        name_frame = ttk.Frame(frame)
-        name_frame.pack(fill='x', pady=2)
-        
-        ttk.Label(name_frame, text="Nom:", width=15).pack(side='left')
-        name_entry = ttk.Entry(name_frame, width=30)
-        name_entry.insert(0, room.name)
-        name_entry.pack(side='left', padx=5)
-        name_entry.bind('<KeyRelease>', lambda e, idx=index: self.update_room_name(idx, name_entry.get()))
-        
-        # Ligne 2: Source de données
-        source_frame = ttk.Frame(frame)
-        source_frame.pack(fill='x', pady=2)
-        
-        ttk.Label(source_frame, text="Source:", width=15).pack(side='left')
-        
-        use_real_var = tk.BooleanVar(value=room.use_real_data)
+    def edit_room_cell(self, event):
+        """Édition en place de la cellule double-cliquée"""
+        if self.rooms_tree.identify_region(event.x, event.y) != 'cell':
+            return
+        iid = self.rooms_tree.identify_row(event.y)
+        column = self.rooms_tree.identify_column(event.x)
+        if not iid:
+            return
         
-        real_radio = ttk.Radiobutton(source_frame, text="📁 Données réelles (CSV)", 
-                                    variable=use_real_var, value=True,
-                                    command=lambda idx=index, var=use_real_var: self.toggle_data_source(idx, var))
-        real_radio.pack(side='left', padx=5)
+        self.close_cell_editor()
+        index = int(iid)
+        room = self.rooms[index]
+        field = ROOM_COLUMNS[int(column[1:]) - 1]
         
-        fake_radio = ttk.Radiobutton(source_frame, text="🎲 Données générées", 
-                                    variable=use_real_var, value=False,
-                                    command=lambda idx=index, var=use_real_var: self.toggle_data_source(idx, var))
-        fake_radio.pack(side='left', padx=5)
+        if field == 'detail' and room.use_real_data:
+            self.browse_csv(index)
+            return
         
-        # Ligne 3: Options selon source
-        options_frame = ttk.Frame(frame)
-        options_frame.pack(fill='x', pady=2)
+        bbox = self.rooms_tree.bbox(iid, column)
+        if not bbox:
+            return
         
-        ttk.Label(options_frame, text="", width=15).pack(side='left')  # Alignement
+        if field == 'name':
+            var = tk.StringVar(value=room.name)
+            editor = ttk.Entry(self.rooms_tree, textvariable=var)
+            editor.select_range(0, tk.END)
+            commit = lambda: self.update_room_name(index, var.get())
+        elif field == 'source':
+            var = tk.StringVar(value=SOURCE_LABELS[room.use_real_data])
+            editor = ttk.Combobox(self.rooms_tree, textvariable=var, state='readonly',
+                                  values=list(SOURCE_LABELS.values()))
+            commit = lambda: self.set_room_source(index, var.get() == SOURCE_LABELS[True])
+        elif field == 'detail':
+            var = tk.StringVar(value=room.profile)
+            editor = ttk.Combobox(self.rooms_tree, textvariable=var, state='readonly',
+                                  values=list(ISOLATION_PROFILES.keys()))
+            commit = lambda: self.update_room_profile(index, var.get())
+        else:
+            return
         
-        if room.use_real_data:
-            # Import CSV
-            csv_label = ttk.Label(options_frame, text=room.csv_path or "Aucun fichier sélectionné", 
-                                 foreground='gray')
-            csv_label.pack(side='left', padx=5)
-            
-            ttk.Button(options_frame, text="📂 Parcourir...", 
-                      command=lambda idx=index: self.browse_csv(idx)).pack(side='left', padx=5)
+        def finish(save=True):
+            if self._cell_editor is not finish:
+                return
+            self._cell_editor = None
+            editor.destroy()
+            if save:
+                commit()
+        
+        editor.bind('<Return>', lambda e: finish())
+        editor.bind('<Escape>', lambda e: finish(save=False))
+        if isinstance(editor, ttk.Combobox):
+            # Pas de <FocusOut>: la liste déroulante prend le focus à l'ouverture
+            editor.bind('<<ComboboxSelected>>', lambda e: finish())
         else:
-            # Profil d'isolation
-            ttk.Label(options_frame, text="Profil d'isolation:", foreground='#34495E').pack(side='left', padx=5)
-            
-            profile_var = tk.StringVar(value=room.profile)
-            profile_combo = ttk.Combobox(options_frame, textvariable=profile_var, width=30, state='readonly',
-                                        values=list(ISOLATION_PROFILES.keys()))
-            profile_combo.pack(side='left', padx=5)
-            profile_combo.bind('<<ComboboxSelected>>', 
-                              lambda e, idx=index, var=profile_var: self.update_room_profile(idx, var.get()))
-            
-            # Afficher description
-            profile_desc = ISOLATION_PROFILES[room.profile]['name']
-            ttk.Label(options_frame, text=f"({profile_desc})", foreground='gray').pack(side='left', padx=5)
-        
-        # Stocker la référence pour mise à jour dynamique
-        room._widget_frame = frame
-        room._use_real_var = use_real_var
+            editor.bind('<FocusOut>', lambda e: finish())
+        
+        x, y, width, height = bbox
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.focus_set()
+        self._cell_editor = finish
+    
+    def close_cell_editor(self, save=True):
+        """Ferme l'éditeur de cellule ouvert (en validant sa valeur par défaut)"""
+        if self._cell_editor is not None:
+            self._cell_editor(save)
+    
+    def selected_room_indices(self):
+        """Indices des chambres sélectionnées dans le tableau (ordre d'affichage)"""
+        return sorted(int(iid) for iid in self.rooms_tree.selection())
     
     def update_room_name(self, index, name):
         """Met à jour le nom d'une chambre"""
         self.rooms[index].name = name
+        self.refresh_room_row(index)
     
-    def toggle_data_source(self, index, var):
+    def set_room_source(self, index, use_real_data):
         """Change la source de données (réel/généré)"""
-        self.rooms[index].use_real_data = var.get()
-        # Rafraîchir l'affichage
-        self.update_rooms_display()
+        self.rooms[index].use_real_data = use_real_data
+        self.refresh_room_row(index)
     
     def update_room_profile(self, index, profile):
         """Met à jour le profil d'isolation"""
         self.rooms[index].profile = profile
+        self.refresh_room_row(index)
+    
+    def set_selected_profile(self):
+        """Applique le profil choisi aux chambres sélectionnées (passées en données générées)"""
+        indices = self.selected_room_indices()
+        if not indices:
+            messagebox.showwarning("Attention", "Aucune chambre sélectionnée")
+            return
+        profile = self.bulk_profile_var.get()
+        for index in indices:
+            self.rooms[index].profile = profile
+            self.rooms[index].use_real_data = False
+            self.refresh_room_row(index)
+        self.log(f"🏷️ Profil '{profile}' appliqué à {len(indices)} chambre(s)")
+    
+    def set_selected_source(self, use_real_data):
+        """Change la source de données des chambres sélectionnées"""
+        indices = self.selected_room_indices()
+        for index in indices:
+            self.set_room_source(index, use_real_data)
+        if indices:
+            self.log(f"✓ {len(indices)} chambre(s) → {SOURCE_LABELS[use_real_data]}")
     
     def browse_csv(self, index):
         """Ouvre un dialogue pour sélectionner un CSV"""
         filename = filedialog.askopenfilename(
             title=f"Sélectionner CSV pour {self.rooms[index].name}",
-            filetypes=[("Fichiers CSV", "*.csv"), ("Tous fichiers", "*.*")]
+            filetypes=[("Fichiers CSV", "*.csv *.csv.gz *.csv.zst *.csv.xz"), ("Tous fichiers", "*.*")]
         )
         if filename:
             self.rooms[index].csv_path = filename
+            self.rooms[index].use_real_data = True
             self.log(f"✓ Fichier sélectionné pour {self.rooms[index].name}: {filename}")
-            self.update_rooms_display()
+            self.refresh_room_row(index)
+    
+    def browse_selected_csv(self):
+        """
+        Importe des CSV pour les chambres sélectionnées
+        
+        Les fichiers choisis (triés par nom) sont attribués dans l'ordre aux
+        chambres sélectionnées.
+        """
+        indices = self.selected_room_indices()
+        if not indices:
+            messagebox.showwarning("Attention", "Aucune chambre sélectionnée")
+            return
+        if len(indices) == 1:
+            self.browse_csv(indices[0])
+            return
+        
+        filenames = filedialog.askopenfilenames(
+            title=f"Sélectionner {len(indices)} CSV (attribués dans l'ordre des chambres)",
+            filetypes=[("Fichiers CSV", "*.csv *.csv.gz *.csv.zst *.csv.xz"), ("Tous fichiers", "*.*")]
+        )
+        if not filenames:
+            return
+        for index, filename in zip(indices, sorted(filenames)):
+            self.rooms[index].csv_path = filename
+            self.rooms[index].use_real_data = True
+            self.refresh_room_row(index)
+        
+        assigned = min(len(indices), len(filenames))
+        self.log(f"✓ {assigned} fichier(s) CSV attribué(s) aux chambres sélectionnées")
+        if len(filenames) != len(indices):
+            self.log(f"  ⚠️  {len(filenames)} fichier(s) pour {len(indices)} chambre(s) sélectionnée(s)")
     
     def log(self, message):
         """Affiche un message dans le journal"""
@@ -371,6 +531,7 @@ class DataGeneratorGUI:
             'num_rooms': self.num_rooms_var.get(),
             'days': self.days_var.get(),
             'interval': self.interval_var.get(),
+            'compression': self.compression_var.get(),
             'start_date': {
                 'year': self.start_year_var.get(),
                 'month': self.start_month_var.get(),
@@ -406,6 +567,8 @@ class DataGeneratorGUI:
             self.num_rooms_var.set(config.get('num_rooms', 3))
             self.days_var.set(config.get('days', 365))
             self.interval_var.set(config.get('interval', 30))
+            compression = config.get('compression', NO_COMPRESSION)
+            self.compression_var.set(compression if compression in available_compressions() else NO_COMPRESSION)
             
             start = config.get('start_date', {})
             self.start_year_var.set(start.get('year', datetime.now().year - 1))
@@ -423,7 +586,7 @@ class DataGeneratorGUI:
                 )
                 self.rooms.append(room)
             
-            self.update_rooms_display()
+            self.update_rooms_display(rebuild=True)
             self.log(f"📂 Configuration chargée: {self.config_file}")
             
         except Exception as e:
@@ -436,9 +599,15 @@ class DataGeneratorGUI:
             self.log("🚀 DÉBUT DE LA GÉNÉRATION")
             self.log("="*60)
             
-            # Supprimer tous les fichiers CSV existants
+            # Supprimer les fichiers CSV existants (toutes compressions), sauf les imports réels à jour
+            manifest = load_import_manifest()
+            kept = {
+                os.path.normpath(self.real_csv_output(room)) for room in self.rooms
+                if room.use_real_data and room.csv_path
+                and is_import_current(room.csv_path, self.real_csv_output(room), manifest)
+            }
             import glob
-            existing_csvs = glob.glob("data/Room*_data.csv")
+            existing_csvs = [f for f in glob.glob("data/Room*_data.csv*") if os.path.normpath(f) not in kept]
             if existing_csvs:
                 for csv_file in existing_csvs:
                     os.remove(csv_file)
@@ -457,9 +626,13 @@ class DataGeneratorGUI:
             
             num_days = self.days_var.get()
             interval = self.interval_var.get()
+            compression = self.compression_var.get()
+            compression = None if compression == NO_COMPRESSION else compression
             
             self.log(f"📅 Période: {num_days} jours depuis {start_date.strftime('%Y-%m-%d')}")
             self.log(f"⏱️  Intervalle: {interval} minutes")
+            if compression:
+                self.log(f"🗜️  Compression: {compression} (*.csv{CSV_COMPRESSIONS[compression]})")
             self.log(f"🏠 Chambres: {len(self.rooms)}")
             self.log("")
             
@@ -473,10 +646,7 @@ class DataGeneratorGUI:
                         self.log(f"  ⚠️  Fichier introuvable: {room.csv_path}")
                         continue
                     
-                    df = pd.read_csv(room.csv_path)
-                    output_file = f"data/Room{room.room_id}_data.csv"
-                    df.to_csv(output_file, index=False)
-                    self.log(f"  ✓ Copié: {len(df)} lignes → {output_file}")
+                    self.import_real_csv(room, self.real_csv_output(room), manifest, indent="  ")
                     
                 else:
                     # Générer données fictives
@@ -490,13 +660,15 @@ class DataGeneratorGUI:
                         interval
                     )
                     
-                    output_file = f"data/Room{room.room_id}_data.csv"
-                    df.to_csv(output_file, index=False)
+                    output_file = room_csv_path(room.room_id, "data", compression)
+                    df.to_csv(output_file, index=False, compression=compression)
                     self.log(f"  ✓ Généré: {len(df)} lignes → {output_file}")
                     self.log(f"    Temp: {df['Temperature_Celsius(°C)'].min():.1f}°C - {df['Temperature_Celsius(°C)'].max():.1f}°C (moy: {df['Temperature_Celsius(°C)'].mean():.1f}°C)")
                 
                 self.log("")
             
+            save_import_manifest(manifest)
+            
             self.log("="*60)
             self.log("✅ GÉNÉRATION TERMINÉE")
             self.log("="*60)
@@ -509,6 +681,35 @@ class DataGeneratorGUI:
             self.log(f"❌ ERREUR: {e}")
             messagebox.showerror("Erreur", f"Erreur lors de la génération:\n{e}")
     
+    def real_csv_output(self, room):
+        """Destination du CSV réel d'une chambre (même compression que la source)"""
+        return room_csv_path(room.room_id, "data", csv_compression(room.csv_path))
+    
+    def import_real_csv(self, room, output_file, manifest, indent="", label=""):
+        """
+        Copie le CSV réel d'une chambre dans data/ (en-tête vérifié, pas de re-parsing)
+        
+        Returns:
+            True si le fichier est en place
+        """
+        try:
+            status = import_room_csv(room.csv_path, output_file, manifest)
+        except (OSError, ValueError) as e:
+            self.log(f"{indent}❌ {label}Erreur - {e}")
+            return False
+        
+        # Une seule variante par room (ex: ancien .csv remplacé par un .csv.gz)
+        for other in room_csv_variants(room.room_id, "data"):
+            if os.path.normpath(other) != os.path.normpath(output_file):
+                os.remove(other)
+        
+        if status == 'inchangé':
+            self.log(f"{indent}✓ {label}Source inchangée, {output_file} conservé")
+        else:
+            size_mb = os.path.getsize(output_file) / (1024 * 1024)
+            self.log(f"{indent}✓ {label}Copié: {size_mb:.1f} MB → {output_file} ({status})")
+        return True
+    
     def generate_synthetic_data(self, profile_key, start_date, num_days, interval_minutes):
         """Génère des données synthétiques pour une chambre"""
         from generate_test_data import generate_external_temperature, generate_room_temperature
@@ -570,28 +771,23 @@ class DataGeneratorGUI:
             self.log("📋 PRÉPARATION DES DONNÉES")
             self.log("="*60)
             
+            manifest = load_import_manifest()
             for i, room in enumerate(self.rooms, 1):
                 if room.use_real_data and room.csv_path:
                     if not os.path.exists(room.csv_path):
                         self.log(f"⚠️  Room {i}: Fichier introuvable: {room.csv_path}")
                         continue
                     
-                    try:
-                        df = pd.read_csv(room.csv_path)
-                        output_file = f"data/Room{room.room_id}_data.csv"
-                        
-                        # Créer le dossier data s'il n'existe pas
-                        os.makedirs("data", exist_ok=True)
-                        
-                        df.to_csv(output_file, index=False)
-                        self.log(f"✓ Room {i}: {len(df)} lignes → {output_file}")
-                    except Exception as e:
-                        self.log(f"❌ Room {i}: Erreur - {str(e)}")
+                    self.import_real_csv(room, self.real_csv_output(room), manifest, label=f"Room {i}: ")
+            save_import_manifest(manifest)
             
             self.log("")
         
+        quality_warning = self.check_data_quality()
+        
         response = messagebox.askyesno(
             "Entraîner le Modèle",
+            quality_warning +
             "Lancer l'entraînement du modèle avec les données actuelles?\n\n"
             "Cela peut prendre plusieurs minutes."
         )
@@ -608,6 +804,35 @@ class DataGeneratorGUI:
             thread = threading.Thread(target=self._train_model_thread)
             thread.start()
     
+    def check_data_quality(self):
+        """
+        Contrôle qualité des CSV de data/ avant l'entraînement (data_quality.py)
+        
+        Returns:
+            Avertissement à afficher dans la confirmation ('' si tout est valide)
+        """
+        self.log("="*60)
+        self.log("🔍 CONTRÔLE QUALITÉ DES DONNÉES")
+        self.log("="*60)
+        try:
+            qualities, errors = scan_csv_files()
+        except Exception as e:
+            self.log(f"⚠️  Contrôle qualité impossible: {e}")
+            return ""
+        
+        lines = format_quality_summary(qualities, errors)
+        self.log(lines[0])
+        for line in lines[1:]:
+            self.log(f"  ⚠️  {line}")
+        self.log("")
+        
+        if len(lines) == 1:
+            return ""
+        details = "\n".join(f"• {line}" for line in lines[1:6])
+        more = f"\n• ... ({len(lines) - 6} autres, voir le journal)" if len(lines) > 6 else ""
+        return (f"⚠️ Anomalies détectées:\n{details}{more}\n\n"
+                "Les lignes invalides (doublons, hors plage, pics) seront écartées.\n\n")
+    
     def _train_model_thread(self):
         """Thread pour l'entraînement"""
         import subprocess
@@ -679,16 +904,9 @@ class DataGeneratorGUI:
             self._safe_log("📊 EXPORT CSV VERS ARDUINO")
             self._safe_log("="*60)
             
-            # Vérifier si les fichiers CSV existent
-            csv_files = [
-                "data/Room1_data.csv",
-                "data/Room2_data.csv", 
-                "data/Room3_data.csv"
-            ]
-            
-            missing = [f for f in csv_files if not os.path.exists(f)]
-            if missing:
-                self._safe_log(f"⚠️  Fichiers CSV manquants: {', '.join(missing)}")
+            # Vérifier si les fichiers CSV existent (éventuellement compressés)
+            if not get_csv_files("data"):
+                self._safe_log("⚠️  Aucun fichier Room*_data.csv dans data/")
                 self._safe_log("⚠️  Export annulé - page DONNÉES CSV utilisera les anciennes données")
                 self.root.after(0, lambda: messagebox.showinfo("Succès", 
                     "Modèle entraîné avec succès!\n\n⚠️ Export CSV ignoré (fichiers manquants)\n\nVous pouvez maintenant uploader sur M5Stack."))
@@ -762,19 +980,11 @@ class DataGeneratorGUI:
     
     def manual_export_to_arduino(self):
         """Export manuel des CSV vers Arduino (bouton dédié)"""
-        # Vérifier si les fichiers CSV existent
-        csv_files = [
-            "data/Room1_data.csv",
-            "data/Room2_data.csv", 
-            "data/Room3_data.csv"
-        ]
-        
-        missing = [f for f in csv_files if not os.path.exists(f)]
-        if missing:
+        # Vérifier si les fichiers CSV existent (éventuellement compressés)
+        if not get_csv_files("data"):
             messagebox.showerror("Fichiers manquants", 
-                f"Les fichiers CSV suivants sont manquants:\n\n" + 
-                "\n".join(missing) + 
-                "\n\nGénérez ou importez des données d'abord.")
+                "Aucun fichier Room*_data.csv dans le dossier data/\n\n"
+                "Générez ou importez des données d'abord.")
             return
         
         response = messagebox.askyesno(
@@ -798,10 +1008,11 @@ class DataGeneratorGUI:
     def visualize_csv_data(self):
         """Affiche une fenêtre avec les graphiques des données CSV"""
         # Vérifier si des fichiers CSV existent
+        room_files = get_csv_files("data")
         csv_files = []
         for i in range(1, len(self.rooms) + 1):
-            csv_path = f"data/Room{i}_data.csv"
-            if os.path.exists(csv_path):
+            csv_path = room_files.get(f"room{i}")
+            if csv_path is not None:
                 csv_files.append((i, csv_path))
         
         if not csv_files:
@@ -863,14 +1074,21 @@ class DataGeneratorGUI:
                 stats_text.delete(1.0, tk.END)
                 stats_text.insert(tk.END, "=== STATISTIQUES DES DONNÉES ===\n\n")
                 
+                # Store memmap partagé s'il est à jour (évite de re-parser les CSV)
+                store = open_current_store(room_files)
+                
                 for idx, (room_num, csv_path) in enumerate(csv_files):
-                    df = pd.read_csv(csv_path)
-                    
-                    # Trouver colonne timestamp et température
-                    timestamp_col = [c for c in df.columns if 'timestamp' in c.lower()][0]
-                    temp_col = [c for c in df.columns if 'temp' in c.lower() and 'celsius' in c.lower()][0]
-                    
-                    df[timestamp_col] = pd.to_datetime(df[timestamp_col])
+                    if store is not None and f"room{room_num}" in store.rooms:
+                        df = store.room_dataframe(f"room{room_num}")
+                        timestamp_col, temp_col = 'timestamp', 'temperature'
+                    else:
+                        df = pd.read_csv(csv_path)
+                        
+                        # Trouver colonne timestamp et température
+                        timestamp_col = [c for c in df.columns if 'timestamp' in c.lower()][0]
+                        temp_col = [c for c in df.columns if 'temp' in c.lower() and 'celsius' in c.lower()][0]
+                        
+                        df[timestamp_col] = pd.to_datetime(df[timestamp_col])
                     
                     # Limiter aux derniers N points
                     df_plot = df.tail(n_points)
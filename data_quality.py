@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+Contrôle qualité des séries des rooms (équivalent Python de validate_temperature)
+Une passe NumPy par room, les rooms étant traitées en parallèle:
+- lignes hors ordre chronologique (monotonie)
+- timestamps dupliqués (dont doublons contradictoires)
+- températures manquantes ou hors plage [TEMP_MIN, TEMP_MAX] (ex: 85°C au
+  démarrage d'un DS18B20)
+- pics isolés (aller-retour brutal par rapport aux voisins)
+- trous d'enregistrement (coupures capteur)
+
+Actions (QUALITY['action'] dans train_model_with_date.py):
+- 'report': rapport seul
+- 'repair': tri, suppression des doublons et des valeurs invalides en mémoire
+- 'quarantine': comme 'repair', les lignes rejetées sont écrites dans
+  <data_dir>/quarantine/ (quarantine_dir_for) et les rooms trop dégradées sont exclues
+
+Usage:
+    python data_quality.py [--data-dir data] [--workers 4] [--json rapport.json]
+"""
+
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from room_data import DATA_DIR, TEMP_MAX, TEMP_MIN, detect_room_columns, get_csv_files, read_room_columns
+
+QUARANTINE_DIR = os.path.join(DATA_DIR, 'quarantine')
+ACTIONS = ('report', 'repair', 'quarantine')
+
+def quarantine_dir_for(data_dir=DATA_DIR):
+    """Dossier de quarantaine d'un dossier de CSV (data/quarantine, data/<site>/quarantine)"""
+    return os.path.join(data_dir, 'quarantine')
+
+# Seuils par défaut
+GAP_MINUTES = 90.0          # Trou signalé au-delà (même borne que l'interpolation d'align_rooms)
+SPIKE_DELTA = 3.0           # Écart minimal (°C) d'un pic par rapport à la moyenne de ses voisins
+SPIKE_MAD_K = 8.0           # ...et au moins k écarts robustes (MAD) de la room
+MAX_BAD_FRACTION = 0.2      # Quarantaine: room exclue au-delà de cette part de lignes rejetées
+
+# Motifs de rejet (bits)
+DUPLICATE = 1
+MISSING = 2
+OUT_OF_RANGE = 4
+SPIKE = 8
+REASONS = {DUPLICATE: 'doublon', MISSING: 'manquante', OUT_OF_RANGE: 'hors_plage', SPIKE: 'pic'}
+
+class RoomQuality:
+    """
+    Résultat du contrôle d'une room
+
+    Attributs:
+        order: permutation triant les lignes par timestamp (tri stable)
+        flags: motifs de rejet de chaque ligne triée (0 = valide)
+    """
+
+    def __init__(self, room_name, rows):
+        self.room_name = room_name
+        self.rows = rows
+        self.unsorted = 0
+        self.duplicates = 0
+        self.conflicting_duplicates = 0
+        self.missing = 0
+        self.out_of_range = 0
+        self.humidity_out_of_range = 0
+        self.spikes = 0
+        self.gaps = 0
+        self.gap_hours = 0.0
+        self.largest_gap_hours = 0.0
+        self.interval_minutes = None
+        self.order = None
+        self.flags = None
+
+    @property
+    def rejected(self):
+        """Nombre de lignes rejetées (doublons, manquantes, hors plage, pics)"""
+        return self.duplicates + self.missing + self.out_of_range + self.spikes
+
+    @property
+    def bad_fraction(self):
+        return self.rejected / self.rows if self.rows else 0.0
+
+    @property
+    def has_issues(self):
+        return bool(self.rejected or self.unsorted or self.gaps or self.humidity_out_of_range)
+
+    def to_dict(self):
+        """Résumé sérialisable (sans les tableaux par ligne)"""
+        return {
+            'room': self.room_name, 'rows': self.rows, 'unsorted': self.unsorted,
+            'duplicates': self.duplicates, 'conflicting_duplicates': self.conflicting_duplicates,
+            'missing': self.missing, 'out_of_range': self.out_of_range,
+            'humidity_out_of_range': self.humidity_out_of_range, 'spikes': self.spikes,
+            'gaps': self.gaps, 'gap_hours': round(self.gap_hours, 2),
+            'largest_gap_hours': round(self.largest_gap_hours, 2),
+            'interval_minutes': self.interval_minutes, 'bad_fraction': round(self.bad_fraction, 4)
+        }
+
+    def describe(self):
+        """Une ligne lisible décrivant les anomalies"""
+        if not self.has_issues:
+            return f"{self.room_name}: {self.rows} lignes, OK"
+        parts = []
+        if self.unsorted:
+            parts.append(f"{self.unsorted} hors ordre")
+        if self.duplicates:
+            parts.append(f"{self.duplicates} doublons ({self.conflicting_duplicates} contradictoires)")
+        if self.missing:
+            parts.append(f"{self.missing} manquantes")
+        if self.out_of_range:
+            parts.append(f"{self.out_of_range} hors plage")
+        if self.spikes:
+            parts.append(f"{self.spikes} pics")
+        if self.humidity_out_of_range:
+            parts.append(f"{self.humidity_out_of_range} humidités hors 0-100%")
+        if self.gaps:
+            parts.append(f"{self.gaps} trous ({self.gap_hours:.1f}h, max {self.largest_gap_hours:.1f}h)")
+        return f"{self.room_name}: {self.rows} lignes, {', '.join(parts)}"
+
+# ============================================================================
+# CONTRÔLE
+# ============================================================================
+
+def scan_room(room_name, timestamps, temps, humidity=None, gap_minutes=GAP_MINUTES,
+              spike_delta=SPIKE_DELTA, spike_mad_k=SPIKE_MAD_K):
+    """
+    Contrôle une room en une passe vectorisée
+
+    Args:
+        timestamps: int64 ns, dans l'ordre du fichier
+        temps: températures float32
+        humidity: humidités (optionnel)
+
+    Returns:
+        RoomQuality
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    temps = np.asarray(temps, dtype=np.float32)
+    n = len(timestamps)
+    quality = RoomQuality(room_name, n)
+    quality.unsorted = int(np.count_nonzero(timestamps[1:] < timestamps[:-1]))
+
+    order = np.argsort(timestamps, kind='stable')
+    ts = timestamps[order]
+    values = temps[order]
+    flags = np.zeros(n, dtype=np.uint8)
+
+    # Doublons: la dernière occurrence du fichier est conservée (comme RoomFrame.from_rooms,
+    # align_rooms et append_readings), le tri stable garde l'ordre du fichier
+    duplicate = np.zeros(n, dtype=bool)
+    duplicate[:-1] = ts[:-1] == ts[1:]
+    last = np.minimum.accumulate(np.where(duplicate, n, np.arange(n))[::-1])[::-1]
+    conflicting = duplicate & ~np.isclose(values, values[last], equal_nan=True)
+    flags[duplicate] |= DUPLICATE
+
+    missing = np.isnan(values) & ~duplicate
+    flags[missing] |= MISSING
+    out_of_range = ~np.isnan(values) & ~duplicate & ((values < TEMP_MIN) | (values > TEMP_MAX))
+    flags[out_of_range] |= OUT_OF_RANGE
+
+    # Pics: aller-retour par rapport aux deux voisins valides
+    valid = np.flatnonzero(flags == 0)
+    if len(valid) >= 3:
+        v = values[valid].astype(np.float64)
+        deviation = v[1:-1] - (v[:-2] + v[2:]) / 2
+        mad = 1.4826 * np.median(np.abs(deviation - np.median(deviation)))
+        threshold = max(spike_delta, spike_mad_k * mad)
+        magnitude = np.abs(deviation)
+        # Maximum local: les voisins d'un pic s'écartent aussi de leur moyenne
+        padded = np.pad(magnitude, 1)
+        local_max = (magnitude >= padded[:-2]) & (magnitude >= padded[2:])
+        spike = (magnitude > threshold) & local_max & ((v[1:-1] - v[:-2]) * (v[2:] - v[1:-1]) < 0)
+        flags[valid[1:-1][spike]] |= SPIKE
+        quality.spikes = int(np.count_nonzero(spike))
+
+    # Trous: pas entre mesures valides successives
+    steps = np.diff(ts[flags == 0])
+    if len(steps):
+        interval = np.median(steps)
+        quality.interval_minutes = round(float(interval) / 60e9, 2)
+        gaps = steps[steps > gap_minutes * 60e9]
+        quality.gaps = int(len(gaps))
+        quality.gap_hours = float((gaps - interval).sum() / 3600e9)
+        quality.largest_gap_hours = float(gaps.max() / 3600e9) if len(gaps) else 0.0
+
+    if humidity is not None:
+        hums = np.asarray(humidity, dtype=np.float32)
+        quality.humidity_out_of_range = int(np.count_nonzero((hums < 0) | (hums > 100)))
+
+    quality.duplicates = int(np.count_nonzero(duplicate))
+    quality.conflicting_duplicates = int(np.count_nonzero(conflicting))
+    quality.missing = int(np.count_nonzero(missing))
+    quality.out_of_range = int(np.count_nonzero(out_of_range))
+    quality.order = order
+    quality.flags = flags
+    return quality
+
+def scan_rooms(rooms, workers=None, **options):
+    """
+    Contrôle des rooms déjà chargées, en parallèle (NumPy libère le GIL)
+
+    Args:
+        rooms: liste de tuples (room_name, timestamps, temperature, humidity)
+        options: seuils de scan_room
+
+    Returns:
+        Liste de RoomQuality (même ordre que rooms)
+    """
+    workers = workers or min(len(rooms), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda room: scan_room(*room, **options), rooms))
+
+def _scan_csv_file(args):
+    """Lecture + contrôle d'un CSV (exécuté dans un processus du pool)"""
+    room_name, csv_file, options = args
+    _, detected = detect_room_columns(csv_file)
+    if detected['timestamp'] is None or detected['temperature'] is None:
+        raise ValueError(f"{csv_file}: colonnes timestamp/température introuvables")
+    timestamps, values = read_room_columns(csv_file, detected)
+    quality = scan_room(room_name, timestamps, values['temperature'], values.get('humidity'), **options)
+    # Seul le résumé revient au processus principal
+    quality.order = quality.flags = None
+    return quality
+
+def _run_task(task):
+    try:
+        return _scan_csv_file(task), None
+    except (OSError, ValueError) as e:
+        return None, str(e)
+
+def scan_csv_files(csv_files=None, workers=None, **options):
+    """
+    Contrôle des CSV sans les charger dans le processus appelant (GUI)
+
+    Returns:
+        (liste de RoomQuality, dict room_name -> message d'erreur)
+    """
+    csv_files = get_csv_files() if csv_files is None else csv_files
+    tasks = [(room_name, csv_file, options) for room_name, csv_file in csv_files.items()]
+    qualities, errors = [], {}
+    if not tasks:
+        return qualities, errors
+
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    if workers == 1:
+        results = [_run_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_task, tasks))
+
+    for (room_name, _, _), (quality, error) in zip(tasks, results):
+        if error is None:
+            qualities.append(quality)
+        else:
+            errors[room_name] = error
+    return qualities, errors
+
+# ============================================================================
+# RÉPARATION / QUARANTAINE
+# ============================================================================
+
+def repair_room(quality, timestamps, temps, humidity):
+    """
+    Lignes valides d'une room, triées par timestamp
+
+    Returns:
+        (timestamps, temperature, humidity) sans doublons, valeurs manquantes,
+        hors plage ni pics; humidité ramenée dans [0, 100]
+    """
+    keep = quality.order[quality.flags == 0]
+    hums = np.clip(np.asarray(humidity)[keep], 0, 100).astype(np.float32)
+    return np.asarray(timestamps)[keep], np.asarray(temps)[keep], hums
+
+def write_quarantine(quality, timestamps, temps, quarantine_dir=QUARANTINE_DIR):
+    """
+    Écrit les lignes rejetées d'une room avec leur motif
+
+    Returns:
+        Chemin du fichier écrit, ou None si aucune ligne rejetée
+    """
+    rejected = np.flatnonzero(quality.flags)
+    if not len(rejected):
+        return None
+    rows = quality.order[rejected]
+    flags = quality.flags[rejected]
+    os.makedirs(quarantine_dir, exist_ok=True)
+    path = os.path.join(quarantine_dir, f"{quality.room_name}_rejected.csv")
+    pd.DataFrame({
+        'row': rows,
+        'timestamp': pd.to_datetime(np.asarray(timestamps)[rows]),
+        'temperature': np.asarray(temps)[rows],
+        'reason': ['+'.join(label for bit, label in REASONS.items() if flag & bit) for flag in flags]
+    }).to_csv(path, index=False)
+    return path
+
+def apply_quality(rooms, qualities, action='repair', max_bad_fraction=MAX_BAD_FRACTION,
+                  quarantine_dir=QUARANTINE_DIR):
+    """
+    Applique l'action choisie aux rooms contrôlées
+
+    Returns:
+        Liste de tuples (room_name, timestamps, temperature, humidity)
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Action qualité inconnue: '{action}' (attendu: {', '.join(ACTIONS)})")
+    if action == 'report':
+        return rooms
+
+    result = []
+    for (room_name, timestamps, temps, hums), quality in zip(rooms, qualities):
+        if action == 'quarantine':
+            path = write_quarantine(quality, timestamps, temps, quarantine_dir)
+            if path:
+                print(f"[QUALITY] {room_name}: {quality.rejected} lignes rejetées -> {path}")
+            if quality.bad_fraction > max_bad_fraction:
+                print(f"[WARN] {room_name} exclue: {quality.bad_fraction:.1%} de lignes rejetées "
+                      f"(max {max_bad_fraction:.1%})")
+                continue
+        if quality.rejected or quality.unsorted or quality.humidity_out_of_range:
+            result.append((room_name, *repair_room(quality, timestamps, temps, hums)))
+        else:
+            result.append((room_name, timestamps, temps, hums))
+    return result
+
+def format_quality_summary(qualities, errors=None):
+    """Résumé ligne par ligne (journal de la GUI, console)"""
+    errors = errors or {}
+    flagged = [q for q in qualities if q.has_issues]
+    lines = [f"{len(qualities)} rooms contrôlées, {len(flagged)} avec anomalies, {len(errors)} illisibles"]
+    lines += [q.describe() for q in flagged]
+    lines += [f"{room_name}: {error}" for room_name, error in errors.items()]
+    return lines
+
+def print_quality_summary(qualities, errors=None):
+    lines = format_quality_summary(qualities, errors)
+    print(f"[QUALITY] {lines[0]}")
+    for line in lines[1:]:
+        print(f"  [WARN] {line}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Contrôle qualité des CSV des rooms")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="Processus parallèles (défaut: nb de CPU)")
+    parser.add_argument('--gap-minutes', type=float, default=GAP_MINUTES)
+    parser.add_argument('--spike-delta', type=float, default=SPIKE_DELTA)
+    parser.add_argument('--json', help="Écrire le rapport détaillé dans ce fichier")
+    args = parser.parse_args()
+
+    qualities, errors = scan_csv_files(get_csv_files(args.data_dir), args.workers,
+                                       gap_minutes=args.gap_minutes, spike_delta=args.spike_delta)
+    print_quality_summary(qualities, errors)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'rooms': [q.to_dict() for q in qualities], 'errors': errors}, f,
+                      indent=2, ensure_ascii=False)
+        print(f"[OK] Rapport: {args.json}")
+
+if __name__ == "__main__":
+    main()
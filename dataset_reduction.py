@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Réduction du jeu d'entraînement (coreset)
+À 5-30 min de résolution, les lignes consécutives de prepare_features_with_date
+sont presque identiques: un sous-ensemble représentatif suffit pour entraîner.
+
+Deux méthodes, sur la matrice X (temp_ext, humidité, saison_sin, saison_cos, heure_sin):
+- 'stratified': strates jour de l'année x heure x température extérieure,
+  allocation proportionnelle avec au moins un échantillon par strate
+- 'kcenter': couverture gloutonne de l'espace des features (farthest-point),
+  l'ordre de sélection fait de chaque préfixe un coreset valide
+"""
+
+import numpy as np
+
+METHODS = ('stratified', 'kcenter')
+
+# Nombre de classes par dimension de stratification
+DOY_BINS = 52       # ~1 semaine
+HOUR_BINS = 12      # sur sin(heure): 2h et 10h se confondent, comme pour le modèle
+TEMP_EXT_BINS = 8   # quantiles de température extérieure
+
+def strata_keys(X, doy_bins=DOY_BINS, hour_bins=HOUR_BINS, temp_bins=TEMP_EXT_BINS):
+    """
+    Identifiant de strate de chaque échantillon
+
+    Le jour de l'année est retrouvé à partir de (saison_sin, saison_cos); l'heure
+    n'est connue qu'à travers sin(heure), seule information vue par le modèle.
+    """
+    angle = np.mod(np.arctan2(X[:, 2], X[:, 3]), 2 * np.pi)
+    doy_bin = np.minimum((angle / (2 * np.pi) * doy_bins).astype(np.int64), doy_bins - 1)
+
+    hour_angle = np.arcsin(np.clip(X[:, 4], -1.0, 1.0)) + np.pi / 2
+    hour_bin = np.minimum((hour_angle / np.pi * hour_bins).astype(np.int64), hour_bins - 1)
+
+    edges = np.unique(np.quantile(X[:, 0], np.linspace(0, 1, temp_bins + 1)[1:-1]))
+    temp_bin = np.searchsorted(edges, X[:, 0], side='right')
+
+    return (doy_bin * hour_bins + hour_bin) * temp_bins + temp_bin
+
+def stratified_indices(X, size, seed=42):
+    """
+    Tirage stratifié de `size` échantillons
+
+    Returns:
+        Indices triés (ordre chronologique conservé)
+    """
+    n = len(X)
+    if size >= n:
+        return np.arange(n)
+
+    rng = np.random.default_rng(seed)
+    _, keys = np.unique(strata_keys(X), return_inverse=True)
+    counts = np.bincount(keys)
+
+    # Au moins un échantillon par strate si la taille le permet, puis
+    # répartition proportionnelle du reste (méthode du plus fort reste)
+    base = np.ones_like(counts) if size >= len(counts) else np.zeros_like(counts)
+    capacity = counts - base
+    share = capacity * (size - base.sum()) / max(capacity.sum(), 1)
+    quota = base + np.floor(share).astype(np.int64)
+    left = size - quota.sum()
+    if left > 0:
+        quota[np.argsort(-(share - np.floor(share)), kind='stable')[:left]] += 1
+    quota = np.minimum(quota, counts)
+
+    # Rang aléatoire de chaque échantillon dans sa strate
+    order = np.lexsort((rng.random(n), keys))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(n) - starts[keys[order]]
+    return np.sort(order[rank < quota[keys[order]]])
+
+def k_center_indices(X, size, seed=42):
+    """
+    Coreset k-center glouton (farthest-point) sur les features standardisées
+
+    Coût O(n x size). Les indices sont rendus dans l'ordre de sélection: les
+    `k` premiers forment le coreset de taille k.
+    """
+    n = len(X)
+    size = min(size, n)
+    if size <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    std = X.std(axis=0)
+    Z = (X - X.mean(axis=0)) / np.where(std > 0, std, 1.0)
+
+    selected = np.empty(size, dtype=np.int64)
+    selected[0] = np.random.default_rng(seed).integers(n)
+    distances = ((Z - Z[selected[0]]) ** 2).sum(axis=1)
+    for i in range(1, size):
+        selected[i] = np.argmax(distances)
+        np.minimum(distances, ((Z - Z[selected[i]]) ** 2).sum(axis=1), out=distances)
+    return selected
+
+def select_coreset(X, size, method='stratified', seed=42):
+    """
+    Sélectionne un sous-ensemble représentatif de X
+
+    Args:
+        X: matrice des features (n x 5)
+        size: nombre d'échantillons voulus
+        method: 'stratified' ou 'kcenter'
+
+    Returns:
+        Tableau d'indices dans X
+    """
+    if method == 'stratified':
+        return stratified_indices(X, size, seed)
+    if method == 'kcenter':
+        return k_center_indices(X, size, seed)
+    raise ValueError(f"Méthode de réduction inconnue: '{method}' (attendu: {', '.join(METHODS)})")
+
+def coreset_size(n, size=None, fraction=None):
+    """Taille cible: `size` absolue, sinon `fraction` de n (au moins 1)"""
+    if size is not None:
+        return max(1, min(int(size), n))
+    return max(1, min(n, int(round(n * fraction))))
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Empreinte flash / RAM des headers générés (neural_weights.h, csv_data.h)
+Calcule la taille binaire exacte de chaque tableau émis et la compare au
+budget d'un profil d'appareil, avant d'écrire le header: un dépassement est
+signalé à l'export plutôt qu'au link du firmware.
+
+Sur ESP32, un tableau `const` (avec ou sans PROGMEM) reste en flash (.rodata);
+un tableau de pointeurs non const est copié en RAM au démarrage (.data: RAM +
+image d'initialisation en flash); un tableau non initialisé n'occupe que la
+RAM (.bss).
+
+Les profils reprennent les valeurs affichées par l'IDE Arduino à la
+compilation ("Maximum is N bytes"). firmware_flash_bytes / firmware_ram_bytes
+estiment la part du croquis hors données générées (code, M5Unified, WiFi/TLS):
+à recalibrer avec la sortie de compilation via un profil JSON (--device profil.json).
+
+Usage:
+    python device_footprint.py --rooms 100             # budget pour 100 rooms
+    python device_footprint.py --device m5stack-default --rooms 30
+"""
+
+import os
+import json
+import argparse
+import numpy as np
+
+DEFAULT_PROFILE = 'm5stack-huge-app'
+
+DEVICE_PROFILES = {
+    'm5stack-huge-app': {
+        'description': "M5Stack (ESP32), partition Huge APP (3 MB No OTA)",
+        'flash_bytes': 3145728,
+        'ram_bytes': 327680,
+        'firmware_flash_bytes': 1250000,
+        'firmware_ram_bytes': 48000
+    },
+    'm5stack-no-ota': {
+        'description': "M5Stack (ESP32), partition No OTA (2 MB APP)",
+        'flash_bytes': 2097152,
+        'ram_bytes': 327680,
+        'firmware_flash_bytes': 1250000,
+        'firmware_ram_bytes': 48000
+    },
+    'm5stack-min-spiffs': {
+        'description': "M5Stack (ESP32), partition Minimal SPIFFS (1.9 MB APP avec OTA)",
+        'flash_bytes': 1966080,
+        'ram_bytes': 327680,
+        'firmware_flash_bytes': 1250000,
+        'firmware_ram_bytes': 48000
+    },
+    'm5stack-default': {
+        'description': "M5Stack (ESP32), partition Default (1.2 MB APP)",
+        'flash_bytes': 1310720,
+        'ram_bytes': 327680,
+        'firmware_flash_bytes': 1250000,
+        'firmware_ram_bytes': 48000
+    }
+}
+
+# Taille des types C sur ESP32 (Xtensa 32 bits)
+SIZEOF = {'float': 4, 'int': 4, 'int16': 2, 'pointer': 4}
+
+# RoomPredictor.ino: float history_api_rooms[API_HISTORY_SIZE][NUM_ROOMS]
+FIRMWARE_API_HISTORY_SIZE = 16
+
+OVERFLOW_ACTIONS = ('fail', 'reduce', 'warn')
+MIN_POINTS = 2   # points par room et par période en dessous desquels la réduction échoue
+
+class ArrayFootprint:
+    """
+    Un tableau C émis dans un header
+
+    memory: 'flash' (const, .rodata), 'data' (RAM initialisée + image en flash)
+    ou 'bss' (RAM seule)
+    """
+
+    def __init__(self, name, ctype, count, memory='flash', header=''):
+        self.name = name
+        self.ctype = ctype
+        self.count = int(count)
+        self.memory = memory
+        self.header = header
+
+    @property
+    def bytes(self):
+        return self.count * SIZEOF[self.ctype]
+
+    @property
+    def flash_bytes(self):
+        return self.bytes if self.memory in ('flash', 'data') else 0
+
+    @property
+    def ram_bytes(self):
+        return self.bytes if self.memory in ('data', 'bss') else 0
+
+def load_device_profile(device=DEFAULT_PROFILE):
+    """
+    Profil d'appareil: nom d'un profil intégré, chemin d'un JSON ou dict
+
+    Un JSON peut ne redéfinir que certains champs ('base' = profil de départ).
+    """
+    if isinstance(device, dict):
+        return dict(device)
+    if device in DEVICE_PROFILES:
+        return dict(DEVICE_PROFILES[device], name=device)
+    if os.path.exists(device):
+        with open(device, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+        base = overrides.pop('base', DEFAULT_PROFILE)
+        return dict(DEVICE_PROFILES[base], name=os.path.basename(device), **overrides)
+    raise ValueError(f"Profil d'appareil inconnu: '{device}' (attendu: {', '.join(DEVICE_PROFILES)} ou un .json)")
+
+# ============================================================================
+# TABLEAUX ÉMIS
+# ============================================================================
+
+def weights_arrays(num_rooms, num_inputs=5, hidden=32, output_rank=None):
+    """
+    Tableaux de neural_weights.h (const float -> flash)
+
+    Args:
+        output_rank: rang k de la tête factorisée (W2[32][k] + ROOM_W[N][k]),
+            None pour la tête dense W2[32][N]
+    """
+    outputs = output_rank or num_rooms
+    shapes = [('W0', num_inputs * hidden), ('BIAS0', hidden), ('W1', hidden * hidden),
+              ('BIAS1', hidden), ('W2', hidden * outputs), ('BIAS2', outputs)]
+    if output_rank:
+        shapes += [('ROOM_W', num_rooms * output_rank), ('ROOM_BIAS', num_rooms)]
+    return [ArrayFootprint(name, 'float', count, 'flash', 'neural_weights.h') for name, count in shapes]
+
+def sharded_weights_arrays(num_rooms, num_shards, shard_max_rooms, num_inputs=5, hidden=32):
+    """Tableaux de neural_weights.h d'un modèle shardé (un jeu de poids par shard + index des rooms)"""
+    shapes = [('W0', num_inputs * hidden), ('BIAS0', hidden), ('W1', hidden * hidden),
+              ('BIAS1', hidden), ('W2', hidden * shard_max_rooms), ('BIAS2', shard_max_rooms)]
+    arrays = [ArrayFootprint(name, 'float', num_shards * count, 'flash', 'neural_weights.h')
+              for name, count in shapes]
+    return arrays + [ArrayFootprint(name, 'int', num_rooms, 'flash', 'neural_weights.h')
+                     for name in ('ROOM_SHARD', 'ROOM_SLOT')]
+
+def calendar_arrays(steps_per_hour, fixed_point=False):
+    """Tables de calendar_tables.h (calendar_tables.py)"""
+    from calendar_tables import CALENDAR_DAYS
+    ctype = 'int16' if fixed_point else 'float'
+    return [ArrayFootprint('SEASON_SIN', ctype, CALENDAR_DAYS, 'flash', 'calendar_tables.h'),
+            ArrayFootprint('SEASON_COS', ctype, CALENDAR_DAYS, 'flash', 'calendar_tables.h'),
+            ArrayFootprint('TIME_SIN', ctype, 24 * steps_per_hour, 'flash', 'calendar_tables.h')]
+
+def history_arrays(period_sizes):
+    """
+    Tableaux de csv_data.h
+
+    Args:
+        period_sizes: par période, liste du nombre de points de chaque room
+    """
+    arrays = []
+    for period_idx, sizes in enumerate(period_sizes):
+        total = sum(sizes)
+        arrays += [
+            ArrayFootprint(f"csv_period{period_idx}_temps", 'float', total, 'flash', 'csv_data.h'),
+            ArrayFootprint(f"csv_period{period_idx}_hours", 'float', total, 'flash', 'csv_data.h'),
+            ArrayFootprint(f"csv_period{period_idx}_offsets", 'int', len(sizes), 'flash', 'csv_data.h'),
+            ArrayFootprint(f"csv_period{period_idx}_sizes", 'int', len(sizes), 'flash', 'csv_data.h')
+        ]
+    # const float* csv_temps_arrays[]: pointeurs non const -> .data
+    for name in ('csv_temps_arrays', 'csv_hours_arrays', 'csv_offsets_arrays', 'csv_sizes_arrays'):
+        arrays.append(ArrayFootprint(name, 'pointer', len(period_sizes), 'data', 'csv_data.h'))
+    return arrays
+
+def firmware_room_arrays(num_rooms):
+    """Buffers du firmware dimensionnés par NUM_ROOMS (RoomPredictor.ino)"""
+    return [ArrayFootprint('history_api_rooms', 'float', FIRMWARE_API_HISTORY_SIZE * num_rooms, 'bss',
+                           'RoomPredictor.ino')]
+
+def device_arrays(num_rooms, period_sizes, output_rank=None):
+    """Tous les tableaux dépendant des données exportées, pour num_rooms rooms"""
+    return (weights_arrays(num_rooms, output_rank=output_rank) + history_arrays(period_sizes)
+            + firmware_room_arrays(num_rooms))
+
+# ============================================================================
+# BUDGET
+# ============================================================================
+
+def check_footprint(arrays, profile):
+    """
+    Compare l'empreinte des tableaux au budget du profil
+
+    Returns:
+        dict flash/ram: utilisé (firmware inclus), maximum, et 'fits'
+    """
+    flash = profile['firmware_flash_bytes'] + sum(a.flash_bytes for a in arrays)
+    ram = profile['firmware_ram_bytes'] + sum(a.ram_bytes for a in arrays)
+    return {
+        'flash_bytes': flash, 'flash_max': profile['flash_bytes'],
+        'ram_bytes': ram, 'ram_max': profile['ram_bytes'],
+        'fits': flash <= profile['flash_bytes'] and ram <= profile['ram_bytes']
+    }
+
+def fit_point_budgets(periods, num_rooms, profile):
+    """
+    Réduit proportionnellement les max_points des périodes pour tenir en flash
+
+    Returns:
+        liste des max_points par période
+
+    Raises:
+        ValueError: même MIN_POINTS par période ne tient pas
+    """
+    # Tout sauf les tableaux temps/hours (8 octets par point et par room)
+    fixed_arrays = device_arrays(num_rooms, [[0] * num_rooms for _ in periods])
+    fixed = check_footprint(fixed_arrays, profile)
+    available = profile['flash_bytes'] - fixed['flash_bytes']
+    bytes_per_point = num_rooms * (SIZEOF['float'] * 2)
+    wanted = sum(p['max_points'] for p in periods)
+    factor = available / (bytes_per_point * wanted) if wanted else 0.0
+    budgets = [min(p['max_points'], max(MIN_POINTS, int(p['max_points'] * factor))) for p in periods]
+    if bytes_per_point * sum(budgets) > available or fixed['ram_bytes'] > profile['ram_bytes']:
+        raise ValueError(f"{num_rooms} rooms ne tiennent pas sur {profile['name']}, "
+                         f"même avec {MIN_POINTS} points par période")
+    return budgets
+
+def max_rooms(periods, profile):
+    """Nombre maximal de rooms avec les max_points actuels (flash et RAM)"""
+    per_room = check_footprint(device_arrays(1, [[p['max_points']] for p in periods]), profile)
+    empty = check_footprint(device_arrays(0, [[] for _ in periods]), profile)
+    flash_room = per_room['flash_bytes'] - empty['flash_bytes']
+    ram_room = per_room['ram_bytes'] - empty['ram_bytes']
+    limits = [(profile['flash_bytes'] - empty['flash_bytes']) // flash_room]
+    if ram_room:
+        limits.append((profile['ram_bytes'] - empty['ram_bytes']) // ram_room)
+    return max(0, min(limits))
+
+def _kb(num_bytes):
+    return f"{num_bytes / 1024:.1f} KB"
+
+def print_footprint_report(arrays, profile, periods=None, period_sizes=None):
+    """Tableau du budget par période / par room, puis total flash et RAM face au profil"""
+    num_rooms = len(period_sizes[0]) if period_sizes else 0
+    print(f"\n=== EMPREINTE FIRMWARE ({profile['name']}: {profile['description']}) ===")
+    if periods and period_sizes:
+        print(f"{'Période':<10}{'Points/room':>14}{'Octets/room':>14}{'Total':>14}")
+        for period, sizes in zip(periods, period_sizes):
+            points = max(sizes) if sizes else 0
+            total = sum(sizes) * 2 * SIZEOF['float'] + len(sizes) * 2 * SIZEOF['int']
+            print(f"{period['name']:<10}{points:>14}{points * 2 * SIZEOF['float'] + 2 * SIZEOF['int']:>14}"
+                  f"{_kb(total):>14}")
+
+    by_header = {}
+    for array in arrays:
+        flash, ram = by_header.get(array.header, (0, 0))
+        by_header[array.header] = (flash + array.flash_bytes, ram + array.ram_bytes)
+    for header, (flash, ram) in by_header.items():
+        per_room = f" ({_kb(flash / num_rooms)}/room)" if num_rooms and header == 'csv_data.h' else ''
+        print(f"  {header:<20} flash {_kb(flash):>10}   RAM {_kb(ram):>9}{per_room}")
+
+    result = check_footprint(arrays, profile)
+    for memory in ('flash', 'ram'):
+        used, maximum = result[f'{memory}_bytes'], result[f'{memory}_max']
+        tag = '[OK]' if used <= maximum else '[ERREUR]'
+        print(f"{tag} {memory.upper()}: {_kb(used)} / {_kb(maximum)} ({100 * used / maximum:.0f}%, "
+              f"firmware estimé {_kb(profile[f'firmware_{memory}_bytes'])} inclus)")
+    if periods:
+        print(f"[INFO] Capacité avec ces points par période: {max_rooms(periods, profile)} rooms")
+    return result
+
+def reduce_samples(samples, budgets):
+    """Sous-échantillonne uniformément les échantillons d'une room (un max_points par période)"""
+    reduced = []
+    for period, max_points in zip(samples, budgets):
+        if len(period['temps']) <= max_points:
+            reduced.append(period)
+            continue
+        indices = np.linspace(0, len(period['temps']) - 1, max_points, dtype=int)
+        reduced.append({key: [values[i] for i in indices] for key, values in period.items()})
+    return reduced
+
+def main():
+    parser = argparse.ArgumentParser(description="Empreinte flash / RAM des headers pour un nombre de rooms")
+    parser.add_argument('--rooms', type=int, default=3)
+    parser.add_argument('--device', default=DEFAULT_PROFILE,
+                        help=f"Profil ({', '.join(DEVICE_PROFILES)}) ou fichier JSON")
+    parser.add_argument('--output-rank', type=int, help="Rang de la tête factorisée (défaut: dense)")
+    args = parser.parse_args()
+
+    from export_csv_to_arduino_v2 import PERIODS
+    profile = load_device_profile(args.device)
+    period_sizes = [[p['max_points']] * args.rooms for p in PERIODS]
+    result = print_footprint_report(device_arrays(args.rooms, period_sizes, args.output_rank), profile, PERIODS, period_sizes)
+    if not result['fits']:
+        print(f"[INFO] Points par période réduits pour {args.rooms} rooms: ", end='')
+        try:
+            print(', '.join(f"{p['name']}={n}" for p, n in zip(PERIODS, fit_point_budgets(PERIODS, args.rooms, profile))))
+        except ValueError as e:
+            print(f"impossible ({e})")
+
+if __name__ == "__main__":
+    main()
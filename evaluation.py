@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Rapport d'évaluation du modèle (tout nombre de rooms)
+Le test set est prédit en un seul lot, puis les erreurs sont agrégées de manière
+vectorisée: par room (MAE, RMSE, biais), par heure, par saison, et les N plus
+gros résidus. Le rapport est écrit en JSON + CSV dans reports/, et une ligne est
+ajoutée à reports/evaluation_history.csv pour suivre la qualité d'un
+réentraînement à l'autre.
+
+residual_series() agrège aussi les résidus par jour et par saison pour chaque
+room (evaluation_*_series.npz), la base des graphiques de render_reports.py.
+"""
+
+import os
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+REPORT_DIR = 'reports'
+HISTORY_FILE = 'evaluation_history.csv'
+WORST_N = 20
+
+# Saison météorologique de chaque mois (index 0 = janvier)
+SEASONS = ['hiver', 'printemps', 'été', 'automne']
+MONTH_TO_SEASON = np.array([0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
+def _error_stats(residuals, axis=None):
+    """MAE, RMSE et biais (prédiction - vérité) selon un axe"""
+    return {
+        'mae': np.abs(residuals).mean(axis=axis),
+        'rmse': np.sqrt((residuals ** 2).mean(axis=axis)),
+        'bias': residuals.mean(axis=axis)
+    }
+
+def _grouped_stats(residuals, groups, num_groups):
+    """Statistiques d'erreur par groupe (toutes rooms confondues), via bincount"""
+    counts = np.bincount(groups, minlength=num_groups) * residuals.shape[1]
+    sums = {
+        'mae': np.bincount(groups, weights=np.abs(residuals).sum(axis=1), minlength=num_groups),
+        'mse': np.bincount(groups, weights=(residuals ** 2).sum(axis=1), minlength=num_groups),
+        'bias': np.bincount(groups, weights=residuals.sum(axis=1), minlength=num_groups)
+    }
+    safe = np.maximum(counts, 1)
+    return counts, sums['mae'] / safe, np.sqrt(sums['mse'] / safe), sums['bias'] / safe
+
+def evaluate_predictions(y_true, y_pred, timestamps, room_names, worst_n=WORST_N):
+    """
+    Agrège les erreurs de prédiction du test set
+
+    Args:
+        y_true, y_pred: matrices (échantillons x rooms)
+        timestamps: int64 ns de chaque échantillon
+        room_names: nom de chaque colonne
+
+    Returns:
+        dict du rapport (sérialisable en JSON)
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    residuals = y_pred - y_true
+    dates = pd.DatetimeIndex(np.asarray(timestamps).view('datetime64[ns]'))
+
+    overall = {key: float(value) for key, value in _error_stats(residuals).items()}
+    per_room = _error_stats(residuals, axis=0)
+    max_abs = np.abs(residuals).max(axis=0)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'samples': int(residuals.shape[0]),
+        'rooms': len(room_names),
+        'overall': overall,
+        'per_room': [
+            {'room': name, 'mae': float(per_room['mae'][r]), 'rmse': float(per_room['rmse'][r]),
+             'bias': float(per_room['bias'][r]), 'max_abs_error': float(max_abs[r])}
+            for r, name in enumerate(room_names)
+        ]
+    }
+
+    counts, mae, rmse, bias = _grouped_stats(residuals, dates.hour.values, 24)
+    report['per_hour'] = [
+        {'hour': h, 'count': int(counts[h]), 'mae': float(mae[h]), 'rmse': float(rmse[h]), 'bias': float(bias[h])}
+        for h in range(24) if counts[h]
+    ]
+
+    counts, mae, rmse, bias = _grouped_stats(residuals, MONTH_TO_SEASON[dates.month.values - 1], len(SEASONS))
+    report['per_season'] = [
+        {'season': SEASONS[s], 'count': int(counts[s]), 'mae': float(mae[s]), 'rmse': float(rmse[s]),
+         'bias': float(bias[s])}
+        for s in range(len(SEASONS)) if counts[s]
+    ]
+
+    # N plus gros résidus absolus (sélection partielle, sans tri complet)
+    flat = np.abs(residuals).ravel()
+    worst_n = min(worst_n, flat.size)
+    worst = np.argpartition(flat, -worst_n)[-worst_n:] if worst_n else np.empty(0, dtype=np.int64)
+    worst = worst[np.argsort(-flat[worst])]
+    rows, cols = np.unravel_index(worst, residuals.shape)
+    report['worst'] = [
+        {'timestamp': str(dates[i]), 'room': room_names[r], 'true': float(y_true[i, r]),
+         'pred': float(y_pred[i, r]), 'residual': float(residuals[i, r])}
+        for i, r in zip(rows, cols)
+    ]
+    return report
+
+def residual_series(y_true, y_pred, timestamps):
+    """
+    Résidus agrégés par jour et par saison, pour chaque room
+
+    Returns:
+        dict de tableaux: 'days' (int64 ns, minuit), 'daily_mae' / 'daily_bias'
+        (jours x rooms), 'season_mae' / 'season_bias' (saisons x rooms, NaN si
+        la saison est absente du test set)
+    """
+    residuals = np.asarray(y_pred, dtype=np.float64) - np.asarray(y_true, dtype=np.float64)
+    dates = pd.DatetimeIndex(np.asarray(timestamps).view('datetime64[ns]'))
+    days, day_index = np.unique(dates.normalize().asi8, return_inverse=True)
+    series = {'days': days}
+
+    for prefix, groups, num_groups in (('daily', day_index, len(days)),
+                                       ('season', MONTH_TO_SEASON[dates.month.values - 1], len(SEASONS))):
+        counts = np.bincount(groups, minlength=num_groups).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for stat, values in (('mae', np.abs(residuals)), ('bias', residuals)):
+                sums = np.stack([np.bincount(groups, weights=values[:, r], minlength=num_groups)
+                                 for r in range(residuals.shape[1])], axis=1)
+                series[f'{prefix}_{stat}'] = (sums / counts[:, None]).astype(np.float32)
+    return series
+
+def write_evaluation_report(report, output_dir=REPORT_DIR, label=None, series=None):
+    """
+    Écrit le rapport (JSON + CSV par room et pires résidus) et l'historique
+
+    Args:
+        series: résidus agrégés (residual_series), écrits dans {stem}_series.npz
+
+    Returns:
+        Chemin du fichier JSON
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stem = f"evaluation_{label or datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    if series is not None:
+        np.savez(os.path.join(output_dir, f"{stem}_series.npz"), **series)
+        report['series'] = f"{stem}_series.npz"
+
+    json_path = os.path.join(output_dir, f"{stem}.json")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    pd.DataFrame(report['per_room']).to_csv(os.path.join(output_dir, f"{stem}_rooms.csv"),
+                                            index=False, float_format='%.4f')
+    pd.DataFrame(report['worst']).to_csv(os.path.join(output_dir, f"{stem}_worst.csv"),
+                                         index=False, float_format='%.4f')
+
+    history_path = os.path.join(output_dir, HISTORY_FILE)
+    entry = pd.DataFrame([{'created': report['created'], 'report': os.path.basename(json_path),
+                           'rooms': report['rooms'], 'samples': report['samples'], **report['overall']}])
+    entry.to_csv(history_path, mode='a', header=not os.path.exists(history_path),
+                 index=False, float_format='%.4f')
+    return json_path
+
+def print_evaluation_summary(report, max_rooms=20):
+    """Affiche le résumé du rapport (rooms les moins bien prédites en premier)"""
+    overall = report['overall']
+    print(f"[OK] {report['samples']} échantillons x {report['rooms']} rooms: "
+          f"MAE={overall['mae']:.3f}°C, RMSE={overall['rmse']:.3f}°C, biais={overall['bias']:+.3f}°C")
+
+    rooms = sorted(report['per_room'], key=lambda room: -room['mae'])
+    if len(rooms) > max_rooms:
+        print(f"\nPar room ({max_rooms} moins bien prédites sur {len(rooms)}):")
+    else:
+        print(f"\nPar room:")
+    for room in rooms[:max_rooms]:
+        print(f"  {room['room']:<12} MAE={room['mae']:.3f}°C  RMSE={room['rmse']:.3f}°C  "
+              f"biais={room['bias']:+.3f}°C  max={room['max_abs_error']:.2f}°C")
+
+    print("\nPar saison:")
+    for season in report['per_season']:
+        print(f"  {season['season']:<10} MAE={season['mae']:.3f}°C  biais={season['bias']:+.3f}°C")
+
+    if report['per_hour']:
+        worst_hour = max(report['per_hour'], key=lambda hour: hour['mae'])
+        best_hour = min(report['per_hour'], key=lambda hour: hour['mae'])
+        print(f"\nPar heure: meilleure {best_hour['hour']}h (MAE={best_hour['mae']:.3f}°C), "
+              f"pire {worst_hour['hour']}h (MAE={worst_hour['mae']:.3f}°C)")
+
+    if report['worst']:
+        print(f"\nPlus gros résidus:")
+        for item in report['worst'][:5]:
+            print(f"  {item['timestamp']} {item['room']}: vrai={item['true']:.1f}°C, "
+                  f"préd={item['pred']:.1f}°C ({item['residual']:+.2f}°C)")
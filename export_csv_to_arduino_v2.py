@@ -1,13 +1,24 @@
 """
 Export CSV Data to Arduino Header File (Version 2 - Scalable)
 Convertit les fichiers CSV en structure linéaire pour supporter N rooms dynamiquement
+
+--target files: historique en fichiers binaires pour SPIFFS / carte SD
+(history_files.py) au lieu de csv_data.h, écrit une room à la fois
 """
 
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
-import glob
+
+from room_data import get_csv_files
+from room_store import file_fingerprint, open_current_store, store_dir_for
+from ota_artifacts import OTA_DIR, publish_history
+from history_files import HISTORY_DIR, ROOMS_PER_SHARD, HistoryFiles, HistoryWriter, write_history_header
+from device_footprint import (DEFAULT_PROFILE, DEVICE_PROFILES, OVERFLOW_ACTIONS, check_footprint,
+                              device_arrays, fit_point_budgets, load_device_profile, max_rooms,
+                              print_footprint_report, reduce_samples)
+from pipeline_profiler import add_profiling_arguments, options_from_args, profile_stage, profiling
 
 def sample_data(df, max_points=500):
     """Échantillonne uniformément les données pour limiter la taille"""
@@ -16,15 +27,114 @@ def sample_data(df, max_points=500):
     indices = np.linspace(0, len(df)-1, max_points, dtype=int)
     return df.iloc[indices]
 
-def export_csv_to_arduino():
+DEFAULT_OUTPUT_FILE = "M5Stack_Temperature_Prediction/RoomPredictor/csv_data.h"
+DEFAULT_HISTORY_HEADER = "M5Stack_Temperature_Prediction/RoomPredictor/history_files.h"
+EXPORT_TARGETS = ('header', 'files')
+
+# Périodes affichées sur le M5Stack
+PERIODS = [
+    {"name": "1J", "hours": 24, "max_points": 48},
+    {"name": "1S", "hours": 168, "max_points": 168},
+    {"name": "1M", "hours": 720, "max_points": 360},
+    {"name": "3M", "hours": 2160, "max_points": 540}
+]
+
+def sample_room_periods(df, periods=PERIODS):
+    """
+    Échantillonne une room pour chaque période
+
+    Returns:
+        liste (une entrée par période) de dict 'temps' (températures) et 'hours' (heures relatives)
+    """
+    samples = []
+    now = df['timestamp'].max()
+    for period in periods:
+        start_time = now - pd.Timedelta(hours=period['hours'])
+        df_sampled = sample_data(df[df['timestamp'] >= start_time], period['max_points'])
+        hours_ago = (now - df_sampled['timestamp']).dt.total_seconds().values / 3600
+        samples.append({
+            'temps': df_sampled['temperature'].values.tolist(),
+            'hours': hours_ago[::-1].tolist()
+        })
+    return samples
+
+def store_room_samples(store, room_name, periods=PERIODS):
+    """
+    Échantillons d'une room du store
+
+    Seule la fenêtre de la plus longue période est lue (indépendant de l'historique).
+
+    Returns:
+        (lignes lues, lignes de la room, échantillons par période)
+    """
+    window_ns = pd.Timedelta(hours=max(p['hours'] for p in periods)).value
+    timestamps = store.column(room_name, 'timestamp')
+    start = np.searchsorted(timestamps, timestamps[-1] - window_ns) if len(timestamps) else 0
+    df = store.room_dataframe(room_name, start)
+    return len(df), len(timestamps), sample_room_periods(df, periods)
+
+def store_room_fingerprint(store, room_name):
+    """Empreinte d'une room du store: change à chaque ajout (append, ingestion) ou réimport"""
+    room = store.rooms[room_name]
+    return {'rows': room['rows'], 'last_ts': room['last_ts'],
+            'source': (room.get('source') or {}).get('fingerprint')}
+
+def iter_store_samples(store, periods=PERIODS):
+    """
+    Échantillons de chaque room du store, une room à la fois
+
+    Yields:
+        (room_name, lignes lues, lignes de la room, échantillons par période)
+    """
+    for room_name in store.room_names:
+        yield (room_name, *store_room_samples(store, room_name, periods))
+
+def read_room_csv(csv_file):
+    """Lit un CSV de room (colonnes uniformisées, trié par date)"""
+    df = pd.read_csv(csv_file)
+
+    # Renommer colonnes pour uniformiser
+    df.columns = df.columns.str.strip()
+    if 'Timestamp' in df.columns:
+        df.rename(columns={'Timestamp': 'timestamp'}, inplace=True)
+    if 'Temperature_Celsius(°C)' in df.columns:
+        df.rename(columns={'Temperature_Celsius(°C)': 'temperature'}, inplace=True)
+
+    # Convertir les dates en timestamps
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df.sort_values('timestamp')
+
+def iter_csv_samples(room_files, periods=PERIODS):
+    """
+    Échantillons de chaque room depuis les CSV, une room à la fois
+
+    Yields:
+        (room_name, lignes lues, lignes de la room, échantillons par période)
+    """
+    for room_name, csv_file in room_files.items():
+        df = read_room_csv(csv_file)
+        yield room_name, len(df), len(df), sample_room_periods(df, periods)
+
+def export_csv_to_arduino(data_dir="data", output_file=DEFAULT_OUTPUT_FILE, cache=None, ota_dir=OTA_DIR,
+                          device=DEFAULT_PROFILE, on_overflow='fail'):
+    """
+    Génère csv_data.h à partir des CSV de data_dir
+
+    Args:
+        cache: dict conservé par l'appelant entre deux exports (mode watch);
+            seules les rooms dont le CSV (ou l'entrée d'index du store: lignes,
+            dernier timestamp) a changé depuis l'export précédent sont relues
+            et ré-échantillonnées
+        ota_dir: dossier du blob OTA versionné de l'historique (None: pas de blob)
+        device: profil d'appareil (device_footprint.py) dont la flash / RAM est vérifiée
+        on_overflow: si l'empreinte dépasse le profil, 'fail' (ValueError avant
+            d'écrire le header), 'reduce' (moins de points par période) ou 'warn'
+    """
     print("\n=== EXPORT CSV VERS ARDUINO (VERSION SCALABLE) ===\n")
     
-    # Chemins
-    data_dir = "data"
-    output_file = "M5Stack_Temperature_Prediction/RoomPredictor/csv_data.h"
-    
-    # Détecter automatiquement tous les fichiers Room*_data.csv
-    csv_files = sorted(glob.glob(os.path.join(data_dir, "Room*_data.csv")))
+    # Détecter automatiquement tous les fichiers Room*_data.csv (éventuellement compressés)
+    room_files = get_csv_files(data_dir)
+    csv_files = list(room_files.values())
     
     if len(csv_files) == 0:
         print(f"[ERREUR] Aucun fichier Room*_data.csv trouvé dans {data_dir}/")
@@ -33,37 +143,83 @@ def export_csv_to_arduino():
     num_rooms = len(csv_files)
     print(f"[OK] {num_rooms} fichiers CSV détectés\n")
     
-    # Lire les données
-    rooms_data = []
-    for i, csv_file in enumerate(csv_files, 1):
-        df = pd.read_csv(csv_file)
-        print(f"Room {i}: {len(df)} entrées")
-        
-        # Renommer colonnes pour uniformiser
-        df.columns = df.columns.str.strip()
-        if 'Timestamp' in df.columns:
-            df.rename(columns={'Timestamp': 'timestamp'}, inplace=True)
-        if 'Temperature_Celsius(°C)' in df.columns:
-            df.rename(columns={'Temperature_Celsius(°C)': 'temperature'}, inplace=True)
-        
-        # Convertir les dates en timestamps
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
-        
-        rooms_data.append(df)
+    periods = PERIODS
     
-    print(f"\n[INFO] Échantillonnage en cours...")
+    # Lire les données (store memmap s'il est à jour, sinon CSV)
+    with profile_stage('read') as stage:
+        rooms_samples = []
+        stage.rows = 0
+        store = open_current_store(room_files, store_dir_for(data_dir))
+        reread = 0
+        if store is not None:
+            print(f"[STORE] Lecture depuis le store memmap: {store.store_dir}\n")
+            for i, room_name in enumerate(store.room_names, 1):
+                fingerprint = store_room_fingerprint(store, room_name)
+                entry = cache.get(room_name) if cache is not None else None
+                if entry is not None and entry['source'] == store.store_dir and entry['fingerprint'] == fingerprint:
+                    print(f"Room {i}: {entry['rows']} entrées (cache)")
+                    rooms_samples.append(entry['samples'])
+                    continue
+
+                rows, total, samples = store_room_samples(store, room_name, periods)
+                print(f"Room {i}: {rows} entrées (sur {total})")
+                rooms_samples.append(samples)
+                stage.rows += rows
+                reread += 1
+                if cache is not None:
+                    cache[room_name] = {'source': store.store_dir, 'fingerprint': fingerprint,
+                                        'rows': total, 'samples': samples}
+    
+        for i, (room_name, csv_file) in enumerate(room_files.items() if store is None else [], 1):
+            fingerprint = file_fingerprint(csv_file)
+            entry = cache.get(room_name) if cache is not None else None
+            if entry is not None and entry['source'] == csv_file and entry['fingerprint'] == fingerprint:
+                print(f"Room {i}: {entry['rows']} entrées (cache)")
+                rooms_samples.append(entry['samples'])
+                continue
+
+            df = read_room_csv(csv_file)
+            print(f"Room {i}: {len(df)} entrées")
+            samples = sample_room_periods(df, periods)
+            rooms_samples.append(samples)
+            stage.rows += len(df)
+            reread += 1
+            if cache is not None:
+                cache[room_name] = {'source': csv_file, 'fingerprint': fingerprint,
+                                    'rows': len(df), 'samples': samples}
+
+        if cache is not None:
+            # Oublier les rooms supprimées
+            current = store.room_names if store is not None else room_files
+            for room_name in set(cache) - set(current):
+                del cache[room_name]
+            print(f"\n[CACHE] {reread}/{len(current)} rooms relues")
+    
+    # Le store peut contenir des rooms ajoutées hors CSV et déjà incluses par un réentraînement
+    num_rooms = len(rooms_samples)
     
-    # Préparer les périodes
-    periods = [
-        {"name": "1J", "hours": 24, "max_points": 48},
-        {"name": "1S", "hours": 168, "max_points": 168},
-        {"name": "1M", "hours": 720, "max_points": 360},
-        {"name": "3M", "hours": 2160, "max_points": 540}
-    ]
+    # Vérifier l'empreinte flash / RAM (poids + historique) avant d'écrire le header
+    with profile_stage('footprint'):
+        profile = load_device_profile(device)
+        period_sizes = [[len(samples[p]['temps']) for samples in rooms_samples] for p in range(len(periods))]
+        arrays = device_arrays(num_rooms, period_sizes)
+        if not check_footprint(arrays, profile)['fits'] and on_overflow == 'reduce':
+            budgets = fit_point_budgets(periods, num_rooms, profile)
+            print(f"[WARN] Empreinte trop grande pour {profile['name']}: points par période réduits à "
+                  + ", ".join(f"{p['name']}={n}" for p, n in zip(periods, budgets)))
+            rooms_samples = [reduce_samples(samples, budgets) for samples in rooms_samples]
+            period_sizes = [[len(samples[p]['temps']) for samples in rooms_samples] for p in range(len(periods))]
+            arrays = device_arrays(num_rooms, period_sizes)
+        footprint = print_footprint_report(arrays, profile, periods, period_sizes)
+        if not footprint['fits'] and on_overflow == 'fail':
+            raise ValueError(f"{num_rooms} rooms dépassent la mémoire de {profile['name']} "
+                             f"(--on-overflow reduce pour réduire les points par période)")
+    
+    print(f"\n[INFO] Échantillonnage en cours...")
     
     # Générer le fichier header
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with profile_stage('write_header') as stage, open(output_file, 'w', encoding='utf-8') as f:
+        stage.rows = 0
         f.write("// DONNÉES CSV RÉELLES - Généré automatiquement (Version Scalable)\n")
         f.write(f"// Date de génération: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
         f.write(f"// Nombre de rooms: {num_rooms}\n")
@@ -86,30 +242,20 @@ def export_csv_to_arduino():
             offsets = [0]  # Offset de début pour chaque room
             sizes = []
             
-            for room_idx, df in enumerate(rooms_data):
-                # Filtrer et échantillonner
-                now = df['timestamp'].max()
-                start_time = now - pd.Timedelta(hours=period['hours'])
-                df_period = df[df['timestamp'] >= start_time].copy()
-                df_sampled = sample_data(df_period, period['max_points'])
-                
-                # Ajouter au grand tableau
-                temps = df_sampled['temperature'].values.tolist()
+            for room_idx, samples in enumerate(rooms_samples):
+                # Ajouter au grand tableau (échantillons déjà filtrés sur la période)
+                temps = samples[period_idx]['temps']
                 all_temps.extend(temps)
-                
-                # Calculer heures relatives
-                timestamps = df_sampled['timestamp']
-                hours_ago = [(now - ts).total_seconds() / 3600 for ts in timestamps]
-                hours_ago.reverse()
-                all_hours.extend(hours_ago)
+                all_hours.extend(samples[period_idx]['hours'])
                 
                 # Enregistrer taille et offset
                 size = len(temps)
                 sizes.append(size)
-                if room_idx < len(rooms_data) - 1:
+                if room_idx < len(rooms_samples) - 1:
                     offsets.append(offsets[-1] + size)
             
             total_points = len(all_temps)
+            stage.rows += total_points
             
             # Écrire le grand tableau de températures
             f.write(f"// Tableau linéaire contenant toutes les rooms ({total_points} points)\n")
@@ -203,27 +349,106 @@ def export_csv_to_arduino():
     print(f"\n[OK] Fichier généré: {output_file}")
     print(f"[OK] Taille fichier: {os.path.getsize(output_file) / 1024:.2f} KB")
     
+    # Un history_files.h resté d'un export --target files aurait priorité sur csv_data.h dans le firmware
+    stale_header = os.path.join(os.path.dirname(output_file), os.path.basename(DEFAULT_HISTORY_HEADER))
+    if os.path.exists(stale_header):
+        os.remove(stale_header)
+        print(f"[INFO] {stale_header} supprimé (le firmware lit de nouveau csv_data.h)")
+    
+    # Même historique en blob binaire versionné (mise à jour OTA via ota_server.py)
+    if ota_dir:
+        publish_history(rooms_samples, ota_dir)
+    
     # Afficher statistiques
     print("\n=== STATISTIQUES ===")
     for period_idx, period in enumerate(periods):
         print(f"\nPériode {period['name']} ({period['hours']}h):")
-        for room_idx, df in enumerate(rooms_data, 1):
-            now = df['timestamp'].max()
-            start_time = now - pd.Timedelta(hours=period['hours'])
-            df_period = df[df['timestamp'] >= start_time]
-            df_sampled = sample_data(df_period, period['max_points'])
+        for room_idx, samples in enumerate(rooms_samples, 1):
+            temps = pd.Series(samples[period_idx]['temps'], dtype=float)
             
-            temp_min = df_sampled['temperature'].min()
-            temp_max = df_sampled['temperature'].max()
-            temp_mean = df_sampled['temperature'].mean()
+            temp_min = temps.min()
+            temp_max = temps.max()
+            temp_mean = temps.mean()
             
-            print(f"  Room {room_idx}: {len(df_sampled):4d} pts | "
+            print(f"  Room {room_idx}: {len(temps):4d} pts | "
                   f"Min: {temp_min:6.2f}°C | Max: {temp_max:6.2f}°C | "
                   f"Moy: {temp_mean:6.2f}°C")
     
     print(f"\n[OK] Export terminé avec succès!")
     print(f"[INFO] Ce format supporte {num_rooms} rooms actuellement")
-    print(f"[INFO] Peut facilement supporter 100+ rooms sans modification du code Arduino!\n")
+    print(f"[INFO] Capacité de {profile['name']}: {max_rooms(periods, profile)} rooms avec ces points par période\n")
+
+def export_csv_to_files(data_dir="data", history_dir=HISTORY_DIR, header_file=DEFAULT_HISTORY_HEADER,
+                        rooms_per_shard=ROOMS_PER_SHARD, on_sd=False):
+    """
+    Écrit l'historique échantillonné en fichiers binaires (index + shards) et history_files.h
+
+    Chaque room est lue, échantillonnée puis écrite avant de passer à la suivante:
+    la mémoire ne dépend pas du nombre de rooms (hors index, 12 octets par room
+    et période). Le contenu est celui de csv_data.h (mêmes PERIODS, même échantillonnage).
+
+    Args:
+        history_dir: dossier à copier sur la carte SD ou dans l'image SPIFFS
+        header_file: history_files.h pour le firmware (remplace csv_data.h)
+        rooms_per_shard: rooms par fichier shard
+        on_sd: le firmware lit la carte SD au lieu de SPIFFS
+    """
+    print("\n=== EXPORT CSV VERS FICHIERS (SPIFFS / SD) ===\n")
+    
+    room_files = get_csv_files(data_dir)
+    if len(room_files) == 0:
+        print(f"[ERREUR] Aucun fichier Room*_data.csv trouvé dans {data_dir}/")
+        return
+    
+    periods = PERIODS
+    store = open_current_store(room_files, store_dir_for(data_dir))
+    if store is not None:
+        print(f"[STORE] Lecture depuis le store memmap: {store.store_dir}\n")
+        rooms = iter_store_samples(store, periods)
+    else:
+        rooms = iter_csv_samples(room_files, periods)
+    
+    with profile_stage('write_files') as stage, HistoryWriter(history_dir, len(periods), rooms_per_shard) as writer:
+        stage.rows = 0
+        for i, (room_name, rows, _, samples) in enumerate(rooms, 1):
+            writer.add_room(samples)
+            stage.rows += rows
+            if i % 100 == 0:
+                print(f"  {i} rooms écrites")
+    
+    header_file = write_history_header(writer, header_file, on_sd)
+    history = HistoryFiles(history_dir)
+    print(f"[OK] {history.num_rooms} rooms, {history.num_periods} périodes -> {history_dir}/ "
+          f"({history.total_bytes() / 1024:.1f} KB, {-(-history.num_rooms // rooms_per_shard)} shards)")
+    print(f"[OK] Fichier généré: {header_file} (lecture depuis {'SD' if on_sd else 'SPIFFS'})")
+    print(f"[INFO] Copier {history_dir}/ à la racine de la {'carte SD' if on_sd else 'partition SPIFFS'}")
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Export des CSV vers csv_data.h (Arduino)")
+    parser.add_argument('--device', default=DEFAULT_PROFILE,
+                        help=f"Profil d'appareil ({', '.join(DEVICE_PROFILES)}) ou fichier JSON")
+    parser.add_argument('--on-overflow', choices=OVERFLOW_ACTIONS, default='fail',
+                        help="Empreinte trop grande: échec, réduction des points par période, ou avertissement")
+    parser.add_argument('--target', choices=EXPORT_TARGETS, default='header',
+                        help="csv_data.h compilé en flash, ou fichiers binaires pour SPIFFS / carte SD")
+    parser.add_argument('--history-dir', default=HISTORY_DIR, help="Dossier des fichiers (--target files)")
+    parser.add_argument('--rooms-per-shard', type=int, default=ROOMS_PER_SHARD,
+                        help=f"Rooms par fichier shard (--target files, défaut: {ROOMS_PER_SHARD})")
+    parser.add_argument('--sd', action='store_true', help="Le firmware lit la carte SD au lieu de SPIFFS")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
+    with profiling('export_csv', **options_from_args(args)):
+        try:
+            if args.target == 'files':
+                export_csv_to_files(history_dir=args.history_dir, rooms_per_shard=args.rooms_per_shard,
+                                    on_sd=args.sd)
+            else:
+                export_csv_to_arduino(device=args.device, on_overflow=args.on_overflow)
+        except ValueError as e:
+            print(f"\n[ERREUR] {e}")
+            exit(1)
 
 if __name__ == "__main__":
-    export_csv_to_arduino()
+    main()
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Prévisions par lots côté serveur (équivalent de fetch_api_forecast du firmware)
+À partir d'une série horaire de température extérieure (dump Open-Meteo ou CSV),
+produit la matrice heures x rooms en un seul passage du modèle par bloc, au lieu
+d'un appel à predict_rooms par heure comme sur le M5Stack.
+
+Modèle:
+- modèle Keras entraîné (rooms_model_with_date.h5), ou
+- modèle shardé (rooms_model_shards.npz, sharded_training.py), ou
+- poids exportés pour l'ESP32 (neural_weights.h), évalués en numpy sans TensorFlow
+
+Options de compatibilité firmware (--firmware):
+- jour de l'année par table non bissextile (day_of_year du firmware)
+- heure fixée à midi dans les features (predict_rooms)
+- variation horaire ajoutée: sin(heure/24*6.28)*0.5*(0.3 + r*0.15)
+
+Usage:
+    python forecast.py data/weather/default.json --output forecast.csv
+    python forecast.py meteo.csv --weights neural_weights.h --firmware --output forecast.parquet
+"""
+
+import os
+import re
+import argparse
+import numpy as np
+import pandas as pd
+
+from calendar_tables import season_encoding, time_of_day_encoding
+from room_data import TEMP_MAX, TEMP_MIN, detect_column, get_csv_files
+from weather_store import HOUR_NS, read_open_meteo_json
+
+MODEL_FILE = 'rooms_model_with_date.h5'
+WEIGHTS_HEADER = os.path.join('M5Stack_Temperature_Prediction', 'RoomPredictor', 'neural_weights.h')
+DEFAULT_HUMIDITY = 50.0   # Comme le firmware (humidité non mesurée)
+CHUNK_HOURS = 24 * 7 * 52  # Taille des blocs écrits (1 an d'heures)
+
+# Jours cumulés par mois, année non bissextile (day_of_year du firmware)
+FIRMWARE_CUMULATIVE_DAYS = np.array([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334])
+
+# ============================================================================
+# FEATURES
+# ============================================================================
+
+def forecast_features(timestamps, temp_ext, humidity=DEFAULT_HUMIDITY, firmware=False):
+    """
+    Construit les 5 features d'entrée pour chaque heure (vectorisé)
+
+    Args:
+        timestamps: int64 ns ou DatetimeIndex
+        temp_ext: température extérieure (°C) à chaque timestamp
+        humidity: humidité (scalaire ou tableau)
+        firmware: reproduire predict_rooms (table non bissextile, heure fixée à midi)
+
+    Returns:
+        Matrice float32 (heures x 5): temp_ext, humidité, saison_sin, saison_cos, heure_sin
+    """
+    dates = pd.DatetimeIndex(np.asarray(timestamps).view('datetime64[ns]'))
+    if firmware:
+        doy = FIRMWARE_CUMULATIVE_DAYS[dates.month.values - 1] + dates.day.values
+        hours, minutes = np.full(len(dates), 12), 0
+    else:
+        # Mêmes encodages que prepare_features_with_date (calendar_tables.py)
+        doy = dates.dayofyear.values
+        hours, minutes = dates.hour.values, dates.minute.values
+
+    X = np.empty((len(dates), 5), dtype=np.float32)
+    X[:, 0] = temp_ext
+    X[:, 1] = humidity
+    X[:, 2], X[:, 3] = season_encoding(doy)
+    X[:, 4] = time_of_day_encoding(hours, minutes)
+    return X
+
+def firmware_hour_adjustment(timestamps, num_rooms):
+    """
+    Variation horaire ajoutée par fetch_api_forecast (mode horaire)
+
+    Returns:
+        Matrice float32 (heures x rooms)
+    """
+    hours = pd.DatetimeIndex(np.asarray(timestamps).view('datetime64[ns]')).hour.values.astype(np.float32)
+    hour_factor = np.sin(hours / np.float32(24.0) * np.float32(6.28)) * np.float32(0.5)
+    room_weight = np.float32(0.3) + np.arange(num_rooms, dtype=np.float32) * np.float32(0.15)
+    return hour_factor[:, None] * room_weight[None, :]
+
+# ============================================================================
+# MODÈLE
+# ============================================================================
+
+class NumpyMLP:
+    """
+    Réseau dense ReLU évalué en numpy à partir des poids exportés (aucune dépendance TF)
+
+    Les `linear_layers` dernières couches sont linéaires (2 avec la tête factorisée:
+    bottleneck puis ROOM_W).
+    """
+
+    def __init__(self, layers, linear_layers=1):
+        self.layers = [(np.asarray(W, dtype=np.float32), np.asarray(b, dtype=np.float32)) for W, b in layers]
+        self.linear_layers = linear_layers
+
+    @property
+    def num_outputs(self):
+        return self.layers[-1][0].shape[1]
+
+    def predict(self, X, batch_size=None, verbose=0):
+        h = np.asarray(X, dtype=np.float32)
+        for i, (W, b) in enumerate(self.layers):
+            h = h @ W + b
+            if i < len(self.layers) - self.linear_layers:
+                np.maximum(h, 0.0, out=h)
+        return h
+
+def parse_weights_header(path):
+    """
+    Lit les tableaux `const float|int NOM[..][..] = {...};` d'un header généré
+
+    Returns:
+        dict nom -> tableau numpy à la forme déclarée
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        source = re.sub(r'//[^\n]*', '', f.read())
+
+    arrays = {}
+    pattern = re.compile(r'const\s+(?:float|int)\s+(\w+)((?:\[\w+\])+)\s*(?:PROGMEM\s*)?=\s*\{(.*?)\};', re.S)
+    defines = dict(re.findall(r'#define\s+(\w+)\s+(\d+)', source))
+    for name, dims, body in pattern.findall(source):
+        shape = tuple(int(defines.get(d, d)) for d in re.findall(r'\[(\w+)\]', dims))
+        values = np.array(re.findall(r'[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?', body), dtype=np.float32)
+        arrays[name] = values.reshape(shape)
+    return arrays
+
+def load_forecast_model(model_path=None, header_path=None):
+    """
+    Charge le modèle Keras, ou à défaut les poids du header ESP32
+
+    Returns:
+        Objet exposant predict(X, batch_size, verbose)
+    """
+    if header_path is None and model_path is not None:
+        if model_path.endswith('.npz'):
+            from sharded_training import ShardedModel
+            return ShardedModel.load(model_path)
+        from tensorflow.keras.models import load_model
+        return load_model(model_path, compile=False)
+
+    arrays = parse_weights_header(header_path or WEIGHTS_HEADER)
+    if 'ROOM_SHARD' in arrays:
+        from sharded_training import ShardedModel
+        return ShardedModel.from_header(arrays)
+    layers = []
+    i = 0
+    while f'W{i}' in arrays:
+        layers.append((arrays[f'W{i}'], arrays[f'BIAS{i}']))
+        i += 1
+    if not layers:
+        raise ValueError(f"Aucune couche W0/BIAS0 trouvée dans {header_path}")
+    if 'ROOM_W' in arrays:
+        # Tête factorisée: ROOM_W[N][k] est stocké une ligne par room
+        layers.append((arrays['ROOM_W'].T, arrays['ROOM_BIAS']))
+        return NumpyMLP(layers, linear_layers=2)
+    return NumpyMLP(layers)
+
+def model_num_outputs(model):
+    if isinstance(model, NumpyMLP):
+        return model.num_outputs
+    return model.output_shape[-1]
+
+# ============================================================================
+# SÉRIE EXTÉRIEURE
+# ============================================================================
+
+def read_outdoor_series(path):
+    """
+    Lit une série de température extérieure (dump Open-Meteo .json ou CSV)
+
+    Les valeurs hors de la plage du firmware (validate_temperature) sont
+    écartées, comme sur le M5Stack.
+
+    Returns:
+        (timestamps int64 ns triés, températures float32)
+    """
+    if path.lower().endswith('.json'):
+        timestamps, temps = read_open_meteo_json(path)
+    else:
+        df = pd.read_csv(path)
+        timestamp_col = detect_column(df, 'timestamp')
+        temp_col = detect_column(df, 'external_temp') or detect_column(df, 'temperature')
+        if timestamp_col is None or temp_col is None:
+            raise ValueError(f"{path}: colonnes timestamp/température introuvables: {list(df.columns)}")
+        timestamps = pd.to_datetime(df[timestamp_col]).values.astype('datetime64[ns]').view(np.int64)
+        temps = pd.to_numeric(df[temp_col], errors='coerce').to_numpy(dtype=np.float32)
+
+    valid = np.isfinite(temps) & (temps >= TEMP_MIN) & (temps <= TEMP_MAX)
+    if (~valid).any():
+        print(f"[WARN] {int((~valid).sum())} températures invalides ignorées")
+    order = np.argsort(timestamps[valid], kind='stable')
+    return timestamps[valid][order], temps[valid][order]
+
+# ============================================================================
+# PRÉVISION
+# ============================================================================
+
+def forecast(model, timestamps, temp_ext, humidity=DEFAULT_HUMIDITY, firmware=False, batch_size=65536):
+    """
+    Prévision heures x rooms en un passage par lot
+
+    Returns:
+        Matrice float32 (heures x rooms)
+    """
+    X = forecast_features(timestamps, temp_ext, humidity, firmware)
+    predictions = np.asarray(model.predict(X, batch_size=batch_size, verbose=0), dtype=np.float32)
+    if firmware:
+        predictions += firmware_hour_adjustment(timestamps, predictions.shape[1])
+    return predictions
+
+def iter_forecast(model, timestamps, temp_ext, room_names, chunk_hours=CHUNK_HOURS, **options):
+    """Génère la prévision par blocs de DataFrames (timestamp, temp_ext, une colonne par room)"""
+    for start in range(0, len(timestamps), chunk_hours):
+        ts = timestamps[start:start + chunk_hours]
+        temps = temp_ext[start:start + chunk_hours]
+        predictions = forecast(model, ts, temps, **options)
+        chunk = pd.DataFrame(predictions, columns=room_names)
+        chunk.insert(0, 'temp_ext', temps)
+        chunk.insert(0, 'timestamp', pd.DatetimeIndex(ts.view('datetime64[ns]')))
+        yield chunk
+
+def write_forecast(chunks, output_path):
+    """
+    Écrit les blocs au fil de l'eau (CSV, ou Parquet si pyarrow est installé)
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    rows = 0
+    if output_path.lower().endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False,
+                     float_format='%.2f', date_format='%Y-%m-%d %H:%M:%S')
+        rows += len(chunk)
+    return rows
+
+def default_room_names(num_rooms):
+    """Noms des sorties du modèle (rooms triées comme dans prepare_features_with_date)"""
+    names = sorted(get_csv_files())
+    if len(names) == num_rooms:
+        return names
+    return [f'room{r + 1}' for r in range(num_rooms)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Prévisions heures x rooms à partir d'une série météo")
+    parser.add_argument('input', help="Dump Open-Meteo (.json) ou CSV (timestamp, température extérieure)")
+    parser.add_argument('--output', default='forecast.csv', help="Fichier .csv ou .parquet")
+    parser.add_argument('--model', default=MODEL_FILE, help="Modèle Keras entraîné")
+    parser.add_argument('--weights', help="Header neural_weights.h (évaluation numpy, sans TensorFlow)")
+    parser.add_argument('--firmware', action='store_true',
+                        help="Reproduire le firmware (jour non bissextile, midi, variation horaire)")
+    parser.add_argument('--humidity', type=float, default=DEFAULT_HUMIDITY)
+    parser.add_argument('--start', help="Première heure (ex: 2025-01-01)")
+    parser.add_argument('--hours', type=int, help="Horizon en heures à partir de --start")
+    args = parser.parse_args()
+
+    timestamps, temps = read_outdoor_series(args.input)
+    if args.start:
+        keep = timestamps >= pd.Timestamp(args.start).value
+        timestamps, temps = timestamps[keep], temps[keep]
+    if args.hours and len(timestamps):
+        keep = timestamps < timestamps[0] + args.hours * HOUR_NS
+        timestamps, temps = timestamps[keep], temps[keep]
+    if len(timestamps) == 0:
+        print("[ERROR] Aucune heure à prévoir")
+        return
+
+    header = args.weights
+    if header is None and not os.path.exists(args.model):
+        print(f"[INFO] {args.model} introuvable: utilisation de {WEIGHTS_HEADER}")
+        header = WEIGHTS_HEADER
+    model = load_forecast_model(args.model, header)
+    room_names = default_room_names(model_num_outputs(model))
+
+    print(f"[INFO] {len(timestamps)} heures x {len(room_names)} rooms "
+          f"({pd.Timestamp(timestamps[0])} -> {pd.Timestamp(timestamps[-1])})")
+    rows = write_forecast(iter_forecast(model, timestamps, temps, room_names,
+                                        humidity=args.humidity, firmware=args.firmware), args.output)
+    print(f"[OK] {rows} lignes écrites: {args.output}")
+
+if __name__ == "__main__":
+    main()
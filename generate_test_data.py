@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Modèle physique simplifié pour la génération de données de test
+Température extérieure (saison + cycle jour/nuit) et réponse thermique d'une
+pièce selon son profil d'isolation (ISOLATION_PROFILES de data_generator_gui).
+
+Deux interfaces partagent les mêmes équations:
+- generate_external_temperature / generate_room_temperature: pas à pas (GUI)
+- generate_fleet_temperatures: vectorisée sur N rooms (corpus de benchmark)
+"""
+
+import numpy as np
+import pandas as pd
+
+# Climat extérieur (tempéré, hémisphère nord)
+EXT_MEAN = 12.0           # Moyenne annuelle (°C)
+EXT_SEASONAL_AMP = 10.0   # Amplitude saisonnière (°C)
+EXT_DAILY_AMP = 4.0       # Amplitude jour/nuit (°C)
+EXT_NOISE_STD = 1.5       # Bruit météo (°C)
+ROOM_NOISE_STD = 0.1      # Bruit capteur intérieur (°C)
+
+def is_heating_season(month):
+    """Saison de chauffage: octobre à avril"""
+    return (month >= 10) | (month <= 4)
+
+def _external_baseline(day_of_year, hour):
+    """Température extérieure moyenne attendue (sans bruit)"""
+    seasonal = EXT_SEASONAL_AMP * np.sin(2 * np.pi * (day_of_year - 80) / 365.0)
+    # Minimum vers 3h, maximum vers 15h
+    daily = EXT_DAILY_AMP * np.sin(2 * np.pi * (hour - 9) / 24.0)
+    return EXT_MEAN + seasonal + daily
+
+def _room_step(ext_temp, current_temp, profile, hour, is_heating, noise):
+    """
+    Un pas de la réponse thermique (scalaires ou tableaux numpy)
+
+    La pièce tend vers un équilibre entre le confort du profil et l'extérieur
+    (external_influence), le chauffage compense une part du déficit
+    (heating_efficiency), et l'inertie thermique lisse la trajectoire.
+    """
+    low, high = profile['temp_range']
+    comfort = (low + high) / 2.0
+
+    passive = comfort + profile['external_influence'] * (ext_temp - comfort)
+    deficit = np.maximum(comfort - passive, 0.0)
+    passive = np.where(is_heating, passive + profile['heating_efficiency'] * deficit, passive)
+
+    # Pièce plus chaude en fin d'après-midi (occupation, apports solaires)
+    daily = profile['daily_variation'] / 2.0 * np.sin(2 * np.pi * (hour - 10) / 24.0)
+    target = passive + daily
+
+    inertia = profile['thermal_inertia']
+    new_temp = inertia * current_temp + (1 - inertia) * target + noise
+
+    # L'écart au confort reste borné par l'amplitude saisonnière du profil
+    amplitude = profile['seasonal_amplitude']
+    return np.clip(new_temp, comfort - amplitude, comfort + amplitude)
+
+def generate_external_temperature(date):
+    """
+    Température extérieure simulée à une date donnée
+
+    Args:
+        date: datetime
+
+    Returns:
+        Température (°C), arrondie à 0.01
+    """
+    hour = date.hour + date.minute / 60.0
+    value = _external_baseline(date.timetuple().tm_yday, hour) + np.random.normal(0, EXT_NOISE_STD)
+    return round(float(value), 2)
+
+def generate_room_temperature(ext_temp, current_temp, profile, hour, is_heating):
+    """
+    Température intérieure au pas suivant
+
+    Args:
+        ext_temp: température extérieure (°C)
+        current_temp: température intérieure au pas précédent (°C)
+        profile: profil d'isolation (dict de ISOLATION_PROFILES)
+        hour: heure de la journée
+        is_heating: True en saison de chauffage
+
+    Returns:
+        Température (°C), arrondie à 0.01
+    """
+    noise = np.random.normal(0, ROOM_NOISE_STD)
+    value = _room_step(ext_temp, current_temp, profile, hour, is_heating, noise)
+    return round(float(value), 2)
+
+def generate_fleet_temperatures(profiles, start_date, num_samples, interval_minutes=30, seed=None):
+    """
+    Génère les séries de N rooms en une passe vectorisée sur les rooms
+
+    Toutes les rooms partagent la même température extérieure; seule la boucle
+    temporelle (récurrence de l'inertie) reste séquentielle.
+
+    Args:
+        profiles: liste de profils d'isolation (un par room)
+        start_date: premier timestamp
+        num_samples: nombre de pas de temps
+        interval_minutes: pas d'échantillonnage
+        seed: graine du générateur aléatoire (reproductibilité)
+
+    Returns:
+        (DatetimeIndex, température extérieure (num_samples,),
+         températures float32 (num_rooms x num_samples))
+    """
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(start_date, periods=num_samples, freq=f'{interval_minutes}min')
+    hours = (timestamps.hour + timestamps.minute / 60.0).to_numpy()
+    heating = is_heating_season(timestamps.month.to_numpy())
+
+    ext_temps = _external_baseline(timestamps.dayofyear.to_numpy(), hours)
+    ext_temps = np.round(ext_temps + rng.normal(0, EXT_NOISE_STD, num_samples), 2)
+
+    # Paramètres des profils empilés en colonnes (une valeur par room)
+    stacked = {
+        'temp_range': (np.array([p['temp_range'][0] for p in profiles], dtype=np.float64),
+                       np.array([p['temp_range'][1] for p in profiles], dtype=np.float64))
+    }
+    for key in ('thermal_inertia', 'external_influence', 'heating_efficiency',
+                'daily_variation', 'seasonal_amplitude'):
+        stacked[key] = np.array([p[key] for p in profiles], dtype=np.float64)
+
+    num_rooms = len(profiles)
+    temperatures = np.empty((num_rooms, num_samples), dtype=np.float32)
+    current = (stacked['temp_range'][0] + stacked['temp_range'][1]) / 2 + rng.uniform(-1, 1, num_rooms)
+    noise = rng.normal(0, ROOM_NOISE_STD, (num_samples, num_rooms))
+
+    for t in range(num_samples):
+        current = _room_step(ext_temps[t], current, stacked, hours[t], heating[t], noise[t])
+        temperatures[:, t] = current
+
+    return timestamps, ext_temps, np.round(temperatures, 2)
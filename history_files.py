@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+Historique des rooms en fichiers binaires (SPIFFS / carte SD) au lieu de csv_data.h
+csv_data.h place chaque point de chaque room et période dans un seul header:
+à 1 000 rooms x 4 périodes, des centaines de milliers de littéraux dans une
+unité de compilation, et tout l'historique en flash de l'application. Ici
+l'historique est écrit dans des fichiers à layout fixe, lus par seek sur
+l'appareil, et l'export traite une room à la fois (mémoire bornée sur l'hôte).
+
+Layout (little-endian, comme la mémoire de l'ESP32):
+    history/index.bin
+        en-tête <4s H H H H>: magic 'PTHI', format, rooms (N), périodes (P), rooms par shard
+        uint32 entrée[N][P][3]: shard, offset (octets dans le shard), points
+    history/shard_000.bin, shard_001.bin, ...
+        rooms consécutives (rooms_per_shard par fichier); pour chaque room et
+        chaque période: float32 temps[points], float32 hours[points]
+
+L'entrée de la room r, période p est à HEADER + (r * P + p) * 12 octets:
+l'appareil lit une tranche en deux seeks, sans charger l'index.
+history_files.h (généré) définit CSV_NUM_ROOMS / CSV_NUM_PERIODS et
+history_read_slice(); RoomPredictor.ino l'utilise à la place de csv_data.h
+quand il est présent.
+
+Usage:
+    python export_csv_to_arduino_v2.py --target files [--sd] [--rooms-per-shard 64]
+    python history_files.py history --room 3 --period 1   # relit une tranche
+"""
+
+import os
+import argparse
+import numpy as np
+
+from ota_artifacts import HEADER_STRUCT
+
+HISTORY_DIR = 'history'
+INDEX_FILE = 'index.bin'
+HISTORY_HEADER = 'history_files.h'
+INDEX_MAGIC = b'PTHI'
+HISTORY_FILES_FORMAT = 1
+ROOMS_PER_SHARD = 64        # 1 000 rooms -> 16 fichiers (SPIFFS: peu de fichiers, noms courts)
+ENTRY_DTYPE = np.dtype('<u4')
+ENTRY_FIELDS = 3            # shard, offset, points
+
+def shard_filename(shard):
+    return f"shard_{shard:03d}.bin"
+
+# ============================================================================
+# ÉCRITURE
+# ============================================================================
+
+class HistoryWriter:
+    """
+    Écrit les rooms une par une dans les shards, l'index à la fermeture
+
+    Seules les entrées d'index (12 octets par room et période) restent en
+    mémoire; les points de chaque room sont écrits dès add_room().
+    """
+
+    def __init__(self, output_dir=HISTORY_DIR, num_periods=4, rooms_per_shard=ROOMS_PER_SHARD):
+        if rooms_per_shard < 1:
+            raise ValueError(f"rooms_per_shard doit être >= 1 (reçu: {rooms_per_shard})")
+        self.output_dir = output_dir
+        self.num_periods = num_periods
+        self.rooms_per_shard = rooms_per_shard
+        self.entries = []
+        self.max_points = 0
+        self.bytes_written = 0
+        self._shard_file = None
+        os.makedirs(output_dir, exist_ok=True)
+        # Export précédent retiré (index d'abord): ses shards ne seraient plus cohérents
+        index_path = os.path.join(output_dir, INDEX_FILE)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        for name in os.listdir(output_dir):
+            if name.startswith('shard_') and name.endswith('.bin'):
+                os.remove(os.path.join(output_dir, name))
+
+    @property
+    def num_rooms(self):
+        return len(self.entries)
+
+    def add_room(self, samples):
+        """
+        Ajoute une room
+
+        Args:
+            samples: liste par période de dict 'temps' / 'hours'
+                (export_csv_to_arduino_v2.sample_room_periods)
+        """
+        if len(samples) != self.num_periods:
+            raise ValueError(f"{len(samples)} périodes reçues, {self.num_periods} attendues")
+        shard = self.num_rooms // self.rooms_per_shard
+        if self.num_rooms % self.rooms_per_shard == 0:
+            self._close_shard()
+            self._shard_file = open(os.path.join(self.output_dir, shard_filename(shard)), 'wb')
+
+        room_entries = []
+        for period in samples:
+            temps = np.ascontiguousarray(period['temps'], dtype='<f4')
+            hours = np.ascontiguousarray(period['hours'], dtype='<f4')
+            if len(temps) != len(hours):
+                raise ValueError(f"temps ({len(temps)}) et hours ({len(hours)}) de longueurs différentes")
+            room_entries.append((shard, self._shard_file.tell(), len(temps)))
+            self._shard_file.write(temps.tobytes())
+            self._shard_file.write(hours.tobytes())
+            self.max_points = max(self.max_points, len(temps))
+            self.bytes_written += temps.nbytes + hours.nbytes
+        self.entries.append(room_entries)
+
+    def _close_shard(self):
+        if self._shard_file is not None:
+            self._shard_file.close()
+            self._shard_file = None
+
+    def close(self):
+        """Ferme le dernier shard et écrit index.bin (écrit en dernier: un export interrompu n'a pas d'index)"""
+        self._close_shard()
+        entries = np.array(self.entries, dtype=ENTRY_DTYPE).reshape(self.num_rooms, self.num_periods, ENTRY_FIELDS)
+        header = HEADER_STRUCT.pack(INDEX_MAGIC, HISTORY_FILES_FORMAT, self.num_rooms, self.num_periods,
+                                    self.rooms_per_shard)
+        index_path = os.path.join(self.output_dir, INDEX_FILE)
+        with open(index_path + '.tmp', 'wb') as f:
+            f.write(header + entries.tobytes())
+        os.replace(index_path + '.tmp', index_path)
+        self.bytes_written += len(header) + entries.nbytes
+        return index_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._close_shard()
+        return False
+
+# ============================================================================
+# LECTURE (accès direct à une tranche room / période)
+# ============================================================================
+
+class HistoryFiles:
+    """
+    Relit un export history/ comme l'appareil: index puis seek dans le shard
+
+    Attributes:
+        num_rooms, num_periods, rooms_per_shard
+        entries: uint32 (rooms x périodes x 3): shard, offset, points
+    """
+
+    def __init__(self, history_dir=HISTORY_DIR):
+        self.history_dir = history_dir
+        with open(os.path.join(history_dir, INDEX_FILE), 'rb') as f:
+            magic, version, num_rooms, num_periods, rooms_per_shard = HEADER_STRUCT.unpack(
+                f.read(HEADER_STRUCT.size))
+            if magic != INDEX_MAGIC or version != HISTORY_FILES_FORMAT:
+                raise ValueError(f"Index d'historique invalide (magic={magic!r}, format={version})")
+            count = num_rooms * num_periods * ENTRY_FIELDS
+            entries = np.fromfile(f, dtype=ENTRY_DTYPE, count=count)
+        if len(entries) != count:
+            raise ValueError(f"Index d'historique tronqué ({len(entries)}/{count} valeurs)")
+        self.num_rooms = num_rooms
+        self.num_periods = num_periods
+        self.rooms_per_shard = rooms_per_shard
+        self.entries = entries.reshape(num_rooms, num_periods, ENTRY_FIELDS)
+
+    def __len__(self):
+        return self.num_rooms
+
+    def size(self, room, period):
+        """Nombre de points d'une room pour une période"""
+        return int(self.entries[room, period, 2])
+
+    def read_slice(self, room, period):
+        """
+        Points d'une room pour une période
+
+        Args:
+            room: index de la room (ordre de l'export, 0 = première)
+            period: index de la période (PERIODS)
+
+        Returns:
+            (temps, hours) float32
+        """
+        if not (0 <= room < self.num_rooms and 0 <= period < self.num_periods):
+            raise IndexError(f"room {room} / période {period} hors de l'export "
+                             f"({self.num_rooms} rooms, {self.num_periods} périodes)")
+        shard, offset, count = (int(v) for v in self.entries[room, period])
+        with open(os.path.join(self.history_dir, shard_filename(shard)), 'rb') as f:
+            f.seek(offset)
+            values = np.fromfile(f, dtype='<f4', count=2 * count)
+        if len(values) != 2 * count:
+            raise ValueError(f"{shard_filename(shard)} tronqué (room {room}, période {period})")
+        return values[:count], values[count:]
+
+    def total_bytes(self):
+        """Taille de l'export (index + shards), à comparer à la partition SPIFFS"""
+        return sum(entry.stat().st_size for entry in os.scandir(self.history_dir)
+                   if entry.name == INDEX_FILE or entry.name.startswith('shard_'))
+
+# ============================================================================
+# HEADER FIRMWARE
+# ============================================================================
+
+def write_history_header(writer, output_file=HISTORY_HEADER, on_sd=False, device_dir='/' + HISTORY_DIR):
+    """
+    Écrit history_files.h: dimensions de l'export et lecture d'une tranche depuis le système de fichiers
+
+    Args:
+        writer: HistoryWriter fermé (dimensions et nombre max de points)
+        on_sd: fichiers sur la carte SD (SD) au lieu de la flash (SPIFFS)
+        device_dir: dossier des fichiers sur l'appareil
+    """
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write("// Historique CSV sur système de fichiers - Généré automatiquement (history_files.py)\n")
+        f.write("// Remplace csv_data.h: copier le dossier history/ sur la carte SD ou dans l'image SPIFFS\n")
+        f.write("// Ne pas modifier manuellement - regénérer avec export_csv_to_arduino_v2.py --target files\n\n")
+        f.write("#ifndef HISTORY_FILES_H\n")
+        f.write("#define HISTORY_FILES_H\n\n")
+        f.write("#include <FS.h>\n")
+        if on_sd:
+            f.write("#include <SD.h>\n")
+            f.write("#define HISTORY_FS SD\n\n")
+        else:
+            f.write("#include <SPIFFS.h>\n")
+            f.write("#define HISTORY_FS SPIFFS\n\n")
+        f.write(f"#define CSV_NUM_ROOMS {writer.num_rooms}\n")
+        f.write(f"#define CSV_NUM_PERIODS {writer.num_periods}\n")
+        f.write(f"#define HISTORY_MAX_POINTS {max(writer.max_points, 1)}\n")
+        f.write(f"#define HISTORY_DIR \"{device_dir}\"\n")
+        f.write(f"#define HISTORY_HEADER_BYTES {HEADER_STRUCT.size}\n\n")
+
+        f.write("inline bool history_begin() {\n")
+        f.write("  return HISTORY_FS.begin();\n")
+        f.write("}\n\n")
+
+        f.write("// Entrée d'index de la room / période: shard, offset (octets), points\n")
+        f.write("inline bool history_entry(int period, int room, uint32_t entry[3]) {\n")
+        f.write("  File index = HISTORY_FS.open(HISTORY_DIR \"/index.bin\", \"r\");\n")
+        f.write("  if (!index) return false;\n")
+        f.write("  index.seek(HISTORY_HEADER_BYTES + ((uint32_t)room * CSV_NUM_PERIODS + period) * 3 * sizeof(uint32_t));\n")
+        f.write("  bool ok = index.read((uint8_t*)entry, 3 * sizeof(uint32_t)) == 3 * sizeof(uint32_t);\n")
+        f.write("  index.close();\n")
+        f.write("  return ok;\n")
+        f.write("}\n\n")
+
+        f.write("// Lit les points d'une room pour une période (hours peut être NULL)\n")
+        f.write("// Retourne le nombre de points lus, -1 en cas d'erreur\n")
+        f.write("inline int history_read_slice(int period, int room, float* temps, float* hours, int max_points) {\n")
+        f.write("  uint32_t entry[3];\n")
+        f.write("  if (!history_entry(period, room, entry)) return -1;\n")
+        f.write("  char path[40];\n")
+        f.write("  snprintf(path, sizeof(path), HISTORY_DIR \"/shard_%03u.bin\", (unsigned)entry[0]);\n")
+        f.write("  File shard = HISTORY_FS.open(path, \"r\");\n")
+        f.write("  if (!shard) return -1;\n")
+        f.write("  int count = (int)entry[2] < max_points ? (int)entry[2] : max_points;\n")
+        f.write("  shard.seek(entry[1]);\n")
+        f.write("  bool ok = shard.read((uint8_t*)temps, count * sizeof(float)) == count * sizeof(float);\n")
+        f.write("  if (ok && hours != NULL) {\n")
+        f.write("    shard.seek(entry[1] + entry[2] * sizeof(float));\n")
+        f.write("    ok = shard.read((uint8_t*)hours, count * sizeof(float)) == count * sizeof(float);\n")
+        f.write("  }\n")
+        f.write("  shard.close();\n")
+        f.write("  return ok ? count : -1;\n")
+        f.write("}\n\n")
+        f.write("#endif // HISTORY_FILES_H\n")
+    return output_file
+
+# ============================================================================
+# CLI (vérification d'un export)
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Relit un export d'historique (index + shards)")
+    parser.add_argument('history_dir', nargs='?', default=HISTORY_DIR)
+    parser.add_argument('--room', type=int, help="Index de la room (0 = première)")
+    parser.add_argument('--period', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        history = HistoryFiles(args.history_dir)
+        print(f"[OK] {args.history_dir}: {history.num_rooms} rooms, {history.num_periods} périodes, "
+              f"{history.rooms_per_shard} rooms par shard, {history.total_bytes() / 1024:.1f} KB")
+        if args.room is None:
+            # Relit chaque tranche: détecte un shard tronqué ou un index incohérent
+            points = sum(len(history.read_slice(room, period)[0])
+                         for room in range(history.num_rooms) for period in range(history.num_periods))
+            print(f"[OK] {history.num_rooms * history.num_periods} tranches relues ({points} points)")
+        else:
+            temps, hours = history.read_slice(args.room, args.period)
+            stats = f" | Min: {temps.min():.2f}°C | Max: {temps.max():.2f}°C" if len(temps) else ""
+            print(f"  Room {args.room}, période {args.period}: {len(temps)} pts{stats}")
+    except (OSError, ValueError, IndexError) as e:
+        print(f"[ERROR] {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
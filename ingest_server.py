@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+Service HTTP d'ingestion des mesures des capteurs
+Les rooms envoient leurs mesures par lots (NDJSON ou CSV, mêmes colonnes que
+COLUMN_MAPPINGS: timestamp / temperature / humidity). Les lots sont validés de
+manière vectorisée, bufferisés en mémoire (capacité bornée, 429 si plein) puis
+écrits dans le store (room_store.py) par grandes écritures séquentielles.
+
+Endpoints:
+    POST /ingest/<room>   lot de mesures d'une room (ex: /ingest/room3)
+    POST /ingest          lot multi-rooms (colonne/champ 'room' par mesure)
+    GET  /metrics         débit, latence de flush, taille du buffer
+    GET  /health
+
+Les timestamps sont ramenés à l'heure locale naïve des CSV: epoch unix en
+secondes / ms / µs / ns (unité déduite de l'ordre de grandeur) et chaînes
+ISO avec fuseau ('...Z', '+02:00') sont convertis dans le fuseau du service
+(--timezone, défaut: fuseau du système). Un lot contenant des dates hors de
+[MIN_TIMESTAMP, maintenant + MAX_FUTURE] est refusé en entier (400).
+
+Usage:
+    python ingest_server.py [--port 5001] [--store-dir data/store] [--timezone Europe/Paris]
+"""
+
+import io
+import time
+import atexit
+import argparse
+import threading
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+from dateutil import tz as dateutil_tz
+from flask import Flask, jsonify, request
+
+from room_data import TEMP_MAX, TEMP_MIN, detect_column
+from room_store import STORE_DIR, ROOM_NAME_PATTERN, append_readings
+
+MAX_BUFFERED_ROWS = 2_000_000  # Au-delà: 429 Too Many Requests
+FLUSH_ROWS = 200_000           # Flush anticipé dès que le buffer atteint ce seuil
+FLUSH_INTERVAL = 2.0           # Flush périodique (secondes)
+MAX_BATCH_BYTES = 64 * 1024 * 1024
+MIN_TIMESTAMP = pd.Timestamp('2000-01-01')  # Avant: erreur d'unité ou horloge non réglée
+MAX_FUTURE = pd.Timedelta(days=1)           # Après maintenant + MAX_FUTURE: horloge déréglée
+AWARE_PATTERN = r'(?:Z|[+-]\d{2}:?\d{2})$'  # Suffixe de fuseau d'une chaîne ISO 8601
+
+# Epoch unix: unité déduite de l'ordre de grandeur (secondes jusqu'à 1e11, soit l'an 5138)
+EPOCH_UNITS = ((1e11, 1_000_000_000), (1e14, 1_000_000), (1e17, 1_000))
+
+def local_timezone(name=None):
+    """Fuseau IANA (ex. 'Europe/Paris'), ou fuseau du système si None"""
+    return ZoneInfo(name) if name else dateutil_tz.tzlocal()
+
+def _epoch_to_ns(epochs):
+    """Epochs unix (float64, unité selon l'ordre de grandeur) -> int64 ns UTC"""
+    magnitude = np.abs(epochs)
+    scale = np.select([magnitude < limit for limit, _ in EPOCH_UNITS], [factor for _, factor in EPOCH_UNITS], 1)
+    # Entiers multipliés en int64: pas d'arrondi flottant sur les ms / µs
+    integral = epochs == np.floor(epochs)
+    return np.where(integral, epochs.astype(np.int64) * scale, np.round(epochs * scale).astype(np.int64))
+
+def parse_timestamps(values, timezone=None):
+    """
+    Convertit une colonne de timestamps en heure locale naïve (comme les CSV)
+
+    Args:
+        values: Series d'epochs unix (s, ms, µs ou ns) et / ou de chaînes de date
+        timezone: fuseau local (local_timezone()), défaut: fuseau du système
+
+    Returns:
+        Series datetime64[ns] naïve (NaT si illisible)
+    """
+    timezone = timezone or local_timezone()
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    numeric = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+    epoch = np.isfinite(numeric) & (np.abs(numeric) < 2 ** 62)
+    if epoch.any():
+        utc = pd.to_datetime(pd.Series(_epoch_to_ns(numeric[epoch]), index=values.index[epoch]), unit='ns', utc=True)
+        parsed[epoch] = utc.dt.tz_convert(timezone).dt.tz_localize(None).astype('datetime64[ns]')
+
+    text = values[~epoch & values.notna().to_numpy()].astype('string').str.strip()
+    aware = text.str.contains(AWARE_PATTERN, regex=True).fillna(False).to_numpy(dtype=bool)
+    if (~aware).any():
+        parsed[text.index[~aware]] = pd.to_datetime(text[~aware], errors='coerce').astype('datetime64[ns]')
+    if aware.any():
+        converted = pd.to_datetime(text[aware], errors='coerce', utc=True).dt.tz_convert(timezone)
+        parsed[text.index[aware]] = converted.dt.tz_localize(None).astype('datetime64[ns]')
+    return parsed
+
+def parse_batch(body, content_type):
+    """
+    Parse un lot NDJSON ou CSV en DataFrame
+
+    Le format est déduit du Content-Type, sinon du premier caractère ('{' = NDJSON).
+    """
+    if not body.strip():
+        return pd.DataFrame()
+    content_type = (content_type or '').lower()
+    if 'csv' in content_type:
+        is_ndjson = False
+    elif 'json' in content_type:
+        is_ndjson = True
+    else:
+        is_ndjson = body.lstrip()[:1] == b'{'
+
+    if is_ndjson:
+        return pd.read_json(io.BytesIO(body), lines=True, dtype=False, convert_dates=False)
+    return pd.read_csv(io.BytesIO(body))
+
+def validate_batch(df, room_name=None, timezone=None):
+    """
+    Valide un lot de manière vectorisée
+
+    Args:
+        df: DataFrame brut (colonnes détectées via COLUMN_MAPPINGS)
+        room_name: room imposée par l'URL, sinon colonne 'room' du lot
+        timezone: fuseau des CSV (parse_timestamps)
+
+    Returns:
+        (dict room -> colonnes valides, nombre de lignes rejetées)
+
+    Raises:
+        ValueError: colonnes introuvables, room absente, ou dates hors plage
+    """
+    timestamp_col = detect_column(df, 'timestamp')
+    temperature_col = detect_column(df, 'temperature')
+    if timestamp_col is None or temperature_col is None:
+        raise ValueError(f"Colonnes timestamp/température introuvables: {list(df.columns)}")
+    humidity_col = detect_column(df, 'humidity')
+
+    timestamps = parse_timestamps(df[timestamp_col], timezone)
+    latest = pd.Timestamp.now(tz=timezone or local_timezone()).tz_localize(None) + MAX_FUTURE
+    implausible = timestamps.notna() & ((timestamps < MIN_TIMESTAMP) | (timestamps > latest))
+    if implausible.any():
+        example = df[timestamp_col][implausible].iloc[0]
+        raise ValueError(f"{int(implausible.sum())} timestamp(s) hors de [{MIN_TIMESTAMP.date()}, {latest.date()}] "
+                         f"(ex: {example} -> {timestamps[implausible].iloc[0]}); lot refusé")
+    temps = pd.to_numeric(df[temperature_col], errors='coerce').to_numpy(dtype=np.float32)
+    valid = timestamps.notna().to_numpy() & np.isfinite(temps) & (temps >= TEMP_MIN) & (temps <= TEMP_MAX)
+
+    hums = None
+    if humidity_col is not None:
+        hums = pd.to_numeric(df[humidity_col], errors='coerce').to_numpy(dtype=np.float32)
+        # Humidité absente tolérée (NaN), mais hors [0, 100] = mesure rejetée
+        valid &= np.isnan(hums) | ((hums >= 0.0) & (hums <= 100.0))
+
+    if room_name is not None:
+        rooms = np.full(len(df), room_name, dtype=object)
+    elif 'room' in df.columns:
+        rooms = df['room'].astype(str).str.lower().to_numpy(dtype=object)
+    else:
+        raise ValueError("Room non précisée: utilisez /ingest/<room> ou un champ 'room'")
+
+    ts_values = timestamps.to_numpy().astype('datetime64[ns]').view(np.int64)
+    batch = {}
+    for name in pd.unique(rooms[valid]):
+        if not ROOM_NAME_PATTERN.match(name):
+            valid &= rooms != name
+            continue
+        selected = valid & (rooms == name)
+        batch[name] = {
+            'timestamp': ts_values[selected],
+            'temperature': temps[selected],
+            'humidity': hums[selected] if hums is not None else None
+        }
+    return batch, int((~valid).sum())
+
+class IngestBuffer:
+    """
+    Buffer mémoire borné des mesures en attente d'écriture
+
+    Les lots acceptés sont empilés par room; un thread de flush les concatène
+    et les écrit dans le store en un seul appel à append_readings.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, max_rows=MAX_BUFFERED_ROWS,
+                 flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL):
+        self.store_dir = store_dir
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._pending_rows = 0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+        self.metrics = {
+            'started_at': time.time(),
+            'accepted_rows': 0,
+            'rejected_rows': 0,
+            'throttled_requests': 0,
+            'flushed_rows': 0,
+            'flush_count': 0,
+            'flush_errors': 0,
+            'last_flush_seconds': None,
+            'max_flush_seconds': 0.0,
+            'total_flush_seconds': 0.0
+        }
+
+    def offer(self, batch, rejected=0):
+        """
+        Ajoute un lot validé au buffer
+
+        Returns:
+            False si le buffer est plein (le lot entier est refusé)
+        """
+        rows = sum(len(columns['timestamp']) for columns in batch.values())
+        with self._condition:
+            self.metrics['rejected_rows'] += rejected
+            if self._pending_rows + rows > self.max_rows:
+                self.metrics['throttled_requests'] += 1
+                return False
+            for room_name, columns in batch.items():
+                self._pending.setdefault(room_name, []).append(columns)
+            self._pending_rows += rows
+            self.metrics['accepted_rows'] += rows
+            if self._pending_rows >= self.flush_rows:
+                self._condition.notify()
+        return True
+
+    def flush(self):
+        """Écrit tout le contenu du buffer dans le store; retourne le nombre de lignes"""
+        with self._flush_lock:
+            with self._condition:
+                pending, self._pending = self._pending, {}
+                rows = self._pending_rows
+            if not pending:
+                return 0
+
+            batch = {}
+            for room_name, chunks in pending.items():
+                columns = {}
+                for column in ('timestamp', 'temperature', 'humidity'):
+                    parts = [chunk[column] for chunk in chunks]
+                    if column == 'humidity':
+                        if all(part is None for part in parts):
+                            continue
+                        parts = [np.full(len(chunk['timestamp']), np.nan, dtype=np.float32)
+                                 if part is None else part for chunk, part in zip(chunks, parts)]
+                    columns[column] = np.concatenate(parts)
+                batch[room_name] = columns
+
+            start = time.perf_counter()
+            try:
+                append_readings(batch, self.store_dir)
+            except Exception as e:
+                # Remettre les lignes en tête du buffer: la capacité reste occupée,
+                # les clients reçoivent 429 tant que le disque refuse les écritures
+                print(f"[ERROR] Flush échoué ({rows} lignes remises en attente): {e}")
+                with self._condition:
+                    self.metrics['flush_errors'] += 1
+                    for room_name, chunks in pending.items():
+                        self._pending[room_name] = chunks + self._pending.get(room_name, [])
+                return 0
+            elapsed = time.perf_counter() - start
+
+            with self._condition:
+                # Libérer la capacité seulement une fois les lignes écrites sur disque
+                self._pending_rows -= rows
+                self.metrics['flushed_rows'] += rows
+                self.metrics['flush_count'] += 1
+                self.metrics['last_flush_seconds'] = elapsed
+                self.metrics['max_flush_seconds'] = max(self.metrics['max_flush_seconds'], elapsed)
+                self.metrics['total_flush_seconds'] += elapsed
+            return rows
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopped and self._pending_rows < self.flush_rows:
+                    self._condition.wait(self.flush_interval)
+                stopped = self._stopped
+            self.flush()
+            if stopped:
+                return
+
+    def start(self):
+        """Démarre le thread de flush"""
+        self._thread = threading.Thread(target=self._run, name='ingest-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Arrête le thread de flush après un dernier flush"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def snapshot(self):
+        """Métriques courantes (débit, latence de flush, remplissage du buffer)"""
+        with self._condition:
+            metrics = dict(self.metrics)
+            metrics['buffered_rows'] = self._pending_rows
+        uptime = time.time() - metrics.pop('started_at')
+        metrics['uptime_seconds'] = uptime
+        metrics['max_buffered_rows'] = self.max_rows
+        metrics['accepted_rows_per_second'] = metrics['accepted_rows'] / uptime if uptime > 0 else 0.0
+        metrics['avg_flush_seconds'] = (metrics['total_flush_seconds'] / metrics['flush_count']
+                                        if metrics['flush_count'] else None)
+        return metrics
+
+def create_app(buffer=None, timezone=None):
+    """Crée l'application Flask d'ingestion (buffer démarré par l'appelant)"""
+    app = Flask(__name__)
+    timezone = timezone or local_timezone()
+    app.config['MAX_CONTENT_LENGTH'] = MAX_BATCH_BYTES
+    buffer = buffer or IngestBuffer()
+    app.config['INGEST_BUFFER'] = buffer
+
+    def ingest(room_name=None):
+        if room_name is not None:
+            room_name = room_name.lower()
+            if not ROOM_NAME_PATTERN.match(room_name):
+                return jsonify(error=f"Nom de room invalide: '{room_name}'"), 400
+        try:
+            df = parse_batch(request.get_data(cache=False), request.content_type)
+            if df.empty:
+                return jsonify(accepted=0, rejected=0), 202
+            batch, rejected = validate_batch(df, room_name, timezone)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+
+        if not buffer.offer(batch, rejected):
+            response = jsonify(error="Buffer plein, réessayez plus tard")
+            response.headers['Retry-After'] = str(max(1, int(buffer.flush_interval)))
+            return response, 429
+        accepted = sum(len(columns['timestamp']) for columns in batch.values())
+        return jsonify(accepted=accepted, rejected=rejected), 202
+
+    app.add_url_rule('/ingest', 'ingest', ingest, methods=['POST'])
+    app.add_url_rule('/ingest/<room_name>', 'ingest_room', ingest, methods=['POST'])
+
+    @app.route('/metrics')
+    def metrics():
+        return jsonify(buffer.snapshot())
+
+    @app.route('/health')
+    def health():
+        return jsonify(status='ok')
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Service HTTP d'ingestion des mesures")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--max-buffered-rows', type=int, default=MAX_BUFFERED_ROWS)
+    parser.add_argument('--flush-rows', type=int, default=FLUSH_ROWS)
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL)
+    parser.add_argument('--timezone', help="Fuseau des CSV pour les epochs et dates avec fuseau "
+                                           "(ex. Europe/Paris, défaut: fuseau du système)")
+    args = parser.parse_args()
+
+    buffer = IngestBuffer(args.store_dir, args.max_buffered_rows, args.flush_rows, args.flush_interval)
+    buffer.start()
+    app = create_app(buffer, local_timezone(args.timezone))
+
+    print(f"[OK] Ingestion sur http://{args.host}:{args.port}/ingest -> {args.store_dir}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
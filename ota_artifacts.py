@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Artefacts binaires versionnés pour la mise à jour over-the-air du M5Stack
+En plus de neural_weights.h / csv_data.h (compilés dans le firmware), le
+pipeline publie les mêmes données en blobs binaires little-endian, dans le
+layout des tableaux C, pour qu'un appareil puisse les télécharger (ota_server.py)
+et les copier tels quels en mémoire.
+
+Chaque blob est adressé par son contenu: version = sha256 tronqué du blob.
+Une publication identique à la précédente ne crée pas de nouvelle version,
+donc un appareil à jour reçoit 304 Not Modified. Une copie gzip est écrite à
+côté de chaque blob, et les KEEP_VERSIONS dernières versions sont conservées.
+
+Layout:
+    ota/manifest.json               version courante et versions conservées
+    ota/weights-<version>.bin[.gz]  poids (export_weights_for_esp32)
+    ota/history-<version>.bin[.gz]  historique (export_csv_to_arduino)
+
+Blob 'weights' (format WEIGHTS_FORMAT, tête dense):
+    en-tête <4s H H H H>: magic 'PTWB', format, entrées (5), neurones cachés (32), rooms (N)
+    float32: W0[5][32], BIAS0[32], W1[32][32], BIAS1[32], W2[32][N], BIAS2[N]
+
+Blob 'weights' (format FACTORIZED_WEIGHTS_FORMAT, tête factorisée de rang k):
+    même en-tête, suivi de <H H>: rang (k), réservé
+    float32: W0[5][32], BIAS0[32], W1[32][32], BIAS1[32], W2[32][k], BIAS2[k],
+             ROOM_W[N][k], ROOM_BIAS[N]
+
+Blob 'weights' (format SHARDED_WEIGHTS_FORMAT, modèle shardé, S shards de M rooms au plus):
+    même en-tête, suivi de <H H>: shards (S), rooms par shard (M)
+    float32: W0[S][5][32], BIAS0[S][32], W1[S][32][32], BIAS1[S][32],
+             W2[S][32][M], BIAS2[S][M] (colonnes au-delà des rooms du shard à zéro)
+    int32: ROOM_SHARD[N], ROOM_SLOT[N]
+
+Blob 'history' (format HISTORY_FORMAT):
+    en-tête <4s H H H H>: magic 'PTCH', format, rooms (N), périodes (P), réservé
+    uint32 total_points[P]
+    pour chaque période p: float32 temps[total_p], float32 hours[total_p],
+                           int32 offsets[N], int32 sizes[N]
+"""
+
+import os
+import json
+import gzip
+import struct
+import hashlib
+from datetime import datetime
+import numpy as np
+
+OTA_DIR = 'ota'
+MANIFEST_FILE = 'manifest.json'
+KEEP_VERSIONS = 5
+ARTIFACT_KINDS = ('weights', 'history')
+
+HEADER_STRUCT = struct.Struct('<4sHHHH')
+WEIGHTS_MAGIC = b'PTWB'
+WEIGHTS_FORMAT = 1
+FACTORIZED_WEIGHTS_FORMAT = 2
+RANK_STRUCT = struct.Struct('<HH')
+SHARDED_WEIGHTS_FORMAT = 3
+SHARDS_STRUCT = struct.Struct('<HH')
+HISTORY_MAGIC = b'PTCH'
+HISTORY_FORMAT = 1
+
+def _float32(values):
+    return np.ascontiguousarray(values, dtype='<f4').tobytes()
+
+def encode_weights(weights):
+    """
+    Sérialise les tableaux du modèle: W0, BIAS0, W1, BIAS1, W2, BIAS2, plus
+    ROOM_W, ROOM_BIAS pour une tête factorisée (8 tableaux Keras)
+
+    Returns:
+        bytes du blob 'weights'
+    """
+    W0, BIAS0, W1, BIAS1, W2, BIAS2 = weights[:6]
+    num_inputs, hidden = W0.shape
+    if len(weights) == 8:
+        ROOM_W, ROOM_BIAS = weights[6:]
+        header = (HEADER_STRUCT.pack(WEIGHTS_MAGIC, FACTORIZED_WEIGHTS_FORMAT, num_inputs, hidden, ROOM_W.shape[1])
+                  + RANK_STRUCT.pack(W2.shape[1], 0))
+        # ROOM_W transposé: une ligne de k poids par room, comme dans neural_weights.h
+        arrays = (W0, BIAS0, W1, BIAS1, W2, BIAS2, np.transpose(ROOM_W), ROOM_BIAS)
+    else:
+        header = HEADER_STRUCT.pack(WEIGHTS_MAGIC, WEIGHTS_FORMAT, num_inputs, hidden, W2.shape[1])
+        arrays = (W0, BIAS0, W1, BIAS1, W2, BIAS2)
+    return header + b''.join(_float32(array) for array in arrays)
+
+def decode_weights(blob):
+    """Relit un blob 'weights' (vérification, tests de bout en bout), dans le layout Keras"""
+    magic, version, num_inputs, hidden, num_rooms = HEADER_STRUCT.unpack_from(blob)
+    if magic != WEIGHTS_MAGIC or version not in (WEIGHTS_FORMAT, FACTORIZED_WEIGHTS_FORMAT):
+        raise ValueError(f"Blob de poids invalide (magic={magic!r}, format={version})")
+    offset = HEADER_STRUCT.size
+    if version == FACTORIZED_WEIGHTS_FORMAT:
+        rank, _ = RANK_STRUCT.unpack_from(blob, offset)
+        offset += RANK_STRUCT.size
+        shapes = [(num_inputs, hidden), (hidden,), (hidden, hidden), (hidden,), (hidden, rank), (rank,),
+                  (num_rooms, rank), (num_rooms,)]
+    else:
+        shapes = [(num_inputs, hidden), (hidden,), (hidden, hidden), (hidden,), (hidden, num_rooms), (num_rooms,)]
+    arrays = []
+    for shape in shapes:
+        count = int(np.prod(shape))
+        arrays.append(np.frombuffer(blob, dtype='<f4', count=count, offset=offset).reshape(shape))
+        offset += 4 * count
+    if version == FACTORIZED_WEIGHTS_FORMAT:
+        arrays[6] = arrays[6].T
+    return arrays
+
+def encode_sharded_weights(shards_weights, room_shard, room_slot):
+    """
+    Sérialise un modèle shardé dans le layout du neural_weights.h shardé
+
+    Args:
+        shards_weights: par shard, W0, BIAS0, W1, BIAS1, W2, BIAS2 (layout Keras)
+        room_shard, room_slot: shard de chaque room et sa colonne dans le shard
+
+    Returns:
+        bytes du blob 'weights'
+    """
+    num_inputs, hidden = shards_weights[0][0].shape
+    shard_max_rooms = max(weights[5].shape[0] for weights in shards_weights)
+
+    def stacked(index):
+        arrays = [weights[index] for weights in shards_weights]
+        if index >= 4:
+            arrays = [np.pad(a, [(0, 0)] * (a.ndim - 1) + [(0, shard_max_rooms - a.shape[-1])]) for a in arrays]
+        return np.stack(arrays)
+
+    header = (HEADER_STRUCT.pack(WEIGHTS_MAGIC, SHARDED_WEIGHTS_FORMAT, num_inputs, hidden, len(room_shard))
+              + SHARDS_STRUCT.pack(len(shards_weights), shard_max_rooms))
+    return (header + b''.join(_float32(stacked(i)) for i in range(6))
+            + np.ascontiguousarray(room_shard, dtype='<i4').tobytes()
+            + np.ascontiguousarray(room_slot, dtype='<i4').tobytes())
+
+def decode_sharded_weights(blob):
+    """
+    Relit un blob 'weights' shardé
+
+    Returns:
+        dict des tableaux du header (W0 ... BIAS2, ROOM_SHARD, ROOM_SLOT),
+        utilisable par ShardedModel.from_header
+    """
+    magic, version, num_inputs, hidden, num_rooms = HEADER_STRUCT.unpack_from(blob)
+    if magic != WEIGHTS_MAGIC or version != SHARDED_WEIGHTS_FORMAT:
+        raise ValueError(f"Blob de poids shardé invalide (magic={magic!r}, format={version})")
+    num_shards, shard_max_rooms = SHARDS_STRUCT.unpack_from(blob, HEADER_STRUCT.size)
+    offset = HEADER_STRUCT.size + SHARDS_STRUCT.size
+    arrays = {}
+    for name, dtype, shape in (('W0', '<f4', (num_shards, num_inputs, hidden)), ('BIAS0', '<f4', (num_shards, hidden)),
+                               ('W1', '<f4', (num_shards, hidden, hidden)), ('BIAS1', '<f4', (num_shards, hidden)),
+                               ('W2', '<f4', (num_shards, hidden, shard_max_rooms)),
+                               ('BIAS2', '<f4', (num_shards, shard_max_rooms)),
+                               ('ROOM_SHARD', '<i4', (num_rooms,)), ('ROOM_SLOT', '<i4', (num_rooms,))):
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(blob, dtype=dtype, count=count, offset=offset).reshape(shape)
+        offset += 4 * count
+    return arrays
+
+def encode_history(rooms_samples):
+    """
+    Sérialise l'historique échantillonné (même contenu que csv_data.h)
+
+    Args:
+        rooms_samples: par room, liste par période de dict 'temps' / 'hours'
+            (export_csv_to_arduino_v2.sample_room_periods)
+
+    Returns:
+        bytes du blob 'history'
+    """
+    num_rooms = len(rooms_samples)
+    num_periods = len(rooms_samples[0]) if num_rooms else 0
+    sections = []
+    totals = []
+    for period_idx in range(num_periods):
+        sizes = np.array([len(samples[period_idx]['temps']) for samples in rooms_samples], dtype='<i4')
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype('<i4')
+        totals.append(int(sizes.sum()))
+        sections.append(_float32(np.concatenate([samples[period_idx]['temps'] for samples in rooms_samples])))
+        sections.append(_float32(np.concatenate([samples[period_idx]['hours'] for samples in rooms_samples])))
+        sections.append(offsets.tobytes() + sizes.tobytes())
+    header = HEADER_STRUCT.pack(HISTORY_MAGIC, HISTORY_FORMAT, num_rooms, num_periods, 0)
+    return header + np.array(totals, dtype='<u4').tobytes() + b''.join(sections)
+
+def decode_history(blob):
+    """
+    Relit un blob 'history'
+
+    Returns:
+        liste par période de dict 'temps', 'hours', 'offsets', 'sizes'
+    """
+    magic, version, num_rooms, num_periods, _ = HEADER_STRUCT.unpack_from(blob)
+    if magic != HISTORY_MAGIC or version != HISTORY_FORMAT:
+        raise ValueError(f"Blob d'historique invalide (magic={magic!r}, format={version})")
+    offset = HEADER_STRUCT.size
+    totals = np.frombuffer(blob, dtype='<u4', count=num_periods, offset=offset)
+    offset += 4 * num_periods
+    periods = []
+    for total in totals:
+        period = {}
+        for name, dtype, count in (('temps', '<f4', total), ('hours', '<f4', total),
+                                   ('offsets', '<i4', num_rooms), ('sizes', '<i4', num_rooms)):
+            period[name] = np.frombuffer(blob, dtype=dtype, count=int(count), offset=offset)
+            offset += 4 * int(count)
+        periods.append(period)
+    return periods
+
+# ============================================================================
+# PUBLICATION
+# ============================================================================
+
+def artifact_filename(kind, version):
+    return f"{kind}-{version}.bin"
+
+def load_manifest(ota_dir=OTA_DIR):
+    """Manifeste des artefacts publiés ({} si aucun)"""
+    path = os.path.join(ota_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def publish_artifact(kind, blob, ota_dir=OTA_DIR, **metadata):
+    """
+    Publie un blob comme nouvelle version courante de `kind`
+
+    Returns:
+        entrée du manifeste (version, fichier, tailles, sha256...)
+    """
+    if kind not in ARTIFACT_KINDS:
+        raise ValueError(f"Type d'artefact inconnu: {kind}")
+    os.makedirs(ota_dir, exist_ok=True)
+    digest = hashlib.sha256(blob).hexdigest()
+    version = digest[:16]
+    manifest = load_manifest(ota_dir)
+    current = manifest.get(kind)
+    if current is not None and current['version'] == version:
+        print(f"[OTA] {kind}: inchangé (version {version})")
+        return current
+
+    filename = artifact_filename(kind, version)
+    path = os.path.join(ota_dir, filename)
+    _write_atomic(path, blob)
+    compressed = gzip.compress(blob, compresslevel=9, mtime=0)
+    _write_atomic(path + '.gz', compressed)
+
+    previous = ([current['version']] + current.get('previous', [])) if current else []
+    entry = {
+        'version': version,
+        'file': filename,
+        'size': len(blob),
+        'gzip_size': len(compressed),
+        'sha256': digest,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        **metadata,
+        'previous': [v for v in previous if v != version][:KEEP_VERSIONS - 1]
+    }
+    manifest[kind] = entry
+    _write_atomic(os.path.join(ota_dir, MANIFEST_FILE),
+                  json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+
+    # Supprimer les versions qui ne sont plus référencées
+    kept = {artifact_filename(kind, v) for v in [version] + entry['previous']}
+    for name in os.listdir(ota_dir):
+        base = name[:-3] if name.endswith('.gz') else name
+        if base.startswith(f"{kind}-") and base.endswith('.bin') and base not in kept:
+            os.remove(os.path.join(ota_dir, name))
+
+    print(f"[OTA] {kind}: version {version} ({len(blob) / 1024:.1f} KB, gzip {len(compressed) / 1024:.1f} KB)")
+    return entry
+
+def publish_weights(weights, ota_dir=OTA_DIR):
+    """Publie les poids du modèle (layout de neural_weights.h)"""
+    factorized = len(weights) == 8
+    metadata = {'output_rank': int(weights[5].shape[0])} if factorized else {}
+    return publish_artifact('weights', encode_weights(weights), ota_dir,
+                            num_rooms=int(weights[-1].shape[0]),
+                            format=FACTORIZED_WEIGHTS_FORMAT if factorized else WEIGHTS_FORMAT, **metadata)
+
+def publish_sharded_weights(model, ota_dir=OTA_DIR):
+    """Publie les poids d'un ShardedModel (layout du neural_weights.h shardé)"""
+    room_shard, room_slot = model.room_index()
+    blob = encode_sharded_weights([shard['weights'] for shard in model.shards], room_shard, room_slot)
+    return publish_artifact('weights', blob, ota_dir, num_rooms=int(model.num_rooms),
+                            format=SHARDED_WEIGHTS_FORMAT, num_shards=int(model.num_shards))
+
+def publish_history(rooms_samples, ota_dir=OTA_DIR):
+    """Publie l'historique échantillonné (layout de csv_data.h)"""
+    return publish_artifact('history', encode_history(rooms_samples), ota_dir,
+                            num_rooms=len(rooms_samples), format=HISTORY_FORMAT)
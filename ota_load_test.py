@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Test de charge du serveur OTA avec de nombreux appareils simulés
+Chaque appareil simulé (un thread, une connexion HTTP keep-alive) interroge
+périodiquement /manifest avec If-None-Match, puis télécharge uniquement les
+artefacts dont la version a changé:
+- en entier, compressé gzip pour une partie des appareils
+- ou en deux requêtes Range (téléchargement interrompu puis repris)
+Le contenu reçu est vérifié (sha256 du manifeste).
+
+Sans --url, un serveur local est démarré sur une copie temporaire des
+artefacts (--ota-dir, ou artefacts synthétiques s'il est vide), et une
+nouvelle version des poids y est publiée toutes les --publish-every secondes
+pour simuler un réentraînement pendant le test.
+
+Usage:
+    python ota_load_test.py --devices 200 --duration 20
+    python ota_load_test.py --url http://192.168.1.10:5002 --devices 50
+"""
+
+import os
+import gzip
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import http.client
+from urllib.parse import urlsplit
+import numpy as np
+
+from ota_artifacts import MANIFEST_FILE, OTA_DIR, load_manifest, publish_history, publish_weights
+
+DEFAULT_DEVICES = 100
+DEFAULT_DURATION = 10.0
+POLL_INTERVAL = 0.5        # secondes entre deux interrogations d'un appareil
+RESUME_FRACTION = 0.2      # part des téléchargements interrompus puis repris par Range
+GZIP_FRACTION = 0.5        # part des appareils qui acceptent gzip
+PUBLISH_EVERY = 3.0        # nouvelle version des poids (serveur local uniquement)
+
+class LoadStats:
+    """Compteurs partagés par les appareils simulés"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.status = {}
+        self.bytes_received = 0
+        self.downloads = 0
+        self.errors = {}
+
+    def record(self, kind, status, seconds, received):
+        with self._lock:
+            self.latencies.setdefault(kind, []).append(seconds)
+            self.status[status] = self.status.get(status, 0) + 1
+            self.bytes_received += received
+
+    def error(self, reason):
+        with self._lock:
+            self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def downloaded(self):
+        with self._lock:
+            self.downloads += 1
+
+class SimulatedDevice:
+    def __init__(self, device_id, host, port, stats, accept_gzip, resume_fraction, seed):
+        self.device_id = device_id
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.accept_gzip = accept_gzip
+        self.resume_fraction = resume_fraction
+        self.rng = random.Random(seed)
+        self.manifest_etag = None
+        self.versions = {}
+        self.connection = None
+
+    def request(self, kind, path, headers):
+        """GET sur la connexion keep-alive (reconnexion si le serveur l'a fermée)"""
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+            start = time.perf_counter()
+            try:
+                self.connection.request('GET', path, headers=headers)
+                response = self.connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+                continue
+            self.stats.record(kind, response.status, time.perf_counter() - start, len(body))
+            return response, body
+
+    def download(self, kind, entry):
+        path = f"/artifacts/{kind}/{entry['version']}"
+        if entry['size'] > 1 and self.rng.random() < self.resume_fraction:
+            # Téléchargement interrompu à mi-parcours puis repris
+            half = entry['size'] // 2
+            first, head = self.request('range', path, {'Range': f"bytes=0-{half - 1}"})
+            second, tail = self.request('range', path, {'Range': f"bytes={half}-"})
+            if first.status != 206 or second.status != 206:
+                self.stats.error('range sans 206')
+                return
+            blob = head + tail
+        else:
+            headers = {'Accept-Encoding': 'gzip'} if self.accept_gzip else {}
+            response, blob = self.request('artifact', path, headers)
+            if response.status != 200:
+                self.stats.error(f"artefact {response.status}")
+                return
+            if response.getheader('Content-Encoding') == 'gzip':
+                blob = gzip.decompress(blob)
+
+        if hashlib.sha256(blob).hexdigest() != entry['sha256']:
+            self.stats.error('sha256')
+            return
+        self.versions[kind] = entry['version']
+        self.stats.downloaded()
+
+    def poll(self):
+        headers = {'If-None-Match': f'"{self.manifest_etag}"'} if self.manifest_etag else {}
+        response, body = self.request('manifest', '/manifest', headers)
+        if response.status == 304:
+            return
+        if response.status != 200:
+            self.stats.error(f"manifest {response.status}")
+            return
+        manifest = json.loads(body)
+        for kind, entry in manifest.items():
+            if self.versions.get(kind) != entry['version']:
+                self.download(kind, entry)
+        # Un téléchargement en échec sera retenté à la prochaine interrogation
+        if all(self.versions.get(kind) == entry['version'] for kind, entry in manifest.items()):
+            self.manifest_etag = (response.getheader('ETag') or '').strip('"') or None
+
+    def run(self, deadline, poll_interval):
+        # Démarrages étalés sur le premier intervalle (pas tous à la même milliseconde)
+        time.sleep(self.rng.uniform(0, poll_interval))
+        while time.monotonic() < deadline:
+            try:
+                self.poll()
+            except (http.client.HTTPException, OSError, ValueError) as e:
+                self.stats.error(type(e).__name__)
+            time.sleep(poll_interval * self.rng.uniform(0.5, 1.5))
+        if self.connection is not None:
+            self.connection.close()
+
+# ============================================================================
+# SERVEUR LOCAL
+# ============================================================================
+
+def _synthetic_weights(num_rooms, rng):
+    shapes = [(5, 32), (32,), (32, 32), (32,), (32, num_rooms), (num_rooms,)]
+    return [rng.normal(0, 0.3, shape).astype(np.float32) for shape in shapes]
+
+def prepare_ota_dir(source_dir, target_dir, num_rooms, rng):
+    """Copie les artefacts existants, ou en publie des synthétiques"""
+    if load_manifest(source_dir):
+        for name in os.listdir(source_dir):
+            if name == MANIFEST_FILE or name.endswith(('.bin', '.bin.gz')):
+                shutil.copy2(os.path.join(source_dir, name), target_dir)
+        print(f"[INFO] Artefacts copiés depuis {source_dir}/")
+        return
+    from export_csv_to_arduino_v2 import PERIODS
+    print(f"[INFO] Aucun artefact dans {source_dir}/: artefacts synthétiques ({num_rooms} rooms)")
+    publish_weights(_synthetic_weights(num_rooms, rng), target_dir)
+    publish_history([[{'temps': rng.normal(21, 2, p['max_points']), 'hours': np.linspace(p['hours'], 0, p['max_points'])}
+                      for p in PERIODS] for _ in range(num_rooms)], target_dir)
+
+def start_local_server(ota_dir):
+    """Serveur OTA dans un thread (port libre)"""
+    import logging
+    from werkzeug.serving import make_server
+    from ota_server import create_app
+    # Une ligne de journal par requête fausserait les latences mesurées
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, create_app(ota_dir), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='ota-server', daemon=True)
+    thread.start()
+    return server
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+def print_load_report(stats, elapsed, devices):
+    total = sum(len(v) for v in stats.latencies.values())
+    print(f"\n{'='*80}\nTEST DE CHARGE OTA: {devices} appareils, {elapsed:.1f}s\n{'='*80}")
+    print(f"{'Requête':<12}{'Nombre':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}")
+    print('-' * 58)
+    for kind, values in sorted(stats.latencies.items()):
+        print(f"{kind:<12}{len(values):>10}{_percentile(values, 50):>12.1f}"
+              f"{_percentile(values, 95):>12.1f}{_percentile(values, 99):>12.1f}")
+    print('-' * 58)
+    print(f"[INFO] {total} requêtes, {total / elapsed:.0f} req/s, "
+          f"{stats.bytes_received / 1024 / 1024:.2f} MB reçus ({stats.bytes_received / 1024 / 1024 / elapsed:.2f} MB/s)")
+    print(f"[INFO] Statuts: " + ', '.join(f"{status}={count}" for status, count in sorted(stats.status.items())))
+    print(f"[INFO] {stats.downloads} artefacts téléchargés et vérifiés")
+    not_modified = stats.status.get(304, 0)
+    if total:
+        print(f"[INFO] {100 * not_modified / total:.0f}% des requêtes servies en 304 (rien à télécharger)")
+    if stats.errors:
+        print(f"[ERROR] Erreurs: " + ', '.join(f"{reason}={count}" for reason, count in stats.errors.items()))
+    else:
+        print("[OK] Aucune erreur")
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du serveur OTA")
+    parser.add_argument('--url', help="Serveur existant (défaut: serveur local temporaire)")
+    parser.add_argument('--ota-dir', default=OTA_DIR, help="Artefacts servis par le serveur local")
+    parser.add_argument('--devices', type=int, default=DEFAULT_DEVICES)
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION)
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--resume-fraction', type=float, default=RESUME_FRACTION)
+    parser.add_argument('--gzip-fraction', type=float, default=GZIP_FRACTION)
+    parser.add_argument('--publish-every', type=float, default=PUBLISH_EVERY,
+                        help="Publier de nouveaux poids toutes les N secondes (serveur local, 0: jamais)")
+    parser.add_argument('--rooms', type=int, default=10, help="Rooms des artefacts synthétiques")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Écrire les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    server = tmp_dir = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix='ota_load_')
+        prepare_ota_dir(args.ota_dir, tmp_dir, args.rooms, rng)
+        server = start_local_server(tmp_dir)
+        host, port = '127.0.0.1', server.server_port
+        print(f"[OK] Serveur local sur http://{host}:{port}")
+
+    stats = LoadStats()
+    devices = [SimulatedDevice(i, host, port, stats, i < args.devices * args.gzip_fraction,
+                               args.resume_fraction, args.seed + i) for i in range(args.devices)]
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=device.run, args=(deadline, args.poll_interval), daemon=True)
+               for device in devices]
+    for thread in threads:
+        thread.start()
+
+    publications = 0
+    try:
+        while server is not None and args.publish_every > 0 and time.monotonic() + args.publish_every < deadline:
+            time.sleep(args.publish_every)
+            num_rooms = load_manifest(tmp_dir).get('weights', {}).get('num_rooms', args.rooms)
+            publish_weights(_synthetic_weights(num_rooms, rng), tmp_dir)
+            publications += 1
+        for thread in threads:
+            thread.join()
+    finally:
+        if server is not None:
+            server.shutdown()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    elapsed = time.monotonic() - start
+    print_load_report(stats, elapsed, args.devices)
+    if publications:
+        print(f"[INFO] {publications} nouvelles versions des poids publiées pendant le test")
+
+    if args.json:
+        result = {
+            'devices': args.devices, 'seconds': elapsed, 'publications': publications,
+            'requests': {kind: {'count': len(values), 'p50_ms': _percentile(values, 50),
+                                'p95_ms': _percentile(values, 95), 'p99_ms': _percentile(values, 99)}
+                         for kind, values in stats.latencies.items()},
+            'status': {str(status): count for status, count in stats.status.items()},
+            'bytes_received': stats.bytes_received, 'downloads': stats.downloads, 'errors': stats.errors
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"[OK] Résultats: {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Serveur HTTP des artefacts OTA (poids et historique) pour les M5Stack
+Sert les blobs versionnés publiés par le pipeline (ota_artifacts.py) pour
+qu'un appareil ne télécharge que ce qui a changé depuis sa dernière mise à jour:
+- ETag = version du blob; If-None-Match -> 304 Not Modified
+- requêtes Range (reprise d'un téléchargement interrompu) -> 206
+- Accept-Encoding: gzip -> copie gzip précompressée (sans Range)
+
+Endpoints:
+    GET /manifest                     versions courantes (JSON, avec ETag)
+    GET /artifacts/<kind>             version courante de 'weights' ou 'history'
+    GET /artifacts/<kind>/<version>   version précise (immuable, cache long)
+    GET /metrics                      requêtes par statut, octets envoyés
+    GET /health
+
+Usage:
+    python ota_server.py [--port 5002] [--ota-dir ota]
+    python ota_load_test.py            # test de charge local
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from flask import Flask, Response, abort, jsonify, request, send_file
+
+from ota_artifacts import ARTIFACT_KINDS, OTA_DIR, artifact_filename, load_manifest
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+class ManifestCache:
+    """Manifeste relu seulement quand le fichier change (publication par le pipeline)"""
+
+    def __init__(self, ota_dir=OTA_DIR):
+        self.ota_dir = ota_dir
+        self._lock = threading.Lock()
+        self._key = None
+        self._manifest = {}
+        self._body = b'{}'
+        self._etag = None
+
+    def get(self):
+        """Returns: (manifest, corps JSON, etag)"""
+        path = os.path.join(self.ota_dir, 'manifest.json')
+        try:
+            stat = os.stat(path)
+            key = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            key = None
+        with self._lock:
+            if key != self._key or self._etag is None:
+                self._manifest = load_manifest(self.ota_dir) if key else {}
+                self._body = json.dumps(self._manifest, ensure_ascii=False).encode('utf-8')
+                self._etag = hashlib.sha256(self._body).hexdigest()[:16]
+                self._key = key
+            return self._manifest, self._body, self._etag
+
+class ServerMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.counts = {}
+
+    def record(self, endpoint, status, sent):
+        with self._lock:
+            counts = self.counts.setdefault(endpoint, {'requests': 0, 'bytes_sent': 0, 'status': {}})
+            counts['requests'] += 1
+            counts['bytes_sent'] += sent
+            counts['status'][str(status)] = counts['status'].get(str(status), 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = json.loads(json.dumps(self.counts))
+        return {'uptime_seconds': time.time() - self.started_at, 'endpoints': counts}
+
+def _not_modified(etags):
+    """True si l'appareil possède déjà l'une des représentations (If-None-Match)"""
+    return any(request.if_none_match.contains(etag) for etag in etags)
+
+def create_app(ota_dir=OTA_DIR):
+    app = Flask(__name__)
+    # send_file résout les chemins relatifs depuis le dossier de l'application
+    ota_dir = os.path.abspath(ota_dir)
+    manifests = ManifestCache(ota_dir)
+    metrics = ServerMetrics()
+
+    def serve_artifact(kind, version=None):
+        if kind not in ARTIFACT_KINDS:
+            abort(404)
+        manifest, _, _ = manifests.get()
+        entry = manifest.get(kind)
+        if entry is None:
+            abort(404)
+        if version is None:
+            version = entry['version']
+            cache_control = {'no_cache': True}
+        elif version in [entry['version']] + entry.get('previous', []):
+            cache_control = {'no_cache': None, 'public': True, 'max_age': IMMUTABLE_MAX_AGE, 'immutable': True}
+        else:
+            abort(404)
+
+        path = os.path.join(ota_dir, artifact_filename(kind, version))
+        gzip_path = path + '.gz'
+        use_gzip = ('Range' not in request.headers and request.accept_encodings['gzip'] > 0
+                    and os.path.exists(gzip_path))
+        etag = f"{version}-gz" if use_gzip else version
+
+        if _not_modified([version, f"{version}-gz"]):
+            response = Response(status=304)
+            response.set_etag(etag)
+        else:
+            try:
+                # conditional=True: Range -> 206 / 416 (Werkzeug)
+                response = send_file(gzip_path if use_gzip else path, mimetype='application/octet-stream',
+                                     conditional=True, etag=etag, max_age=None)
+            except FileNotFoundError:
+                abort(404)
+            if use_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+        for key, value in cache_control.items():
+            setattr(response.cache_control, key, value)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['X-Artifact-Version'] = version
+        if version == entry['version']:
+            response.headers['X-Artifact-Sha256'] = entry['sha256']
+        return response
+
+    @app.route('/manifest')
+    def manifest():
+        _, body, etag = manifests.get()
+        if _not_modified([etag]):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response
+
+    @app.route('/artifacts/<kind>')
+    def current_artifact(kind):
+        return serve_artifact(kind)
+
+    @app.route('/artifacts/<kind>/<version>')
+    def versioned_artifact(kind, version):
+        return serve_artifact(kind, version)
+
+    @app.route('/metrics')
+    def server_metrics():
+        return jsonify(metrics.snapshot())
+
+    @app.route('/health')
+    def health():
+        return jsonify({'status': 'ok'})
+
+    @app.after_request
+    def record(response):
+        if request.url_rule is not None and request.url_rule.endpoint not in ('server_metrics', 'health'):
+            metrics.record(request.url_rule.endpoint, response.status_code, response.content_length or 0)
+        return response
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur des artefacts OTA (poids / historique)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5002)
+    parser.add_argument('--ota-dir', default=OTA_DIR)
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.ota_dir)
+    if not manifest:
+        print(f"[WARN] Aucun artefact dans {args.ota_dir}/ (lancer l'entraînement ou l'export)")
+    for kind, entry in manifest.items():
+        print(f"[OK] {kind}: version {entry['version']} ({entry['size'] / 1024:.1f} KB)")
+
+    app = create_app(args.ota_dir)
+    print(f"[OK] Artefacts OTA sur http://{args.host}:{args.port}/artifacts/<kind>")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
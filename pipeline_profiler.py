@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation optionnelle des étapes du pipeline
+Chaque étape (chargement, features, fit, écriture du header...) enregistre
+temps mural, temps CPU, pic de RSS et nombre de lignes traitées. En fin de
+run: tableau récapitulatif + fichier Chrome trace (chrome://tracing, Perfetto).
+
+Désactivée par défaut: profile_stage() ne coûte alors qu'un test. Activation:
+    python train_model_with_date.py --profile [--cprofile] [--tracemalloc]
+    python export_csv_to_arduino_v2.py --profile
+    PREDICTEMP_PROFILE=1 (ou "cprofile,tracemalloc") pour les scripts lancés par la GUI
+
+Sorties dans profiles/:
+    <run>_trace.json                  étapes + courbe RSS, pour un trace viewer
+    <run>_<étape>.prof                cProfile (snakeviz, pstats), option --cprofile
+    <run>_<étape>.tracemalloc.txt     principales allocations, option --tracemalloc
+"""
+
+import os
+import json
+import time
+import threading
+import contextlib
+from datetime import datetime
+
+PROFILE_DIR = 'profiles'
+PROFILE_ENV = 'PREDICTEMP_PROFILE'
+TRACEMALLOC_TOP = 25
+
+# ============================================================================
+# MESURE MÉMOIRE
+# ============================================================================
+
+def current_rss_mb(pid=None):
+    """Mémoire résidente actuelle du processus (courant par défaut) en MB, ou None"""
+    try:
+        import psutil
+        try:
+            return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+        except psutil.Error:
+            return None
+    except ImportError:
+        pass
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class PeakRssSampler:
+    """
+    Échantillonne la RSS dans un thread
+
+    ru_maxrss ne fait que croître sur la durée du processus: un échantillonnage
+    périodique donne le pic propre à une étape. Avec record=True, les mesures
+    (perf_counter, MB) sont conservées pour tracer la courbe mémoire.
+    """
+
+    def __init__(self, interval=0.01, record=False):
+        self.interval = interval
+        self.record = record
+        self.samples = []
+        self.start_mb = None
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None:
+            self.peak_mb = rss if self.peak_mb is None else max(self.peak_mb, rss)
+            if self.record:
+                self.samples.append((time.perf_counter(), rss))
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.start_mb = self._sample()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
+
+# ============================================================================
+# PROFILER
+# ============================================================================
+
+class StageRecord:
+    """Mesures d'une étape; `rows` peut être renseigné par l'appelant dans le bloc"""
+
+    def __init__(self, name, depth=0, rows=None):
+        self.name = name
+        self.depth = depth
+        self.rows = rows
+        self.start = None
+        self.wall = None
+        self.cpu = None
+        self.rss_start_mb = None
+        self.peak_rss_mb = None
+        self.traced_peak_mb = None
+
+class PipelineProfiler:
+    """
+    Collecte les mesures des étapes d'un run
+
+    Les étapes peuvent être imbriquées (ex: 'load' > 'align'). cProfile et
+    tracemalloc ne sont appliqués qu'aux étapes de premier niveau (un seul
+    profileur actif à la fois), les sous-étapes étant couvertes par leur parent.
+    """
+
+    def __init__(self, run_name, output_dir=PROFILE_DIR, cprofile=False, tracemalloc=False,
+                 sample_interval=0.05):
+        self.run_name = run_name
+        self.output_dir = output_dir
+        self.cprofile = cprofile
+        self.tracemalloc = tracemalloc
+        self.records = []
+        self.started_at = datetime.now()
+        self._origin = time.perf_counter()
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._sampler = PeakRssSampler(sample_interval, record=True).__enter__()
+
+    def _path(self, suffix):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, f"{self.run_name}_{suffix}")
+
+    def _peak_between(self, start, end):
+        peaks = [rss for t, rss in list(self._sampler.samples) if start <= t <= end]
+        return max(peaks) if peaks else None
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """Mesure une étape; le StageRecord produit accepte `rows` en cours de bloc"""
+        with self._lock:
+            record = StageRecord(name, self._depth, rows)
+            self._depth += 1
+            top_level = record.depth == 0
+
+        profile = None
+        if top_level and self.cprofile:
+            import cProfile
+            profile = cProfile.Profile()
+        tracing = False
+        if top_level and self.tracemalloc:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                tracing = True
+
+        record.rss_start_mb = self._sampler._sample()
+        record.start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            record.cpu = time.process_time() - cpu_start
+            end = time.perf_counter()
+            record.wall = end - record.start
+            self._sampler._sample()
+            record.peak_rss_mb = self._peak_between(record.start, time.perf_counter())
+
+            safe_name = name.replace(os.sep, '_').replace(' ', '_')
+            if profile is not None:
+                profile.dump_stats(self._path(f"{safe_name}.prof"))
+            if tracing:
+                import tracemalloc
+                record.traced_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                with open(self._path(f"{safe_name}.tracemalloc.txt"), 'w', encoding='utf-8') as f:
+                    f.write(f"# {self.run_name} / {name}: pic tracé {record.traced_peak_mb:.1f} MB\n")
+                    for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                        f.write(f"{stat}\n")
+
+            with self._lock:
+                self._depth -= 1
+                self.records.append(record)
+
+    def summary(self):
+        """Affiche le tableau récapitulatif des étapes (ordre chronologique)"""
+        records = sorted(self.records, key=lambda r: r.start)
+        total = sum(r.wall for r in records if r.depth == 0) or 1.0
+        print("\n" + "="*80)
+        print(f"PROFIL: {self.run_name}")
+        print("="*80)
+        print(f"{'Étape':<28}{'Mural':>10}{'CPU':>10}{'% run':>8}{'Pic RSS':>12}{'Lignes':>12}")
+        print("-"*80)
+        for r in records:
+            label = ('  ' * r.depth + r.name)[:27]
+            peak = f"{r.peak_rss_mb:.0f} MB" if r.peak_rss_mb is not None else '-'
+            rows = f"{r.rows:,}".replace(',', ' ') if r.rows is not None else '-'
+            share = f"{100 * r.wall / total:.0f}%" if r.depth == 0 else ''
+            print(f"{label:<28}{r.wall:>9.2f}s{r.cpu:>9.2f}s{share:>8}{peak:>12}{rows:>12}")
+        print("-"*80)
+
+    def write_chrome_trace(self, path=None):
+        """
+        Écrit les étapes au format Chrome trace (événements 'X' + compteur RSS)
+
+        Returns:
+            Chemin du fichier écrit
+        """
+        path = path or self._path('trace.json')
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': self.run_name}}]
+        for r in sorted(self.records, key=lambda r: (r.start, r.depth)):
+            args = {'cpu_s': round(r.cpu, 4)}
+            if r.rows is not None:
+                args['rows'] = r.rows
+            if r.peak_rss_mb is not None:
+                args['peak_rss_mb'] = round(r.peak_rss_mb, 1)
+            if r.traced_peak_mb is not None:
+                args['traced_peak_mb'] = round(r.traced_peak_mb, 1)
+            events.append({
+                'name': r.name, 'cat': 'stage', 'ph': 'X', 'pid': pid, 'tid': 0,
+                'ts': (r.start - self._origin) * 1e6, 'dur': r.wall * 1e6, 'args': args
+            })
+        for t, rss in list(self._sampler.samples):
+            events.append({'name': 'rss', 'ph': 'C', 'pid': pid, 'tid': 0,
+                           'ts': (t - self._origin) * 1e6, 'args': {'MB': round(rss, 1)}})
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'run': self.run_name,
+                                     'started_at': self.started_at.isoformat(timespec='seconds')}}, f)
+        return path
+
+    def close(self):
+        """Arrête l'échantillonnage, affiche le résumé et écrit la trace"""
+        self._sampler.__exit__(None, None, None)
+        self.summary()
+        path = self.write_chrome_trace()
+        print(f"[OK] Trace: {path} (chrome://tracing ou https://ui.perfetto.dev)")
+        if self.cprofile:
+            print(f"[OK] Profils cProfile: {self.output_dir}/{self.run_name}_*.prof")
+        if self.tracemalloc:
+            print(f"[OK] Allocations: {self.output_dir}/{self.run_name}_*.tracemalloc.txt")
+
+# ============================================================================
+# ACTIVATION
+# ============================================================================
+
+_active = None
+
+@contextlib.contextmanager
+def profiling(run_name, enabled=True, **options):
+    """
+    Active un profiler pour la durée du bloc (no-op si enabled=False)
+
+    Args:
+        run_name: préfixe des fichiers produits (horodaté)
+        options: cprofile, tracemalloc, output_dir
+    """
+    global _active
+    if not enabled or _active is not None:
+        yield _active
+        return
+    profiler = PipelineProfiler(f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}", **options)
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = None
+        profiler.close()
+
+def profile_stage(name, rows=None):
+    """Mesure une étape si un profiler est actif, sinon ne fait rien"""
+    if _active is None:
+        return contextlib.nullcontext(StageRecord(name, rows=rows))
+    return _active.stage(name, rows)
+
+def options_from_env():
+    """
+    Options de profilage demandées via PREDICTEMP_PROFILE
+
+    Returns:
+        dict (enabled, cprofile, tracemalloc)
+    """
+    value = os.environ.get(PROFILE_ENV, '').strip().lower()
+    flags = {flag.strip() for flag in value.split(',') if flag.strip()}
+    return {
+        'enabled': bool(flags - {'0', 'false', 'no'}),
+        'cprofile': 'cprofile' in flags,
+        'tracemalloc': 'tracemalloc' in flags
+    }
+
+def add_profiling_arguments(parser):
+    """Ajoute --profile / --cprofile / --tracemalloc à un argparse.ArgumentParser"""
+    parser.add_argument('--profile', action='store_true',
+                        help="Mesurer chaque étape (résumé + Chrome trace dans profiles/)")
+    parser.add_argument('--cprofile', action='store_true', help="Dump cProfile par étape (implique --profile)")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="Allocations Python par étape (implique --profile)")
+
+def options_from_args(args):
+    """Combine les arguments de ligne de commande et PREDICTEMP_PROFILE"""
+    options = options_from_env()
+    options['cprofile'] |= args.cprofile
+    options['tracemalloc'] |= args.tracemalloc
+    options['enabled'] |= args.profile or options['cprofile'] or options['tracemalloc']
+    return options
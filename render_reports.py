@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""
+Rapports graphiques du parc, sans interface (PNG / HTML statiques)
+La visualisation de data_generator_gui.py affiche une vue à la fois dans une
+fenêtre matplotlib. Ici tous les graphiques sont générés d'un coup, pour des
+centaines de rooms, dans des processus parallèles:
+
+- par room: historique (moyenne / min / max journaliers), résidus journaliers
+  du test set (MAE, biais), erreur par saison
+- parc: historique (moyenne et bande p10-p90 des rooms), résidus journaliers,
+  erreur par saison et par heure
+
+Les graphiques ne lisent jamais les lignes brutes:
+1. chaque room est agrégée par jour (store memmap s'il est à jour, sinon CSV),
+   agrégats mis en cache dans reports/charts/aggregates/ tant que la source
+   ne change pas (taille + date de modification)
+2. les résidus viennent du dernier rapport d'évaluation
+   (evaluation_*.json + evaluation_*_series.npz, voir evaluation.py)
+3. chaque graphique a une empreinte de ses données: s'il est inchangé depuis
+   le dernier rendu (manifest.json) et que ses fichiers existent, il est sauté
+
+Usage:
+    python render_reports.py                       # HTML + PNG dans reports/charts/
+    python render_reports.py --format html --workers 8
+    python render_reports.py --report reports/evaluation_20240101_120000.json --force
+"""
+
+import os
+import glob
+import json
+import hashlib
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from evaluation import REPORT_DIR, SEASONS
+from room_data import DATA_DIR, detect_room_columns, get_csv_files, read_room_columns
+from room_store import RoomStore, file_fingerprint, open_current_store, store_dir_for
+
+CHARTS_DIR = os.path.join(REPORT_DIR, 'charts')
+AGGREGATES_DIR = 'aggregates'
+MANIFEST_FILE = 'manifest.json'
+FORMATS = ('html', 'png')
+RENDER_VERSION = 1          # à incrémenter quand la mise en forme change (invalide tous les graphiques)
+
+DAY_NS = 86400 * 10**9
+PNG_SIZE = (1200, 500)
+
+# ============================================================================
+# AGRÉGATS JOURNALIERS
+# ============================================================================
+
+def daily_aggregates(timestamps, temps):
+    """
+    Moyenne / min / max / nombre de mesures par jour
+
+    Returns:
+        dict 'days' (int64 ns, minuit), 'mean', 'min', 'max' (float32), 'count'
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    temps = np.asarray(temps, dtype=np.float64)
+    valid = np.isfinite(temps)
+    timestamps, temps = timestamps[valid], temps[valid]
+    days, day_index = np.unique(timestamps - timestamps % DAY_NS, return_inverse=True)
+
+    count = np.bincount(day_index, minlength=len(days))
+    mean = np.bincount(day_index, weights=temps, minlength=len(days)) / np.maximum(count, 1)
+    minimum = np.full(len(days), np.inf)
+    maximum = np.full(len(days), -np.inf)
+    np.minimum.at(minimum, day_index, temps)
+    np.maximum.at(maximum, day_index, temps)
+    return {'days': days, 'mean': mean.astype(np.float32), 'min': minimum.astype(np.float32),
+            'max': maximum.astype(np.float32), 'count': count.astype(np.int32)}
+
+def _aggregate_room(task):
+    """Agrège une room (exécuté dans un processus du pool)"""
+    room_name, source, store_dir, cache_path = task
+    try:
+        if store_dir is not None:
+            store = RoomStore(store_dir)
+            timestamps = store.column(room_name, 'timestamp')
+            temps = store.column(room_name, 'temperature')
+        else:
+            _, detected = detect_room_columns(source)
+            if detected['timestamp'] is None or detected['temperature'] is None:
+                raise ValueError(f"{source}: colonnes timestamp/température introuvables")
+            timestamps, values = read_room_columns(source, detected)
+            temps = values['temperature']
+        aggregates = daily_aggregates(timestamps, temps)
+    except (OSError, ValueError, KeyError) as e:
+        return room_name, None, str(e)
+    np.savez(cache_path, **aggregates)
+    return room_name, aggregates, None
+
+def load_room_aggregates(data_dir=DATA_DIR, output_dir=CHARTS_DIR, workers=None):
+    """
+    Agrégats journaliers de chaque room, recalculés uniquement si la source a changé
+    (empreinte du CSV, plus lignes et dernier timestamp de la room si lue dans le store)
+
+    Returns:
+        (dict room_name -> agrégats, dict room_name -> message d'erreur)
+    """
+    csv_files = get_csv_files(data_dir)
+    store_dir = store_dir_for(data_dir)
+    store = open_current_store(csv_files, store_dir)
+    cache_dir = os.path.join(output_dir, AGGREGATES_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    sources_path = os.path.join(cache_dir, 'sources.json')
+    cached_sources = {}
+    if os.path.exists(sources_path):
+        with open(sources_path, 'r', encoding='utf-8') as f:
+            cached_sources = json.load(f)
+
+    aggregates, errors, tasks, sources = {}, {}, [], {}
+    for room_name, csv_file in csv_files.items():
+        cache_path = os.path.join(cache_dir, f"{room_name}.npz")
+        in_store = store is not None and room_name in store.rooms
+        sources[room_name] = file_fingerprint(csv_file)
+        if in_store:
+            # Mesures ajoutées au store (append, ingestion) sans changement du CSV
+            room = store.rooms[room_name]
+            sources[room_name]['store'] = {'rows': room['rows'], 'last_ts': room['last_ts']}
+        if cached_sources.get(room_name) == sources[room_name] and os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                aggregates[room_name] = {key: data[key] for key in data.files}
+        else:
+            tasks.append((room_name, csv_file, store_dir if in_store else None, cache_path))
+
+    if tasks:
+        workers = workers or min(len(tasks), os.cpu_count() or 1)
+        if workers == 1:
+            results = [_aggregate_room(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_aggregate_room, tasks))
+        for room_name, room_aggregates, error in results:
+            if error is None:
+                aggregates[room_name] = room_aggregates
+            else:
+                errors[room_name] = error
+                sources.pop(room_name)
+
+    with open(sources_path, 'w', encoding='utf-8') as f:
+        json.dump(sources, f, indent=2)
+    print(f"[INFO] Agrégats journaliers: {len(aggregates)} rooms "
+          f"({len(tasks) - len(errors)} recalculées{', store memmap' if store is not None else ''})")
+    return {name: aggregates[name] for name in sorted(aggregates)}, errors
+
+def fleet_aggregates(aggregates):
+    """Moyenne et bande p10-p90 des moyennes journalières des rooms, sur l'union des jours"""
+    days = np.unique(np.concatenate([a['days'] for a in aggregates.values()]))
+    means = np.full((len(aggregates), len(days)), np.nan, dtype=np.float32)
+    for r, room in enumerate(aggregates.values()):
+        means[r, np.searchsorted(days, room['days'])] = room['mean']
+    p10, p90 = np.nanpercentile(means, [10, 90], axis=0)
+    return {'days': days, 'mean': np.nanmean(means, axis=0), 'p10': p10, 'p90': p90,
+            'rooms': np.sum(np.isfinite(means), axis=0).astype(np.int32)}
+
+# ============================================================================
+# RAPPORT D'ÉVALUATION
+# ============================================================================
+
+def latest_evaluation_report(report_dir=REPORT_DIR):
+    """Dernier rapport JSON écrit par write_evaluation_report (None si aucun)"""
+    reports = glob.glob(os.path.join(report_dir, 'evaluation_*.json'))
+    return max(reports, key=os.path.getmtime) if reports else None
+
+def load_evaluation(report_path):
+    """
+    Rapport d'évaluation et ses résidus agrégés
+
+    Returns:
+        (rapport, séries residual_series ou None si le rapport n'en a pas)
+    """
+    with open(report_path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    series_path = os.path.join(os.path.dirname(report_path), report.get('series', ''))
+    if not report.get('series') or not os.path.exists(series_path):
+        return report, None
+    with np.load(series_path) as data:
+        return report, {key: data[key] for key in data.files}
+
+# ============================================================================
+# GRAPHIQUES (plotly, importé dans les processus de rendu)
+# ============================================================================
+
+def _dates(days):
+    return np.asarray(days, dtype=np.int64).view('datetime64[ns]')
+
+def _history_figure(go, title, data):
+    fig = go.Figure()
+    if 'p10' in data:
+        low, high, band = data['p10'], data['p90'], 'p10-p90 des rooms'
+    else:
+        low, high, band = data['min'], data['max'], 'min-max'
+    fig.add_trace(go.Scatter(x=_dates(data['days']), y=high, mode='lines', line={'width': 0},
+                             showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=_dates(data['days']), y=low, mode='lines', line={'width': 0},
+                             fill='tonexty', fillcolor='rgba(52, 152, 219, 0.25)', name=band))
+    fig.add_trace(go.Scatter(x=_dates(data['days']), y=data['mean'], mode='lines',
+                             line={'color': '#2C3E50', 'width': 1.5}, name='Moyenne journalière'))
+    fig.update_layout(title=title, xaxis_title='Date', yaxis_title='Température (°C)')
+    return fig
+
+def _residuals_figure(go, title, data):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=_dates(data['days']), y=data['mae'], mode='lines+markers',
+                             line={'color': '#E74C3C'}, name='MAE'))
+    fig.add_trace(go.Scatter(x=_dates(data['days']), y=data['bias'], mode='lines',
+                             line={'color': '#3498DB', 'dash': 'dot'}, name='Biais (préd. - réel)'))
+    fig.add_hline(y=0, line={'color': 'gray', 'width': 1})
+    fig.update_layout(title=title, xaxis_title='Date (test set)', yaxis_title='Erreur (°C)')
+    return fig
+
+def _seasonal_figure(go, title, data):
+    from plotly.subplots import make_subplots
+    hourly = 'hour_mae' in data
+    fig = make_subplots(rows=1, cols=2 if hourly else 1,
+                        subplot_titles=['Par saison', 'Par heure'] if hourly else None)
+    fig.add_trace(go.Bar(x=list(data['seasons']), y=data['season_mae'], marker_color='#F39C12',
+                         name='MAE par saison'), row=1, col=1)
+    if hourly:
+        fig.add_trace(go.Scatter(x=data['hours'], y=data['hour_mae'], mode='lines+markers',
+                                 line={'color': '#9B59B6'}, name='MAE par heure'), row=1, col=2)
+        fig.update_xaxes(title_text='Heure', row=1, col=2)
+    fig.update_yaxes(title_text='MAE (°C)', row=1, col=1)
+    fig.update_layout(title=title)
+    return fig
+
+FIGURES = {
+    'history': _history_figure,
+    'residuals': _residuals_figure,
+    'seasonal': _seasonal_figure,
+}
+
+def chart_hash(kind, title, data, formats):
+    """Empreinte des données d'un graphique (et de ce qui change son rendu)"""
+    digest = hashlib.sha256(json.dumps([RENDER_VERSION, kind, title, sorted(formats)]).encode('utf-8'))
+    for key in sorted(data):
+        digest.update(key.encode('utf-8'))
+        digest.update(np.ascontiguousarray(data[key]).tobytes())
+    return digest.hexdigest()
+
+def _render_chart(task):
+    """Rendu d'un graphique en HTML / PNG (exécuté dans un processus du pool)"""
+    name, kind, title, data, formats, output_dir = task
+    try:
+        import plotly.graph_objects as go
+        fig = FIGURES[kind](go, title, data)
+        fig.update_layout(template='plotly_white', hovermode='x unified')
+        files = []
+        if 'html' in formats:
+            # plotly.min.js écrit une seule fois dans le dossier, partagé par tous les graphiques
+            fig.write_html(os.path.join(output_dir, f"{name}.html"), include_plotlyjs='directory')
+            files.append(f"{name}.html")
+        if 'png' in formats:
+            fig.write_image(os.path.join(output_dir, f"{name}.png"), width=PNG_SIZE[0], height=PNG_SIZE[1])
+            files.append(f"{name}.png")
+    except Exception as e:  # le rendu d'un graphique ne doit pas arrêter les autres
+        return name, None, f"{type(e).__name__}: {e}"
+    return name, files, None
+
+# ============================================================================
+# LISTE DES GRAPHIQUES
+# ============================================================================
+
+def chart_specs(aggregates, report=None, series=None):
+    """
+    Graphiques à produire: (nom, type, titre, données)
+
+    Les graphiques de résidus ne sont produits que pour les rooms du rapport d'évaluation.
+    """
+    specs = []
+    if aggregates:
+        specs.append(('fleet_history', 'history', f"Parc - températures journalières ({len(aggregates)} rooms)",
+                      fleet_aggregates(aggregates)))
+    if report is not None:
+        specs.append(('fleet_seasonal', 'seasonal', f"Parc - erreur de test (MAE {report['overall']['mae']:.3f}°C)", {
+            'seasons': np.array([s['season'] for s in report['per_season']]),
+            'season_mae': np.array([s['mae'] for s in report['per_season']]),
+            'hours': np.array([h['hour'] for h in report['per_hour']]),
+            'hour_mae': np.array([h['mae'] for h in report['per_hour']])
+        }))
+    if series is not None:
+        with np.errstate(invalid='ignore'):
+            specs.append(('fleet_residuals', 'residuals', "Parc - résidus journaliers du test set", {
+                'days': series['days'], 'mae': np.nanmean(series['daily_mae'], axis=1),
+                'bias': np.nanmean(series['daily_bias'], axis=1)
+            }))
+
+    for room_name, room in aggregates.items():
+        specs.append((f"{room_name}_history", 'history', f"{room_name} - températures journalières", room))
+
+    if series is not None:
+        present = np.isfinite(series['season_mae'][:, 0])
+        for r, room in enumerate(report['per_room']):
+            name = room['room']
+            specs.append((f"{name}_residuals", 'residuals', f"{name} - résidus journaliers (MAE {room['mae']:.3f}°C)",
+                          {'days': series['days'], 'mae': series['daily_mae'][:, r],
+                           'bias': series['daily_bias'][:, r]}))
+            specs.append((f"{name}_seasonal", 'seasonal', f"{name} - erreur par saison",
+                          {'seasons': np.array(SEASONS)[present], 'season_mae': series['season_mae'][present, r]}))
+    return specs
+
+def png_available():
+    """Le rendu PNG de plotly passe par kaleido"""
+    try:
+        import kaleido  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def render_charts(specs, output_dir=CHARTS_DIR, formats=FORMATS, workers=None, force=False):
+    """
+    Rend les graphiques dont les données ont changé depuis le dernier rendu
+
+    Returns:
+        dict 'rendered', 'skipped', 'errors' (nom -> message), 'seconds'
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    tasks, hashes, skipped = [], {}, 0
+    for name, kind, title, data in specs:
+        hashes[name] = chart_hash(kind, title, data, formats)
+        entry = manifest.get(name)
+        if (entry is not None and entry['hash'] == hashes[name]
+                and all(os.path.exists(os.path.join(output_dir, file)) for file in entry['files'])):
+            skipped += 1
+        else:
+            tasks.append((name, kind, title, data, formats, output_dir))
+
+    errors, start = {}, time.perf_counter()
+    if tasks:
+        workers = workers or min(len(tasks), os.cpu_count() or 1)
+        print(f"[INFO] Rendu de {len(tasks)} graphiques ({skipped} inchangés), {workers} processus")
+        if workers == 1:
+            results = [_render_chart(task) for task in tasks]
+        else:
+            # Lots de graphiques par processus: limite les allers-retours pour des centaines de rooms
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_render_chart, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+        for name, files, error in results:
+            if error is None:
+                manifest[name] = {'hash': hashes[name], 'files': files}
+            else:
+                errors[name] = error
+                manifest.pop(name, None)
+
+    # Graphiques qui ne sont plus produits (room retirée): retirés du manifest
+    manifest = {name: entry for name, entry in manifest.items() if name in hashes}
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return {'rendered': len(tasks) - len(errors), 'skipped': skipped, 'errors': errors,
+            'seconds': time.perf_counter() - start}
+
+def write_index(specs, output_dir=CHARTS_DIR):
+    """index.html: liens vers les graphiques du parc puis de chaque room"""
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    lines = ["<!DOCTYPE html>", "<html><head><meta charset=\"utf-8\"><title>Rapports Predictemp</title></head><body>",
+             "<h1>Rapports Predictemp</h1>", "<ul>"]
+    for name, _, title, _ in specs:
+        if name in manifest:
+            links = ' '.join(f"<a href=\"{file}\">{os.path.splitext(file)[1][1:]}</a>" for file in manifest[name]['files'])
+            lines.append(f"<li>{title} {links}</li>")
+    lines += ["</ul>", "</body></html>"]
+    index_path = os.path.join(output_dir, 'index.html')
+    with open(index_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return index_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Graphiques statiques du parc et de chaque room (plotly)")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--report', help="Rapport d'évaluation JSON (défaut: le plus récent de reports/)")
+    parser.add_argument('--output', default=CHARTS_DIR)
+    parser.add_argument('--format', default=','.join(FORMATS), help="Formats séparés par des virgules (html,png)")
+    parser.add_argument('--workers', type=int, default=None, help="Processus parallèles (défaut: nb de CPU)")
+    parser.add_argument('--force', action='store_true', help="Tout re-rendre, même les graphiques inchangés")
+    args = parser.parse_args()
+
+    formats = tuple(f.strip() for f in args.format.split(',') if f.strip())
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown or not formats:
+        print(f"[ERROR] Format inconnu: {', '.join(unknown) or args.format} (attendu: {', '.join(FORMATS)})")
+        exit(1)
+    try:
+        import plotly  # noqa: F401
+    except ImportError:
+        print("[ERROR] plotly n'est pas installé (pip install -r requirements.txt)")
+        exit(1)
+    if 'png' in formats and not png_available():
+        formats = tuple(f for f in formats if f != 'png')
+        if not formats:
+            print("[ERROR] kaleido n'est pas installé: rendu PNG impossible (pip install kaleido)")
+            exit(1)
+        print("[WARN] kaleido n'est pas installé: PNG ignorés, HTML seulement")
+
+    aggregates, errors = load_room_aggregates(args.data_dir, args.output, args.workers)
+    for room_name, error in errors.items():
+        print(f"[WARN] {room_name}: {error}")
+
+    report_path = args.report or latest_evaluation_report()
+    report = series = None
+    if report_path is None:
+        print("[WARN] Aucun rapport d'évaluation: graphiques de résidus et d'erreur ignorés")
+    else:
+        report, series = load_evaluation(report_path)
+        print(f"[INFO] Rapport d'évaluation: {report_path}")
+        if series is None:
+            print("[WARN] Rapport sans résidus journaliers (réentraîner pour les obtenir): "
+                  "résidus par room ignorés")
+
+    specs = chart_specs(aggregates, report, series)
+    if not specs:
+        print(f"[ERROR] Aucune donnée à représenter dans {args.data_dir}")
+        exit(1)
+    result = render_charts(specs, args.output, formats, args.workers, args.force)
+    for name, error in result['errors'].items():
+        print(f"[ERREUR] {name}: {error}")
+    index_path = write_index(specs, args.output)
+    print(f"[OK] {result['rendered']} graphiques rendus, {result['skipped']} inchangés "
+          f"en {result['seconds']:.1f}s -> {index_path}")
+    if result['errors']:
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+Accès aux données des rooms (sans dépendance TensorFlow)
+Détection des fichiers RoomN_data.csv, des colonnes et représentation large
+partagée par l'entraînement, l'export Arduino et l'interface graphique
+
+Les CSV peuvent être compressés (RoomN_data.csv.gz / .zst / .xz): le codec est
+déduit de l'extension et pandas décompresse en flux à la lecture.
+"""
+
+import os
+import re
+import glob
+import importlib.util
+import numpy as np
+import pandas as pd
+
+DATA_DIR = 'data'
+
+# Plage de validité des températures (identique à validate_temperature du firmware)
+TEMP_MIN = -50.0
+TEMP_MAX = 60.0
+
+# Mapping flexible des colonnes - définir les noms possibles pour chaque type de colonne
+COLUMN_MAPPINGS = {
+    'timestamp': ['Timestamp', 'timestamp', 'Date', 'date', 'DateTime', 'datetime', 'Time', 'time'],
+    'temperature': ['Temperature_Celsius(°C)', 'Temperature', 'temperature', 'Temp', 'temp',
+                    'Temperature(°C)', 'Temperature (°C)', 'Température', 'température'],
+    'humidity': ['Relative_Humidity(%)', 'Humidity', 'humidity', 'RH', 'rh', 'Humidité', 'humidité',
+                 'Relative Humidity', 'relative_humidity'],
+    'external_temp': ['External_Temp(°C)', 'External_Temp', 'external_temp', 'Temp_ext', 'temp_ext',
+                      'Température extérieure']
+}
+
+# Compression des CSV: codec pandas -> extension ajoutée après '.csv'
+CSV_COMPRESSIONS = {'gzip': '.gz', 'zstd': '.zst', 'xz': '.xz'}
+
+# Module requis par pandas pour chaque codec (zstd: paquet optionnel zstandard)
+COMPRESSION_MODULES = {'gzip': 'gzip', 'zstd': 'zstandard', 'xz': 'lzma'}
+
+ROOM_CSV_PATTERN = re.compile(r'^Room(.+)_data\.csv(' + '|'.join(
+    re.escape(ext) for ext in CSV_COMPRESSIONS.values()) + r')?$')
+
+def csv_compression(path):
+    """Codec d'un CSV d'après son extension ('gzip', 'zstd', 'xz') ou None"""
+    for compression, ext in CSV_COMPRESSIONS.items():
+        if path.lower().endswith(ext):
+            return compression
+    return None
+
+def available_compressions():
+    """Codecs utilisables avec les modules installés"""
+    return [compression for compression, module in COMPRESSION_MODULES.items()
+            if importlib.util.find_spec(module) is not None]
+
+def room_csv_path(room_id, data_dir=DATA_DIR, compression=None):
+    """Chemin du CSV d'une room (ex: data/Room3_data.csv.gz)"""
+    suffix = CSV_COMPRESSIONS[compression] if compression else ''
+    return os.path.join(data_dir, f"Room{room_id}_data.csv{suffix}")
+
+def room_csv_variants(room_id, data_dir=DATA_DIR):
+    """Fichiers existants d'une room, toutes compressions confondues"""
+    return [room_csv_path(room_id, data_dir, compression) for compression in [None, *CSV_COMPRESSIONS]
+            if os.path.exists(room_csv_path(room_id, data_dir, compression))]
+
+def get_csv_files(data_dir=DATA_DIR):
+    """Détecte automatiquement tous les fichiers RoomN_data.csv[.gz|.zst|.xz] dans data/"""
+    csv_files = {}
+    pattern = os.path.join(data_dir, 'Room*_data.csv*')
+
+    for filepath in sorted(glob.glob(pattern)):
+        # Extraire le nom/numéro entre 'Room' et '_data.csv' ('Room1_data.csv.gz' -> '1')
+        match = ROOM_CSV_PATTERN.match(os.path.basename(filepath))
+        if match is None:
+            continue
+        room_name = f'room{match.group(1)}'
+        # Plusieurs variantes d'une même room: la plus récemment écrite
+        if room_name in csv_files and os.path.getmtime(csv_files[room_name]) >= os.path.getmtime(filepath):
+            continue
+        csv_files[room_name] = filepath
+
+    return csv_files
+
+def get_sites(data_dir=DATA_DIR):
+    """
+    Sites (bâtiments) d'un layout partitionné data/<site>/Room*_data.csv
+
+    Returns:
+        dict site -> dossier des CSV du site (trié par nom)
+    """
+    if not os.path.isdir(data_dir):
+        return {}
+    return {entry.name: entry.path for entry in sorted(os.scandir(data_dir), key=lambda e: e.name)
+            if entry.is_dir() and get_csv_files(entry.path)}
+
+def detect_column(df, column_type):
+    """
+    Détecte automatiquement quelle colonne correspond au type demandé
+
+    Args:
+        df: DataFrame pandas
+        column_type: 'timestamp', 'temperature', 'humidity' ou 'external_temp'
+
+    Returns:
+        Nom de la colonne détectée ou None
+    """
+    possible_names = COLUMN_MAPPINGS.get(column_type, [])
+
+    # Chercher correspondance exacte (case-insensitive)
+    for col in df.columns:
+        if col in possible_names:
+            return col
+
+    # Chercher correspondance partielle
+    for col in df.columns:
+        col_lower = col.lower()
+        for possible in possible_names:
+            if possible.lower() in col_lower:
+                return col
+
+    return None
+
+def detect_room_columns(csv_file):
+    """
+    Lit uniquement l'en-tête d'un CSV et détecte ses colonnes
+
+    Returns:
+        (liste des colonnes, dict type -> nom de colonne ou None)
+    """
+    header = pd.read_csv(csv_file, nrows=0)
+    detected = {column_type: detect_column(header, column_type) for column_type in COLUMN_MAPPINGS}
+    return list(header.columns), detected
+
+def read_room_columns(csv_file, detected):
+    """
+    Parse uniquement les colonnes détectées d'un CSV de room
+
+    Args:
+        csv_file: chemin du CSV
+        detected: dict retourné par detect_room_columns (timestamp et temperature requis)
+
+    Returns:
+        (timestamps int64 en ns, dict type -> tableau float32)
+    """
+    timestamp_col = detected['timestamp']
+    value_cols = {column_type: col for column_type, col in detected.items()
+                  if col is not None and column_type != 'timestamp'}
+
+    usecols = [timestamp_col] + list(dict.fromkeys(value_cols.values()))
+    df = pd.read_csv(csv_file, usecols=usecols,
+                     dtype={col: np.float32 for col in usecols if col != timestamp_col})
+
+    timestamps = pd.to_datetime(df[timestamp_col]).values.astype('datetime64[ns]').view(np.int64)
+    values = {column_type: df[col].to_numpy(dtype=np.float32) for column_type, col in value_cols.items()}
+    return timestamps, values
+
+class RoomFrame:
+    """
+    Représentation large et compacte des données de toutes les rooms
+
+    Attributs:
+        timestamps: index int64 trié et unique (ns depuis epoch), partagé par toutes les rooms
+        room_names: noms des rooms, stockés une seule fois
+        temperature: matrice float32 (rooms x temps)
+        humidity: matrice float32 (rooms x temps)
+        mask: matrice booléenne (rooms x temps), True là où la room a une mesure
+    """
+
+    def __init__(self, timestamps, room_names, temperature, humidity, mask):
+        self.timestamps = timestamps
+        self.room_names = list(room_names)
+        self.temperature = temperature
+        self.humidity = humidity
+        self.mask = mask
+
+    @property
+    def num_rooms(self):
+        return len(self.room_names)
+
+    @property
+    def num_timestamps(self):
+        return len(self.timestamps)
+
+    @property
+    def empty(self):
+        return self.num_rooms == 0 or self.num_timestamps == 0
+
+    @property
+    def nbytes(self):
+        """Taille mémoire des tableaux (octets)"""
+        return (self.timestamps.nbytes + self.temperature.nbytes +
+                self.humidity.nbytes + self.mask.nbytes)
+
+    def datetimes(self):
+        """Index des timestamps sous forme de DatetimeIndex pandas"""
+        return pd.DatetimeIndex(self.timestamps.view('datetime64[ns]'))
+
+    @classmethod
+    def from_rooms(cls, rooms):
+        """
+        Construit la représentation large à partir des séries de chaque room
+
+        Args:
+            rooms: liste de tuples (room_name, timestamps int64, temperature, humidity)
+        """
+        if not rooms:
+            return cls(np.empty(0, dtype=np.int64), [],
+                       np.empty((0, 0), dtype=np.float32),
+                       np.empty((0, 0), dtype=np.float32),
+                       np.empty((0, 0), dtype=bool))
+
+        # Index commun: union triée des timestamps (chemin rapide si toutes les rooms
+        # partagent déjà la même grille, cas des données générées)
+        first_ts = rooms[0][1]
+        if all(np.array_equal(ts, first_ts) for _, ts, _, _ in rooms[1:]):
+            timestamps = np.unique(first_ts)
+        else:
+            timestamps = np.unique(np.concatenate([ts for _, ts, _, _ in rooms]))
+
+        shape = (len(rooms), len(timestamps))
+        temperature = np.full(shape, np.nan, dtype=np.float32)
+        humidity = np.full(shape, np.nan, dtype=np.float32)
+
+        for r, (_, ts, temps, hums) in enumerate(rooms):
+            # En cas de doublons, la dernière mesure l'emporte
+            positions = np.searchsorted(timestamps, ts)
+            temperature[r, positions] = temps
+            humidity[r, positions] = hums
+
+        mask = ~np.isnan(temperature)
+        return cls(timestamps, [name for name, _, _, _ in rooms], temperature, humidity, mask)
+
+def infer_interval_ns(rooms):
+    """
+    Intervalle d'échantillonnage typique (médiane sur les rooms), en ns
+
+    Par room, chaque pas compte pour round(pas / pas médian) intervalles (trous
+    inclus) et l'intervalle est la moyenne sur toute la série: la gigue des
+    capteurs s'annule au lieu de décaler la grille.
+    """
+    medians = []
+    for _, ts, _, _ in rooms:
+        steps = np.diff(np.sort(ts))
+        steps = steps[steps > 0]
+        if len(steps):
+            counts = np.round(steps / np.median(steps))
+            medians.append(steps[counts > 0].sum() / counts[counts > 0].sum())
+    if not medians:
+        raise ValueError("Impossible de déduire l'intervalle: pas assez de mesures")
+    # Arrondi à la seconde pour absorber la dérive des capteurs
+    return max(1, int(round(np.median(medians) / 1e9))) * 1_000_000_000
+
+def dominant_phase_ns(rooms, interval, tolerance):
+    """
+    Décalage des mesures dans l'intervalle (ex. capteurs horaires à :30)
+
+    Les phases (timestamp modulo interval) sont comptées à la seconde; la
+    fenêtre circulaire de +/- tolerance qui contient le plus de mesures donne
+    la phase, moyenne des phases de cette fenêtre.
+
+    Returns:
+        phase en ns, entre 0 et interval
+    """
+    bins = max(1, interval // 1_000_000_000)
+    resolution = interval // bins
+    phases = np.minimum(np.concatenate([ts for _, ts, _, _ in rooms]) % interval // resolution, bins - 1)
+    counts = np.bincount(phases.astype(np.int64), minlength=bins)
+    width = min(int(tolerance // 1_000_000_000), (bins - 1) // 2)
+    # Somme glissante circulaire sur 2 * width + 1 secondes
+    cumulative = np.concatenate([[0], np.cumsum(np.concatenate([counts, counts[:2 * width]]))])
+    windows = cumulative[2 * width + 1:] - cumulative[:bins]
+    start = int(np.argmax(windows))
+    offsets = np.arange(2 * width + 1)
+    weights = counts[(start + offsets) % bins]
+    phase = (start + (offsets * weights).sum() / max(weights.sum(), 1)) % bins
+    return int(round(phase)) % bins * resolution
+
+def align_rooms(rooms, interval_minutes=None, tolerance_minutes=5.0, max_gap_minutes=90.0):
+    """
+    Rééchantillonne toutes les rooms sur une grille temporelle commune
+
+    La grille est calée sur la phase dominante des mesures (dominant_phase_ns):
+    des capteurs horaires à :30 donnent une grille à :30, pas à :00.
+
+    Pour chaque point de la grille, jointure as-of triée (searchsorted):
+    - mesure la plus proche si elle est à moins de `tolerance_minutes`
+    - sinon interpolation linéaire entre les mesures encadrantes si elles sont
+      séparées de moins de `max_gap_minutes` (trou borné)
+    - sinon valeur manquante (masque)
+    Coût: O(n log n) par room, entièrement vectorisé.
+
+    Args:
+        rooms: liste de tuples (room_name, timestamps int64, temperature, humidity)
+        interval_minutes: pas de la grille (None = déduit des données)
+
+    Returns:
+        (RoomFrame aligné, dict room_name -> {'nearest', 'interpolated'}: part de
+        la grille couverte par une mesure dans la tolérance / par interpolation)
+    """
+    if not rooms:
+        return RoomFrame.from_rooms([]), {}
+
+    interval = (int(interval_minutes * 60 * 1e9) if interval_minutes
+                else infer_interval_ns(rooms))
+    tolerance = int(tolerance_minutes * 60 * 1e9)
+    max_gap = int(max_gap_minutes * 60 * 1e9)
+
+    first = min(int(ts.min()) for _, ts, _, _ in rooms if len(ts))
+    last = max(int(ts.max()) for _, ts, _, _ in rooms if len(ts))
+    # Premier point de phase dominante à moins de la tolérance de la première mesure
+    phase = dominant_phase_ns(rooms, interval, tolerance)
+    start = first - tolerance + (phase - (first - tolerance)) % interval
+    # Taille calculée en entiers (np.arange perd en précision sur des int64 ~1e18)
+    grid = start + interval * np.arange((last - start) // interval + 1, dtype=np.int64)
+
+    shape = (len(rooms), len(grid))
+    temperature = np.full(shape, np.nan, dtype=np.float32)
+    humidity = np.full(shape, np.nan, dtype=np.float32)
+    coverage = {}
+
+    for r, (name, ts, temps, hums) in enumerate(rooms):
+        # Trier et dédupliquer (dernière mesure conservée), ignorer les températures manquantes
+        order = np.argsort(ts, kind='stable')
+        ts, temps, hums = ts[order], np.asarray(temps)[order], np.asarray(hums)[order]
+        keep = np.append(ts[1:] != ts[:-1], True) & ~np.isnan(temps)
+        ts, temps, hums = ts[keep], temps[keep], hums[keep]
+        if len(ts) == 0:
+            coverage[name] = {'nearest': 0.0, 'interpolated': 0.0}
+            continue
+
+        # As-of: dernière mesure <= point de grille, et la suivante
+        prev = np.searchsorted(ts, grid, side='right') - 1
+        nxt = np.searchsorted(ts, grid, side='left')
+        has_prev = prev >= 0
+        has_next = nxt < len(ts)
+        prev_c = np.clip(prev, 0, len(ts) - 1)
+        next_c = np.clip(nxt, 0, len(ts) - 1)
+
+        d_prev = np.where(has_prev, grid - ts[prev_c], np.iinfo(np.int64).max)
+        d_next = np.where(has_next, ts[next_c] - grid, np.iinfo(np.int64).max)
+
+        # 1) Mesure la plus proche dans la tolérance
+        nearest = np.where(d_prev <= d_next, prev_c, next_c)
+        near_ok = np.minimum(d_prev, d_next) <= tolerance
+
+        # 2) Interpolation linéaire sur un trou borné
+        span = ts[next_c] - ts[prev_c]
+        interp_ok = ~near_ok & has_prev & has_next & (span > 0) & (span <= max_gap)
+        weight = np.where(interp_ok, d_prev / np.where(span > 0, span, 1), 0.0)
+
+        for source, target in ((temps, temperature), (hums, humidity)):
+            values = np.full(len(grid), np.nan, dtype=np.float32)
+            values[near_ok] = source[nearest[near_ok]]
+            interpolated = source[prev_c] + (source[next_c] - source[prev_c]) * weight
+            values[interp_ok] = interpolated[interp_ok]
+            target[r] = values
+
+        coverage[name] = {'nearest': float(near_ok.mean()), 'interpolated': float(interp_ok.mean())}
+
+    mask = ~np.isnan(temperature)
+    frame = RoomFrame(grid, [name for name, _, _, _ in rooms], temperature, humidity, mask)
+    return frame, coverage
@@ -0,0 +1,645 @@
+# -*- coding: utf-8 -*-
+"""
+Store consolidé des séries temporelles des rooms (numpy.memmap)
+Chaque room est stockée en colonnes binaires à largeur fixe + un petit index JSON.
+Les lecteurs (entraînement, export Arduino, GUI) ouvrent les colonnes en memmap:
+cache de pages partagé et tranches sans copie.
+
+Les rooms créées par append_readings (sans CSV source) restent en attente
+('pending') hors de room_names: le modèle entraîné et csv_data.h gardent le
+même jeu de rooms tant qu'un réentraînement ne les inclut pas explicitement
+(train_model_with_date.py --include-new-rooms).
+
+Structure:
+    data/store/index.json
+    data/store/room1/timestamp.i8     (int64, ns depuis epoch)
+    data/store/room1/temperature.f4   (float32)
+    data/store/room1/humidity.f4      (float32, NaN si absente)
+    data/store/room1/external_temp.f4 (float32, NaN si absente)
+
+Une réimportation des CSV conserve les mesures présentes seulement dans le
+store (append, ingestion): rooms sans CSV, et lignes plus récentes que la fin
+du CSV de la room. Si des mesures ajoutées seraient perdues (CSV supprimé,
+ou mesures antérieures à la fin du CSV et absentes de celui-ci), l'import est
+refusé sans --force.
+
+Usage:
+    python room_store.py import [--data-dir data] [--store-dir data/store] [--force]
+    python room_store.py export [--store-dir data/store] [--out-dir data]
+    python room_store.py append Room3_new.csv [--room room3]
+    python room_store.py info
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+from room_data import DATA_DIR, RoomFrame, get_csv_files, detect_room_columns, read_room_columns
+
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+INDEX_FILE = 'index.json'
+STORE_VERSION = 1
+
+# Colonnes stockées: nom -> dtype numpy (little-endian, largeur fixe)
+STORE_COLUMNS = {
+    'timestamp': '<i8',
+    'temperature': '<f4',
+    'humidity': '<f4',
+    'external_temp': '<f4'
+}
+
+# Noms de room acceptés (mêmes identifiants que get_csv_files: 'room' + id)
+ROOM_NAME_PATTERN = re.compile(r'^room[\w-]+$')
+
+# Noms de colonnes utilisés lors de l'export CSV (même schéma que le générateur)
+CSV_COLUMN_NAMES = {
+    'timestamp': 'Timestamp',
+    'temperature': 'Temperature_Celsius(°C)',
+    'humidity': 'Relative_Humidity(%)',
+    'external_temp': 'External_Temp(°C)'
+}
+
+def column_filename(column):
+    """Nom du fichier binaire d'une colonne (ex: 'temperature.f4')"""
+    return f"{column}.{STORE_COLUMNS[column][1:]}"
+
+def file_fingerprint(path):
+    """Empreinte légère d'un fichier source (taille + date de modification)"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def _write_column(path, values, dtype):
+    """Écrit une colonne de manière atomique (fichier temporaire puis renommage)"""
+    tmp_path = path + '.tmp'
+    np.asarray(values, dtype=dtype).tofile(tmp_path)
+    os.replace(tmp_path, path)
+
+def _write_index(store_dir, index):
+    """Écrit l'index JSON de manière atomique"""
+    path = os.path.join(store_dir, INDEX_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _empty_stats():
+    return {'count': 0, 'sum': 0.0, 'sum_sq': 0.0, 'min': None, 'max': None}
+
+def _update_stats(stats, temps):
+    """Met à jour les statistiques de température avec les nouvelles valeurs uniquement"""
+    values = np.asarray(temps, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return stats
+    stats['count'] += int(len(values))
+    stats['sum'] += float(values.sum())
+    stats['sum_sq'] += float(np.square(values).sum())
+    stats['min'] = float(values.min()) if stats['min'] is None else min(stats['min'], float(values.min()))
+    stats['max'] = float(values.max()) if stats['max'] is None else max(stats['max'], float(values.max()))
+    return stats
+
+def _is_pending(room):
+    """Room en attente: créée par append_readings et pas encore incluse (stores antérieurs: sans source)"""
+    return room.get('pending', room.get('source') is None)
+
+def _to_int64_timestamps(timestamps):
+    """Convertit des timestamps (int64 ns, datetime64, chaînes...) en int64 ns"""
+    timestamps = np.asarray(timestamps)
+    if timestamps.dtype == np.int64:
+        return timestamps
+    return pd.to_datetime(timestamps).values.astype('datetime64[ns]').view(np.int64)
+
+class RoomStore:
+    """Store ouvert en lecture: colonnes de chaque room exposées en numpy.memmap"""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        if self.index.get('version') != STORE_VERSION:
+            raise ValueError(f"Version de store non supportée: {self.index.get('version')}")
+        self.rooms = {room['name']: room for room in self.index['rooms']}
+        self._maps = {}
+
+    @property
+    def room_names(self):
+        """Noms des rooms dans l'ordre d'import (même ordre que get_csv_files), hors rooms en attente"""
+        return [room['name'] for room in self.index['rooms'] if not _is_pending(room)]
+
+    @property
+    def pending_rooms(self):
+        """Rooms ajoutées par append_readings, pas encore incluses par un réentraînement"""
+        return [room['name'] for room in self.index['rooms'] if _is_pending(room)]
+
+    def column(self, room_name, column):
+        """
+        Retourne une colonne d'une room en memmap lecture seule (aucune copie)
+
+        Les colonnes absentes (humidité, température extérieure) valent NaN.
+        """
+        key = (room_name, column)
+        if key not in self._maps:
+            room = self.rooms[room_name]
+            dtype = np.dtype(STORE_COLUMNS[column])
+            path = os.path.join(self.store_dir, room['dir'], column_filename(column))
+            if room['rows'] == 0:
+                self._maps[key] = np.empty(0, dtype=dtype)
+            else:
+                self._maps[key] = np.memmap(path, dtype=dtype, mode='r', shape=(room['rows'],))
+        return self._maps[key]
+
+    def has_column(self, room_name, column):
+        """Indique si la colonne existait dans la source (humidité, temp. extérieure)"""
+        return column in self.rooms[room_name]['columns']
+
+    def room_dataframe(self, room_name, start=None, stop=None):
+        """DataFrame (timestamp, temperature[, humidity, external_temp]) d'une room"""
+        rows = slice(start, stop)
+        data = {'timestamp': pd.to_datetime(self.column(room_name, 'timestamp')[rows].view('datetime64[ns]'))}
+        for column in ('temperature', 'humidity', 'external_temp'):
+            if column == 'temperature' or self.has_column(room_name, column):
+                data[column] = self.column(room_name, column)[rows]
+        return pd.DataFrame(data)
+
+    def room_series(self, default_humidity=50.0, include_pending=False):
+        """
+        Séries (room_name, timestamps, temperature, humidity) de chaque room, en memmap
+
+        Args:
+            default_humidity: humidité des rooms sans colonne humidité, et des lignes
+                sans mesure (historique antérieur à un append qui l'apporte)
+            include_pending: inclure les rooms en attente (réentraînement qui les intègre)
+        """
+        rooms = []
+        for name in self.room_names + (self.pending_rooms if include_pending else []):
+            temps = self.column(name, 'temperature')
+            if self.has_column(name, 'humidity'):
+                hums = self.column(name, 'humidity')
+                missing = np.isnan(hums)
+                if missing.any():
+                    hums = np.where(missing, np.float32(default_humidity), hums)
+            else:
+                hums = np.full(len(temps), default_humidity, dtype=np.float32)
+            rooms.append((name, self.column(name, 'timestamp'), temps, hums))
+        return rooms
+
+    def to_room_frame(self, default_humidity=50.0):
+        """Construit la représentation large RoomFrame utilisée par l'entraînement"""
+        return RoomFrame.from_rooms(self.room_series(default_humidity))
+
+    def is_current(self, csv_files=None):
+        """
+        Vérifie que le store correspond aux CSV actuels de data/
+
+        Le store est considéré à jour si les mêmes rooms sont présentes et que
+        chaque CSV source n'a pas changé depuis l'import. Les rooms sans CSV
+        source (append_readings) ne comptent pas: en attente, elles sont hors
+        de room_names; incluses, elles font partie du jeu entraîné.
+        """
+        if csv_files is None:
+            csv_files = get_csv_files(self.index.get('data_dir', DATA_DIR))
+        imported = [room['name'] for room in self.index['rooms'] if room.get('source')]
+        if list(csv_files) != imported:
+            return False
+        for name, path in csv_files.items():
+            source = self.rooms[name]['source']
+            if not os.path.exists(path) or source.get('fingerprint') != file_fingerprint(path):
+                return False
+        return True
+
+def store_dir_for(data_dir=DATA_DIR):
+    """Store memmap associé à un dossier de CSV (data/store, data/<site>/store)"""
+    return os.path.join(data_dir, 'store')
+
+def open_store(store_dir=STORE_DIR):
+    """Ouvre le store s'il existe, sinon retourne None"""
+    if not os.path.exists(os.path.join(store_dir, INDEX_FILE)):
+        return None
+    return RoomStore(store_dir)
+
+def appended_rows(index):
+    """Nombre de lignes du store absentes des CSV importés (append_readings, ingestion)"""
+    return sum(room['rows'] - (0 if room.get('source') is None else room.get('source_rows', room['rows']))
+               for room in index['rooms'])
+
+def open_current_store(csv_files=None, store_dir=STORE_DIR):
+    """Ouvre le store uniquement s'il est à jour par rapport aux CSV, sinon None"""
+    try:
+        store = open_store(store_dir)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[WARN] Store illisible ({store_dir}): {e}")
+        return None
+    if store is None:
+        return None
+    if not store.is_current(csv_files):
+        appended = appended_rows(store.index)
+        if appended:
+            print(f"[WARN] Store {store_dir} plus à jour avec les CSV: lecture des CSV, {appended} mesures "
+                  f"ajoutées au store (append / ingestion) ignorées. Relancez 'python room_store.py import' "
+                  f"pour les réintégrer")
+        return None
+    if store.pending_rooms:
+        print(f"[INFO] {len(store.pending_rooms)} rooms ajoutées hors CSV en attente "
+              f"(ignorées jusqu'à train_model_with_date.py --include-new-rooms): {', '.join(store.pending_rooms)}")
+    return store
+
+def include_pending_rooms(store_dir=STORE_DIR, room_names=None):
+    """
+    Intègre des rooms en attente au jeu de rooms du store (après un réentraînement qui les inclut)
+
+    Args:
+        room_names: rooms à intégrer (défaut: toutes les rooms en attente)
+
+    Returns:
+        noms des rooms intégrées
+    """
+    store = open_store(store_dir)
+    if store is None:
+        return []
+    included = []
+    for room in store.index['rooms']:
+        if _is_pending(room) and (room_names is None or room['name'] in room_names):
+            room['pending'] = False
+            included.append(room['name'])
+    if included:
+        _write_index(store_dir, store.index)
+    return included
+
+def _new_store_index(data_dir=DATA_DIR):
+    return {'version': STORE_VERSION, 'data_dir': data_dir, 'columns': STORE_COLUMNS, 'rooms': []}
+
+def _read_csv_timestamps(csv_file):
+    _, detected = detect_room_columns(csv_file)
+    if detected['timestamp'] is None or detected['temperature'] is None:
+        return np.empty(0, dtype=np.int64)
+    return read_room_columns(csv_file, detected)[0]
+
+def _rows_outside_csv(store, csv_files):
+    """
+    Lignes du store absentes des CSV actuels (append_readings, ingestion), copiées en mémoire
+
+    Rooms sans CSV source: toutes leurs lignes. Rooms importées: lignes au-delà
+    des source_rows importées (stores antérieurs: plus récentes que la fin du CSV).
+
+    Returns:
+        (dict room -> {'room': entrée d'index, colonnes} des lignes conservées
+         au-delà de la fin du CSV, dict room -> nombre de lignes perdues)
+    """
+    kept, lost = {}, {}
+    for room in store.index['rooms']:
+        name = room['name']
+        imported = room.get('source') is not None
+        start = room.get('source_rows') if imported else 0
+        if start is not None and start >= room['rows']:
+            continue
+        timestamps = store.column(name, 'timestamp')
+        csv_timestamps = _read_csv_timestamps(csv_files[name]) if name in csv_files else None
+        if start is None:
+            # Store antérieur à source_rows: seules les lignes après la fin du CSV sont identifiables
+            if csv_timestamps is None or len(csv_timestamps) == 0:
+                continue
+            start = int(np.searchsorted(timestamps, csv_timestamps.max(), side='right'))
+            if start >= room['rows']:
+                continue
+
+        extra = timestamps[start:]
+        if csv_timestamps is None:
+            # CSV supprimé: la room importée disparaît, une room sans CSV est conservée
+            keep = np.full(len(extra), not imported)
+        elif len(csv_timestamps):
+            keep = extra > csv_timestamps.max()
+        else:
+            keep = np.ones(len(extra), dtype=bool)
+        missing = ~keep if csv_timestamps is None else ~keep & ~np.isin(extra, csv_timestamps)
+        if missing.any():
+            lost[name] = int(missing.sum())
+        if keep.any():
+            kept[name] = {'room': room, 'timestamp': np.array(extra[keep])}
+            for column in ('temperature', 'humidity', 'external_temp'):
+                kept[name][column] = np.array(store.column(name, column)[start:][keep])
+    return kept, lost
+
+def import_csv_to_store(data_dir=DATA_DIR, store_dir=STORE_DIR, force=False):
+    """
+    Importe tous les fichiers RoomN_data.csv dans le store memmap
+
+    Les mesures présentes seulement dans le store (rooms sans CSV, lignes plus
+    récentes que la fin du CSV) sont conservées.
+
+    Args:
+        force: réimporter même si des mesures ajoutées au store seraient perdues
+
+    Returns:
+        RoomStore ouvert sur le store créé
+
+    Raises:
+        ValueError: aucun CSV, ou mesures ajoutées perdues sans force
+    """
+    csv_files = get_csv_files(data_dir)
+    if not csv_files:
+        raise ValueError(f"Aucun fichier Room*_data.csv trouvé dans {data_dir}/")
+
+    try:
+        previous = open_store(store_dir)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[WARN] Store existant illisible ({store_dir}), remplacé: {e}")
+        previous = None
+    carried, lost = _rows_outside_csv(previous, csv_files) if previous is not None else ({}, {})
+    # Libérer les memmaps avant de réécrire les colonnes
+    del previous
+    if lost:
+        detail = ', '.join(f"{name}: {count}" for name, count in lost.items())
+        if not force:
+            raise ValueError(f"Mesures ajoutées au store (append / ingestion) absentes des CSV et non "
+                             f"conservables ({detail}); exportez-les (room_store.py export) ou relancez avec --force")
+        print(f"[WARN] --force: mesures ajoutées au store abandonnées ({detail})")
+
+    os.makedirs(store_dir, exist_ok=True)
+    index = _new_store_index(data_dir)
+
+    for room_name, csv_file in csv_files.items():
+        fingerprint = file_fingerprint(csv_file)
+        _, detected = detect_room_columns(csv_file)
+        if detected['timestamp'] is None or detected['temperature'] is None:
+            print(f"[WARN] {csv_file}: colonnes timestamp/température introuvables, ignoré")
+            continue
+
+        timestamps, values = read_room_columns(csv_file, detected)
+        # Stockage trié par timestamp (ordre stable pour conserver les doublons)
+        order = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[order]
+        values = {column: column_values[order] for column, column_values in values.items()}
+        source_rows = len(timestamps)
+
+        extra = carried.pop(room_name, None)
+        if extra is not None:
+            # Mesures ajoutées après la fin du CSV: conservées en fin de colonnes
+            timestamps = np.concatenate([timestamps, extra['timestamp']])
+            for column in ('temperature', 'humidity', 'external_temp'):
+                if column in values or column in extra['room']['columns']:
+                    csv_values = values.get(column, np.full(source_rows, np.nan, dtype=np.float32))
+                    values[column] = np.concatenate([csv_values, extra[column]])
+
+        entry = _write_room(store_dir, room_name, timestamps, values)
+        entry['source'] = {'path': csv_file, 'fingerprint': fingerprint}
+        entry['source_rows'] = source_rows
+        index['rooms'].append(entry)
+        kept = f", {len(timestamps) - source_rows} mesures ajoutées conservées" if extra is not None else ""
+        print(f"[OK] {room_name}: {source_rows} lignes importées ({', '.join(entry['columns'])}){kept}")
+
+    # Rooms sans CSV (append_readings, ingestion): conservées avec leur état en attente / inclus
+    for room_name, extra in carried.items():
+        values = {column: extra[column] for column in ('temperature', 'humidity', 'external_temp')
+                  if column == 'temperature' or column in extra['room']['columns']}
+        entry = _write_room(store_dir, extra['room']['dir'], extra['timestamp'], values)
+        entry.update(name=room_name, source=None, pending=_is_pending(extra['room']))
+        index['rooms'].append(entry)
+        print(f"[OK] {room_name}: {len(extra['timestamp'])} lignes conservées (sans CSV"
+              f"{', en attente' if entry['pending'] else ''})")
+
+    _write_index(store_dir, index)
+    print(f"[OK] Store écrit: {store_dir} ({len(index['rooms'])} rooms)")
+    return RoomStore(store_dir)
+
+def _write_room(store_dir, room_dir_name, timestamps, values):
+    """
+    Écrit les colonnes d'une room (triées par timestamp)
+
+    Args:
+        values: dict colonne -> tableau ('temperature' requis, autres colonnes optionnelles)
+
+    Returns:
+        entrée d'index sans source
+    """
+    room_dir = os.path.join(store_dir, room_dir_name)
+    os.makedirs(room_dir, exist_ok=True)
+
+    present = ['timestamp', 'temperature']
+    _write_column(os.path.join(room_dir, column_filename('timestamp')), timestamps, STORE_COLUMNS['timestamp'])
+    for column in ('temperature', 'humidity', 'external_temp'):
+        if column in values:
+            column_values = values[column]
+            if column != 'temperature':
+                present.append(column)
+        else:
+            column_values = np.full(len(timestamps), np.nan, dtype=np.float32)
+        _write_column(os.path.join(room_dir, column_filename(column)), column_values, STORE_COLUMNS[column])
+
+    return {
+        'name': room_dir_name,
+        'dir': room_dir_name,
+        'rows': int(len(timestamps)),
+        'columns': present,
+        'first_ts': int(timestamps[0]) if len(timestamps) else None,
+        'last_ts': int(timestamps[-1]) if len(timestamps) else None,
+        'stats': _update_stats(_empty_stats(), values['temperature'])
+    }
+
+def append_readings(batch, store_dir=STORE_DIR):
+    """
+    Ajoute de nouvelles mesures au store, room par room (append-only)
+
+    Seules les nouvelles lignes sont écrites: les colonnes existantes sont
+    complétées en fin de fichier, sans relire ni réécrire l'historique.
+    Les doublons du lot sont dédupliqués sur le timestamp (la dernière mesure
+    l'emporte) et les mesures antérieures ou égales au high-water mark de la
+    room (dernier timestamp stocké) sont ignorées.
+
+    Args:
+        batch: dict room_name -> dict de colonnes {'timestamp', 'temperature'[,
+               'humidity', 'external_temp']} (tableaux de même longueur)
+        store_dir: dossier du store (créé si nécessaire)
+
+    Returns:
+        dict room_name -> {'appended': n, 'duplicates': n, 'stale': n}
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    if os.path.exists(os.path.join(store_dir, INDEX_FILE)):
+        index = RoomStore(store_dir).index
+    else:
+        index = _new_store_index()
+    rooms = {room['name']: room for room in index['rooms']}
+    summary = {}
+
+    for room_name, columns in batch.items():
+        if not ROOM_NAME_PATTERN.match(room_name):
+            raise ValueError(f"Nom de room invalide: '{room_name}' (attendu: room<id>)")
+
+        timestamps = _to_int64_timestamps(columns['timestamp'])
+        n_input = len(timestamps)
+
+        # Dédupliquer le lot sur le timestamp (dernière occurrence conservée), trié
+        _, last_positions = np.unique(timestamps[::-1], return_index=True)
+        keep = n_input - 1 - last_positions
+        duplicates = n_input - len(keep)
+
+        room = rooms.get(room_name)
+        if room is None:
+            room = {'name': room_name, 'dir': room_name, 'rows': 0,
+                    'columns': ['timestamp', 'temperature'], 'first_ts': None,
+                    'last_ts': None, 'stats': _empty_stats(), 'source': None, 'pending': True}
+            rooms[room_name] = room
+            index['rooms'].append(room)
+
+        # Ignorer tout ce qui n'est pas plus récent que le high-water mark
+        if room['last_ts'] is not None:
+            keep = keep[timestamps[keep] > room['last_ts']]
+        stale = n_input - duplicates - len(keep)
+        summary[room_name] = {'appended': int(len(keep)), 'duplicates': int(duplicates), 'stale': int(stale)}
+        if len(keep) == 0:
+            continue
+
+        room_dir = os.path.join(store_dir, room['dir'])
+        os.makedirs(room_dir, exist_ok=True)
+        new_values = {'timestamp': timestamps[keep]}
+        for column in ('temperature', 'humidity', 'external_temp'):
+            if columns.get(column) is not None:
+                new_values[column] = np.asarray(columns[column], dtype=np.float32)[keep]
+                if column not in room['columns']:
+                    room['columns'].append(column)
+            else:
+                new_values[column] = np.full(len(keep), np.nan, dtype=np.float32)
+
+        for column, values in new_values.items():
+            path = os.path.join(room_dir, column_filename(column))
+            dtype = np.dtype(STORE_COLUMNS[column])
+            expected_size = room['rows'] * dtype.itemsize
+            # Écarter une éventuelle écriture partielle (interrompue avant l'index)
+            if os.path.exists(path) and os.path.getsize(path) > expected_size:
+                os.truncate(path, expected_size)
+            with open(path, 'ab') as f:
+                np.asarray(values, dtype=dtype).tofile(f)
+
+        room['rows'] += int(len(keep))
+        if room['first_ts'] is None:
+            room['first_ts'] = int(new_values['timestamp'][0])
+        room['last_ts'] = int(new_values['timestamp'][-1])
+        _update_stats(room['stats'], new_values['temperature'])
+
+    _write_index(store_dir, index)
+    return summary
+
+def append_csv_files(csv_files, room_name=None, store_dir=STORE_DIR):
+    """
+    Ajoute au store les lignes de fichiers CSV (colonnes détectées via COLUMN_MAPPINGS)
+
+    Args:
+        csv_files: liste de chemins; la room est déduite du nom 'RoomN_....csv'
+        room_name: room cible pour tous les fichiers (prioritaire sur le nom de fichier)
+    """
+    batch = {}
+    for csv_file in csv_files:
+        target = room_name
+        if target is None:
+            match = re.match(r'^Room([\w-]+?)_', os.path.basename(csv_file))
+            if match is None:
+                raise ValueError(f"Room introuvable dans le nom '{csv_file}', utilisez --room")
+            target = f"room{match.group(1)}"
+
+        _, detected = detect_room_columns(csv_file)
+        if detected['timestamp'] is None or detected['temperature'] is None:
+            raise ValueError(f"{csv_file}: colonnes timestamp/température introuvables")
+        timestamps, values = read_room_columns(csv_file, detected)
+        values['timestamp'] = timestamps
+
+        if target in batch:
+            # Plusieurs fichiers pour la même room: concaténer avant l'ajout
+            previous = batch[target]
+            merged = {}
+            for column in set(previous) | set(values):
+                merged[column] = np.concatenate([
+                    part.get(column, np.full(len(part['timestamp']), np.nan, dtype=np.float32))
+                    for part in (previous, values)
+                ])
+            values = merged
+        batch[target] = values
+
+    summary = append_readings(batch, store_dir)
+    for name, result in summary.items():
+        print(f"[OK] {name}: +{result['appended']} lignes "
+              f"(doublons: {result['duplicates']}, déjà présentes/anciennes: {result['stale']})")
+    return summary
+
+def export_store_to_csv(store_dir=STORE_DIR, out_dir=DATA_DIR):
+    """Réécrit chaque room du store au format RoomN_data.csv"""
+    store = RoomStore(store_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+
+    for name in store.rooms:
+        df = store.room_dataframe(name)
+        df.rename(columns=CSV_COLUMN_NAMES, inplace=True)
+        output_file = os.path.join(out_dir, f"Room{name[4:]}_data.csv")
+        df.to_csv(output_file, index=False, date_format='%Y-%m-%d %H:%M:%S')
+        written.append(output_file)
+        print(f"[OK] {name}: {len(df)} lignes -> {output_file}")
+
+        # Export vers les CSV sources: le store reste à jour
+        source = store.rooms[name].get('source')
+        if source and os.path.abspath(source['path']) == os.path.abspath(output_file):
+            source['fingerprint'] = file_fingerprint(output_file)
+            store.rooms[name]['source_rows'] = store.rooms[name]['rows']
+
+    _write_index(store_dir, store.index)
+    return written
+
+def print_store_info(store_dir=STORE_DIR):
+    """Affiche le contenu de l'index du store"""
+    store = RoomStore(store_dir)
+    total_rows = 0
+    print(f"Store: {store_dir} ({len(store.room_names)} rooms, {len(store.pending_rooms)} en attente)")
+    for name in store.rooms:
+        room = store.rooms[name]
+        total_rows += room['rows']
+        first = pd.Timestamp(room['first_ts']) if room['first_ts'] is not None else '-'
+        last = pd.Timestamp(room['last_ts']) if room['last_ts'] is not None else '-'
+        stats = room.get('stats') or _empty_stats()
+        mean = f"{stats['sum'] / stats['count']:.2f}°C" if stats['count'] else '-'
+        pending = " | en attente (--include-new-rooms)" if _is_pending(room) else ""
+        print(f"  {name}: {room['rows']} lignes | {first} -> {last} | moy: {mean} | "
+              f"{', '.join(room['columns'])}{pending}")
+    print(f"Total: {total_rows} lignes | À jour avec les CSV: {'oui' if store.is_current() else 'non'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Store memmap des séries temporelles des rooms")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Importer data/Room*_data.csv dans le store")
+    import_parser.add_argument('--data-dir', default=DATA_DIR)
+    import_parser.add_argument('--store-dir', default=STORE_DIR)
+    import_parser.add_argument('--force', action='store_true',
+                               help="Réimporter même si des mesures ajoutées au store seraient perdues")
+
+    export_parser = subparsers.add_parser('export', help="Réexporter le store en RoomN_data.csv")
+    export_parser.add_argument('--store-dir', default=STORE_DIR)
+    export_parser.add_argument('--out-dir', default=DATA_DIR)
+
+    append_parser = subparsers.add_parser('append', help="Ajouter de nouvelles mesures au store")
+    append_parser.add_argument('csv_files', nargs='+', help="CSV de nouvelles mesures (RoomN_....csv)")
+    append_parser.add_argument('--room', default=None, help="Room cible (ex: room3)")
+    append_parser.add_argument('--store-dir', default=STORE_DIR)
+
+    info_parser = subparsers.add_parser('info', help="Afficher le contenu du store")
+    info_parser.add_argument('--store-dir', default=STORE_DIR)
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        try:
+            import_csv_to_store(args.data_dir, args.store_dir, args.force)
+        except ValueError as e:
+            print(f"[ERREUR] {e}")
+            sys.exit(1)
+    elif args.command == 'export':
+        export_store_to_csv(args.store_dir, args.out_dir)
+    elif args.command == 'append':
+        append_csv_files(args.csv_files, args.room, args.store_dir)
+    else:
+        print_store_info(args.store_dir)
+
+if __name__ == "__main__":
+    main()
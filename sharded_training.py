@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Entraînement shardé: un modèle par groupe de rooms
+Avec un seul modèle multi-sorties, tout le parc est entraîné dans un seul
+model.fit et une room difficile ralentit la convergence de toutes les autres.
+Ici les rooms sont réparties en groupes, chaque groupe entraîne son propre
+réseau Input(5) -> Dense(32) -> Dense(32) -> Output(n) dans un processus
+dédié (threads de calcul plafonnés), puis les shards sont fusionnés:
+
+- ShardedModel: predict() rend les N rooms dans l'ordre global (alphabétique)
+- neural_weights.h: un jeu de poids par shard + index room -> (shard, colonne)
+  (export_weights_for_esp32, predict_rooms avec NUM_SHARDS dans le firmware)
+
+Répartition des rooms (SHARD_METHODS):
+- 'count': groupes contigus de tailles égales (ordre alphabétique)
+- 'cluster': k-means sur le profil thermique de chaque room (température
+  moyenne par période de l'année x heure), rooms semblables ensemble
+
+Usage:
+    python train_model_with_date.py --shards 8 --shard-method cluster --shard-workers 4
+"""
+
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+from dataset_reduction import strata_keys
+from forecast import NumpyMLP
+from site_pipeline import THREAD_ENV_VARS
+
+SHARD_METHODS = ('count', 'cluster')
+SHARDS_FILE = 'rooms_model_shards.npz'
+
+# Profil thermique d'une room pour le clustering: ~mois x tranche de 4h
+PROFILE_DOY_BINS = 12
+PROFILE_HOUR_BINS = 6
+KMEANS_ITERATIONS = 50
+
+# ============================================================================
+# RÉPARTITION DES ROOMS
+# ============================================================================
+
+def room_profiles(X, y):
+    """
+    Profil thermique de chaque room: température moyenne par strate jour de l'année x heure
+
+    Returns:
+        matrice rooms x strates (strates vides retirées)
+    """
+    keys = strata_keys(X, PROFILE_DOY_BINS, PROFILE_HOUR_BINS, 1)
+    _, keys = np.unique(keys, return_inverse=True)
+    counts = np.bincount(keys)
+    sums = np.zeros((len(counts), y.shape[1]))
+    np.add.at(sums, keys, y)
+    return (sums / counts[:, None]).T
+
+def kmeans_groups(profiles, num_groups, seed=42):
+    """
+    k-means (initialisation k-means++) sur les profils des rooms
+
+    Returns:
+        liste de groupes non vides (indices de rooms triés)
+    """
+    rng = np.random.default_rng(seed)
+    centers = [profiles[rng.integers(len(profiles))]]
+    for _ in range(1, num_groups):
+        distances = np.min([((profiles - c) ** 2).sum(axis=1) for c in centers], axis=0)
+        total = distances.sum()
+        index = rng.choice(len(profiles), p=distances / total) if total > 0 else rng.integers(len(profiles))
+        centers.append(profiles[index])
+    centers = np.array(centers)
+
+    labels = None
+    for _ in range(KMEANS_ITERATIONS):
+        distances = ((profiles[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        for g in range(num_groups):
+            if np.any(labels == g):
+                centers[g] = profiles[labels == g].mean(axis=0)
+    return [np.flatnonzero(labels == g).tolist() for g in range(num_groups) if np.any(labels == g)]
+
+def partition_rooms(X, y, num_shards, method='count', seed=42):
+    """
+    Répartit les colonnes de y (rooms) en groupes
+
+    Args:
+        X, y: features brutes (prepare_features_with_date, avant standardisation) et températures
+        num_shards: nombre de groupes voulus (borné par le nombre de rooms)
+        method: 'count' ou 'cluster'
+
+    Returns:
+        liste de listes d'indices de rooms
+    """
+    num_rooms = y.shape[1]
+    num_shards = max(1, min(int(num_shards), num_rooms))
+    if method == 'count':
+        return [group.tolist() for group in np.array_split(np.arange(num_rooms), num_shards)]
+    if method == 'cluster':
+        return kmeans_groups(room_profiles(X, y), num_shards, seed)
+    raise ValueError(f"Répartition inconnue: '{method}' (attendu: {', '.join(SHARD_METHODS)})")
+
+# ============================================================================
+# MODÈLE FUSIONNÉ
+# ============================================================================
+
+class ShardedModel:
+    """
+    Shards fusionnés, même interface que le modèle Keras pour le pipeline
+    (predict, output_shape, count_params, save)
+
+    Attributes:
+        shards: par shard, dict 'rooms' (indices globaux) et 'weights'
+            (W0, BIAS0, W1, BIAS1, W2, BIAS2 au layout Keras)
+        num_rooms: nombre total de rooms
+    """
+
+    def __init__(self, shards, num_rooms):
+        self.shards = shards
+        self.num_rooms = num_rooms
+        self._networks = [NumpyMLP(list(zip(s['weights'][::2], s['weights'][1::2]))) for s in shards]
+
+    @property
+    def output_shape(self):
+        return (None, self.num_rooms)
+
+    @property
+    def num_shards(self):
+        return len(self.shards)
+
+    def room_index(self):
+        """Returns: (shard de chaque room, colonne de la room dans son shard)"""
+        room_shard = np.zeros(self.num_rooms, dtype=np.int32)
+        room_slot = np.zeros(self.num_rooms, dtype=np.int32)
+        for s, shard in enumerate(self.shards):
+            room_shard[shard['rooms']] = s
+            room_slot[shard['rooms']] = np.arange(len(shard['rooms']))
+        return room_shard, room_slot
+
+    def count_params(self):
+        return int(sum(w.size for shard in self.shards for w in shard['weights']))
+
+    def predict(self, X, batch_size=None, verbose=0):
+        output = np.empty((len(X), self.num_rooms), dtype=np.float32)
+        for shard, network in zip(self.shards, self._networks):
+            output[:, shard['rooms']] = network.predict(X)
+        return output
+
+    def save(self, path):
+        arrays = {'num_rooms': np.array(self.num_rooms)}
+        for s, shard in enumerate(self.shards):
+            arrays[f'shard{s}_rooms'] = np.asarray(shard['rooms'], dtype=np.int32)
+            for i, weight in enumerate(shard['weights']):
+                arrays[f'shard{s}_w{i}'] = weight
+        np.savez(path, **arrays)
+
+    @classmethod
+    def from_header(cls, arrays):
+        """ShardedModel à partir des tableaux d'un neural_weights.h shardé (parse_weights_header)"""
+        room_shard = arrays['ROOM_SHARD'].astype(np.int64)
+        room_slot = arrays['ROOM_SLOT'].astype(np.int64)
+        shards = []
+        for s in range(arrays['W0'].shape[0]):
+            rooms = np.flatnonzero(room_shard == s)
+            rooms = rooms[np.argsort(room_slot[rooms])]
+            n = len(rooms)
+            weights = [arrays['W0'][s], arrays['BIAS0'][s], arrays['W1'][s], arrays['BIAS1'][s],
+                       arrays['W2'][s][:, :n], arrays['BIAS2'][s][:n]]
+            shards.append({'rooms': rooms.tolist(), 'weights': weights})
+        return cls(shards, len(room_shard))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            shards = []
+            while f'shard{len(shards)}_rooms' in data:
+                s = len(shards)
+                weights = []
+                while f'shard{s}_w{len(weights)}' in data:
+                    weights.append(data[f'shard{s}_w{len(weights)}'])
+                shards.append({'rooms': data[f'shard{s}_rooms'].tolist(), 'weights': weights})
+            return cls(shards, int(data['num_rooms']))
+
+# ============================================================================
+# ENTRAÎNEMENT (un processus par shard)
+# ============================================================================
+
+def _init_worker(threads):
+    """Plafonne les threads de calcul du processus avant le premier calcul TensorFlow"""
+    if threads:
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(threads)
+        try:
+            import tensorflow as tf
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(threads)
+        except (ImportError, RuntimeError, AttributeError):
+            pass
+
+def _train_shard(task):
+    """Entraîne le modèle d'un shard (exécuté dans un processus du pool)"""
+    import train_model_with_date as pipeline
+    shard_idx, X_train, y_train, fit_kwargs, epochs, seed = task
+    np.random.seed(seed + shard_idx)
+    try:
+        import tensorflow as tf
+        tf.random.set_seed(seed + shard_idx)
+    except (ImportError, AttributeError):
+        pass
+
+    model = pipeline.create_model_with_date(num_outputs=y_train.shape[1], verbose=False)
+    start = time.perf_counter()
+    history = model.fit(X_train, y_train, epochs=epochs, batch_size=16, verbose=0, **fit_kwargs)
+    return {
+        'weights': [np.asarray(w) for w in model.get_weights()],
+        'seconds': time.perf_counter() - start,
+        'final_loss': float(history.history['loss'][-1])
+    }
+
+def train_shards(X_train, y_train, groups, epochs, fit_kwargs=None, workers=None, threads=None, seed=42):
+    """
+    Entraîne un modèle par groupe de rooms, au plus `workers` en parallèle
+
+    Args:
+        groups: listes d'indices de rooms (partition_rooms)
+        fit_kwargs: validation_split ou validation_data (y complet, découpé par shard)
+        workers: processus simultanés (défaut: min(shards, CPU))
+        threads: threads de calcul par processus (défaut: CPU / workers)
+
+    Returns:
+        ShardedModel
+    """
+    fit_kwargs = fit_kwargs or {}
+    workers = workers or min(len(groups), os.cpu_count() or 1)
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    print(f"[SHARDS] {len(groups)} shards, {workers} processus, {threads} threads par processus")
+
+    tasks = []
+    for s, rooms in enumerate(groups):
+        kwargs = dict(fit_kwargs)
+        if 'validation_data' in kwargs:
+            X_val, y_val = kwargs['validation_data']
+            kwargs['validation_data'] = (X_val, y_val[:, rooms])
+        tasks.append((s, X_train, y_train[:, rooms], kwargs, epochs, seed))
+
+    results = [None] * len(groups)
+    start = time.perf_counter()
+    # spawn: le processus parent a déjà initialisé TensorFlow (fork non sûr)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = {pool.submit(_train_shard, task): task[0] for task in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            s = futures[future]
+            results[s] = future.result()
+            print(f"  [{done}/{len(groups)}] shard {s}: {len(groups[s])} rooms, "
+                  f"{results[s]['seconds']:.1f}s, loss {results[s]['final_loss']:.4f}")
+    wall = time.perf_counter() - start
+    busy = sum(r['seconds'] for r in results)
+    print(f"[SHARDS] Terminé en {wall:.1f}s (somme des shards {busy:.1f}s, x{busy / wall if wall else 0:.1f})")
+
+    shards = [{'rooms': list(rooms), 'weights': result['weights']} for rooms, result in zip(groups, results)]
+    return ShardedModel(shards, y_train.shape[1])
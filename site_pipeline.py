@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline multi-sites: un bâtiment par dossier data/<site>/
+Chaque site exécute chargement -> features -> entraînement -> export dans un
+processus dédié (au plus --workers sites à la fois), avec ses propres
+artefacts et des limites de ressources par site:
+- mémoire résidente: surveillée par le driver, le processus est arrêté au-delà
+- temps CPU: RLIMIT_CPU appliqué par le processus du site (POSIX)
+- durée maximale
+- threads de calcul (OMP / TensorFlow), pour ne pas sur-souscrire la machine
+
+Layout:
+    data/<site>/Room*_data.csv[.gz|.zst|.xz]   CSV du bâtiment
+    data/<site>/store/                         store memmap (optionnel)
+    data/weather/<site>.json                   historique météo (optionnel)
+    sites/<site>/                              artefacts du site:
+        rooms_model_with_date.h5, rooms_model_with_date.weights.h5,
+        neural_weights.h, csv_data.h, ota/, reports/, profiles/, pipeline.log
+
+Usage:
+    python site_pipeline.py                                  # tous les sites de data/
+    python site_pipeline.py --sites batA batB --workers 2 --epochs 20
+    python site_pipeline.py --max-memory-mb 2048 --max-cpu-seconds 1800 --timeout 3600
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from room_data import DATA_DIR, get_sites
+from ota_artifacts import OTA_DIR
+from pipeline_profiler import PROFILE_DIR, current_rss_mb, profile_stage, profiling
+
+SITES_DIR = 'sites'
+RESULT_FILE = 'result.json'
+LOG_FILE = 'pipeline.log'
+REPORT_FILE = 'site_report.json'
+DEFAULT_EPOCHS = 100
+MONITOR_INTERVAL = 0.5   # secondes entre deux mesures de la RSS d'un site
+
+# Variables lues par OpenMP / BLAS / TensorFlow au démarrage du processus
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                   'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS')
+
+# Regroupement des étapes du profiler pour le rapport combiné
+REPORT_GROUPS = {
+    'load': ['import', 'load'],
+    'features': ['weather', 'features', 'split'],
+    'train': ['reduce', 'build_model', 'fit', 'fit_full', 'fit_raw'],
+    'evaluate': ['evaluate'],
+    'export': ['save', 'export_weights', 'export_csv']
+}
+
+# ============================================================================
+# PROCESSUS D'UN SITE
+# ============================================================================
+
+def run_site(site, data_dir, output_dir, epochs=DEFAULT_EPOCHS, max_cpu_seconds=None):
+    """
+    Exécute le pipeline complet d'un site dans le processus courant
+
+    Returns:
+        dict résultat (statut, durée par étape, pic RSS, nombre de rooms)
+    """
+    if max_cpu_seconds:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_CPU, (int(max_cpu_seconds), int(max_cpu_seconds) + 5))
+        except (ImportError, ValueError, OSError) as e:
+            print(f"[WARN] Limite CPU non appliquée: {e}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    result = {'site': site, 'data_dir': data_dir, 'status': 'ok'}
+    start = time.perf_counter()
+    profiler = None
+    try:
+        with profiling(f"site_{site}", output_dir=os.path.join(output_dir, PROFILE_DIR)) as profiler:
+            with profile_stage('import'):
+                import train_model_with_date as pipeline
+                from export_csv_to_arduino_v2 import export_csv_to_arduino
+
+            model, _ = pipeline.train_model(epochs=epochs, data_dir=data_dir, site=site, output_dir=output_dir)
+            if model is None:
+                raise RuntimeError("aucun modèle produit")
+            result['rooms'] = int(model.output_shape[-1])
+
+            with profile_stage('export_weights'):
+                pipeline.export_weights_for_esp32(model, result['rooms'], output_dir)
+            with profile_stage('export_csv'):
+                export_csv_to_arduino(data_dir, os.path.join(output_dir, 'csv_data.h'),
+                                      ota_dir=os.path.join(output_dir, OTA_DIR))
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+        print(f"[ERROR] {site}: {result['error']}")
+
+    result['seconds'] = time.perf_counter() - start
+    if profiler is not None:
+        records = [r for r in profiler.records if r.depth == 0]
+        result['stages'] = {r.name: r.wall for r in records}
+        peaks = [r.peak_rss_mb for r in records if r.peak_rss_mb is not None]
+        result['peak_rss_mb'] = max(peaks) if peaks else None
+    return result
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def _site_environment(threads):
+    env = dict(os.environ)
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [repo_dir, env.get('PYTHONPATH')]))
+    if threads:
+        for name in THREAD_ENV_VARS:
+            env[name] = str(threads)
+    return env
+
+def run_site_process(site, data_dir, args):
+    """
+    Lance un site dans un sous-processus et applique ses limites (exécuté par un thread du pool)
+
+    Un site qui dépasse sa limite ou plante n'affecte pas les autres.
+    """
+    output_dir = os.path.join(args.output_dir, site)
+    os.makedirs(output_dir, exist_ok=True)
+    result_file = os.path.join(output_dir, RESULT_FILE)
+    if os.path.exists(result_file):
+        os.remove(result_file)
+
+    command = [sys.executable, os.path.abspath(__file__), '--worker', site,
+               '--data-dir', data_dir, '--output-dir', output_dir, '--epochs', str(args.epochs)]
+    if args.max_cpu_seconds:
+        command += ['--max-cpu-seconds', str(args.max_cpu_seconds)]
+
+    start = time.perf_counter()
+    peak_mb = None
+    limit_error = None
+    with open(os.path.join(output_dir, LOG_FILE), 'w', encoding='utf-8') as log:
+        process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT,
+                                   env=_site_environment(args.threads))
+        while True:
+            try:
+                process.wait(timeout=MONITOR_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            rss = current_rss_mb(process.pid)
+            if rss is not None:
+                peak_mb = rss if peak_mb is None else max(peak_mb, rss)
+            if args.max_memory_mb and rss is not None and rss > args.max_memory_mb:
+                limit_error = f"limite mémoire dépassée ({rss:.0f} MB > {args.max_memory_mb} MB)"
+            elif args.timeout and time.perf_counter() - start > args.timeout:
+                limit_error = f"durée maximale dépassée ({args.timeout} s)"
+            if limit_error:
+                process.kill()
+                process.wait()
+                break
+
+    seconds = time.perf_counter() - start
+    if limit_error is None and os.path.exists(result_file):
+        with open(result_file, encoding='utf-8') as f:
+            result = json.load(f)
+    else:
+        if limit_error is None:
+            limit_error = f"processus terminé avec le code {process.returncode}"
+            if hasattr(signal, 'SIGXCPU') and process.returncode == -signal.SIGXCPU:
+                limit_error = f"limite CPU dépassée ({args.max_cpu_seconds} s)"
+        result = {'site': site, 'data_dir': data_dir, 'status': 'error', 'error': limit_error}
+    result['wall_seconds'] = seconds
+    if peak_mb is not None:
+        result['peak_rss_mb'] = max(peak_mb, result.get('peak_rss_mb') or 0)
+    result['log'] = os.path.join(output_dir, LOG_FILE)
+    return result
+
+def run_sites(sites, args):
+    """
+    Exécute tous les sites, au plus args.workers en parallèle
+
+    Returns:
+        dict du rapport combiné
+    """
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'config': {'workers': args.workers, 'epochs': args.epochs, 'threads': args.threads,
+                   'max_memory_mb': args.max_memory_mb, 'max_cpu_seconds': args.max_cpu_seconds,
+                   'timeout': args.timeout},
+        'sites': {}
+    }
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(run_site_process, site, data_dir, args): site for site, data_dir in sites.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            site = futures[future]
+            result = future.result()
+            report['sites'][site] = result
+            status = '[OK]' if result['status'] == 'ok' else '[X]'
+            detail = f"{result.get('rooms', '?')} rooms" if result['status'] == 'ok' else result.get('error')
+            print(f"{status} [{done}/{len(sites)}] {site}: {result['wall_seconds']:.1f}s, {detail}")
+    report['wall_seconds'] = time.perf_counter() - start
+    report['sites'] = {site: report['sites'][site] for site in sites}
+    return report
+
+def print_site_report(report):
+    """Tableau combiné: durée par groupe d'étapes, pic RSS et statut de chaque site"""
+    print("\n" + "="*100)
+    print("RAPPORT MULTI-SITES")
+    print("="*100)
+    header = f"{'Site':<20}{'Statut':<8}{'Rooms':>6}" + "".join(f"{group:>11}" for group in REPORT_GROUPS) + \
+             f"{'Total':>11}{'Pic RSS':>11}"
+    print(header)
+    print("-" * len(header))
+    total_site_seconds = 0.0
+    for site, result in report['sites'].items():
+        stages = result.get('stages', {})
+        cells = []
+        for names in REPORT_GROUPS.values():
+            seconds = sum(stages.get(name, 0.0) for name in names)
+            cells.append(f"{seconds:.1f}s" if any(name in stages for name in names) else '-')
+        peak = f"{result['peak_rss_mb']:.0f} MB" if result.get('peak_rss_mb') else '-'
+        total_site_seconds += result['wall_seconds']
+        print(f"{site[:19]:<20}{result['status']:<8}{str(result.get('rooms', '-')):>6}" +
+              "".join(f"{cell:>11}" for cell in cells) + f"{result['wall_seconds']:>10.1f}s{peak:>11}")
+    print("-" * len(header))
+
+    wall = report['wall_seconds']
+    failed = [site for site, result in report['sites'].items() if result['status'] != 'ok']
+    print(f"[INFO] {len(report['sites'])} sites en {wall:.1f}s (cumul {total_site_seconds:.1f}s, "
+          f"parallélisme effectif x{total_site_seconds / wall if wall else 0:.1f})")
+    for site in failed:
+        result = report['sites'][site]
+        print(f"[X] {site}: {result.get('error')} (journal: {result['log']})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline multi-sites (data/<site>/Room*_data.csv)")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Racine des sites (défaut: data)")
+    parser.add_argument('--sites', nargs='+', help="Sites à traiter (défaut: tous)")
+    parser.add_argument('--output-dir', default=SITES_DIR, help="Racine des artefacts (défaut: sites)")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Sites traités en parallèle")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="Threads de calcul par site (défaut: nb de CPU / workers)")
+    parser.add_argument('--epochs', type=int, default=DEFAULT_EPOCHS)
+    parser.add_argument('--max-memory-mb', type=float, help="RSS maximale par site")
+    parser.add_argument('--max-cpu-seconds', type=int, help="Temps CPU maximal par site (POSIX)")
+    parser.add_argument('--timeout', type=float, help="Durée maximale par site (secondes)")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        result = run_site(args.worker, args.data_dir, args.output_dir, args.epochs, args.max_cpu_seconds)
+        with open(os.path.join(args.output_dir, RESULT_FILE), 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        sys.exit(0 if result['status'] == 'ok' else 1)
+
+    sites = get_sites(args.data_dir)
+    if args.sites:
+        unknown = [site for site in args.sites if site not in sites]
+        if unknown:
+            print(f"[ERROR] Sites introuvables dans {args.data_dir}/: {', '.join(unknown)}")
+            sys.exit(1)
+        sites = {site: sites[site] for site in args.sites}
+    if not sites:
+        print(f"[ERROR] Aucun site trouvé (attendu: {args.data_dir}/<site>/Room*_data.csv)")
+        sys.exit(1)
+
+    args.workers = max(1, min(args.workers, len(sites)))
+    if args.threads is None:
+        args.threads = max(1, (os.cpu_count() or 1) // args.workers)
+    print(f"[INFO] {len(sites)} sites, {args.workers} en parallèle, {args.threads} threads par site")
+
+    report = run_sites(sites, args)
+    print_site_report(report)
+    os.makedirs(args.output_dir, exist_ok=True)
+    report_path = os.path.join(args.output_dir, REPORT_FILE)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"[OK] Rapport: {report_path}")
+    if any(result['status'] != 'ok' for result in report['sites'].values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
-﻿# -*- coding: utf-8 -*-
+# -*- coding: utf-8 -*-
 """
 Training amélioré avec features temporelles enrichies
 Architecture: Input(5) -> Dense(32) -> Dense(32) -> Output(N)
 Features: température_ext, humidité, saison_sin, saison_cos, heure_jour_sin
 """
 
+import os
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -15,44 +17,74 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 import tensorflow as tf
 import warnings
+
+from room_data import (COLUMN_MAPPINGS, DATA_DIR, RoomFrame, align_rooms, detect_column, detect_room_columns,
+                       get_csv_files, read_room_columns)
+from room_store import include_pending_rooms, open_current_store, store_dir_for
+from pipeline_profiler import add_profiling_arguments, options_from_args, profile_stage, profiling
+from dataset_reduction import METHODS as REDUCTION_METHODS, coreset_size, select_coreset
+from weather_store import DEFAULT_SITE, load_weather_store
+from evaluation import (REPORT_DIR, evaluate_predictions, print_evaluation_summary, residual_series,
+                        write_evaluation_report)
+from data_quality import (ACTIONS as QUALITY_ACTIONS, apply_quality, print_quality_summary, quarantine_dir_for,
+                          scan_rooms)
+from ota_artifacts import OTA_DIR, publish_sharded_weights, publish_weights
+from device_footprint import (DEFAULT_PROFILE, DEVICE_PROFILES, calendar_arrays, firmware_room_arrays,
+                              load_device_profile, print_footprint_report, sharded_weights_arrays, weights_arrays)
+from calendar_tables import (TIME_STEPS_PER_HOUR, export_calendar_tables, season_encoding,
+                             time_of_day_encoding)
+from sharded_training import SHARD_METHODS, SHARDS_FILE, ShardedModel, partition_rooms, train_shards
 warnings.filterwarnings('ignore')
 
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
 
-def get_csv_files():
-    """Détecte automatiquement tous les fichiers RoomN_data.csv dans data/"""
-    import os
-    import glob
-    
-    csv_files = {}
-    pattern = 'data/Room*_data.csv'
-    
-    for filepath in sorted(glob.glob(pattern)):
-        filename = os.path.basename(filepath)
-        # Extraire numéro de chambre (Room1, Room2, etc.)
-        if filename.startswith('Room') and filename.endswith('_data.csv'):
-            # Extraire le nom/numéro entre 'Room' et '_data.csv'
-            room_id = filename[4:-9]  # 'Room1_data.csv' -> '1'
-            csv_files[f'room{room_id}'] = filepath
-    
-    return csv_files
-
 CSV_FILES = get_csv_files()
 
-# Mapping flexible des colonnes - définir les noms possibles pour chaque type de colonne
-COLUMN_MAPPINGS = {
-    'timestamp': ['Timestamp', 'timestamp', 'Date', 'date', 'DateTime', 'datetime', 'Time', 'time'],
-    'temperature': ['Temperature_Celsius(°C)', 'Temperature', 'temperature', 'Temp', 'temp', 
-                    'Temperature(°C)', 'Temperature (°C)', 'Température', 'température'],
-    'humidity': ['Relative_Humidity(%)', 'Humidity', 'humidity', 'RH', 'rh', 'Humidité', 'humidité',
-                 'Relative Humidity', 'relative_humidity']
-}
-
 MODEL_FILE = 'rooms_model_with_date.h5'
 WEIGHTS_FILE = 'rooms_model_with_date.weights.h5'
 
+# Alignement temporel des rooms sur une grille commune (capteurs légèrement décalés)
+ALIGNMENT = {
+    'interval_minutes': None,   # Pas de la grille (None = déduit des données)
+    'tolerance_minutes': 5.0,   # Mesure la plus proche acceptée dans cette tolérance
+    'max_gap_minutes': 90.0     # Interpolation linéaire sur les trous plus courts
+}
+
+# Contrôle qualité des séries avant alignement (data_quality.py)
+QUALITY = {
+    'action': 'repair',         # 'report', 'repair' (lignes invalides retirées) ou 'quarantine'
+    'max_bad_fraction': 0.2     # Quarantaine: room exclue au-delà de cette part de lignes rejetées
+}
+
+# Entraînement shardé par groupes de rooms (sharded_training.py), désactivé par défaut
+SHARDING = {
+    'shards': None,             # Nombre de groupes (None ou 1 = un seul modèle)
+    'method': 'count',          # 'count' (tailles égales) ou 'cluster' (profils thermiques)
+    'workers': None,            # Processus simultanés (None = min(shards, CPU))
+    'threads': None             # Threads de calcul par processus (None = CPU / workers)
+}
+
+# Standardisation des features (StandardScaler) pendant l'entraînement, repliée
+# ensuite dans W0 / BIAS0: le modèle sauvegardé et neural_weights.h prennent
+# toujours les features brutes
+INPUT_SCALING = {
+    'enabled': True,
+    'compare': False,           # Entraîner aussi sans standardisation (époques pour atteindre la MAE cible)
+    'target_mae': None          # °C; None = meilleure MAE de validation atteinte par les deux (+5%)
+}
+
+# Réduction du train set par coreset (dataset_reduction.py), désactivée par défaut
+REDUCTION = {
+    'method': None,             # None, 'stratified' ou 'kcenter'
+    'fraction': 0.1,            # Taille cible en part du train set...
+    'size': None,               # ...ou en nombre d'échantillons
+    'mae_tolerance': None,      # °C: doubler la taille tant que la MAE de validation gagne plus
+    'compare_full': False,      # Entraîner aussi sur toutes les données (rapport de gain)
+    'seed': 42
+}
+
 # ============================================================================
 # CHARGEMENT ET PRÉPARATION DONNÉES
 # ============================================================================
@@ -63,158 +95,197 @@ def day_of_year(date):
 
 def encode_date_cyclical(date):
     """Encode la date de manière cyclique (sin/cos pour continuité)"""
-    doy = day_of_year(date)
-    angle = (2 * np.pi * doy) / 365.0
-    return np.sin(angle), np.cos(angle)
+    return season_encoding(day_of_year(date))
 
 def encode_season(date):
     """Encode la saison de manière cyclique"""
-    # Utilise le jour de l'année pour encoder la saison (cycle de 365 jours)
-    doy = day_of_year(date)
-    angle = (2 * np.pi * doy) / 365.0
-    return np.sin(angle), np.cos(angle)
+    # Utilise le jour de l'année pour encoder la saison (cycle de 365 jours),
+    # même calcul que les tables de l'appareil (calendar_tables.py)
+    return season_encoding(day_of_year(date))
 
 def encode_time_of_day(date):
     """Encode l'heure de la journée de manière cyclique (0-24h)"""
-    hour = date.hour + date.minute / 60.0
-    angle = (2 * np.pi * hour) / 24.0
-    return np.sin(angle)
+    return time_of_day_encoding(date.hour, date.minute)
 
-def detect_column(df, column_type):
+def peak_rss_mb():
+    """Retourne le pic de mémoire résidente (RSS) du processus en MB, ou None"""
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss est en octets sur macOS, en kilo-octets sur Linux
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+def report_peak_rss(label):
+    """Affiche le pic de mémoire résidente atteint jusqu'ici"""
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"[MEM] Pic RSS après {label}: {peak:.1f} MB")
+
+def load_room_data(alignment=ALIGNMENT, quality=QUALITY, data_dir=DATA_DIR, include_new_rooms=False):
     """
-    Détecte automatiquement quelle colonne correspond au type demandé
-    
+    Charge les données des rooms avec détection automatique des colonnes
+
     Args:
-        df: DataFrame pandas
-        column_type: 'timestamp' ou 'temperature'
-    
+        alignment: paramètres de align_rooms (None = jointure exacte sur les timestamps)
+        quality: action du contrôle qualité (QUALITY), None = pas de contrôle
+        data_dir: dossier des CSV (data/ ou data/<site>/)
+        include_new_rooms: inclure les rooms ajoutées au store hors CSV (en attente)
+
     Returns:
-        Nom de la colonne détectée ou None
+        RoomFrame: index int64 commun + matrices float32 (rooms x temps)
     """
-    possible_names = COLUMN_MAPPINGS.get(column_type, [])
-    
-    # Chercher correspondance exacte (case-insensitive)
-    for col in df.columns:
-        if col in possible_names:
-            return col
-    
-    # Chercher correspondance partielle
-    for col in df.columns:
-        col_lower = col.lower()
-        for possible in possible_names:
-            if possible.lower() in col_lower:
-                return col
-    
-    return None
-
-def load_room_data():
-    """Charge et fusionne les données des rooms avec détection automatique des colonnes"""
     print("="*80)
     print("CHARGEMENT DES DONNÉES AVEC FEATURES TEMPORELLES")
     print("="*80)
     
     # Détecter les fichiers CSV disponibles
-    csv_files = get_csv_files()
+    csv_files = get_csv_files(data_dir)
     
     if not csv_files:
         print("\n[WARN]  AUCUN FICHIER CSV TROUVÉ!")
-        print("   Assurez-vous d'avoir des fichiers Room1_data.csv, Room2_data.csv, etc. dans data/")
-        return pd.DataFrame()
+        print(f"   Assurez-vous d'avoir des fichiers Room1_data.csv, Room2_data.csv, etc. dans {data_dir}/")
+        return RoomFrame.from_rooms([])
     
     print(f"\n[FILES] Fichiers détectés: {len(csv_files)} chambres")
     for room_name, filepath in csv_files.items():
         print(f"   - {room_name}: {filepath}")
     print()
     
-    all_data = []
-    
-    for room_name, csv_file in csv_files.items():
-        try:
-            df = pd.read_csv(csv_file)
-            print(f"\n[OK] {csv_file}: {len(df)} lignes")
-            print(f"  Colonnes disponibles: {list(df.columns)}")
-            
-            # Détection automatique des colonnes
-            timestamp_col = detect_column(df, 'timestamp')
-            temperature_col = detect_column(df, 'temperature')
-            humidity_col = detect_column(df, 'humidity')
-            
-            if timestamp_col is None:
-                print(f"  [WARN] Colonne timestamp non trouvée. Colonnes disponibles: {list(df.columns)}")
-                print(f"     Essayez d'ajouter le nom de votre colonne dans COLUMN_MAPPINGS['timestamp']")
-                continue
-            
-            if temperature_col is None:
-                print(f"  [WARN] Colonne température non trouvée. Colonnes disponibles: {list(df.columns)}")
-                print(f"     Essayez d'ajouter le nom de votre colonne dans COLUMN_MAPPINGS['temperature']")
-                continue
-            
-            print(f"  -> Timestamp: '{timestamp_col}'")
-            print(f"  -> Température: '{temperature_col}'")
-            
-            # Préparer colonnes à extraire
-            cols_to_extract = [timestamp_col, temperature_col]
-            rename_map = {
-                timestamp_col: 'Timestamp',
-                temperature_col: 'temperature'
-            }
-            
-            # Ajouter humidité si disponible
-            if humidity_col:
-                print(f"  -> Humidité: '{humidity_col}'")
-                cols_to_extract.append(humidity_col)
-                rename_map[humidity_col] = 'humidity'
-            else:
-                print(f"  -> Humidité: Non disponible (sera simulée)")
-            
-            df_clean = df[cols_to_extract].copy()
-            df_clean.rename(columns=rename_map, inplace=True)
-            
-            # Ajouter humidité par défaut si absente
-            if 'humidity' not in df_clean.columns:
-                df_clean['humidity'] = 50.0  # Valeur par défaut 50%
-            
-            df_clean['room_name'] = room_name
-            
-            all_data.append(df_clean)
-            
-        except Exception as e:
-            print(f"[X] Erreur {csv_file}: {e}")
-    
-    if not all_data:
+    # Store memmap consolidé (room_store.py) s'il est à jour: pas de re-parsing CSV
+    store = open_current_store(csv_files, store_dir_for(data_dir))
+    if store is not None:
+        print(f"[STORE] Lecture depuis le store memmap: {store.store_dir}")
+        with profile_stage('read_store') as stage:
+            rooms = store.room_series(include_pending=include_new_rooms)
+            if include_new_rooms and store.pending_rooms:
+                print(f"[STORE] Rooms ajoutées hors CSV incluses: {', '.join(store.pending_rooms)}")
+            stage.rows = sum(len(ts) for _, ts, _, _ in rooms)
+    else:
+        rooms = []
+        
+        with profile_stage('read_csv') as stage:
+            for room_name, csv_file in csv_files.items():
+                try:
+                    # Lire uniquement l'en-tête pour détecter les colonnes
+                    columns, detected = detect_room_columns(csv_file)
+                
+                    if detected['timestamp'] is None:
+                        print(f"\n[OK] {csv_file}")
+                        print(f"  [WARN] Colonne timestamp non trouvée. Colonnes disponibles: {columns}")
+                        print(f"     Essayez d'ajouter le nom de votre colonne dans COLUMN_MAPPINGS['timestamp']")
+                        continue
+                
+                    if detected['temperature'] is None:
+                        print(f"\n[OK] {csv_file}")
+                        print(f"  [WARN] Colonne température non trouvée. Colonnes disponibles: {columns}")
+                        print(f"     Essayez d'ajouter le nom de votre colonne dans COLUMN_MAPPINGS['temperature']")
+                        continue
+                
+                    # Ne parser que les colonnes utiles, directement en float32
+                    timestamps, values = read_room_columns(csv_file, detected)
+                    print(f"\n[OK] {csv_file}: {len(timestamps)} lignes")
+                    print(f"  Colonnes disponibles: {columns}")
+                    print(f"  -> Timestamp: '{detected['timestamp']}'")
+                    print(f"  -> Température: '{detected['temperature']}'")
+                
+                    if 'humidity' in values:
+                        print(f"  -> Humidité: '{detected['humidity']}'")
+                        hums = values['humidity']
+                    else:
+                        print(f"  -> Humidité: Non disponible (sera simulée)")
+                        hums = np.full(len(timestamps), 50.0, dtype=np.float32)  # Valeur par défaut 50%
+                
+                    rooms.append((room_name, timestamps, values['temperature'], hums))
+                
+                except Exception as e:
+                    print(f"[X] Erreur {csv_file}: {e}")
+            stage.rows = sum(len(ts) for _, ts, _, _ in rooms)
+        
+    if not rooms:
         raise ValueError("Aucune donnée chargée")
     
-    merged = pd.concat(all_data, ignore_index=True)
-    merged['Timestamp'] = pd.to_datetime(merged['Timestamp'])
-    merged.sort_values('Timestamp', inplace=True)
-    merged.reset_index(drop=True, inplace=True)
+    if quality is not None:
+        with profile_stage('quality') as stage:
+            qualities = scan_rooms(rooms)
+            print_quality_summary(qualities)
+            # Quarantaine propre au site: pas de collision entre sites traités en parallèle
+            rooms = apply_quality(rooms, qualities, **{'quarantine_dir': quarantine_dir_for(data_dir), **quality})
+            stage.rows = sum(len(ts) for _, ts, _, _ in rooms)
+        if not rooms:
+            raise ValueError("Aucune room ne passe le contrôle qualité")
+    
+    with profile_stage('align') as stage:
+        if alignment is None:
+            # Jointure exacte: seuls les timestamps identiques sont alignés
+            frame = RoomFrame.from_rooms(rooms)
+        else:
+            frame, coverage = align_rooms(rooms, **alignment)
+            _report_coverage(frame, coverage)
+        stage.rows = frame.num_rooms * frame.num_timestamps
     
-    print(f"\n[OK] Total: {len(merged)} entrées")
-    print(f"  Période: {merged['Timestamp'].min()} -> {merged['Timestamp'].max()}\n")
+    return _report_loaded_frame(frame)
+
+def _report_coverage(frame, coverage):
+    """Affiche la couverture de la grille commune par room (mesures proches / interpolées)"""
+    interval_min = (frame.timestamps[1] - frame.timestamps[0]) / 60e9 if frame.num_timestamps > 1 else 0
+    start = frame.datetimes().min() if frame.num_timestamps else None
+    print(f"\n[ALIGN] Grille commune: {frame.num_timestamps} points, pas de {interval_min:g} min, début {start}")
+    ranked = sorted(coverage.items(), key=lambda item: (item[1]['nearest'] + item[1]['interpolated'], item[1]['nearest']))
+    shown = ranked if len(ranked) <= 20 else ranked[:10]
+    if len(ranked) > 20:
+        print(f"  Couverture moyenne: {100 * np.mean([c['nearest'] for c in coverage.values()]):.1f}% mesurée, "
+              f"{100 * np.mean([c['interpolated'] for c in coverage.values()]):.1f}% interpolée "
+              f"(10 rooms les moins couvertes ci-dessous)")
+    for name, ratio in shown:
+        print(f"  {name}: {100 * ratio['nearest']:.1f}% de la grille mesurée, "
+              f"{100 * ratio['interpolated']:.1f}% interpolée")
+    interpolated = [name for name, ratio in ranked if ratio['interpolated'] > ratio['nearest']]
+    if interpolated:
+        print(f"  [WARN] {len(interpolated)} room(s) majoritairement interpolée(s): "
+              + ', '.join(interpolated[:10]) + (' ...' if len(interpolated) > 10 else ''))
+
+def _report_loaded_frame(frame):
+    """Affiche le résumé d'un RoomFrame chargé et le retourne"""
+    print(f"\n[OK] Total: {int(frame.mask.sum())} entrées "
+          f"({frame.num_rooms} rooms x {frame.num_timestamps} timestamps)")
+    print(f"  Période: {frame.datetimes().min()} -> {frame.datetimes().max()}")
+    print(f"  Mémoire: {frame.nbytes / (1024 * 1024):.1f} MB")
+    report_peak_rss("chargement")
+    print()
     
-    return merged
+    return frame
 
-def prepare_features_with_date(df):
+def prepare_features_with_date(frame, weather=None, site=DEFAULT_SITE, return_timestamps=False):
     """
     Prépare features enrichies:
-    - température_ext (simulée)
+    - température_ext (historique météo local, simulée à défaut)
     - humidité moyenne
     - saison (sin, cos)
     - heure du jour (sin)
     Targets: toutes les rooms disponibles
+    
+    Args:
+        frame: RoomFrame retourné par load_room_data
+        weather: WeatherStore (weather_store.py), None = température simulée
+        site: site météo à utiliser
+        return_timestamps: retourner aussi le timestamp (int64 ns) de chaque échantillon
     """
     print("="*80)
     print("PRÉPARATION FEATURES ENRICHIES (5 ENTRÉES)")
     print("="*80)
     
-    # Simuler température extérieure (modèle simplifié basé sur jour de l'année)
-    # En production: utiliser vraies données météo Open-Meteo
-    
-    # Grouper par timestamp pour avoir tous les rooms ensemble
-    grouped = df.groupby('Timestamp')
-    
-    # Détecter les chambres disponibles
-    available_rooms = sorted(df['room_name'].unique())
+    # Détecter les chambres disponibles (ordre alphabétique, comme les sorties du modèle)
+    order = sorted(range(frame.num_rooms), key=lambda r: frame.room_names[r])
+    available_rooms = [frame.room_names[r] for r in order]
     num_rooms = len(available_rooms)
     
     print(f"\n[ROOMS] Chambres disponibles: {num_rooms}")
@@ -222,39 +293,42 @@ def prepare_features_with_date(df):
         print(f"   - {room}")
     print()
     
-    X_list = []  # Features: [temp_ext, humidity, season_sin, season_cos, time_sin]
-    y_list = []  # Targets: [room1, room2, ..., roomN]
+    dates = frame.datetimes()
+    doy = dates.dayofyear.values
     
-    for timestamp, group in grouped:
-        # Simuler température extérieure basée sur saison
-        doy = day_of_year(timestamp)
-        # Température moyenne annuelle + variation saisonnière
-        temp_ext = 12.0 + 15.0 * np.sin((2 * np.pi * (doy - 80)) / 365.0)
-        # Ajouter bruit aléatoire
-        temp_ext += np.random.normal(0, 3.0)
-        
-        # Calculer humidité moyenne de toutes les rooms pour ce timestamp
-        humidity_values = [row['humidity'] for _, row in group.iterrows() if 'humidity' in row]
-        avg_humidity = np.mean(humidity_values) if humidity_values else 50.0  # Défaut 50%
-        
-        # Encodage cyclique de la saison (jour de l'année)
-        season_sin, season_cos = encode_season(timestamp)
-        
-        # Encodage cyclique de l'heure de la journée
-        time_sin = encode_time_of_day(timestamp)
-        
-        # Récupérer températures des rooms
-        temps = {}
-        for _, row in group.iterrows():
-            temps[row['room_name']] = row['temperature']
-        
-        # Vérifier qu'on a toutes les chambres pour ce timestamp
-        if all(room in temps for room in available_rooms):
-            X_list.append([temp_ext, avg_humidity, season_sin, season_cos, time_sin])
-            y_list.append([temps[room] for room in available_rooms])
+    # Simuler température extérieure (modèle simplifié basé sur jour de l'année)
+    # Température moyenne annuelle + variation saisonnière + bruit aléatoire.
+    # Un tirage par timestamp, dans l'ordre chronologique, y compris pour ceux
+    # écartés ensuite (même séquence aléatoire que la boucle historique)
+    temp_ext = 12.0 + 15.0 * np.sin((2 * np.pi * (doy - 80)) / 365.0)
+    temp_ext = temp_ext + np.random.normal(0, 3.0, size=len(doy))
+    
+    # Température réelle (Open-Meteo ou colonne External_Temp) là où elle est connue
+    if weather is not None:
+        measured = weather.lookup(frame.timestamps, site)
+        known = ~np.isnan(measured)
+        temp_ext = np.where(known, measured, temp_ext)
+        print(f"[WEATHER] Température extérieure réelle sur {100 * known.mean():.1f}% des timestamps"
+              f"{' (reste simulé)' if not known.all() else ''}")
+        if site in weather.sources:
+            print(f"  Source: {weather.sources[site]}\n")
+    
+    # Encodage cyclique de la saison (jour de l'année) et de l'heure de la
+    # journée: mêmes fonctions que les tables exportées (calendar_tables.py)
+    season_sin, season_cos = season_encoding(doy)
+    time_sin = time_of_day_encoding(dates.hour.values, dates.minute.values)
+    
+    # Garder uniquement les timestamps où toutes les chambres ont une mesure
+    complete = frame.mask.all(axis=0)
     
-    X = np.array(X_list)
-    y = np.array(y_list)
+    # Humidité moyenne de toutes les rooms pour chaque timestamp
+    avg_humidity = frame.humidity[:, complete].mean(axis=0, dtype=np.float64)
+    
+    X = np.column_stack([
+        temp_ext[complete], avg_humidity, season_sin[complete],
+        season_cos[complete], time_sin[complete]
+    ])
+    y = frame.temperature[order][:, complete].T
     
     print(f"[OK] Features créées: {X.shape[0]} échantillons")
     print(f"  - Feature 1: Température extérieure (°C)")
@@ -275,27 +349,38 @@ def prepare_features_with_date(df):
         print(f"\n[WARN]  AUCUNE DONNÉE: Les {num_rooms} CSV n'ont aucun timestamp commun!")
         print(f"   Vérifiez que les fichiers couvrent la même période.")
     
+    report_peak_rss("préparation des features")
+    
+    if return_timestamps:
+        return X, y, num_rooms, frame.timestamps[complete]
     return X, y, num_rooms
 
 # ============================================================================
 # MODÈLE RÉSEAU DE NEURONES
 # ============================================================================
 
-def create_model_with_date(num_outputs=3):
+def create_model_with_date(num_outputs=3, verbose=True, output_rank=None):
     """
     Architecture: Input(5) -> Dense(32, ReLU) -> Dense(32, ReLU) -> Output(N)
     
     Args:
         num_outputs: Nombre de chambres à prédire
+        verbose: afficher le résumé du modèle
+        output_rank: tête de sortie factorisée (grands parcs): Dense(32) ->
+            Dense(k, linéaire) partagé -> Output(N), soit un vecteur de k poids
+            par room au lieu de 32; None = sortie dense
     """
-    print("="*80)
-    print("CRÉATION MODÈLE AVEC FEATURES ENRICHIES (5 ENTRÉES)")
-    print("="*80)
+    if verbose:
+        print("="*80)
+        print("CRÉATION MODÈLE AVEC FEATURES ENRICHIES (5 ENTRÉES)")
+        print("="*80)
     
     model = Sequential([
         Input(shape=(5,)),  # 5 features: temp_ext, humidity, season_sin, season_cos, time_sin
         Dense(32, activation='relu', name='hidden1'),
         Dense(32, activation='relu', name='hidden2'),
+        # Bottleneck linéaire optionnel: W2 de rang k (entraîné de bout en bout)
+        *([Dense(output_rank, activation='linear', name='bottleneck')] if output_rank else []),
         Dense(num_outputs, activation='linear', name='output')  # N chambres
     ])
     
@@ -305,88 +390,373 @@ def create_model_with_date(num_outputs=3):
         metrics=['mae']
     )
     
-    print(model.summary())
-    print(f"\n[OK] Architecture: 5 inputs -> 32 -> 32 -> {num_outputs} outputs")
-    print(f"[OK] Total paramètres: {model.count_params()}")
-    print(f"[OK] Optimiseur: Adam (lr=0.001)")
-    print(f"[OK] Loss: MSE, Metric: MAE\n")
+    if verbose:
+        print(model.summary())
+        bottleneck = f" -> {output_rank} (bottleneck)" if output_rank else ""
+        print(f"\n[OK] Architecture: 5 inputs -> 32 -> 32{bottleneck} -> {num_outputs} outputs")
+        print(f"[OK] Total paramètres: {model.count_params()}")
+        print(f"[OK] Optimiseur: Adam (lr=0.001)")
+        print(f"[OK] Loss: MSE, Metric: MAE\n")
     
     return model
 
+# ============================================================================
+# RÉDUCTION DU TRAIN SET (CORESET)
+# ============================================================================
+
+def _search_coreset_size(X_pool, y_pool, validation, num_rooms, epochs, reduction, size, output_rank=None,
+                         scaler=None):
+    """
+    Double la taille du coreset tant que la MAE de validation s'améliore
+    d'au moins `mae_tolerance` °C; retourne la plus petite taille suffisante
+    """
+    tolerance = reduction['mae_tolerance']
+    prepare = scaler.transform if scaler is not None else np.asarray
+    validation = (prepare(validation[0]), validation[1])
+    print(f"[CORESET] Recherche de taille (tolérance MAE: {tolerance}°C)")
+    prev_size, prev_mae = None, None
+    while True:
+        indices = select_coreset(X_pool, size, reduction['method'], reduction.get('seed', 42))
+        model = create_model_with_date(num_outputs=num_rooms, verbose=False, output_rank=output_rank)
+        model.fit(prepare(X_pool[indices]), y_pool[indices], validation_data=validation,
+                  epochs=epochs, batch_size=16, verbose=0)
+        mae = model.evaluate(*validation, verbose=0)[1]
+        print(f"  {size:>8} échantillons: MAE validation {mae:.4f}°C")
+        
+        if prev_mae is not None and prev_mae - mae < tolerance:
+            print(f"[CORESET] Gain < {tolerance}°C en doublant: {prev_size} échantillons retenus")
+            return prev_size
+        if size >= len(X_pool):
+            return size
+        prev_size, prev_mae = size, mae
+        size = min(2 * size, len(X_pool))
+
+def reduce_training_set(X_train, y_train, num_rooms, epochs, reduction=REDUCTION, output_rank=None, scaler=None):
+    """
+    Remplace le train set par un coreset représentatif
+
+    La validation est figée sur les 20% finaux du train set (comme validation_split)
+    afin que toutes les tailles de coreset soient comparées sur les mêmes données.
+    La sélection se fait sur les features brutes (strates); `scaler` ne sert
+    qu'aux entraînements de la recherche de taille.
+
+    Returns:
+        (X coreset, y coreset, arguments de validation pour model.fit)
+    """
+    print("="*80)
+    print("RÉDUCTION DU TRAIN SET (CORESET)")
+    print("="*80)
+    
+    n_val = max(1, int(len(X_train) * 0.2))
+    X_pool, y_pool = X_train[:-n_val], y_train[:-n_val]
+    validation = (X_train[-n_val:], y_train[-n_val:])
+    
+    size = coreset_size(len(X_pool), reduction.get('size'), reduction.get('fraction', 0.1))
+    if reduction.get('mae_tolerance') is not None:
+        size = _search_coreset_size(X_pool, y_pool, validation, num_rooms, epochs, reduction, size, output_rank,
+                                    scaler)
+    
+    indices = select_coreset(X_pool, size, reduction['method'], reduction.get('seed', 42))
+    print(f"[CORESET] Méthode '{reduction['method']}': {len(indices)} / {len(X_pool)} échantillons "
+          f"({100 * len(indices) / len(X_pool):.1f}%), validation: {n_val} échantillons\n")
+    
+    return X_pool[indices], y_pool[indices], {'validation_data': validation}
+
+def compare_with_full_data(X_full, y_full, X_test, y_test, num_rooms, epochs,
+                           reduced_rows, reduced_seconds, reduced_mae, output_rank=None):
+    """
+    Entraîne le même modèle sur tout le train set et compare au coreset
+
+    Returns:
+        dict avec temps et MAE des deux entraînements
+    """
+    print("\n" + "="*80)
+    print("COMPARAISON DONNÉES COMPLÈTES vs CORESET (même test set)")
+    print("="*80)
+    
+    model = create_model_with_date(num_outputs=num_rooms, verbose=False, output_rank=output_rank)
+    start = time.perf_counter()
+    model.fit(X_full, y_full, validation_split=0.2, epochs=epochs, batch_size=16, verbose=0)
+    full_seconds = time.perf_counter() - start
+    full_mae = model.evaluate(X_test, y_test, verbose=0)[1]
+    
+    speedup = full_seconds / reduced_seconds if reduced_seconds > 0 else float('inf')
+    print(f"  Échantillons:  {len(X_full)} -> {reduced_rows} ({100 * reduced_rows / len(X_full):.1f}%)")
+    print(f"  Entraînement:  {full_seconds:.1f}s -> {reduced_seconds:.1f}s (x{speedup:.1f})")
+    print(f"  Test MAE:      {full_mae:.4f}°C -> {reduced_mae:.4f}°C ({reduced_mae - full_mae:+.4f}°C)")
+    
+    return {'full_seconds': full_seconds, 'reduced_seconds': reduced_seconds, 'speedup': speedup,
+            'full_mae': float(full_mae), 'reduced_mae': float(reduced_mae)}
+
+# ============================================================================
+# STANDARDISATION DES ENTRÉES
+# ============================================================================
+
+def fold_input_scaler(W0, BIAS0, mean, scale):
+    """
+    Replie la standardisation (x - mean) / scale dans la première couche:
+    ((x - mean) / scale) @ W0 + BIAS0 = x @ (W0 / scale) + (BIAS0 - (mean / scale) @ W0)
+
+    Returns:
+        (W0, BIAS0) à appliquer aux features brutes, même coût d'inférence
+    """
+    W0 = np.asarray(W0, dtype=np.float64)
+    mean = np.asarray(mean, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+    folded_W0 = W0 / scale[:, None]
+    folded_BIAS0 = np.asarray(BIAS0, dtype=np.float64) - (mean / scale) @ W0
+    return folded_W0.astype(np.float32), folded_BIAS0.astype(np.float32)
+
+def fold_scaler_into_model(model, scaler):
+    """
+    Modèle entraîné sur features standardisées -> modèle sur features brutes
+
+    Returns:
+        le modèle (Keras modifié sur place, ou nouveau ShardedModel)
+    """
+    if isinstance(model, ShardedModel):
+        for shard in model.shards:
+            shard['weights'][0], shard['weights'][1] = fold_input_scaler(
+                shard['weights'][0], shard['weights'][1], scaler.mean_, scaler.scale_)
+        return ShardedModel(model.shards, model.num_rooms)
+    layer = model.get_layer('hidden1')
+    W0, BIAS0 = layer.get_weights()
+    layer.set_weights(list(fold_input_scaler(W0, BIAS0, scaler.mean_, scaler.scale_)))
+    return model
+
+def _scale_fit_kwargs(fit_kwargs, scaler):
+    if 'validation_data' not in fit_kwargs:
+        return fit_kwargs
+    X_val, y_val = fit_kwargs['validation_data']
+    return dict(fit_kwargs, validation_data=(scaler.transform(X_val), y_val))
+
+def epochs_to_target(history, target_mae):
+    """Première époque (1-based) où la MAE de validation atteint target_mae, None sinon"""
+    values = history.history.get('val_mae') or history.history.get('mae', [])
+    for epoch, mae in enumerate(values, 1):
+        if mae <= target_mae:
+            return epoch
+    return None
+
+def compare_input_scaling(X_train, y_train, fit_kwargs, num_rooms, epochs, scaled_history,
+                          target_mae=None, output_rank=None):
+    """
+    Entraîne le même modèle sur les features brutes et compare la convergence
+
+    Args:
+        X_train, fit_kwargs: features et validation brutes
+        scaled_history: historique de l'entraînement standardisé
+        target_mae: MAE de validation cible (°C), None = meilleure MAE atteinte
+            par les deux entraînements + 5%
+
+    Returns:
+        dict: MAE cible, époques pour l'atteindre et meilleure MAE de chaque entraînement
+    """
+    print("\n" + "="*80)
+    print("CONVERGENCE: FEATURES BRUTES vs STANDARDISÉES")
+    print("="*80)
+    
+    model = create_model_with_date(num_outputs=num_rooms, verbose=False, output_rank=output_rank)
+    raw_history = model.fit(X_train, y_train, epochs=epochs, batch_size=16, verbose=0, **fit_kwargs)
+    
+    histories = {'raw': raw_history, 'standardized': scaled_history}
+    best = {name: min(h.history.get('val_mae') or h.history['mae']) for name, h in histories.items()}
+    if target_mae is None:
+        target_mae = max(best.values()) * 1.05
+    result = {'target_mae': float(target_mae), 'epochs': epochs}
+    for name, history in histories.items():
+        result[name] = {'epochs_to_target': epochs_to_target(history, target_mae), 'best_val_mae': float(best[name])}
+    
+    print(f"  MAE de validation cible: {target_mae:.4f}°C ({epochs} époques max)")
+    for name, label in (('raw', 'Features brutes'), ('standardized', 'Standardisées')):
+        reached = result[name]['epochs_to_target']
+        print(f"  {label:<16} {('époque ' + str(reached)) if reached else 'non atteinte':>14}   "
+              f"meilleure MAE {result[name]['best_val_mae']:.4f}°C")
+    
+    return result
+
 # ============================================================================
 # ENTRAÎNEMENT
 # ============================================================================
 
-def train_model():
-    """Pipeline complet: chargement, préparation, entraînement"""
+def train_model(epochs=100, reduction=REDUCTION, quality=QUALITY, data_dir=DATA_DIR, site=DEFAULT_SITE,
+                output_dir='', output_rank=None, sharding=SHARDING, input_scaling=INPUT_SCALING,
+                include_new_rooms=False):
+    """
+    Pipeline complet: chargement, préparation, entraînement
+
+    Args:
+        epochs: nombre d'époques (fixé à une petite valeur par benchmark_pipeline.py)
+        reduction: paramètres du coreset (REDUCTION), méthode None = toutes les données
+        quality: contrôle qualité des séries (QUALITY)
+        data_dir, site: CSV et historique météo du bâtiment (site_pipeline.py)
+        output_dir: dossier du modèle et des rapports ('' = répertoire courant)
+        output_rank: rang de la tête de sortie factorisée (None = dense)
+        sharding: un modèle par groupe de rooms (SHARDING), retourne un ShardedModel
+        input_scaling: standardisation des features (INPUT_SCALING), repliée
+            dans W0 / BIAS0 avant l'évaluation et la sauvegarde
+        include_new_rooms: entraîner aussi les rooms ajoutées au store hors CSV
+            (room_store.py append, ingest_server.py)
+    """
+    sharded = sharding is not None and (sharding.get('shards') or 1) > 1
+    if sharded and output_rank:
+        raise ValueError("La tête factorisée et l'entraînement shardé ne se combinent pas")
     
     # 1. Charger données
-    df = load_room_data()
+    with profile_stage('load') as stage:
+        frame = load_room_data(quality=quality, data_dir=data_dir, include_new_rooms=include_new_rooms)
+        stage.rows = int(frame.mask.sum())
     
-    if df.empty:
+    if frame.empty:
         print("\n[ERROR] ERREUR: Aucune donnée disponible!")
         return None, None
     
-    # 2. Préparer features avec date
-    X, y, num_rooms = prepare_features_with_date(df)
+    # 2. Préparer features avec date (température extérieure réelle si disponible)
+    with profile_stage('weather'):
+        weather = load_weather_store(get_csv_files(data_dir), site=site, store_dir=store_dir_for(data_dir))
+    with profile_stage('features') as stage:
+        X, y, num_rooms, timestamps = prepare_features_with_date(frame, weather, site, return_timestamps=True)
+        stage.rows = X.shape[0]
+    room_names = sorted(frame.room_names)
     
     if X.shape[0] == 0:
         print("\n[ERROR] ERREUR: Aucun échantillon généré!")
         return None, None
     
     # 3. Split train/test
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
+    with profile_stage('split', rows=X.shape[0]):
+        X_train, X_test, y_train, y_test, _, ts_test = train_test_split(
+            X, y, timestamps, test_size=0.2, random_state=42
+        )
     
     print(f"Train set: {X_train.shape[0]} échantillons")
     print(f"Test set: {X_test.shape[0]} échantillons\n")
     
+    # Standardisation ajustée sur le train set (appliquée après la sélection du coreset)
+    scaler = None
+    if input_scaling is not None and input_scaling.get('enabled'):
+        scaler = StandardScaler().fit(X_train)
+        print(f"[SCALER] Moyennes: {', '.join(f'{v:.3f}' for v in scaler.mean_)}")
+        print(f"[SCALER] Écarts-types: {', '.join(f'{v:.3f}' for v in scaler.scale_)}\n")
+    
+    # 3bis. Réduction optionnelle du train set (coreset)
+    reduced = reduction is not None and reduction.get('method') is not None
+    X_full, y_full = X_train, y_train
+    fit_kwargs = {'validation_split': 0.2}
+    reduce_seconds = 0.0
+    if reduced:
+        with profile_stage('reduce', rows=X_train.shape[0]) as stage:
+            start = time.perf_counter()
+            X_train, y_train, fit_kwargs = reduce_training_set(X_train, y_train, num_rooms, epochs, reduction,
+                                                               output_rank, scaler)
+            reduce_seconds = time.perf_counter() - start
+            stage.rows = X_train.shape[0]
+    
+    X_train_raw, fit_kwargs_raw = X_train, fit_kwargs
+    if scaler is not None:
+        X_train = scaler.transform(X_train)
+        fit_kwargs = _scale_fit_kwargs(fit_kwargs, scaler)
+    
     # 4. Créer modèle
-    model = create_model_with_date(num_outputs=num_rooms)
+    if sharded:
+        with profile_stage('build_model'):
+            # Profils par strate jour / heure décodés des sin / cos bruts, pas des features standardisées
+            groups = partition_rooms(X_train_raw, y_train, sharding['shards'], sharding.get('method', 'count'))
+        sizes = [len(group) for group in groups]
+        print(f"[SHARDS] Répartition '{sharding.get('method', 'count')}': {len(groups)} groupes "
+              f"({min(sizes)} à {max(sizes)} rooms)")
+    else:
+        with profile_stage('build_model'):
+            model = create_model_with_date(num_outputs=num_rooms, output_rank=output_rank)
     
     # 5. Entraîner
     print("="*80)
     print("ENTRAÎNEMENT")
     print("="*80)
     
-    history = model.fit(
-        X_train, y_train,
-        validation_split=0.2,
-        epochs=100,
-        batch_size=16,
-        verbose=1
-    )
+    with profile_stage('fit', rows=X_train.shape[0] * epochs):
+        start = time.perf_counter()
+        if sharded:
+            model = train_shards(X_train, y_train, groups, epochs, fit_kwargs,
+                                 sharding.get('workers'), sharding.get('threads'))
+            history = None
+        else:
+            history = model.fit(
+                X_train, y_train,
+                epochs=epochs,
+                batch_size=16,
+                verbose=1,
+                **fit_kwargs
+            )
+        fit_seconds = time.perf_counter() - start
+    
+    if scaler is not None:
+        # Le modèle prend désormais les features brutes (évaluation, .h5, neural_weights.h)
+        model = fold_scaler_into_model(model, scaler)
+        print(f"\n[SCALER] Standardisation repliée dans W0 / BIAS0")
     
     # 6. Évaluation
     print("\n" + "="*80)
     print("ÉVALUATION SUR TEST SET")
     print("="*80)
     
-    test_loss, test_mae = model.evaluate(X_test, y_test, verbose=0)
+    # Tout le test set en un seul lot, erreurs agrégées par room / heure / saison
+    with profile_stage('evaluate', rows=X_test.shape[0]):
+        y_pred = model.predict(X_test, batch_size=4096, verbose=0)
+        report = evaluate_predictions(y_test, y_pred, ts_test, room_names)
+    test_loss = float(np.mean((y_pred - y_test) ** 2))
+    test_mae = report['overall']['mae']
     print(f"[OK] Test Loss (MSE): {test_loss:.4f}")
-    print(f"[OK] Test MAE: {test_mae:.4f}°C")
-    
-    # Prédictions exemples
-    print("\nExemples de prédictions:")
-    for i in range(min(5, len(X_test))):
-        pred = model.predict(X_test[i:i+1], verbose=0)[0]
-        true = y_test[i]
-        print(f"\n  Exemple {i+1}:")
-        print(f"    Input: temp_ext={X_test[i][0]:.1f}°C, humidity={X_test[i][1]:.1f}%, season_sin={X_test[i][2]:.3f}, season_cos={X_test[i][3]:.3f}, time_sin={X_test[i][4]:.3f}")
-        print(f"    Vrai:  R1={true[0]:.1f}°C, R2={true[1]:.1f}°C, R3={true[2]:.1f}°C")
-        print(f"    Préd:  R1={pred[0]:.1f}°C, R2={pred[1]:.1f}°C, R3={pred[2]:.1f}°C")
-        print(f"    Erreur: R1={abs(pred[0]-true[0]):.1f}°C, R2={abs(pred[1]-true[1]):.1f}°C, R3={abs(pred[2]-true[2]):.1f}°C")
+    print(f"[OK] Test MAE: {test_mae:.4f}°C\n")
+    
+    print_evaluation_summary(report)
+    
+    report['training'] = {'epochs': epochs, 'input_scaling': scaler is not None, 'fit_seconds': fit_seconds}
+    if scaler is not None and input_scaling.get('compare'):
+        if history is None:
+            print("[WARN] Comparaison de la standardisation ignorée en entraînement shardé")
+        else:
+            with profile_stage('fit_raw', rows=X_train.shape[0] * epochs):
+                report['training']['convergence'] = compare_input_scaling(
+                    X_train_raw, y_train, fit_kwargs_raw, num_rooms, epochs, history,
+                    input_scaling.get('target_mae'), output_rank)
+    
+    if reduced:
+        report['reduction'] = {'method': reduction['method'], 'size': int(X_train.shape[0]),
+                               'full_size': int(X_full.shape[0]), 'reduce_seconds': reduce_seconds}
+    if reduced and reduction.get('compare_full') and sharded:
+        print("[WARN] --compare-full ignoré en entraînement shardé")
+    elif reduced and reduction.get('compare_full'):
+        with profile_stage('fit_full', rows=X_full.shape[0] * epochs):
+            # Temps du coreset = sélection (et recherche de taille) + entraînement final
+            prepare = scaler.transform if scaler is not None else np.asarray
+            report['reduction']['comparison'] = compare_with_full_data(
+                prepare(X_full), y_full, prepare(X_test), y_test, num_rooms, epochs,
+                X_train.shape[0], reduce_seconds + fit_seconds, test_mae, output_rank)
+    
+    report_path = write_evaluation_report(report, os.path.join(output_dir, REPORT_DIR),
+                                          series=residual_series(y_test, y_pred, ts_test))
+    print(f"\n[OK] Rapport d'évaluation: {report_path}")
     
     # 7. Sauvegarder
     print("\n" + "="*80)
     print("SAUVEGARDE MODÈLE")
     print("="*80)
     
-    model.save(MODEL_FILE)
-    model.save_weights(WEIGHTS_FILE)
-    print(f"[OK] Modèle sauvegardé: {MODEL_FILE}")
-    print(f"[OK] Poids sauvegardés: {WEIGHTS_FILE}")
+    if sharded:
+        model_file = os.path.join(output_dir, SHARDS_FILE)
+        with profile_stage('save'):
+            model.save(model_file)
+        print(f"[OK] Modèle shardé sauvegardé: {model_file} ({model.num_shards} shards)")
+        return model, history
+    
+    model_file = os.path.join(output_dir, MODEL_FILE)
+    weights_file = os.path.join(output_dir, WEIGHTS_FILE)
+    with profile_stage('save'):
+        model.save(model_file)
+        model.save_weights(weights_file)
+    print(f"[OK] Modèle sauvegardé: {model_file}")
+    print(f"[OK] Poids sauvegardés: {weights_file}")
     
     return model, history
 
@@ -394,12 +764,32 @@ def train_model():
 # EXPORT POUR ESP32
 # ============================================================================
 
-def export_weights_for_esp32(model, num_rooms=3):
-    """Exporte les poids au format C++ pour ESP32"""
+def export_weights_for_esp32(model, num_rooms=3, output_dir='', device=DEFAULT_PROFILE, calendar_fixed_point=False):
+    """
+    Exporte les poids au format C++ pour ESP32
+
+    Args:
+        output_dir: dossier de neural_weights.h; '' = répertoire courant, avec
+            copie vers le projet M5Stack (un dossier de site n'est pas copié).
+            Le blob OTA versionné est publié dans output_dir/ota/
+        device: profil d'appareil (device_footprint.py); ValueError avant
+            d'écrire le header si les poids n'y tiennent pas
+        calendar_fixed_point: tables calendrier (calendar_tables.h) en Q15
+            int16 au lieu de float
+    """
     print("\n" + "="*80)
     print("EXPORT POIDS POUR ESP32")
     print("="*80)
     
+    # Tables calendrier écrites à côté des poids, comptées dans la même empreinte
+    calendar = calendar_arrays(TIME_STEPS_PER_HOUR, calendar_fixed_point)
+    
+    if isinstance(model, ShardedModel):
+        output_file = _write_sharded_weights(model, output_dir, device, calendar)
+        calendar_file = export_calendar_tables(output_dir, fixed_point=calendar_fixed_point)
+        _copy_to_m5stack([output_file, calendar_file], output_dir)
+        return
+    
     # Récupérer poids de chaque couche
     weights = model.get_weights()
     
@@ -409,21 +799,41 @@ def export_weights_for_esp32(model, num_rooms=3):
     # BIAS1: (32,)
     # W2: (32, N) - Hidden2 -> Output
     # BIAS2: (N,)
+    # Tête factorisée (create_model_with_date(output_rank=k)):
+    # W2: (32, k) + BIAS2: (k,) - Hidden2 -> Bottleneck (linéaire, partagé)
+    # ROOM_W: (k, N) + ROOM_BIAS: (N,) - Bottleneck -> Output
     
-    W0, BIAS0, W1, BIAS1, W2, BIAS2 = weights
+    W0, BIAS0, W1, BIAS1, W2, BIAS2 = weights[:6]
+    factorized = len(weights) == 8
+    output_rank = W2.shape[1] if factorized else None
     
     print(f"[OK] W0 shape: {W0.shape} (Input -> Hidden1)")
     print(f"[OK] BIAS0 shape: {BIAS0.shape}")
     print(f"[OK] W1 shape: {W1.shape} (Hidden1 -> Hidden2)")
     print(f"[OK] BIAS1 shape: {BIAS1.shape}")
-    print(f"[OK] W2 shape: {W2.shape} (Hidden2 -> Output)")
-    print(f"[OK] BIAS2 shape: {BIAS2.shape}")
+    if factorized:
+        ROOM_W, ROOM_BIAS = weights[6:]
+        print(f"[OK] W2 shape: {W2.shape} (Hidden2 -> Bottleneck)")
+        print(f"[OK] BIAS2 shape: {BIAS2.shape}")
+        print(f"[OK] ROOM_W shape: {ROOM_W.T.shape} (Bottleneck -> Output, une ligne par room)")
+        print(f"[OK] ROOM_BIAS shape: {ROOM_BIAS.shape}")
+    else:
+        print(f"[OK] W2 shape: {W2.shape} (Hidden2 -> Output)")
+        print(f"[OK] BIAS2 shape: {BIAS2.shape}")
+    
+    # Empreinte flash / RAM (l'historique est vérifié par export_csv_to_arduino)
+    profile = load_device_profile(device)
+    footprint = print_footprint_report(weights_arrays(num_rooms, W0.shape[0], W0.shape[1], output_rank)
+                                       + calendar + firmware_room_arrays(num_rooms), profile)
+    if not footprint['fits']:
+        raise ValueError(f"Modèle à {num_rooms} rooms trop grand pour {profile['name']}")
     
     # Générer fichier C++
-    output_file = 'neural_weights.h'
+    output_file = os.path.join(output_dir, 'neural_weights.h')
     with open(output_file, 'w') as f:
         f.write("// Auto-generated neural network weights\n")
-        f.write(f"// Architecture: Input(5) -> Dense(32) -> Dense(32) -> Output({num_rooms})\n")
+        bottleneck = f" -> Bottleneck({output_rank})" if factorized else ""
+        f.write(f"// Architecture: Input(5) -> Dense(32) -> Dense(32){bottleneck} -> Output({num_rooms})\n")
         f.write(f"// Features: temp_ext, humidity, season_sin, season_cos, time_sin\n")
         f.write(f"// Total parameters: {model.count_params()}\n")
         f.write(f"// Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
@@ -432,7 +842,11 @@ def export_weights_for_esp32(model, num_rooms=3):
         f.write("#define NEURAL_WEIGHTS_H\n\n")
         
         f.write(f"// Configuration\n")
-        f.write(f"#define NUM_ROOMS {num_rooms}\n\n")
+        f.write(f"#define NUM_ROOMS {num_rooms}\n")
+        if factorized:
+            # Active la tête factorisée dans predict_rooms (RoomPredictor.ino)
+            f.write(f"#define OUTPUT_RANK {output_rank}\n")
+        f.write("\n")
         
         # W0: (5, 32) - 5 input features
         f.write(f"// Layer 0: Input(5) -> Dense(32)\n")
@@ -462,9 +876,13 @@ def export_weights_for_esp32(model, num_rooms=3):
         f.write(", ".join([f"{b:.6f}f" for b in BIAS1]))
         f.write("\n};\n\n")
         
-        # W2: (32, N)
-        f.write(f"// Layer 2: Dense(32) -> Output({num_rooms})\n")
-        f.write(f"const float W2[32][{num_rooms}] = {{\n")
+        # W2: (32, N), ou (32, k) pour la tête factorisée
+        outputs = output_rank if factorized else num_rooms
+        if factorized:
+            f.write(f"// Layer 2: Dense(32) -> Bottleneck({output_rank}), linéaire, partagé par toutes les rooms\n")
+        else:
+            f.write(f"// Layer 2: Dense(32) -> Output({num_rooms})\n")
+        f.write(f"const float W2[32][{outputs}] = {{\n")
         for i in range(32):
             f.write("  {")
             f.write(", ".join([f"{w:.6f}f" for w in W2[i]]))
@@ -472,48 +890,222 @@ def export_weights_for_esp32(model, num_rooms=3):
         f.write("};\n\n")
         
         # BIAS2
-        f.write(f"const float BIAS2[{num_rooms}] = {{\n  ")
+        f.write(f"const float BIAS2[{outputs}] = {{\n  ")
         f.write(", ".join([f"{b:.6f}f" for b in BIAS2]))
         f.write("\n};\n\n")
         
+        if factorized:
+            # ROOM_W: une ligne de k poids par room -> prédiction d'une room en O(k)
+            f.write(f"// Layer 3: Bottleneck({output_rank}) -> Output({num_rooms}), une ligne par room\n")
+            f.write(f"const float ROOM_W[{num_rooms}][{output_rank}] = {{\n")
+            for row in ROOM_W.T:
+                f.write("  {")
+                f.write(", ".join([f"{w:.6f}f" for w in row]))
+                f.write("},\n")
+            f.write("};\n\n")
+            
+            f.write(f"const float ROOM_BIAS[{num_rooms}] = {{\n  ")
+            f.write(", ".join([f"{b:.6f}f" for b in ROOM_BIAS]))
+            f.write("\n};\n\n")
+        
         f.write("#endif // NEURAL_WEIGHTS_H\n")
     
     print(f"\n[OK] Fichier généré: {output_file}")
     
-    # Copier vers dossier M5Stack si existant
-    import os
+    # Mêmes poids en blob binaire versionné (mise à jour OTA via ota_server.py)
+    publish_weights(weights, os.path.join(output_dir, OTA_DIR))
+    
+    # Tables calendrier générées par les fonctions d'encodage de l'entraînement
+    calendar_file = export_calendar_tables(output_dir, fixed_point=calendar_fixed_point)
+    
+    _copy_to_m5stack([output_file, calendar_file], output_dir)
+
+def _copy_to_m5stack(output_files, output_dir):
+    """Copie les headers vers le projet M5Stack (export dans le répertoire courant uniquement)"""
     import shutil
-    m5stack_path = os.path.join('M5Stack_Temperature_Prediction', 'RoomPredictor', 'neural_weights.h')
-    if os.path.exists('M5Stack_Temperature_Prediction'):
-        try:
-            shutil.copy(output_file, m5stack_path)
-            print(f"[OK] Copié vers: {m5stack_path}")
-        except Exception as e:
-            print(f"[WARN] Impossible de copier vers M5Stack: {e}")
+    if not output_dir and os.path.exists('M5Stack_Temperature_Prediction'):
+        for output_file in output_files:
+            m5stack_path = os.path.join('M5Stack_Temperature_Prediction', 'RoomPredictor',
+                                        os.path.basename(output_file))
+            try:
+                shutil.copy(output_file, m5stack_path)
+                print(f"[OK] Copié vers: {m5stack_path}")
+            except Exception as e:
+                print(f"[WARN] Impossible de copier vers M5Stack: {e}")
     
     print(f"[OK] Prêt pour upload sur M5Stack TABS\n")
 
+def _write_sharded_weights(model, output_dir='', device=DEFAULT_PROFILE, extra_arrays=()):
+    """
+    neural_weights.h d'un ShardedModel: un jeu de poids par shard (W2 / BIAS2
+    complétés par des zéros jusqu'au plus grand shard) et l'index
+    ROOM_SHARD / ROOM_SLOT de chaque room
+
+    Args:
+        extra_arrays: autres tableaux à compter dans l'empreinte (tables calendrier)
+    
+    Returns:
+        chemin du header écrit
+    """
+    num_rooms = model.num_rooms
+    num_shards = model.num_shards
+    shard_max_rooms = max(len(shard['rooms']) for shard in model.shards)
+    room_shard, room_slot = model.room_index()
+    for s, shard in enumerate(model.shards):
+        print(f"[OK] Shard {s}: {len(shard['rooms'])} rooms, W2 shape: {shard['weights'][4].shape}")
+    
+    profile = load_device_profile(device)
+    footprint = print_footprint_report(sharded_weights_arrays(num_rooms, num_shards, shard_max_rooms)
+                                       + list(extra_arrays) + firmware_room_arrays(num_rooms), profile)
+    if not footprint['fits']:
+        raise ValueError(f"Modèle shardé à {num_rooms} rooms trop grand pour {profile['name']}")
+    
+    def padded(weights, index, size):
+        array = weights[index]
+        pad = [(0, 0)] * (array.ndim - 1) + [(0, size - array.shape[-1])]
+        return np.pad(array, pad)
+    
+    def write_array(f, name, dims, blocks):
+        f.write(f"const float {name}{dims} = {{\n")
+        for block in blocks:
+            if block.ndim == 1:
+                f.write("  {" + ", ".join([f"{w:.6f}f" for w in block]) + "},\n")
+                continue
+            f.write("  {\n")
+            for row in block:
+                f.write("    {" + ", ".join([f"{w:.6f}f" for w in row]) + "},\n")
+            f.write("  },\n")
+        f.write("};\n\n")
+    
+    output_file = os.path.join(output_dir, 'neural_weights.h')
+    with open(output_file, 'w') as f:
+        f.write("// Auto-generated neural network weights\n")
+        f.write(f"// Architecture: {num_shards} shards x [Input(5) -> Dense(32) -> Dense(32) -> Output(n)], "
+                f"{num_rooms} rooms\n")
+        f.write(f"// Features: temp_ext, humidity, season_sin, season_cos, time_sin\n")
+        f.write(f"// Total parameters: {model.count_params()}\n")
+        f.write(f"// Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+        
+        f.write("#ifndef NEURAL_WEIGHTS_H\n")
+        f.write("#define NEURAL_WEIGHTS_H\n\n")
+        
+        f.write(f"// Configuration\n")
+        f.write(f"#define NUM_ROOMS {num_rooms}\n")
+        # Active les réseaux par shard dans predict_rooms (RoomPredictor.ino)
+        f.write(f"#define NUM_SHARDS {num_shards}\n")
+        f.write(f"#define SHARD_MAX_ROOMS {shard_max_rooms}\n\n")
+        
+        shards = [shard['weights'] for shard in model.shards]
+        f.write(f"// Layer 0: Input(5) -> Dense(32), un bloc par shard\n")
+        write_array(f, 'W0', f"[{num_shards}][5][32]", [w[0] for w in shards])
+        write_array(f, 'BIAS0', f"[{num_shards}][32]", [w[1] for w in shards])
+        f.write(f"// Layer 1: Dense(32) -> Dense(32)\n")
+        write_array(f, 'W1', f"[{num_shards}][32][32]", [w[2] for w in shards])
+        write_array(f, 'BIAS1', f"[{num_shards}][32]", [w[3] for w in shards])
+        f.write(f"// Layer 2: Dense(32) -> Output(n), colonnes au-delà de n à zéro\n")
+        write_array(f, 'W2', f"[{num_shards}][32][{shard_max_rooms}]", [padded(w, 4, shard_max_rooms) for w in shards])
+        write_array(f, 'BIAS2', f"[{num_shards}][{shard_max_rooms}]", [padded(w, 5, shard_max_rooms) for w in shards])
+        
+        # Index room -> (shard, colonne dans le shard), rooms dans l'ordre alphabétique
+        f.write(f"const int ROOM_SHARD[{num_rooms}] = {{\n  ")
+        f.write(", ".join(str(v) for v in room_shard))
+        f.write("\n};\n\n")
+        f.write(f"const int ROOM_SLOT[{num_rooms}] = {{\n  ")
+        f.write(", ".join(str(v) for v in room_slot))
+        f.write("\n};\n\n")
+        
+        f.write("#endif // NEURAL_WEIGHTS_H\n")
+    
+    print(f"\n[OK] Fichier généré: {output_file}")
+    
+    # Blob OTA au même layout, remplace le blob dense publié par un entraînement précédent
+    publish_sharded_weights(model, os.path.join(output_dir, OTA_DIR))
+    return output_file
+
 # ============================================================================
 # MAIN
 # ============================================================================
 
-if __name__ == "__main__":
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Entraînement du modèle avec features temporelles")
+    parser.add_argument('--reduce', choices=REDUCTION_METHODS,
+                        help="Entraîner sur un coreset (stratifié ou k-center)")
+    parser.add_argument('--reduce-fraction', type=float, default=REDUCTION['fraction'],
+                        help="Taille du coreset en part du train set (défaut: 0.1)")
+    parser.add_argument('--reduce-size', type=int, help="Taille du coreset en échantillons")
+    parser.add_argument('--mae-tolerance', type=float,
+                        help="Agrandir le coreset tant que la MAE de validation gagne plus (°C)")
+    parser.add_argument('--compare-full', action='store_true',
+                        help="Entraîner aussi sur toutes les données et afficher le gain")
+    parser.add_argument('--quality', choices=QUALITY_ACTIONS, default=QUALITY['action'],
+                        help="Contrôle qualité: rapport seul, réparation ou quarantaine (défaut: repair)")
+    parser.add_argument('--data-dir', default=DATA_DIR, help="Dossier des CSV Room*_data.csv (défaut: data)")
+    parser.add_argument('--output-rank', type=int,
+                        help="Tête de sortie factorisée de rang k (grands parcs de rooms); défaut: dense")
+    parser.add_argument('--no-input-scaling', action='store_true',
+                        help="Entraîner sur les features brutes (sans StandardScaler)")
+    parser.add_argument('--compare-scaling', action='store_true',
+                        help="Entraîner aussi sans standardisation et comparer les époques pour atteindre la MAE cible")
+    parser.add_argument('--target-mae', type=float, help="MAE de validation cible de --compare-scaling (°C)")
+    parser.add_argument('--shards', type=int,
+                        help="Entraîner un modèle par groupe de rooms, chacun dans son processus")
+    parser.add_argument('--shard-method', choices=SHARD_METHODS, default=SHARDING['method'],
+                        help="Répartition des rooms: tailles égales ou clustering des profils (défaut: count)")
+    parser.add_argument('--shard-workers', type=int, help="Shards entraînés en parallèle (défaut: CPU)")
+    parser.add_argument('--shard-threads', type=int, help="Threads de calcul par shard (défaut: CPU / workers)")
+    parser.add_argument('--calendar-fixed-point', action='store_true',
+                        help="Tables calendrier (calendar_tables.h) en virgule fixe Q15")
+    parser.add_argument('--device', default=DEFAULT_PROFILE,
+                        help=f"Profil d'appareil ({', '.join(DEVICE_PROFILES)}) ou fichier JSON")
+    parser.add_argument('--include-new-rooms', action='store_true',
+                        help="Inclure les rooms ajoutées au store hors CSV (room_store.py append, ingestion)")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    
+    reduction = dict(REDUCTION, method=args.reduce, fraction=args.reduce_fraction, size=args.reduce_size,
+                     mae_tolerance=args.mae_tolerance, compare_full=args.compare_full)
+    quality = dict(QUALITY, action=args.quality)
+    input_scaling = dict(INPUT_SCALING, enabled=not args.no_input_scaling, compare=args.compare_scaling,
+                         target_mae=args.target_mae)
+    sharding = dict(SHARDING, shards=args.shards, method=args.shard_method,
+                    workers=args.shard_workers, threads=args.shard_threads)
+
     print("\n" + "="*80)
     print("ENTRAÎNEMENT MODÈLE AVEC FEATURES TEMPORELLES")
     print("="*80 + "\n")
     
-    # Entraîner
-    model, history = train_model()
-    
-    if model is None:
-        print("\n[ERROR] Entraînement échoué!")
-        exit(1)
-    
-    # Récupérer nombre de chambres
-    num_rooms = model.output_shape[-1]
-    
-    # Exporter pour ESP32
-    export_weights_for_esp32(model, num_rooms)
+    with profiling('train_model', **options_from_args(args)):
+        # Entraîner
+        try:
+            model, history = train_model(reduction=reduction, quality=quality, data_dir=args.data_dir,
+                                         output_rank=args.output_rank, sharding=sharding,
+                                         input_scaling=input_scaling, include_new_rooms=args.include_new_rooms)
+        except ValueError as e:
+            print(f"\n[ERROR] {e}")
+            exit(1)
+        
+        if model is None:
+            print("\n[ERROR] Entraînement échoué!")
+            exit(1)
+        
+        # Récupérer nombre de chambres
+        num_rooms = model.output_shape[-1]
+        
+        # Exporter pour ESP32
+        with profile_stage('export_weights'):
+            try:
+                export_weights_for_esp32(model, num_rooms, device=args.device,
+                                         calendar_fixed_point=args.calendar_fixed_point)
+            except ValueError as e:
+                print(f"\n[ERROR] {e}")
+                exit(1)
+        
+        # Les rooms en attente font désormais partie du jeu entraîné (csv_data.h les exporte)
+        if args.include_new_rooms:
+            included = include_pending_rooms(store_dir_for(args.data_dir))
+            if included:
+                print(f"[STORE] Rooms intégrées au store: {', '.join(included)}")
     
     print("\n" + "="*80)
     print("[OK] TERMINÉ AVEC SUCCÈS")
@@ -525,6 +1117,5 @@ if __name__ == "__main__":
     print("3. Tester prédictions avec différentes dates")
     print("\n")
 
-
-
-
+if __name__ == "__main__":
+    main()
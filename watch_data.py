@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Mode watch: réentraînement / export automatiques quand data/ change
+Les changements des fichiers Room*_data.csv[.gz|.zst|.xz] sont notifiés par le
+système (watchdog: inotify sous Linux, FSEvents, ReadDirectoryChangesW) ou, à
+défaut, détectés par scrutation périodique. Une rafale de changements (copie de
+plusieurs CSV, génération de la GUI) est regroupée: le travail n'est lancé
+qu'après --debounce secondes sans nouveau changement (au plus --max-wait).
+
+Les mesures ajoutées au store (room_store.py append, ingest_server.py) sont
+suivies de la même façon, par l'index du store (lignes et dernier timestamp
+de chaque room).
+
+Travail déclenché selon ce qui a changé:
+- contenu de rooms existantes (CSV ou nouvelles lignes du store): export
+  csv_data.h, seules les rooms modifiées sont relues (cache d'échantillons
+  par room conservé entre deux exports)
+- ensemble des rooms (ajout / suppression): réentraînement + export complet
+- nouvelle room créée dans le store (en attente): réentraînement avec
+  --include-new-rooms si le watcher a été lancé avec cette option
+
+L'export et l'entraînement tournent chacun dans leur propre file: jamais deux
+entraînements (ni deux exports) à la fois; une demande arrivée pendant
+l'exécution est fusionnée en une seule relance à la fin.
+
+Usage:
+    python watch_data.py                         # surveille data/
+    python watch_data.py --now --debounce 5
+    python watch_data.py --poll --poll-interval 2
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import subprocess
+
+from room_data import DATA_DIR, ROOM_CSV_PATTERN, get_csv_files
+from room_store import INDEX_FILE, file_fingerprint, open_store, store_dir_for
+from export_csv_to_arduino_v2 import DEFAULT_OUTPUT_FILE, export_csv_to_arduino
+
+DEBOUNCE_SECONDS = 2.0    # silence requis après le dernier changement
+MAX_WAIT_SECONDS = 30.0   # délai maximal d'une rafale continue
+POLL_INTERVAL = 1.0       # scrutation (sans watchdog)
+
+# ============================================================================
+# DÉTECTION DES CHANGEMENTS
+# ============================================================================
+
+def store_snapshot(data_dir=DATA_DIR):
+    """
+    État de l'index du store de data_dir
+
+    Returns:
+        dict room -> (lignes, dernier timestamp, en attente); {} sans store
+    """
+    try:
+        store = open_store(store_dir_for(data_dir))
+    except (OSError, ValueError, KeyError):
+        # Index en cours de remplacement ou illisible: revu au prochain passage
+        return {}
+    if store is None:
+        return {}
+    pending = set(store.pending_rooms)
+    return {room['name']: (room['rows'], room['last_ts'], room['name'] in pending) for room in store.index['rooms']}
+
+def data_snapshot(data_dir=DATA_DIR):
+    """
+    État des CSV de room et du store
+
+    Returns:
+        dict 'csv': room -> (chemin, taille, mtime_ns), 'store': store_snapshot()
+    """
+    csv = {}
+    for room_name, path in get_csv_files(data_dir).items():
+        try:
+            fingerprint = file_fingerprint(path)
+        except OSError:
+            # Fichier supprimé entre le listing et le stat
+            continue
+        csv[room_name] = (path, fingerprint['size'], fingerprint['mtime_ns'])
+    return {'csv': csv, 'store': store_snapshot(data_dir)}
+
+def _changed(previous, current):
+    return {room for room in set(previous) | set(current) if previous.get(room) != current.get(room)}
+
+def plan_work(previous, current, include_new_rooms=False):
+    """
+    Travail nécessaire entre deux états de data/
+
+    Args:
+        include_new_rooms: une room créée dans le store (en attente) déclenche un réentraînement
+
+    Returns:
+        (retrain, changed_rooms): retrain si l'ensemble des rooms a changé,
+        changed_rooms = rooms ajoutées, supprimées ou modifiées, dans les CSV
+        ou dans le store (liste triée)
+    """
+    retrain = set(previous['csv']) != set(current['csv'])
+    if include_new_rooms:
+        retrain = retrain or any(state[2] and room not in previous['store']
+                                 for room, state in current['store'].items())
+    changed = _changed(previous['csv'], current['csv']) | _changed(previous['store'], current['store'])
+    return retrain, sorted(changed)
+
+def _is_room_csv(path):
+    return bool(path) and ROOM_CSV_PATTERN.match(os.path.basename(path)) is not None
+
+class ChangeNotifier:
+    """
+    Signale qu'un CSV de room ou l'index du store a peut-être changé
+
+    watchdog (notifications du système) si installé, sinon un thread de
+    scrutation compare data_snapshot() toutes les poll_interval secondes.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, poll=False, poll_interval=POLL_INTERVAL):
+        self.data_dir = data_dir
+        self.poll_interval = poll_interval
+        self._event = threading.Event()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._thread = None
+        self.method = 'scrutation'
+        if not poll:
+            self._observer = self._create_observer()
+
+    def _create_observer(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            print("[INFO] watchdog non installé (pip install watchdog): scrutation périodique")
+            return None
+
+        notifier = self
+        data_dir = os.path.abspath(self.data_dir)
+        store_index = os.path.join(os.path.abspath(store_dir_for(self.data_dir)), INDEX_FILE)
+
+        def is_watched(path):
+            path = os.path.abspath(path) if path else ''
+            return path == store_index or (os.path.dirname(path) == data_dir and _is_room_csv(path))
+
+        class RoomCsvHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Renommage atomique (copie .tmp puis os.replace): dest_path est le CSV / l'index
+                if is_watched(event.src_path) or is_watched(getattr(event, 'dest_path', '')):
+                    notifier._event.set()
+
+        observer = Observer()
+        # Récursif: l'index du store (data/store/index.json) est réécrit à chaque ajout
+        observer.schedule(RoomCsvHandler(), self.data_dir, recursive=True)
+        self.method = f"notifications ({type(observer).__name__})"
+        return observer
+
+    def _poll(self):
+        snapshot = data_snapshot(self.data_dir)
+        while not self._stopped.wait(self.poll_interval):
+            current = data_snapshot(self.data_dir)
+            if current != snapshot:
+                snapshot = current
+                self._event.set()
+
+    def start(self):
+        if self._observer is not None:
+            self._observer.start()
+        else:
+            self._thread = threading.Thread(target=self._poll, name='watch-poll', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()
+
+    def wait(self, timeout=None):
+        """Attend un changement; True si un changement est survenu (et l'acquitte)"""
+        changed = self._event.wait(timeout)
+        self._event.clear()
+        return changed and not self._stopped.is_set()
+
+    def wait_quiet(self, debounce=DEBOUNCE_SECONDS, max_wait=MAX_WAIT_SECONDS):
+        """Attend debounce secondes sans changement (au plus max_wait) pour regrouper une rafale"""
+        deadline = time.monotonic() + max_wait
+        while not self._stopped.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.wait(min(debounce, remaining)):
+                return
+
+# ============================================================================
+# EXÉCUTION DU TRAVAIL
+# ============================================================================
+
+class SerialTask:
+    """
+    Tâche exécutée au plus une fois à la fois dans un thread dédié
+
+    Les demandes reçues pendant l'exécution sont fusionnées en une seule
+    relance, lancée dès la fin de l'exécution en cours.
+    """
+
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+        self.runs = 0
+        self._lock = threading.Lock()
+        self._running = False
+        self._pending = False
+        self._thread = None
+
+    def request(self):
+        """Demande une exécution; False si elle est fusionnée avec une exécution en cours"""
+        with self._lock:
+            if self._running:
+                if not self._pending:
+                    print(f"[INFO] {self.name} en cours: relance programmée à la fin")
+                self._pending = True
+                return False
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name=f'watch-{self.name}', daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        while True:
+            start = time.perf_counter()
+            try:
+                self.func()
+                print(f"[OK] {self.name} terminé en {time.perf_counter() - start:.1f}s")
+            except Exception as e:
+                print(f"[ERROR] {self.name}: {type(e).__name__}: {e}")
+            self.runs += 1
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+                self._pending = False
+
+    def join(self):
+        """Attend la fin de l'exécution en cours (et de sa relance éventuelle)"""
+        while True:
+            with self._lock:
+                thread = self._thread if self._running else None
+            if thread is None:
+                return
+            thread.join()
+
+class DataWatcher:
+    """Regroupe les changements de data/ et déclenche export / réentraînement"""
+
+    def __init__(self, data_dir=DATA_DIR, output_file=DEFAULT_OUTPUT_FILE, retrain=True,
+                 train_args=(), debounce=DEBOUNCE_SECONDS, max_wait=MAX_WAIT_SECONDS,
+                 poll=False, poll_interval=POLL_INTERVAL, include_new_rooms=False):
+        self.data_dir = data_dir
+        self.output_file = output_file
+        self.retrain_enabled = retrain
+        self.include_new_rooms = include_new_rooms
+        self.train_args = list(train_args) + (['--include-new-rooms'] if include_new_rooms else [])
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.notifier = ChangeNotifier(data_dir, poll, poll_interval)
+        self.export_cache = {}
+        self.export_task = SerialTask('export', self.export)
+        self.train_task = SerialTask('entraînement', self.retrain)
+        self.snapshot = data_snapshot(data_dir)
+
+    def export(self):
+        """Export csv_data.h (seules les rooms modifiées depuis l'export précédent sont relues)"""
+        export_csv_to_arduino(self.data_dir, self.output_file, cache=self.export_cache)
+
+    def retrain(self):
+        """Réentraînement dans un sous-processus (isole TensorFlow et sa mémoire du watcher)"""
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'train_model_with_date.py')
+        command = [sys.executable, script, '--data-dir', self.data_dir, *self.train_args]
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        for line in process.stdout:
+            print(f"  [train] {line.rstrip()}")
+        if process.wait() != 0:
+            raise RuntimeError(f"train_model_with_date.py a échoué (code {process.returncode})")
+
+    def process_changes(self):
+        """Compare data/ à l'état précédent et lance le travail nécessaire"""
+        current = data_snapshot(self.data_dir)
+        retrain, changed = plan_work(self.snapshot, current, self.include_new_rooms)
+        self.snapshot = current
+        if not changed:
+            return
+
+        shown = ', '.join(changed[:10]) + (f" (+{len(changed) - 10})" if len(changed) > 10 else '')
+        if retrain:
+            print(f"\n[WATCH] Ensemble des rooms modifié ({len(current['csv'])} CSV, "
+                  f"{len(current['store'])} rooms dans le store): {shown}")
+            if self.retrain_enabled:
+                self.train_task.request()
+        else:
+            print(f"\n[WATCH] {len(changed)} room(s) modifiée(s): {shown}")
+        self.export_task.request()
+
+    def run(self, initial=False):
+        """Boucle principale (Ctrl+C pour arrêter)"""
+        self.notifier.start()
+        print(f"[OK] Surveillance de {self.data_dir}/ ({len(self.snapshot['csv'])} rooms, "
+              f"{len(self.snapshot['store'])} dans le store) par {self.notifier.method}, "
+              f"regroupement {self.debounce:g}s")
+        if initial:
+            if self.retrain_enabled:
+                self.train_task.request()
+            self.export_task.request()
+        try:
+            while True:
+                if self.notifier.wait(timeout=1.0):
+                    self.notifier.wait_quiet(self.debounce, self.max_wait)
+                    self.process_changes()
+        except KeyboardInterrupt:
+            print("\n[INFO] Arrêt: attente des tâches en cours...")
+        finally:
+            self.notifier.stop()
+            self.export_task.join()
+            self.train_task.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="Surveille data/ et relance export / entraînement")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_FILE, help="Fichier csv_data.h généré")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS,
+                        help="Secondes sans changement avant de lancer le travail (défaut: 2)")
+    parser.add_argument('--max-wait', type=float, default=MAX_WAIT_SECONDS,
+                        help="Délai maximal d'une rafale de changements (défaut: 30)")
+    parser.add_argument('--poll', action='store_true', help="Scrutation périodique même si watchdog est installé")
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--no-retrain', action='store_true',
+                        help="Ne jamais réentraîner (export seul, même si des rooms sont ajoutées)")
+    parser.add_argument('--quality', help="Option --quality transmise à train_model_with_date.py")
+    parser.add_argument('--include-new-rooms', action='store_true',
+                        help="Réentraîner avec les rooms créées dans le store (ingestion) dès leur apparition")
+    parser.add_argument('--now', action='store_true', help="Export (et entraînement) immédiat au démarrage")
+    args = parser.parse_args()
+
+    train_args = ['--quality', args.quality] if args.quality else []
+    watcher = DataWatcher(args.data_dir, args.output, retrain=not args.no_retrain, train_args=train_args,
+                          debounce=args.debounce, max_wait=args.max_wait,
+                          poll=args.poll, poll_interval=args.poll_interval,
+                          include_new_rooms=args.include_new_rooms)
+    watcher.run(initial=args.now)
+
+if __name__ == "__main__":
+    main()
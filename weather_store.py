@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Historique météo local (température extérieure horaire par site)
+Remplace la température extérieure simulée de prepare_features_with_date par
+des mesures réelles, sans accès réseau:
+- dumps JSON de l'API Open-Meteo déposés dans data/weather/<site>.json
+  (même source que le firmware, cf. fetch_api_forecast)
+- à défaut, colonne External_Temp(°C) des CSV des rooms (ou du store memmap)
+
+Chaque site est un index horaire trié (int64 ns) + températures float32;
+la recherche (plus proche ou interpolation) est vectorisée par searchsorted.
+
+Usage:
+    python weather_store.py info                 # couverture des sources détectées
+"""
+
+import os
+import glob
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+from room_data import DATA_DIR, detect_room_columns, get_csv_files, read_room_columns
+from room_store import STORE_DIR, open_current_store
+
+WEATHER_DIR = os.path.join(DATA_DIR, 'weather')
+DEFAULT_SITE = 'default'
+HOUR_NS = 3600 * 1_000_000_000
+MAX_GAP_HOURS = 3.0   # Au-delà, pas d'interpolation (NaN)
+
+def hourly_mean(timestamps, values):
+    """
+    Agrège des mesures sur l'heure pleine la plus proche (moyenne), en ignorant les NaN
+
+    Returns:
+        (index horaire int64 trié, températures float32)
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    # Fenêtre centrée sur l'heure pleine: [h - 30 min, h + 30 min[
+    hours = (timestamps[valid] + HOUR_NS // 2) // HOUR_NS * HOUR_NS
+    index, inverse = np.unique(hours, return_inverse=True)
+    sums = np.bincount(inverse, weights=values[valid], minlength=len(index))
+    counts = np.bincount(inverse, minlength=len(index))
+    return index, (sums / np.maximum(counts, 1)).astype(np.float32)
+
+class WeatherStore:
+    """
+    Températures extérieures horaires par site
+
+    Attributs:
+        sites: dict site -> (timestamps int64 triés, températures float32)
+        sources: dict site -> description de la source
+    """
+
+    def __init__(self):
+        self.sites = {}
+        self.sources = {}
+
+    @property
+    def site_names(self):
+        return list(self.sites)
+
+    def add_series(self, site, timestamps, temps, source):
+        """Ajoute (ou complète) la série d'un site; les heures déjà connues sont conservées"""
+        index, values = hourly_mean(timestamps, temps)
+        if site in self.sites:
+            old_index, old_values = self.sites[site]
+            new = ~np.isin(index, old_index)
+            index = np.concatenate([old_index, index[new]])
+            values = np.concatenate([old_values, values[new]])
+            order = np.argsort(index, kind='stable')
+            index, values = index[order], values[order]
+            source = f"{self.sources[site]} + {source}"
+        self.sites[site] = (index, values)
+        self.sources[site] = source
+
+    def lookup(self, timestamps, site=DEFAULT_SITE, method='interpolate', max_gap_hours=MAX_GAP_HOURS):
+        """
+        Température extérieure à chaque timestamp, en une passe vectorisée
+
+        Args:
+            timestamps: int64 ns (ex: RoomFrame.timestamps)
+            method: 'interpolate' (linéaire entre heures encadrantes) ou 'nearest'
+            max_gap_hours: écart maximal entre heures encadrantes (sinon NaN)
+
+        Returns:
+            Tableau float32, NaN hors de la couverture du site
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        result = np.full(len(timestamps), np.nan, dtype=np.float32)
+        if site not in self.sites or len(self.sites[site][0]) == 0:
+            return result
+        index, values = self.sites[site]
+        max_gap = int(max_gap_hours * HOUR_NS)
+
+        nxt = np.searchsorted(index, timestamps, side='left')
+        prev = np.clip(nxt - 1, 0, len(index) - 1)
+        nxt_c = np.clip(nxt, 0, len(index) - 1)
+        exact = (nxt < len(index)) & (index[nxt_c] == timestamps)
+        inside = (nxt > 0) & (nxt < len(index))
+        span = index[nxt_c] - index[prev]
+        ok = inside & (span > 0) & (span <= max_gap)
+
+        if method == 'nearest':
+            d_prev = timestamps - index[prev]
+            d_next = index[nxt_c] - timestamps
+            chosen = np.where(d_prev <= d_next, prev, nxt_c)
+            result[ok] = values[chosen[ok]]
+        elif method == 'interpolate':
+            weight = (timestamps - index[prev]) / np.where(span > 0, span, 1)
+            interpolated = values[prev] + (values[nxt_c] - values[prev]) * weight
+            result[ok] = interpolated[ok]
+        else:
+            raise ValueError(f"Méthode inconnue: '{method}' (attendu: 'interpolate' ou 'nearest')")
+
+        result[exact] = values[nxt_c[exact]]
+        return result
+
+    def coverage(self, timestamps, site=DEFAULT_SITE):
+        """Part des timestamps couverts par la série du site (0 à 1)"""
+        if len(timestamps) == 0:
+            return 0.0
+        return float((~np.isnan(self.lookup(timestamps, site))).mean())
+
+# ============================================================================
+# SOURCES
+# ============================================================================
+
+def read_open_meteo_json(path):
+    """
+    Lit un dump JSON de l'API Open-Meteo (archive ou forecast)
+
+    Les heures 'iso8601' sont prises telles quelles (heure locale si la requête
+    utilisait timezone=auto, comme les CSV); en 'unixtime', le décalage
+    utc_offset_seconds est appliqué pour revenir à l'heure locale.
+
+    Returns:
+        (timestamps int64 ns, températures float32)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    hourly = payload.get('hourly', {})
+    if 'time' not in hourly or 'temperature_2m' not in hourly:
+        raise ValueError(f"{path}: champs hourly.time / hourly.temperature_2m absents")
+
+    times = hourly['time']
+    if times and isinstance(times[0], (int, float)):
+        offset = int(payload.get('utc_offset_seconds', 0))
+        timestamps = (np.asarray(times, dtype=np.int64) + offset) * 1_000_000_000
+    else:
+        timestamps = pd.to_datetime(times).values.astype('datetime64[ns]').view(np.int64)
+    temps = np.array([np.nan if t is None else t for t in hourly['temperature_2m']], dtype=np.float32)
+    return timestamps, temps
+
+def _room_external_series(csv_files, store_dir=STORE_DIR):
+    """Séries (timestamps, température extérieure) de chaque room qui en possède"""
+    store = open_current_store(csv_files, store_dir)
+    if store is not None:
+        return [(store.column(name, 'timestamp'), store.column(name, 'external_temp'))
+                for name in store.room_names if store.has_column(name, 'external_temp')]
+
+    series = []
+    for csv_file in csv_files.values():
+        try:
+            _, detected = detect_room_columns(csv_file)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] {csv_file}: {e}")
+            continue
+        if detected['timestamp'] is None or detected['external_temp'] is None:
+            continue
+        timestamps, values = read_room_columns(
+            csv_file, {'timestamp': detected['timestamp'], 'external_temp': detected['external_temp']})
+        series.append((timestamps, values['external_temp']))
+    return series
+
+def load_weather_store(csv_files=None, weather_dir=WEATHER_DIR, site=DEFAULT_SITE, store_dir=STORE_DIR):
+    """
+    Construit le store météo à partir des sources locales
+
+    Priorité aux dumps Open-Meteo (data/weather/<site>.json); les heures qu'ils
+    ne couvrent pas sont complétées par la colonne External_Temp des CSV
+    (attribuée à `site`, moyenne de toutes les rooms pour chaque heure).
+
+    Returns:
+        WeatherStore (éventuellement vide)
+    """
+    weather = WeatherStore()
+    for path in sorted(glob.glob(os.path.join(weather_dir, '*.json'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            timestamps, temps = read_open_meteo_json(path)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Météo ignorée: {e}")
+            continue
+        weather.add_series(name, timestamps, temps, f"Open-Meteo ({os.path.basename(path)})")
+
+    csv_files = get_csv_files() if csv_files is None else csv_files
+    series = _room_external_series(csv_files, store_dir)
+    if series:
+        weather.add_series(site, np.concatenate([ts for ts, _ in series]),
+                           np.concatenate([values for _, values in series]),
+                           f"colonne External_Temp ({len(series)} rooms)")
+    return weather
+
+def print_weather_info(weather):
+    """Affiche la couverture de chaque site"""
+    if not weather.sites:
+        print(f"[WARN] Aucune donnée météo (ni {WEATHER_DIR}/*.json, ni colonne External_Temp)")
+        return
+    for site, (index, values) in weather.sites.items():
+        start = pd.Timestamp(index[0]) if len(index) else None
+        end = pd.Timestamp(index[-1]) if len(index) else None
+        print(f"[INFO] {site}: {len(index)} heures, {start} -> {end}, "
+              f"{np.nanmin(values):.1f}..{np.nanmax(values):.1f}°C ({weather.sources[site]})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Historique météo local (température extérieure)")
+    parser.add_argument('command', choices=['info'])
+    parser.add_argument('--weather-dir', default=WEATHER_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print_weather_info(load_weather_store(weather_dir=args.weather_dir))
+
+if __name__ == "__main__":
+    main()